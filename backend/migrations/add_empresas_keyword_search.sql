@@ -0,0 +1,50 @@
+-- Migração: Busca indexada de empresas por palavras-chave
+-- Data: 2025-06-XX
+-- Descrição: A busca por palavras-chave montava três ILIKE '%termo%' por palavra, unidos
+--            por OR, sobre descricao_servicos_produtos, palavras_chave::text e
+--            setor_atuacao — custo proporcional a (nº de palavras × tamanho da tabela).
+--            Passa a existir um vetor de busca ponderado (nome/palavras-chave > descrição
+--            > setor) e um array normalizado das palavras-chave (minúsculas, sem acentos),
+--            ambos mantidos por trigger e indexados com GIN.
+--            Depende de f_unaccent (migrations/add_licitacoes_text_search.sql).
+
+ALTER TABLE empresas ADD COLUMN IF NOT EXISTS busca_vetor tsvector;
+ALTER TABLE empresas ADD COLUMN IF NOT EXISTS palavras_chave_norm text[] NOT NULL DEFAULT '{}';
+
+CREATE OR REPLACE FUNCTION empresas_atualizar_busca()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.palavras_chave_norm := ARRAY(
+        SELECT DISTINCT lower(f_unaccent(btrim(palavra)))
+        FROM jsonb_array_elements_text(
+            CASE WHEN jsonb_typeof(NEW.palavras_chave) = 'array' THEN NEW.palavras_chave ELSE '[]'::jsonb END
+        ) AS palavra
+        WHERE btrim(palavra) <> ''
+    );
+    NEW.busca_vetor :=
+        setweight(to_tsvector('portuguese', f_unaccent(COALESCE(NEW.nome_fantasia, ''))), 'A') ||
+        setweight(to_tsvector('portuguese', array_to_string(NEW.palavras_chave_norm, ' ')), 'A') ||
+        setweight(to_tsvector('portuguese', f_unaccent(COALESCE(NEW.descricao_servicos_produtos, ''))), 'B') ||
+        setweight(to_tsvector('portuguese', f_unaccent(COALESCE(NEW.setor_atuacao, ''))), 'C');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_empresas_atualizar_busca ON empresas;
+CREATE TRIGGER trg_empresas_atualizar_busca
+    BEFORE INSERT OR UPDATE OF nome_fantasia, descricao_servicos_produtos, palavras_chave, setor_atuacao
+    ON empresas
+    FOR EACH ROW EXECUTE FUNCTION empresas_atualizar_busca();
+
+-- Preencher as empresas existentes (o trigger calcula as colunas)
+UPDATE empresas SET palavras_chave = palavras_chave;
+
+CREATE INDEX IF NOT EXISTS idx_empresas_busca_vetor
+    ON empresas USING GIN (busca_vetor);
+
+CREATE INDEX IF NOT EXISTS idx_empresas_palavras_chave_norm
+    ON empresas USING GIN (palavras_chave_norm);
+
+COMMENT ON COLUMN empresas.busca_vetor IS 'tsvector ponderado: nome/palavras-chave (A), descrição (B), setor (C); mantido por trigger';
+COMMENT ON COLUMN empresas.palavras_chave_norm IS 'Palavras-chave em minúsculas e sem acentos; mantido por trigger';
+COMMENT ON FUNCTION empresas_atualizar_busca() IS 'Recalcula busca_vetor e palavras_chave_norm das empresas';
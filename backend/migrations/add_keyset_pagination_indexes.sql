@@ -0,0 +1,23 @@
+-- Migração: Índices para paginação por keyset (cursor)
+-- Data: 2025-06-XX
+-- Descrição: As listagens de licitações e matches passam a paginar pela última linha
+--            da página anterior em vez de OFFSET. Cada índice cobre a ordem da
+--            listagem (lido de trás para frente para o ORDER BY ... DESC), então a
+--            comparação de linha (a, b, id) < (...) começa direto no ponto certo.
+
+-- GET /api/bids/detailed: ORDER BY data_publicacao DESC, created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_licitacoes_keyset
+    ON licitacoes(data_publicacao, created_at, id);
+
+-- Listagens de matches: ORDER BY score_similaridade DESC, created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_matches_keyset
+    ON matches(score_similaridade, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_matches_empresa_keyset
+    ON matches(empresa_id, score_similaridade, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_matches_licitacao_keyset
+    ON matches(licitacao_id, score_similaridade, created_at, id);
+
+COMMENT ON INDEX idx_licitacoes_keyset IS 'Paginação por cursor de /api/bids/detailed (data_publicacao, created_at, id)';
+COMMENT ON INDEX idx_matches_keyset IS 'Paginação por cursor das listagens de matches (score, created_at, id)';
+COMMENT ON INDEX idx_matches_empresa_keyset IS 'Paginação por cursor dos matches de uma empresa';
+COMMENT ON INDEX idx_matches_licitacao_keyset IS 'Paginação por cursor dos matches de uma licitação';
@@ -0,0 +1,16 @@
+-- Migração: Modalidade da contratação nas licitações
+-- Data: 2025-06-XX
+-- Descrição: Grava modalidadeId / modalidadeNome informados pelo PNCP. As listagens
+--            (/api/bids/detailed e a busca de licitações) e a visão de estatísticas
+--            do dashboard já filtram e agrupam por essas colunas.
+
+ALTER TABLE licitacoes ADD COLUMN IF NOT EXISTS modalidade_id INTEGER;
+ALTER TABLE licitacoes ADD COLUMN IF NOT EXISTS modalidade_nome VARCHAR(100);
+
+-- GET /api/bids/detailed?modalidade_id=: filtro + ordem da paginação por keyset
+CREATE INDEX IF NOT EXISTS idx_licitacoes_modalidade_keyset
+    ON licitacoes(modalidade_id, data_publicacao, created_at, id);
+
+COMMENT ON COLUMN licitacoes.modalidade_id IS 'modalidadeId informado pelo PNCP (ex: 6 = Pregão Eletrônico)';
+COMMENT ON COLUMN licitacoes.modalidade_nome IS 'modalidadeNome informado pelo PNCP';
+COMMENT ON INDEX idx_licitacoes_modalidade_keyset IS 'Paginação por cursor de /api/bids/detailed filtrada por modalidade';
@@ -0,0 +1,34 @@
+-- Migração: Busca textual indexada no objeto das licitações
+-- Data: 2025-06-XX
+-- Descrição: A busca por objeto usava objeto_compra ILIKE '%termo%', que não usa índice
+--            B-tree e percorria a tabela inteira. Passa a existir uma coluna tsvector
+--            (português, sem acentos) gerada a partir de objeto_compra, com índice GIN,
+--            e um índice de trigramas (pg_trgm) para buscas por trecho de palavra.
+--            Atenção: adicionar a coluna gerada reescreve a tabela licitacoes.
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- unaccent() é STABLE (depende do search_path); o wrapper com dicionário explícito
+-- pode ser IMMUTABLE e, assim, usado em colunas geradas e índices de expressão
+CREATE OR REPLACE FUNCTION f_unaccent(text)
+RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+ALTER TABLE licitacoes
+    ADD COLUMN IF NOT EXISTS objeto_busca tsvector
+    GENERATED ALWAYS AS (to_tsvector('portuguese', f_unaccent(COALESCE(objeto_compra, '')))) STORED;
+
+-- Busca por palavras (objeto_busca @@ websearch_to_tsquery(...)) com ranking
+CREATE INDEX IF NOT EXISTS idx_licitacoes_objeto_busca
+    ON licitacoes USING GIN (objeto_busca);
+
+-- Busca por trecho (f_unaccent(objeto_compra) ILIKE f_unaccent('%termo%'))
+CREATE INDEX IF NOT EXISTS idx_licitacoes_objeto_trgm
+    ON licitacoes USING GIN (f_unaccent(objeto_compra) gin_trgm_ops);
+
+COMMENT ON FUNCTION f_unaccent(text) IS 'unaccent IMMUTABLE para índices e colunas geradas';
+COMMENT ON COLUMN licitacoes.objeto_busca IS 'tsvector (português, sem acentos) de objeto_compra para busca textual';
+COMMENT ON INDEX idx_licitacoes_objeto_busca IS 'GIN para busca textual no objeto';
+COMMENT ON INDEX idx_licitacoes_objeto_trgm IS 'GIN de trigramas para busca por trecho no objeto';
@@ -0,0 +1,37 @@
+-- Migração: Chave única para matches (licitacao_id, empresa_id)
+-- Data: 2025-06-XX
+-- Descrição: Torna a escrita de matches idempotente. Reexecuções do matching
+--            (busca diária ou reavaliação) passam a atualizar o match existente
+--            via ON CONFLICT em vez de criar linhas duplicadas.
+
+-- 1. Remover duplicatas existentes, mantendo o match de maior score
+--    (em caso de empate, o mais recente)
+DELETE FROM matches m
+USING (
+    SELECT id,
+           ROW_NUMBER() OVER (
+               PARTITION BY licitacao_id, empresa_id
+               ORDER BY score_similaridade DESC, data_match DESC NULLS LAST, id
+           ) AS rn
+    FROM matches
+) d
+WHERE m.id = d.id
+  AND d.rn > 1;
+
+-- 2. Criar a constraint única (idempotente)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'uq_matches_licitacao_empresa'
+    ) THEN
+        ALTER TABLE matches
+        ADD CONSTRAINT uq_matches_licitacao_empresa UNIQUE (licitacao_id, empresa_id);
+    END IF;
+END $$;
+
+-- O índice da constraint também atende consultas por licitacao_id;
+-- índice auxiliar para consultas por empresa
+CREATE INDEX IF NOT EXISTS idx_matches_empresa_id ON matches(empresa_id);
+
+COMMENT ON CONSTRAINT uq_matches_licitacao_empresa ON matches IS 'Um único match por par licitação/empresa (upsert via ON CONFLICT)';
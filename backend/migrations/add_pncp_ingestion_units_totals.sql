@@ -0,0 +1,11 @@
+-- Migração: Totais informados pelo PNCP nas unidades de ingestão
+-- Data: 2025-06-XX
+-- Descrição: A primeira página de cada dia × UF × modalidade informa totalRegistros
+--            e totalPaginas; as páginas seguintes são criadas de uma vez a partir
+--            desses totais e o progresso compara licitações esperadas e recebidas.
+
+ALTER TABLE pncp_ingestion_units ADD COLUMN IF NOT EXISTS total_registros INTEGER;
+ALTER TABLE pncp_ingestion_units ADD COLUMN IF NOT EXISTS total_paginas INTEGER;
+
+COMMENT ON COLUMN pncp_ingestion_units.total_registros IS 'totalRegistros informado pelo PNCP na resposta da página';
+COMMENT ON COLUMN pncp_ingestion_units.total_paginas IS 'totalPaginas informado pelo PNCP na resposta da página';
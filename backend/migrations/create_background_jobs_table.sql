@@ -0,0 +1,53 @@
+-- Migração: Fila durável de jobs em background
+-- Data: 2025-06-XX
+-- Descrição: Substitui as threads daemon dos web workers. Jobs (busca diária,
+--            reavaliação, processamento de documentos) são enfileirados aqui e
+--            consumidos por um pool de workers (no processo web ou em processo
+--            separado) via SELECT ... FOR UPDATE SKIP LOCKED.
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    job_type VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    priority INTEGER NOT NULL DEFAULT 100,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    dedupe_key VARCHAR(200),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    locked_by VARCHAR(200),
+    locked_at TIMESTAMP WITH TIME ZONE,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    duration_ms BIGINT,
+    result JSONB,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    CONSTRAINT chk_background_jobs_status CHECK (status IN ('queued', 'running', 'done', 'failed', 'cancelled'))
+);
+
+-- Índice da consulta de claim (fila por prioridade)
+CREATE INDEX IF NOT EXISTS idx_background_jobs_claim
+    ON background_jobs(priority, run_after, created_at)
+    WHERE status = 'queued';
+
+-- Jobs em execução (detecção de workers mortos por heartbeat)
+CREATE INDEX IF NOT EXISTS idx_background_jobs_running
+    ON background_jobs(heartbeat_at)
+    WHERE status = 'running';
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_type_created ON background_jobs(job_type, created_at DESC);
+
+-- Um único job ativo por dedupe_key (ex.: uma busca diária por vez)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_background_jobs_dedupe_active
+    ON background_jobs(dedupe_key)
+    WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running');
+
+COMMENT ON TABLE background_jobs IS 'Fila durável de jobs em background (claim com FOR UPDATE SKIP LOCKED)';
+COMMENT ON COLUMN background_jobs.priority IS 'Menor valor = maior prioridade';
+COMMENT ON COLUMN background_jobs.dedupe_key IS 'Evita jobs ativos duplicados com a mesma chave';
+COMMENT ON COLUMN background_jobs.run_after IS 'Não executar antes desta data (backoff de retentativas)';
+COMMENT ON COLUMN background_jobs.heartbeat_at IS 'Último sinal de vida do worker; jobs sem heartbeat voltam para a fila';
+COMMENT ON COLUMN background_jobs.duration_ms IS 'Duração da última tentativa em milissegundos';
@@ -0,0 +1,108 @@
+-- Migração: Views materializadas de resumo para os endpoints do dashboard
+-- Data: 2025-06-XX
+-- Descrição: As estatísticas de licitações e matches eram agregadas sobre as tabelas
+--            inteiras a cada carregamento do dashboard. Os agregados passam a ficar em
+--            views materializadas pequenas, atualizadas com REFRESH ... CONCURRENTLY
+--            pelos processos que escrevem (ingestão do PNCP e matching), sem bloquear
+--            as leituras. Cada view tem um índice único, exigido pelo refresh concorrente.
+
+-- Licitações: uma linha por dimensão/chave (total, modalidade, uf, status, modo de disputa, srp)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_licitacoes_estatisticas AS
+SELECT
+    CASE
+        WHEN GROUPING(modalidade_nome, modalidade_id) = 0 THEN 'modalidade'
+        WHEN GROUPING(uf) = 0 THEN 'uf'
+        WHEN GROUPING(status) = 0 THEN 'status'
+        WHEN GROUPING(modo_disputa_nome) = 0 THEN 'modo_disputa'
+        WHEN GROUPING(srp) = 0 THEN 'srp'
+        ELSE 'total'
+    END AS dimensao,
+    COALESCE(modalidade_nome, uf, status, modo_disputa_nome, srp::text, '') AS chave,
+    COALESCE(modalidade_id, -1) AS chave_id,
+    COUNT(*) AS quantidade,
+    COUNT(valor_total_estimado) AS qtd_com_valor,
+    COALESCE(SUM(valor_total_estimado), 0) AS soma_valor,
+    COUNT(*) FILTER (WHERE valor_total_estimado > 0) AS qtd_valor_positivo,
+    COALESCE(SUM(valor_total_estimado) FILTER (WHERE valor_total_estimado > 0), 0) AS soma_valor_positivo,
+    MIN(valor_total_estimado) FILTER (WHERE valor_total_estimado > 0) AS min_valor_positivo,
+    MAX(valor_total_estimado) FILTER (WHERE valor_total_estimado > 0) AS max_valor_positivo,
+    COUNT(*) FILTER (WHERE data_publicacao >= CURRENT_DATE - 30) AS recentes_30_dias,
+    COUNT(*) FILTER (WHERE data_encerramento_proposta > NOW()) AS propostas_abertas,
+    MIN(data_publicacao) AS primeira_publicacao,
+    MAX(data_publicacao) AS ultima_publicacao,
+    GREATEST(MAX(updated_at), MAX(created_at)) AS ultima_atualizacao,
+    NOW() AS atualizado_em
+FROM licitacoes
+GROUP BY GROUPING SETS ((), (modalidade_nome, modalidade_id), (uf), (status), (modo_disputa_nome), (srp));
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_licitacoes_estatisticas
+    ON mv_licitacoes_estatisticas(dimensao, chave, chave_id);
+
+-- Itens por tipo (material/serviço)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_licitacao_itens_tipos AS
+SELECT
+    material_ou_servico,
+    COUNT(*) AS quantidade,
+    AVG(valor_unitario_estimado) AS valor_medio,
+    SUM(valor_unitario_estimado * quantidade) AS valor_total,
+    NOW() AS atualizado_em
+FROM licitacao_itens
+WHERE material_ou_servico IS NOT NULL
+GROUP BY material_ou_servico;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_licitacao_itens_tipos
+    ON mv_licitacao_itens_tipos(material_ou_servico);
+
+-- Matches: totais globais (linha única)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_matches_resumo AS
+SELECT
+    1 AS id,
+    COUNT(*) AS total_matches,
+    AVG(score_similaridade) AS score_medio,
+    MAX(score_similaridade) AS melhor_score,
+    MIN(score_similaridade) AS pior_score,
+    COUNT(*) FILTER (WHERE score_similaridade >= 0.9) AS matches_excelentes,
+    COUNT(*) FILTER (WHERE score_similaridade >= 0.8) AS matches_bons,
+    COUNT(*) FILTER (WHERE score_similaridade >= 0.7) AS matches_regulares,
+    COUNT(DISTINCT empresa_id) AS empresas_com_matches,
+    COUNT(DISTINCT licitacao_id) AS licitacoes_com_matches,
+    MAX(created_at) AS ultimo_match_criado,
+    MIN(created_at) AS primeiro_match_criado,
+    COUNT(*) FILTER (WHERE score_similaridade >= 0.9) AS faixa_09_10,
+    COUNT(*) FILTER (WHERE score_similaridade >= 0.8 AND score_similaridade < 0.9) AS faixa_08_09,
+    COUNT(*) FILTER (WHERE score_similaridade >= 0.7 AND score_similaridade < 0.8) AS faixa_07_08,
+    COUNT(*) FILTER (WHERE score_similaridade >= 0.6 AND score_similaridade < 0.7) AS faixa_06_07,
+    COUNT(*) FILTER (WHERE score_similaridade >= 0.5 AND score_similaridade < 0.6) AS faixa_05_06,
+    COUNT(*) FILTER (WHERE score_similaridade < 0.5) AS faixa_00_05,
+    NOW() AS atualizado_em
+FROM matches;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_matches_resumo ON mv_matches_resumo(id);
+
+-- Matches por empresa (resumo por empresa e top empresas)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_matches_por_empresa AS
+SELECT
+    e.id AS empresa_id,
+    e.nome_fantasia AS empresa_nome,
+    e.razao_social,
+    e.cnpj,
+    e.setor_atuacao,
+    COUNT(m.id) AS total_matches,
+    AVG(m.score_similaridade) AS score_medio,
+    MAX(m.score_similaridade) AS melhor_score,
+    MIN(m.score_similaridade) AS pior_score,
+    NOW() AS atualizado_em
+FROM empresas e
+JOIN matches m ON e.id = m.empresa_id
+GROUP BY e.id, e.nome_fantasia, e.razao_social, e.cnpj, e.setor_atuacao;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_matches_por_empresa ON mv_matches_por_empresa(empresa_id);
+CREATE INDEX IF NOT EXISTS idx_mv_matches_por_empresa_total
+    ON mv_matches_por_empresa(total_matches DESC, score_medio DESC);
+
+COMMENT ON MATERIALIZED VIEW mv_licitacoes_estatisticas IS 'Agregados de licitações por dimensão (total, modalidade, uf, status, modo_disputa, srp) para o dashboard';
+COMMENT ON MATERIALIZED VIEW mv_licitacao_itens_tipos IS 'Itens de licitação agregados por material/serviço';
+COMMENT ON MATERIALIZED VIEW mv_matches_resumo IS 'Totais globais e distribuição de scores dos matches (linha única)';
+COMMENT ON MATERIALIZED VIEW mv_matches_por_empresa IS 'Resumo de matches por empresa (total e scores)';
+COMMENT ON COLUMN mv_licitacoes_estatisticas.chave_id IS 'modalidade_id na dimensão modalidade; -1 nas demais';
+COMMENT ON COLUMN mv_licitacoes_estatisticas.atualizado_em IS 'Momento do último REFRESH da view';
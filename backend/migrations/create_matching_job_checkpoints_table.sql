@@ -0,0 +1,24 @@
+-- Migração: Checkpoints duráveis dos jobs de matching
+-- Data: 2025-06-XX
+-- Descrição: Registra o progresso da busca diária (UF/página) e da reavaliação
+--            (última licitação processada) com um snapshot parcial das estatísticas.
+--            Um job interrompido (deploy, OOM) retoma do último checkpoint.
+
+CREATE TABLE IF NOT EXISTS matching_job_checkpoints (
+    job_name VARCHAR(200) PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    cursor JSONB NOT NULL DEFAULT '{}'::jsonb,
+    stats JSONB NOT NULL DEFAULT '{}'::jsonb,
+    resumed_count INTEGER NOT NULL DEFAULT 0,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_matching_job_checkpoints_status ON matching_job_checkpoints(status, updated_at DESC);
+
+COMMENT ON TABLE matching_job_checkpoints IS 'Checkpoints duráveis dos jobs de matching (busca diária e reavaliação)';
+COMMENT ON COLUMN matching_job_checkpoints.job_name IS 'Identificador do job (ex.: daily:20250610, reevaluate)';
+COMMENT ON COLUMN matching_job_checkpoints.status IS 'running (retomável) ou completed';
+COMMENT ON COLUMN matching_job_checkpoints.cursor IS 'Posição do último trabalho concluído (UF/página ou última licitação)';
+COMMENT ON COLUMN matching_job_checkpoints.stats IS 'Snapshot parcial das estatísticas da execução';
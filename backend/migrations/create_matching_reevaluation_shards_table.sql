@@ -0,0 +1,55 @@
+-- Migração: Reavaliação em shards (múltiplos processos/hosts)
+-- Data: 2025-06-XX
+-- Descrição: Uma execução da reavaliação é dividida em N shards por bucket de hash
+--            do id da licitação. Os shards são reservados com FOR UPDATE SKIP LOCKED
+--            por qualquer worker (processo ou host); os matches de cada shard são
+--            gravados por upsert idempotente e a finalização aplica o limite por empresa.
+
+CREATE TABLE IF NOT EXISTS matching_reevaluation_runs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    shard_count INTEGER NOT NULL,
+    clear_matches BOOLEAN NOT NULL DEFAULT TRUE,
+    vectorizer VARCHAR(100),
+    company_embeddings BYTEA,
+    stats JSONB NOT NULL DEFAULT '{}'::jsonb,
+    last_error TEXT,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Execuções criadas antes do heartbeat da finalização
+ALTER TABLE matching_reevaluation_runs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITH TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS idx_matching_reevaluation_runs_status ON matching_reevaluation_runs(status, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS matching_reevaluation_shards (
+    run_id UUID NOT NULL REFERENCES matching_reevaluation_runs(id) ON DELETE CASCADE,
+    shard_index INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    worker VARCHAR(200),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    bids_processed INTEGER NOT NULL DEFAULT 0,
+    matches_saved INTEGER NOT NULL DEFAULT 0,
+    stats JSONB NOT NULL DEFAULT '{}'::jsonb,
+    score_payload BYTEA,
+    last_error TEXT,
+    started_at TIMESTAMP WITH TIME ZONE,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    duration_ms BIGINT,
+    PRIMARY KEY (run_id, shard_index)
+);
+
+CREATE INDEX IF NOT EXISTS idx_matching_reevaluation_shards_claim
+    ON matching_reevaluation_shards(run_id, status, shard_index);
+
+COMMENT ON TABLE matching_reevaluation_runs IS 'Execuções da reavaliação em shards';
+COMMENT ON COLUMN matching_reevaluation_runs.status IS 'running, finalizing, completed ou failed';
+COMMENT ON COLUMN matching_reevaluation_runs.heartbeat_at IS 'Sinal de vida da finalização; execuções finalizing sem heartbeat recente são finalizadas por outro worker';
+COMMENT ON COLUMN matching_reevaluation_runs.company_embeddings IS 'Embeddings das empresas (npz) calculados uma vez e compartilhados pelos shards';
+COMMENT ON TABLE matching_reevaluation_shards IS 'Unidades de trabalho da reavaliação: bucket de hash do id da licitação';
+COMMENT ON COLUMN matching_reevaluation_shards.status IS 'pending, running, done ou failed';
+COMMENT ON COLUMN matching_reevaluation_shards.heartbeat_at IS 'Último sinal de vida; shards running sem heartbeat recente podem ser reservados de novo';
+COMMENT ON COLUMN matching_reevaluation_shards.score_payload IS 'Matriz de scores do shard (npz), consolidada na finalização';
@@ -0,0 +1,32 @@
+-- Migração: Matriz esparsa de scores por execução do matching
+-- Data: 2025-06-XX
+-- Descrição: Cada execução (busca diária ou reavaliação) persiste os top-N scores
+--            licitação × empresa (Fase 1) e os scores de itens da Fase 2 em formato
+--            compacto (npz comprimido). Permite recalcular o conjunto de matches para
+--            novos thresholds sem novas chamadas de embedding.
+
+CREATE TABLE IF NOT EXISTS matching_score_runs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    run_type VARCHAR(50) NOT NULL,
+    vectorizer VARCHAR(100),
+    threshold_phase1 DOUBLE PRECISION NOT NULL,
+    threshold_phase2 DOUBLE PRECISION NOT NULL,
+    top_n INTEGER NOT NULL,
+    min_score DOUBLE PRECISION NOT NULL,
+    n_bids INTEGER NOT NULL DEFAULT 0,
+    n_companies INTEGER NOT NULL DEFAULT 0,
+    nnz INTEGER NOT NULL DEFAULT 0,
+    payload BYTEA NOT NULL,
+    payload_bytes INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_matching_score_runs_created_at ON matching_score_runs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_matching_score_runs_run_type ON matching_score_runs(run_type, created_at DESC);
+
+COMMENT ON TABLE matching_score_runs IS 'Matriz esparsa top-N de scores (licitação × empresa + itens da Fase 2) de cada execução do matching';
+COMMENT ON COLUMN matching_score_runs.run_type IS 'Origem da execução (daily, reevaluation)';
+COMMENT ON COLUMN matching_score_runs.top_n IS 'Máximo de empresas registradas por licitação';
+COMMENT ON COLUMN matching_score_runs.min_score IS 'Score mínimo registrado (piso para recálculo de thresholds)';
+COMMENT ON COLUMN matching_score_runs.nnz IS 'Quantidade de pares licitação/empresa registrados';
+COMMENT ON COLUMN matching_score_runs.payload IS 'Arrays numpy (npz comprimido) com a matriz esparsa';
@@ -0,0 +1,24 @@
+-- Migração: Índice do arquivo de payloads brutos do PNCP
+-- Data: 2025-06-XX
+-- Descrição: As respostas das APIs de publicação/atualização e de itens são
+--            gravadas em segmentos JSONL comprimidos com zstd (um frame por
+--            registro) organizados por data/UF. Esta tabela aponta o último
+--            payload arquivado de cada contratação (segmento, offset e tamanho).
+
+CREATE TABLE IF NOT EXISTS pncp_archive_index (
+    pncp_id VARCHAR(255) NOT NULL,
+    kind VARCHAR(10) NOT NULL CHECK (kind IN ('bid', 'items')),
+    data_publicacao DATE,
+    uf VARCHAR(2),
+    segment TEXT NOT NULL,
+    frame_offset BIGINT NOT NULL,
+    frame_length INTEGER NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (pncp_id, kind)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pncp_archive_index_data_uf ON pncp_archive_index(data_publicacao, uf);
+
+COMMENT ON TABLE pncp_archive_index IS 'Localização do último payload bruto do PNCP arquivado por contratação';
+COMMENT ON COLUMN pncp_archive_index.segment IS 'Caminho do segmento .jsonl.zst relativo a PNCP_ARCHIVE_DIR';
+COMMENT ON COLUMN pncp_archive_index.frame_offset IS 'Offset em bytes do frame zstd do registro no segmento';
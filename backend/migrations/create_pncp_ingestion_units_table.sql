@@ -0,0 +1,34 @@
+-- Migração: Unidades de trabalho da ingestão do PNCP (backfill)
+-- Data: 2025-06-XX
+-- Descrição: O backfill divide um intervalo de datas em unidades dia × UF × página.
+--            Unidades são reservadas com FOR UPDATE SKIP LOCKED por várias threads
+--            (ou processos) e ficam registradas como concluídas, de modo que uma
+--            nova execução do mesmo intervalo pula o que já foi ingerido.
+
+CREATE TABLE IF NOT EXISTS pncp_ingestion_units (
+    id BIGSERIAL PRIMARY KEY,
+    data_publicacao DATE NOT NULL,
+    uf VARCHAR(2) NOT NULL,
+    modalidade INTEGER NOT NULL DEFAULT 6,
+    pagina INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker VARCHAR(200),
+    bids_found INTEGER NOT NULL DEFAULT 0,
+    bids_new INTEGER NOT NULL DEFAULT 0,
+    matches_saved INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    duration_ms BIGINT,
+    CONSTRAINT uq_pncp_ingestion_units UNIQUE (data_publicacao, uf, modalidade, pagina)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pncp_ingestion_units_claim
+    ON pncp_ingestion_units(status, data_publicacao, uf, pagina);
+
+COMMENT ON TABLE pncp_ingestion_units IS 'Unidades dia × UF × modalidade × página da ingestão do PNCP (backfill)';
+COMMENT ON COLUMN pncp_ingestion_units.status IS 'pending, running, done ou failed';
+COMMENT ON COLUMN pncp_ingestion_units.bids_found IS 'Licitações retornadas pela página';
+COMMENT ON COLUMN pncp_ingestion_units.bids_new IS 'Licitações novas (ainda não processadas) salvas pela unidade';
@@ -0,0 +1,24 @@
+-- Migração: Sincronização incremental de licitações alteradas no PNCP
+-- Data: 2025-06-XX
+-- Descrição: Guarda a marca d'água (maior dataAtualizacao já sincronizada) da
+--            consulta de contratações por data de atualização e adiciona à tabela
+--            licitacoes a situação da compra e a data de atualização no PNCP.
+
+CREATE TABLE IF NOT EXISTS pncp_sync_state (
+    sync_name VARCHAR(100) PRIMARY KEY,
+    watermark TIMESTAMP,
+    last_run_at TIMESTAMP WITH TIME ZONE,
+    last_stats JSONB NOT NULL DEFAULT '{}'::jsonb,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE licitacoes ADD COLUMN IF NOT EXISTS situacao_compra_id INTEGER;
+ALTER TABLE licitacoes ADD COLUMN IF NOT EXISTS situacao_compra_nome VARCHAR(100);
+ALTER TABLE licitacoes ADD COLUMN IF NOT EXISTS data_atualizacao_pncp TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_licitacoes_data_atualizacao_pncp ON licitacoes(data_atualizacao_pncp DESC);
+
+COMMENT ON TABLE pncp_sync_state IS 'Marca d''água da sincronização incremental com o PNCP';
+COMMENT ON COLUMN pncp_sync_state.watermark IS 'Maior dataAtualizacao (horário do PNCP) já sincronizada';
+COMMENT ON COLUMN licitacoes.situacao_compra_nome IS 'Situação da contratação no PNCP (ex.: Divulgada, Revogada, Anulada, Suspensa)';
+COMMENT ON COLUMN licitacoes.data_atualizacao_pncp IS 'Última atualização da contratação no PNCP';
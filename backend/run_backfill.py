@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Script de backfill da ingestão do PNCP
+Recupera licitações de um intervalo de datas (unidades dia × UF × página).
+Uso: python run_backfill.py 2025-06-01 2025-06-07 [--ufs SP,RJ] [--modalidades 6,8] [--concorrencia 4]
+"""
+
+import sys
+import argparse
+from datetime import date
+from pathlib import Path
+
+def main():
+    """Executar o backfill em primeiro plano"""
+    
+    # Adicionar o diretório src ao Python path
+    project_root = Path(__file__).parent
+    src_path = project_root / "src"
+    
+    if str(src_path) not in sys.path:
+        sys.path.insert(0, str(src_path))
+    
+    parser = argparse.ArgumentParser(description="Backfill de licitações do PNCP")
+    parser.add_argument("data_inicio", type=date.fromisoformat, help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("data_fim", type=date.fromisoformat, help="Data final (YYYY-MM-DD, inclusiva)")
+    parser.add_argument("--ufs", default="", help="UFs separadas por vírgula (padrão: todas)")
+    parser.add_argument("--modalidades", default="", help="Códigos de modalidade separados por vírgula (padrão: PNCP_MODALIDADES)")
+    parser.add_argument("--concorrencia", type=int, default=None, help="Threads de ingestão")
+    args = parser.parse_args()
+    
+    try:
+        from config.env_loader import load_environment
+        load_environment()
+    except Exception:
+        pass
+    
+    try:
+        from matching import backfill_bids, INGESTION_CONCURRENCY
+        from jobs.handlers import create_vectorizer
+        
+        ufs = [uf.strip().upper() for uf in args.ufs.split(",") if uf.strip()] or None
+        modalidades = [int(m) for m in args.modalidades.split(",") if m.strip()] or None
+        result = backfill_bids(
+            create_vectorizer(), args.data_inicio, args.data_fim,
+            ufs=ufs, concurrency=args.concorrencia or INGESTION_CONCURRENCY,
+            modalidades=modalidades
+        )
+        sys.exit(0 if result is not None else 1)
+    except KeyboardInterrupt:
+        print("\n🛑 Backfill interrompido (unidades concluídas serão puladas na próxima execução)")
+        sys.exit(0)
+    except Exception as e:
+        print(f"❌ Erro no backfill: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
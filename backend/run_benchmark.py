@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark da ingestão do PNCP (process_daily_bids de ponta a ponta)
+Sobe o servidor de replay local, aponta o pncp_api para ele (PNCP_API_HOST) e
+executa a busca diária contra um Postgres local. Reporta licitações/s,
+requisições/s e linhas gravadas no banco por segundo.
+Uso: python run_benchmark.py --database-url postgresql://localhost/alicit_bench
+     [--latency-ms 50] [--error-rate 0.01] [--max-rps 20] [--concorrencia 8] [--modalidades 6,8]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+from pathlib import Path
+
+BENCHMARK_TABLES = ['licitacoes', 'licitacao_itens', 'matches', 'pncp_ingestion_units']
+
+
+def count_rows(database_url: str) -> dict:
+    """Linhas por tabela (base para calcular linhas gravadas/s)"""
+    import psycopg2
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            counts = {}
+            for table in BENCHMARK_TABLES:
+                cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                counts[table] = cursor.fetchone()[0]
+            return counts
+    finally:
+        conn.close()
+
+
+def free_port() -> int:
+    """Porta livre para o replay (o endereço precisa ser conhecido antes de importar o matching)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    """Executar o benchmark"""
+    
+    # Adicionar o diretório src ao Python path
+    project_root = Path(__file__).parent
+    src_path = project_root / "src"
+    
+    if str(src_path) not in sys.path:
+        sys.path.insert(0, str(src_path))
+    
+    from run_pncp_replay import build_parser, create_server
+    
+    parser = build_parser("Benchmark da ingestão do PNCP")
+    parser.add_argument("--database-url", default=os.getenv('BENCHMARK_DATABASE_URL'),
+                        help="Postgres local com o schema aplicado (nunca o banco de produção)")
+    parser.add_argument("--pncp-host", default=None, help="Usar um replay já em execução em vez de subir um local")
+    parser.add_argument("--concorrencia", type=int, default=None, help="Threads de ingestão (INGESTION_CONCURRENCY)")
+    parser.add_argument("--modalidades", default=None, help="Códigos de modalidade (PNCP_MODALIDADES)")
+    parser.add_argument("--rate-limit", type=float, default=0, help="PNCP_RATE_LIMIT_PER_SECOND do cliente (0 = sem limite)")
+    parser.add_argument("--vectorizer", default="mock", help="Vetorizador (padrão: mock, sem chamadas externas)")
+    parser.add_argument("--json", action="store_true", help="Imprimir o resultado em JSON")
+    args = parser.parse_args()
+    
+    if not args.database_url:
+        parser.error("--database-url (ou BENCHMARK_DATABASE_URL) é obrigatório")
+    
+    port = None if args.pncp_host else free_port()
+    pncp_host = args.pncp_host or f"http://127.0.0.1:{port}"
+    
+    # Configuração lida na importação dos módulos de matching (antes de criar o replay)
+    os.environ['PNCP_API_HOST'] = pncp_host
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ['PNCP_RATE_LIMIT_PER_SECOND'] = str(args.rate_limit)
+    os.environ['MATCHING_BID_PAUSE_SECONDS'] = '0'
+    os.environ.setdefault('PNCP_ARCHIVE_ENABLED', 'false')
+    if args.concorrencia:
+        os.environ['INGESTION_CONCURRENCY'] = str(args.concorrencia)
+    if args.modalidades:
+        os.environ['PNCP_MODALIDADES'] = args.modalidades
+    
+    server = create_server(args, port=port).start() if port else None
+    
+    from matching import process_daily_bids
+    from matching.pncp_api import pncp_rate_limiter
+    from jobs.handlers import create_vectorizer
+    
+    print("=" * 60)
+    print(f"⏱️  Benchmark de ingestão contra {pncp_host}")
+    print("=" * 60)
+    
+    before = count_rows(args.database_url)
+    started = time.perf_counter()
+    result = process_daily_bids(create_vectorizer(args.vectorizer), resume=False)
+    duration = time.perf_counter() - started
+    after = count_rows(args.database_url)
+    
+    if result is None:
+        print("❌ Nenhuma empresa no banco de benchmark: cadastre empresas antes de medir o matching")
+        sys.exit(1)
+    
+    rows = {table: after[table] - before[table] for table in BENCHMARK_TABLES}
+    server_stats = server.stats.snapshot() if server else {}
+    report = {
+        'duracao_segundos': round(duration, 2),
+        'licitacoes_novas': result['licitacoes_novas'],
+        'licitacoes_por_segundo': round(result['licitacoes_novas'] / duration, 2),
+        'requisicoes': pncp_rate_limiter.requests,
+        'requisicoes_por_segundo': round(pncp_rate_limiter.requests / duration, 2),
+        'respostas_429_503': pncp_rate_limiter.throttled,
+        'linhas_gravadas': rows,
+        'linhas_por_segundo': round(sum(rows.values()) / duration, 2),
+        'matches_encontrados': result['matches_encontrados'],
+        'por_modalidade': result['por_modalidade'],
+        'servidor': server_stats
+    }
+    
+    if server:
+        server.stop()
+    
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print("\n📈 RESULTADO DO BENCHMARK")
+        print(f"   ⏱️  Duração: {report['duracao_segundos']}s")
+        print(f"   📄 Licitações/s: {report['licitacoes_por_segundo']} ({report['licitacoes_novas']} novas)")
+        print(f"   🌐 Requisições/s: {report['requisicoes_por_segundo']} ({report['requisicoes']} requisições, "
+              f"{report['respostas_429_503']} 429/503)")
+        print(f"   🗄️  Linhas/s no banco: {report['linhas_por_segundo']} {rows}")
+        if server_stats:
+            print(f"   🎭 Servidor: {server_stats}")
+
+if __name__ == "__main__":
+    main()
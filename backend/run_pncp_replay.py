@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Servidor de replay do PNCP (substituto local de pncp.gov.br)
+Uso: python run_pncp_replay.py [--port 8765] [--latency-ms 50] [--error-rate 0.01] [--max-rps 20]
+     [--archive-from 2025-06-01 --archive-to 2025-06-07]
+Depois: PNCP_API_HOST=http://127.0.0.1:8765 python run_backfill.py ...
+"""
+
+import sys
+import argparse
+from datetime import date
+from pathlib import Path
+
+def build_parser(description: str) -> argparse.ArgumentParser:
+    """Argumentos de comportamento do replay (compartilhados com o benchmark)"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência média por resposta")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Variação da latência (+/-)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fração de respostas 429 aleatórias")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Requisições/s antes de responder 429 (0 = sem limite)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After das respostas 429")
+    parser.add_argument("--bids-per-unit", type=int, default=120, help="Contratações sintéticas por dia × UF × modalidade")
+    parser.add_argument("--items-per-bid", type=int, default=5, help="Itens sintéticos por contratação")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--archive-from", type=date.fromisoformat, default=None, help="Servir o arquivo de payloads a partir desta data")
+    parser.add_argument("--archive-to", type=date.fromisoformat, default=None, help="Data final do arquivo servido")
+    parser.add_argument("--archive-dir", default=None, help="Diretório do arquivo (padrão: PNCP_ARCHIVE_DIR)")
+    return parser
+
+
+def create_server(args, port: int = 0):
+    """Cria o servidor de replay a partir dos argumentos"""
+    from matching.replay_server import PNCPReplayServer, ReplayConfig, ReplayDataset
+
+    config = ReplayConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, max_rps=args.max_rps, retry_after=args.retry_after,
+        bids_per_unit=args.bids_per_unit, items_per_bid=args.items_per_bid, seed=args.seed
+    )
+    dataset = ReplayDataset(config)
+    if args.archive_from:
+        total = dataset.load_archive(args.archive_from, args.archive_to or args.archive_from, args.archive_dir)
+        print(f"📼 {total} contratações carregadas do arquivo")
+    return PNCPReplayServer(config, dataset, port=port)
+
+
+def main():
+    """Executar o servidor de replay em primeiro plano"""
+    
+    # Adicionar o diretório src ao Python path
+    project_root = Path(__file__).parent
+    src_path = project_root / "src"
+    
+    if str(src_path) not in sys.path:
+        sys.path.insert(0, str(src_path))
+    
+    parser = build_parser("Servidor de replay do PNCP")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    
+    server = create_server(args, port=args.port)
+    print("=" * 60)
+    print(f"🎭 PNCP replay em {server.url}")
+    print(f"   PNCP_API_HOST={server.url}")
+    print("=" * 60)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Replay finalizado")
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script de reprocessamento do arquivo de payloads do PNCP
+Reconstrói licitacoes/licitacao_itens a partir dos segmentos arquivados, sem rede.
+Uso: python run_reprocess_archive.py 2025-06-01 2025-06-07 [--ufs SP,RJ] [--dir /caminho/do/arquivo]
+"""
+
+import sys
+import argparse
+from datetime import date
+from pathlib import Path
+
+def main():
+    """Executar o reprocessamento em primeiro plano"""
+    
+    # Adicionar o diretório src ao Python path
+    project_root = Path(__file__).parent
+    src_path = project_root / "src"
+    
+    if str(src_path) not in sys.path:
+        sys.path.insert(0, str(src_path))
+    
+    parser = argparse.ArgumentParser(description="Reprocessamento do arquivo de payloads do PNCP")
+    parser.add_argument("data_inicio", type=date.fromisoformat, help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("data_fim", type=date.fromisoformat, help="Data final (YYYY-MM-DD, inclusiva)")
+    parser.add_argument("--ufs", default="", help="UFs separadas por vírgula (padrão: todas)")
+    parser.add_argument("--dir", default=None, help="Diretório do arquivo (padrão: PNCP_ARCHIVE_DIR)")
+    args = parser.parse_args()
+    
+    try:
+        from config.env_loader import load_environment
+        load_environment()
+    except Exception:
+        pass
+    
+    try:
+        from matching.archive import reprocess_archive, PNCP_ARCHIVE_DIR
+        
+        ufs = [uf.strip().upper() for uf in args.ufs.split(",") if uf.strip()] or None
+        reprocess_archive(args.data_inicio, args.data_fim, ufs=ufs, base_dir=args.dir or PNCP_ARCHIVE_DIR)
+        sys.exit(0)
+    except KeyboardInterrupt:
+        print("\n🛑 Reprocessamento interrompido (dias já gravados permanecem)")
+        sys.exit(0)
+    except Exception as e:
+        print(f"❌ Erro no reprocessamento: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script de entrada para o worker de jobs do Alicit
+Consome a fila background_jobs em processo separado (JOB_WORKER_MODE=external no web)
+"""
+
+import sys
+import os
+from pathlib import Path
+
+def main():
+    """Executar o pool de workers da fila de jobs"""
+    
+    # Adicionar o diretório src ao Python path
+    project_root = Path(__file__).parent
+    src_path = project_root / "src"
+    
+    if str(src_path) not in sys.path:
+        sys.path.insert(0, str(src_path))
+    
+    # Importar e executar o worker
+    try:
+        from jobs.worker import main as worker_main
+        worker_main()
+    except KeyboardInterrupt:
+        print("\n🛑 Worker interrompido pelo usuário")
+        sys.exit(0)
+    except Exception as e:
+        print(f"❌ Erro ao iniciar worker: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,7 @@ def create_app(config: dict = None) -> Flask:
     _initialize_rag_service(app)
     _register_blueprints(app)
     _register_error_handlers(app)
+    _setup_job_workers(app)
     
     return app
 
@@ -284,6 +285,28 @@ def _register_blueprints(app: Flask) -> None:
         app.logger.error("💡 Verifique se todos os arquivos de rotas existem")
         raise e
 
+def _setup_job_workers(app: Flask) -> None:
+    """
+    Iniciar o pool de workers da fila de jobs dentro do processo web
+    (JOB_WORKER_MODE=inprocess). O pool é criado na primeira requisição de cada
+    processo, pois com gunicorn --preload threads criadas antes do fork se perdem.
+    Com JOB_WORKER_MODE=external os jobs são consumidos por run_worker.py.
+    """
+    from jobs.worker import ensure_inprocess_pool, JOB_WORKER_MODE, JOB_WORKER_CONCURRENCY
+
+    if JOB_WORKER_MODE != 'inprocess':
+        app.logger.info(f"👷 Jobs em background: modo '{JOB_WORKER_MODE}' (worker separado)")
+        return
+
+    @app.before_request
+    def _start_job_workers():
+        try:
+            ensure_inprocess_pool()
+        except Exception as e:
+            app.logger.error(f"❌ Erro ao iniciar pool de workers: {e}")
+
+    app.logger.info(f"👷 Jobs em background: modo inprocess ({JOB_WORKER_CONCURRENCY} threads por processo)")
+
 def _register_error_handlers(app: Flask) -> None:
     """Registrar handlers globais de erro"""
     try:
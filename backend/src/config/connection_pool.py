@@ -0,0 +1,279 @@
+"""
+Pool de conexões PostgreSQL compartilhado
+Cada repositório e o motor de matching abriam uma conexão nova (handshake TLS com o
+Supabase) por chamada. O pool mantém conexões abertas entre requisições, com tamanho
+mínimo/máximo, verificação de saúde de conexões ociosas, tempo de vida máximo e métricas.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, List
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+# --- Configurações ---
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))  # Espera por uma conexão livre
+DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))  # Recicla após 30 min
+DB_POOL_HEALTHCHECK_IDLE = float(os.getenv('DB_POOL_HEALTHCHECK_IDLE', '30'))  # SELECT 1 se ociosa há mais tempo
+DB_STREAM_ITERSIZE = int(os.getenv('DB_STREAM_ITERSIZE', '2000'))  # Linhas por ida ao servidor nos cursores nomeados
+
+
+class PoolExhaustedError(Exception):
+    """Nenhuma conexão livre dentro de DB_POOL_TIMEOUT"""
+
+
+class PooledConnection:
+    """
+    Conexão emprestada do pool
+    Repassa tudo para a conexão psycopg2; close() devolve ao pool em vez de fechar,
+    então o padrão `conn = get_db_connection() ... finally: conn.close()` continua valendo.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', raw):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_raw', raw)
+
+    def __getattr__(self, name):
+        raw = object.__getattribute__(self, '_raw')
+        if raw is None:
+            raise psycopg2.InterfaceError("conexão já devolvida ao pool")
+        return getattr(raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw, name, value)
+
+    @property
+    def closed(self) -> int:
+        return 1 if self._raw is None else self._raw.closed
+
+    def close(self):
+        raw = self._raw
+        if raw is not None:
+            object.__setattr__(self, '_raw', None)
+            self._pool.putconn(raw)
+
+    def __del__(self):
+        # Conexão esquecida sem close(): devolve ao pool para não vazar
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Pool thread-safe de conexões psycopg2"""
+
+    def __init__(self, dsn: str, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT, max_lifetime: float = DB_POOL_MAX_LIFETIME,
+                 healthcheck_idle: float = DB_POOL_HEALTHCHECK_IDLE):
+        self.dsn = dsn
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.healthcheck_idle = healthcheck_idle
+
+        self._cond = threading.Condition()
+        self._idle: List[Any] = []  # Conexões livres (LIFO: a mais recente é reutilizada)
+        self._born: Dict[int, float] = {}  # id(conn) -> criação
+        self._last_used: Dict[int, float] = {}  # id(conn) -> última devolução
+        self._size = 0
+        self._pid = os.getpid()
+        self._closed = False
+        self.metrics = {
+            'created': 0, 'reused': 0, 'checkouts': 0, 'waits': 0, 'wait_ms_total': 0.0,
+            'timeouts': 0, 'recycled_lifetime': 0, 'discarded_unhealthy': 0
+        }
+
+    def _register(self, raw):
+        now = time.monotonic()
+        self._born[id(raw)] = now
+        self._last_used[id(raw)] = now
+        self.metrics['created'] += 1
+        return raw
+
+    def _forget(self, raw, close: bool = True):
+        self._born.pop(id(raw), None)
+        self._last_used.pop(id(raw), None)
+        self._size -= 1
+        if close:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    def _check_fork(self):
+        """Processo filho (fork) não pode usar os sockets do pai: recomeça vazio"""
+        if os.getpid() != self._pid:
+            self._idle = []
+            self._born.clear()
+            self._last_used.clear()
+            self._size = 0
+            self._pid = os.getpid()
+
+    def _is_usable(self, raw) -> bool:
+        """Descarta conexões fechadas, velhas demais ou que não respondem após ociosidade"""
+        if raw.closed:
+            self.metrics['discarded_unhealthy'] += 1
+            return False
+        now = time.monotonic()
+        if self.max_lifetime > 0 and now - self._born.get(id(raw), now) > self.max_lifetime:
+            self.metrics['recycled_lifetime'] += 1
+            return False
+        if self.healthcheck_idle >= 0 and now - self._last_used.get(id(raw), now) > self.healthcheck_idle:
+            try:
+                with raw.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                raw.rollback()
+            except Exception:
+                self.metrics['discarded_unhealthy'] += 1
+                return False
+        return True
+
+    def warm(self):
+        """Abre as conexões mínimas (DB_POOL_MIN_SIZE)"""
+        with self._cond:
+            self._check_fork()
+            while self._size < self.min_size:
+                self._idle.append(self._register(psycopg2.connect(self.dsn)))
+                self._size += 1
+
+    def getconn(self, cursor_factory=None, autocommit: bool = False) -> PooledConnection:
+        """Empresta uma conexão; espera até timeout se o pool estiver no máximo"""
+        started = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.InterfaceError("pool de conexões fechado")
+                self._check_fork()
+                raw = None
+                reused = False
+                if self._idle:
+                    raw = self._idle.pop()
+                    reused = True
+                elif self._size < self.max_size:
+                    self._size += 1  # Reserva a vaga; conecta fora do lock
+                else:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self.metrics['timeouts'] += 1
+                        raise PoolExhaustedError(
+                            f"Nenhuma conexão livre em {self.timeout:.0f}s (máximo {self.max_size})")
+                    if not waited:
+                        self.metrics['waits'] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+                    continue
+
+            if reused:
+                if not self._is_usable(raw):
+                    with self._cond:
+                        self._forget(raw)
+                        self._cond.notify()
+                    continue
+            else:
+                try:
+                    raw = psycopg2.connect(self.dsn)
+                    with self._cond:
+                        self._register(raw)
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            raw.cursor_factory = cursor_factory
+            raw.autocommit = autocommit
+            with self._cond:
+                self.metrics['checkouts'] += 1
+                if reused:
+                    self.metrics['reused'] += 1
+                if waited:
+                    self.metrics['wait_ms_total'] += (time.monotonic() - started) * 1000
+            return PooledConnection(self, raw)
+
+    def putconn(self, raw):
+        """Devolve a conexão: transação pendente é desfeita, conexão quebrada é descartada"""
+        keep = not raw.closed and not self._closed
+        if keep and raw.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                raw.rollback()
+            except Exception:
+                keep = False
+        if keep:
+            try:
+                raw.autocommit = False
+            except Exception:
+                keep = False
+
+        with self._cond:
+            if os.getpid() != self._pid:
+                return  # Conexão herdada do processo pai
+            if keep and self.max_lifetime > 0 and \
+                    time.monotonic() - self._born.get(id(raw), 0) > self.max_lifetime:
+                self.metrics['recycled_lifetime'] += 1
+                keep = False
+            if keep:
+                self._last_used[id(raw)] = time.monotonic()
+                self._idle.append(raw)
+            else:
+                self._forget(raw)
+            self._cond.notify()
+
+    def closeall(self):
+        """Fecha as conexões ociosas e recusa novos empréstimos"""
+        with self._cond:
+            self._closed = True
+            for raw in self._idle:
+                self._forget(raw)
+            self._idle = []
+            self._cond.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            checkouts = self.metrics['checkouts']
+            return {
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'reuse_ratio': round(self.metrics['reused'] / checkouts, 3) if checkouts else None,
+                **self.metrics,
+                'wait_ms_total': round(self.metrics['wait_ms_total'], 1)
+            }
+
+
+# Pool do processo (criado sob demanda)
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """Pool compartilhado por repositórios, jobs e motor de matching"""
+    global _pool
+    if _pool is None or _pool._closed:
+        with _pool_lock:
+            if _pool is None or _pool._closed:
+                from .database import get_database_url
+                _pool = ConnectionPool(get_database_url())
+                logger.info(f"🏊 Pool de conexões criado (min={_pool.min_size}, max={_pool.max_size})")
+    return _pool
+
+
+def close_connection_pool():
+    """Fecha o pool do processo (no encerramento da aplicação)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,181 @@
+"""
+Registro de prepared statements nomeados
+As consultas mais chamadas (licitação por pncp_id, itens da licitação, matches recentes,
+hybrid_search) eram analisadas e planejadas pelo Postgres a cada execução. Cada uma é
+registrada uma vez com nome e tipos dos parâmetros; na primeira execução em uma conexão
+do pool é feito PREPARE e, daí em diante, só EXECUTE.
+
+Atrás de um pgbouncer em modo transação (ex: pooler do Supabase na porta 6543) a sessão
+não é fixa e PREPARE não é seguro: nesse caso o SQL é executado direto (fallback).
+"""
+
+import os
+import re
+import logging
+import threading
+import weakref
+from typing import Dict, Any, Optional, Tuple, Sequence
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# 'auto' desliga atrás de pgbouncer (porta 6543 ou pgbouncer=true na URL)
+DB_PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', 'auto').lower()
+
+# Códigos que pedem novo PREPARE: statement inexistente na sessão / plano com resultado alterado
+_REPREPARE_PGCODES = ('26000', '0A000')
+
+
+class PreparedStatement:
+    """Consulta registrada: SQL no estilo psycopg2 (%s) e tipos dos parâmetros"""
+
+    def __init__(self, name: str, sql: str, param_types: Sequence[str]):
+        if not re.fullmatch(r'[a-z_][a-z0-9_]*', name):
+            raise ValueError(f"Nome de prepared statement inválido: {name}")
+        placeholders = len(re.findall(r'(?<!%)%s', sql))
+        if placeholders != len(param_types):
+            raise ValueError(f"'{name}': {placeholders} parâmetros no SQL, {len(param_types)} tipos informados")
+        self.name = name
+        self.sql = sql
+        self.param_types = tuple(param_types)
+
+    @property
+    def prepare_sql(self) -> str:
+        """PREPARE nome (tipos) AS ... com $1..$n no lugar de %s"""
+        counter = iter(range(1, len(self.param_types) + 1))
+        body = re.sub(r'(?<!%)%s', lambda _: f"${next(counter)}", self.sql).replace('%%', '%')
+        types = f" ({', '.join(self.param_types)})" if self.param_types else ""
+        return f"PREPARE {self.name}{types} AS {body}"
+
+    @property
+    def execute_sql(self) -> str:
+        """EXECUTE com cast explícito de cada parâmetro para o tipo declarado"""
+        if not self.param_types:
+            return f"EXECUTE {self.name}"
+        args = ', '.join(f"%s::{param_type}" for param_type in self.param_types)
+        return f"EXECUTE {self.name} ({args})"
+
+
+class PreparedStatementRegistry:
+    """Statements registrados e quais já foram preparados em cada conexão"""
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self._statements: Dict[str, PreparedStatement] = {}
+        self._prepared: "weakref.WeakKeyDictionary[Any, set]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._enabled = enabled
+        self.metrics = {'prepares': 0, 'executions': 0, 'fallbacks': 0, 'reprepares': 0}
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = self._detect_enabled()
+        return self._enabled
+
+    @staticmethod
+    def _detect_enabled() -> bool:
+        if DB_PREPARED_STATEMENTS in ('true', '1', 'yes'):
+            return True
+        if DB_PREPARED_STATEMENTS in ('false', '0', 'no'):
+            return False
+        from .database import get_database_url
+        url = get_database_url()
+        if ':6543' in url or 'pgbouncer=true' in url:
+            logger.info("🔄 pgbouncer detectado: prepared statements desativados (SQL direto)")
+            return False
+        return True
+
+    def register(self, name: str, sql: str, param_types: Sequence[str] = ()) -> PreparedStatement:
+        """Registrar (ou substituir) um statement; o PREPARE acontece sob demanda em cada conexão"""
+        statement = PreparedStatement(name, sql, param_types)
+        with self._lock:
+            previous = self._statements.get(name)
+            if previous is not None and previous.sql != statement.sql:
+                # SQL mudou: conexões que já prepararam o antigo precisam de novo PREPARE
+                for names in self._prepared.values():
+                    names.discard(name)
+            self._statements[name] = statement
+        return statement
+
+    def get(self, name: str) -> PreparedStatement:
+        with self._lock:
+            statement = self._statements.get(name)
+        if statement is None:
+            raise KeyError(f"Prepared statement não registrado: {name}")
+        return statement
+
+    def _prepared_names(self, raw_conn) -> set:
+        with self._lock:
+            names = self._prepared.get(raw_conn)
+            if names is None:
+                names = set()
+                self._prepared[raw_conn] = names
+            return names
+
+    def execute(self, cursor, name: str, params: Sequence[Any] = ()):
+        """
+        Executar o statement no cursor (o resultado fica no cursor, como em cursor.execute)
+        Prepara na conexão se ainda não foi preparado; sem prepared statements, executa o SQL direto.
+        """
+        statement = self.get(name)
+        params = tuple(params)
+        if not self.enabled:
+            with self._lock:
+                self.metrics['fallbacks'] += 1
+            cursor.execute(statement.sql, params)
+            return
+
+        raw_conn = cursor.connection
+        prepared = self._prepared_names(raw_conn)
+        try:
+            self._execute_prepared(cursor, statement, params, prepared)
+        except psycopg2.Error as e:
+            # Sessão perdeu o statement ou o schema mudou: só dá para repetir fora de transação
+            if getattr(e, 'pgcode', None) not in _REPREPARE_PGCODES or not raw_conn.autocommit:
+                prepared.discard(name)
+                raise
+            with self._lock:
+                self.metrics['reprepares'] += 1
+            if e.pgcode == '0A000':
+                cursor.execute(f"DEALLOCATE {name}")
+            prepared.discard(name)
+            self._execute_prepared(cursor, statement, params, prepared)
+
+    def _execute_prepared(self, cursor, statement: PreparedStatement, params: Tuple, prepared: set):
+        if statement.name not in prepared:
+            cursor.execute(statement.prepare_sql)
+            prepared.add(statement.name)
+            with self._lock:
+                self.metrics['prepares'] += 1
+        cursor.execute(statement.execute_sql, params)
+        with self._lock:
+            self.metrics['executions'] += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self._enabled,
+                'registered': sorted(self._statements),
+                'connections_with_prepared': len(self._prepared),
+                **self.metrics
+            }
+
+
+# Registro do processo
+_registry = PreparedStatementRegistry()
+
+
+def get_prepared_registry() -> PreparedStatementRegistry:
+    """Registro compartilhado por repositórios e serviços"""
+    return _registry
+
+
+def register_statement(name: str, sql: str, param_types: Sequence[str] = ()) -> PreparedStatement:
+    """Registrar uma consulta quente com nome e tipos dos parâmetros"""
+    return _registry.register(name, sql, param_types)
+
+
+def execute_prepared(cursor, name: str, params: Sequence[Any] = ()):
+    """Executar um statement registrado (PREPARE sob demanda, fallback para SQL direto)"""
+    _registry.execute(cursor, name, params)
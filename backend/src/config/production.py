@@ -17,6 +17,16 @@ class ProductionConfig:
     SUPABASE_ANON_KEY = os.environ.get('SUPABASE_ANON_KEY')
     DATABASE_URL = os.environ.get('DATABASE_URL')
     
+    # Pool de conexões PostgreSQL
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 1))
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800))
+    DB_POOL_HEALTHCHECK_IDLE = float(os.environ.get('DB_POOL_HEALTHCHECK_IDLE', 30))
+    DB_STREAM_ITERSIZE = int(os.environ.get('DB_STREAM_ITERSIZE', 2000))
+    BULK_INSERT_PAGE_SIZE = int(os.environ.get('BULK_INSERT_PAGE_SIZE', 1000))
+    DB_PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', 'auto').lower()  # auto: desliga atrás de pgbouncer
+    
     # Configurações de API externa
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     
@@ -25,6 +35,10 @@ class ProductionConfig:
     REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
     REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
     REDIS_DB = int(os.environ.get('REDIS_DB', 0))
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+    RESPONSE_CACHE_DEFAULT_TTL = int(os.environ.get('RESPONSE_CACHE_DEFAULT_TTL', 300))
+    RESPONSE_CACHE_VERSION_CHECK = float(os.environ.get('RESPONSE_CACHE_VERSION_CHECK', 5))
     
     # Configurações de CORS para produção
     # Você vai definir isso depois que souber a URL do frontend na Vercel
@@ -36,10 +50,32 @@ class ProductionConfig:
     # Configurações específicas do matching
     SIMILARITY_THRESHOLD_PHASE1 = float(os.environ.get('SIMILARITY_THRESHOLD_PHASE1', 0.65))
     SIMILARITY_THRESHOLD_PHASE2 = float(os.environ.get('SIMILARITY_THRESHOLD_PHASE2', 0.70))
+    MATCH_TOP_K_PER_BID = int(os.environ.get('MATCH_TOP_K_PER_BID', 0))
+    MATCH_TOP_K_PER_COMPANY = int(os.environ.get('MATCH_TOP_K_PER_COMPANY', 0))
+    
+    # Fila de jobs em background
+    JOB_WORKER_MODE = os.environ.get('JOB_WORKER_MODE', 'inprocess')
+    JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', 1))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 5))
+    REEVALUATE_SHARDS = int(os.environ.get('REEVALUATE_SHARDS', 1))
+    MATCHING_ITEMS_BATCH = int(os.environ.get('MATCHING_ITEMS_BATCH', 200))
     
     # Configurações de performance
-    PNCP_MAX_PAGES = int(os.environ.get('PNCP_MAX_PAGES', 5))
     PNCP_PAGE_SIZE = int(os.environ.get('PNCP_PAGE_SIZE', 50))
+    PNCP_API_HOST = os.environ.get('PNCP_API_HOST', 'https://pncp.gov.br')
+    PNCP_MODALIDADES = os.environ.get('PNCP_MODALIDADES', '6')  # Códigos separados por vírgula
+    PNCP_RATE_LIMIT_PER_SECOND = float(os.environ.get('PNCP_RATE_LIMIT_PER_SECOND', 4))
+    INGESTION_CONCURRENCY = int(os.environ.get('INGESTION_CONCURRENCY', 4))
+    PNCP_ARCHIVE_ENABLED = os.environ.get('PNCP_ARCHIVE_ENABLED', 'false').lower() == 'true'
+    PNCP_ARCHIVE_RETENTION_DAYS = int(os.environ.get('PNCP_ARCHIVE_RETENTION_DAYS', 90))
+    PNCP_SYNC_LOOKBACK_DAYS = int(os.environ.get('PNCP_SYNC_LOOKBACK_DAYS', 1))
+    SUMMARY_REFRESH_MIN_INTERVAL = float(os.environ.get('SUMMARY_REFRESH_MIN_INTERVAL', 300))
+    SUMMARY_REFRESH_DEBOUNCE = float(os.environ.get('SUMMARY_REFRESH_DEBOUNCE', 5))
+    PNCP_CONNECT_TIMEOUT = float(os.environ.get('PNCP_CONNECT_TIMEOUT', 5))
+    PNCP_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('PNCP_BREAKER_FAILURE_THRESHOLD', 5))
+    PNCP_BREAKER_RECOVERY_SECONDS = float(os.environ.get('PNCP_BREAKER_RECOVERY_SECONDS', 30))
+    PNCP_NEGATIVE_CACHE_TTL = int(os.environ.get('PNCP_NEGATIVE_CACHE_TTL', 21600))  # 6 horas
+    PNCP_NEGATIVE_CACHE_SIZE = int(os.environ.get('PNCP_NEGATIVE_CACHE_SIZE', 50000))
     
     # RAG configurations
     RAG_CHUNK_SIZE = int(os.environ.get('RAG_CHUNK_SIZE', 800))
@@ -54,7 +54,7 @@ class BidController:
         Migração do endpoint get_bid_detail() do api.py linha 1040-1100
         """
         try:
-            bid, message = self.bid_service.get_bid_by_pncp_id(pncp_id, include_items=True)
+            bid, message = self.bid_service.get_bid_detail(pncp_id)
             
             if not bid:
                 return jsonify({
@@ -90,8 +90,8 @@ class BidController:
             
             logger.info(f"🔍 Buscando detalhes da licitação PNCP: {pncp_id}")
             
-            # Usar o service para obter licitação formatada
-            bid = self.bid_service.get_bid_by_pncp_id(pncp_id)
+            # Licitação formatada com itens e matches (uma consulta)
+            bid, message = self.bid_service.get_bid_detail(pncp_id)
             
             if not bid:
                 return jsonify({
@@ -99,17 +99,10 @@ class BidController:
                     'message': 'Licitação não encontrada'
                 }), 404
             
-            # Buscar itens da licitação formatados
-            bid_items, items_message = self.bid_service.get_bid_items(pncp_id)
-            
-            # Adicionar itens ao bid
-            bid['itens'] = bid_items
-            bid['possui_itens'] = len(bid_items) > 0
-            
             return jsonify({
                 'success': True,
                 'data': bid,
-                'message': f'Licitação {pncp_id} encontrada com {len(bid_items)} itens'
+                'message': message
             }), 200
             
         except Exception as e:
@@ -166,18 +159,15 @@ class BidController:
             
             logger.info(f"🔍 Buscando itens da licitação PNCP: {pncp_id}")
             
-            # Primeiro, buscar a licitação pelo pncp_id
-            bid = self.bid_service.licitacao_repo.find_by_pncp_id(pncp_id)
+            # Licitação e itens em uma consulta (None = licitação inexistente)
+            bid_items = self.bid_service.licitacao_repo.find_items_by_pncp_id(pncp_id)
             
-            if not bid:
+            if bid_items is None:
                 return jsonify({
                     'success': False,
                     'message': 'Licitação não encontrada'
                 }), 404
             
-            # Buscar itens da licitação usando o ID interno
-            bid_items = self.bid_service.licitacao_repo.find_items_by_licitacao_id(bid['id'])
-            
             return jsonify({
                 'success': True,
                 'data': bid_items,
@@ -196,13 +186,16 @@ class BidController:
     @log_endpoint_access
     def get_bids_detailed(self) -> Tuple[Dict[str, Any], int]:
         """
-        GET /api/bids/detailed?page=<page>&limit=<limit>&uf=<uf>&modalidade_id=<id>&status=<status>
+        GET /api/bids/detailed?limit=<limit>&cursor=<cursor>&exact_count=<bool>&uf=<uf>&modalidade_id=<id>&status=<status>
         Migração do endpoint get_bids_detailed() do api.py linha 1276-1355
+        Paginação por cursor (next_cursor); page=<n> mantém a paginação por OFFSET
         """
         try:
             # Obter parâmetros de query
-            page = request.args.get('page', 1, type=int)
+            page = request.args.get('page', type=int)
             limit = request.args.get('limit', 50, type=int)
+            cursor = request.args.get('cursor')
+            exact_count = request.args.get('exact_count', 'false').lower() == 'true'
             uf = request.args.get('uf')
             modalidade_id = request.args.get('modalidade_id', type=int)
             status = request.args.get('status')
@@ -216,15 +209,25 @@ class BidController:
             if status:
                 filters['status'] = status
             
-            # Buscar licitações com filtros
-            bids = self.bid_service.search_bids(filters, limit)
+            # Buscar página de licitações com filtros
+            try:
+                bids, pagination = self.bid_service.get_detailed_bids_page(
+                    filters, limit, cursor=cursor, page=page, exact_count=exact_count
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'message': 'Parâmetro cursor inválido'
+                }), 400
             
             return jsonify({
                 'success': True,
                 'data': bids,
-                'total': len(bids),
+                'total': pagination.get('total_count'),
                 'page': page,
                 'limit': limit,
+                'pagination': pagination,
                 'message': f'{len(bids)} licitações encontradas'
             }), 200
             
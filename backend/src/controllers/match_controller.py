@@ -19,24 +19,35 @@ class MatchController:
         self.match_repository = MatchRepository(db_manager)
     
     def get_all_matches(self):
-        """GET /api/matches - Listar todas as correspondências"""
+        """GET /api/matches - Listar todas as correspondências (paginação por cursor)"""
         try:
-            # Parâmetros simples que o MatchService aceita
             limit = request.args.get('limit', 50, type=int)
+            cursor = request.args.get('cursor')
+            exact_count = request.args.get('exact_count', 'false').lower() == 'true'
+            company_id = request.args.get('company_id')
+            bid_id = request.args.get('bid_id')
+            min_score = request.args.get('min_score', type=float)
             
             logger.info(f"🔍 Listando matches - limite {limit}")
             
-            # Usar repository para dados complexos (com joins)
-            matches = self.match_repository.find_all_with_details()
-            
-            # Aplicar limite se necessário
-            if limit and len(matches) > limit:
-                matches = matches[:limit]
+            # Página com joins de empresa e licitação, a partir do cursor
+            try:
+                matches, pagination = self.match_service.get_matches_page(
+                    per_page=limit, cursor=cursor, company_id=company_id,
+                    licitacao_id=bid_id, min_score=min_score, exact_count=exact_count
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': 'Parâmetro cursor inválido',
+                    'message': str(e)
+                }), 400
             
             return jsonify({
                 'success': True,
                 'data': matches,
-                'total': len(matches),
+                'total': pagination.get('total_count'),
+                'pagination': pagination,
                 'message': f'{len(matches)} matches encontrados'
             }), 200
             
@@ -349,4 +360,51 @@ class MatchController:
                 'success': False,
                 'error': 'Erro interno ao buscar matches agrupados',
                 'message': str(e)
-            }), 500 
\ No newline at end of file
+            }), 500 
+
+    def simulate_thresholds(self):
+        """POST /api/matches/what-if - Recalcular matches para novos thresholds"""
+        try:
+            params = request.get_json() or {}
+            
+            if 'threshold_phase1' not in params or 'threshold_phase2' not in params:
+                return jsonify({
+                    'success': False,
+                    'error': 'Parâmetros obrigatórios: threshold_phase1, threshold_phase2'
+                }), 400
+            
+            result = self.match_service.simulate_thresholds(params)
+            
+            if not result['success']:
+                status_code = {'not_found': 404, 'validation': 400}.get(result.get('error_type'), 500)
+                return jsonify(result), status_code
+            
+            return jsonify(result), 200
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao simular thresholds: {e}")
+            return jsonify({
+                'success': False,
+                'error': 'Erro interno ao simular thresholds',
+                'message': str(e)
+            }), 500
+
+    def get_score_runs(self):
+        """GET /api/matches/score-runs - Execuções com matriz de scores persistida"""
+        try:
+            limit = request.args.get('limit', 10, type=int)
+            runs = self.match_service.get_score_runs(limit)
+            
+            return jsonify({
+                'success': True,
+                'data': runs,
+                'total': len(runs)
+            }), 200
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao listar matrizes de scores: {e}")
+            return jsonify({
+                'success': False,
+                'error': 'Erro interno ao listar matrizes de scores',
+                'message': str(e)
+            }), 500
@@ -35,8 +35,11 @@ class RAGController:
             # Processar com RAG
             result = self.rag_service.process_or_query(licitacao_id, query)
             print(f"result: {result}")
-            # Determinar status code
-            status_code = 200 if result['success'] else 400
+            # Determinar status code (202 quando os documentos foram enfileirados)
+            if result.get('job_id'):
+                status_code = 202
+            else:
+                status_code = 200 if result['success'] else 400
             
             return jsonify(result), status_code
             
@@ -143,6 +146,7 @@ class RAGController:
             
             licitacao_id = data.get('licitacao_id')
             forcar_reprocessamento = data.get('forcar_reprocessamento', True)
+            em_background = data.get('em_background', True)
             
             if not licitacao_id:
                 return jsonify({
@@ -150,6 +154,10 @@ class RAGController:
                     'error': 'licitacao_id é obrigatório'
                 }), 400
             
+            # Processamento pesado (download/extração) vai para a fila de jobs
+            if em_background:
+                return self._enfileirar_reprocessamento(licitacao_id, forcar_reprocessamento)
+            
             # Limpar documentos existentes se forçando
             if forcar_reprocessamento:
                 logger.info(f"🗑️ Limpando documentos existentes para: {licitacao_id}")
@@ -186,3 +194,30 @@ class RAGController:
                 'success': False,
                 'error': f'Erro interno: {str(e)}'
             }), 500
+    
+    def _enfileirar_reprocessamento(self, licitacao_id: str, forcar_reprocessamento: bool):
+        """Enfileira o job 'process_documents' e retorna 202 com o job_id"""
+        from jobs import JobQueue
+        
+        if forcar_reprocessamento:
+            # Vetores e cache são limpos já; os documentos são limpos pelo job
+            try:
+                if hasattr(self.rag_service.vector_store, 'clear_licitacao_vectors'):
+                    self.rag_service.vector_store.clear_licitacao_vectors(licitacao_id)
+                self.rag_service.cache_manager.invalidate_licitacao_cache(licitacao_id)
+            except Exception as clean_error:
+                logger.warning(f"⚠️ Erro na limpeza: {clean_error}")
+        
+        job = JobQueue().enqueue(
+            'process_documents',
+            {'licitacao_id': licitacao_id, 'forcar_reprocessamento': forcar_reprocessamento},
+            dedupe_key=f"process_documents:{licitacao_id}"
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': 'Reprocessamento enfileirado' if job['created'] else 'Reprocessamento já está em andamento',
+            'job_id': job['id'],
+            'job_status': job['status'],
+            'status_url': f"/api/jobs/{job['id']}"
+        }), 202
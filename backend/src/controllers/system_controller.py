@@ -161,10 +161,14 @@ class SystemController:
         """
         try:
             result = self.system_service.start_daily_search()
+            if result['success']:
+                status_code = 202
+            else:
+                status_code = 500 if result.get('error_type') == 'internal' else 409
             return {
                 'status': 'success',
                 'data': result
-            }, 200 if result['success'] else 409
+            }, status_code
         except Exception as e:
             logger.error(f"Erro ao iniciar busca: {str(e)}")
             return {
@@ -181,14 +185,139 @@ class SystemController:
         """
         try:
             result = self.system_service.start_reevaluation()
+            if result['success']:
+                status_code = 202
+            else:
+                status_code = 500 if result.get('error_type') == 'internal' else 409
             return {
                 'status': 'success',
                 'data': result
-            }, 200 if result['success'] else 409
+            }, status_code
         except Exception as e:
             logger.error(f"Erro ao iniciar reavaliação: {str(e)}")
             return {
                 'status': 'error',
                 'message': 'Erro ao iniciar reavaliação',
                 'details': str(e)
-            }, 500 
\ No newline at end of file
+            }, 500
+    
+    @log_endpoint_access
+    def list_jobs(self) -> Tuple[Dict[str, Any], int]:
+        """
+        GET /api/jobs
+        Jobs recentes da fila durável e estatísticas por tipo/status
+        """
+        try:
+            job_type = request.args.get('job_type')
+            status = request.args.get('status')
+            limit = min(request.args.get('limit', 50, type=int), 200)
+            
+            result = self.system_service.list_jobs(job_type=job_type, status=status, limit=limit)
+            if not result['success']:
+                return result, 500
+            return result, 200
+        except Exception as e:
+            logger.error(f"Erro ao listar jobs: {str(e)}")
+            return {
+                'success': False,
+                'message': 'Erro ao listar jobs',
+                'details': str(e)
+            }, 500
+    
+    @log_endpoint_access
+    def get_job(self, job_id: str) -> Tuple[Dict[str, Any], int]:
+        """
+        GET /api/jobs/<job_id>
+        Detalhes de um job (status, tentativas, duração, resultado, erro)
+        """
+        try:
+            result = self.system_service.get_job(job_id)
+            if not result['success']:
+                return result, 404 if result.get('error_type') == 'not_found' else 500
+            return result, 200
+        except Exception as e:
+            logger.error(f"Erro ao buscar job: {str(e)}")
+            return {
+                'success': False,
+                'message': 'Erro ao buscar job',
+                'details': str(e)
+            }, 500
+    
+    @log_endpoint_access
+    def start_backfill(self) -> Tuple[Dict[str, Any], int]:
+        """
+        POST /api/backfill
+        Enfileirar ingestão retroativa do PNCP para um intervalo de datas
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            result = self.system_service.start_backfill(data)
+            if result['success']:
+                return result, 202
+            error_type = result.get('error_type')
+            return result, 400 if error_type == 'validation' else 500 if error_type == 'internal' else 409
+        except Exception as e:
+            logger.error(f"Erro ao iniciar backfill: {str(e)}")
+            return {
+                'success': False,
+                'message': 'Erro ao iniciar backfill',
+                'details': str(e)
+            }, 500
+    
+    @log_endpoint_access
+    def start_sync_updates(self) -> Tuple[Dict[str, Any], int]:
+        """
+        POST /api/sync-updates
+        Enfileirar sincronização incremental das contratações alteradas no PNCP
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            result = self.system_service.start_sync_updates(data)
+            if result['success']:
+                return result, 202
+            return result, 500 if result.get('error_type') == 'internal' else 409
+        except Exception as e:
+            logger.error(f"Erro ao iniciar sincronização: {str(e)}")
+            return {
+                'success': False,
+                'message': 'Erro ao iniciar sincronização',
+                'details': str(e)
+            }, 500
+    
+    @log_endpoint_access
+    def get_sync_updates_status(self) -> Tuple[Dict[str, Any], int]:
+        """
+        GET /api/sync-updates/status
+        Marca d'água e estatísticas da última sincronização incremental
+        """
+        try:
+            result = self.system_service.get_sync_updates_status()
+            return result, 200 if result['success'] else 500
+        except Exception as e:
+            logger.error(f"Erro ao obter status da sincronização: {str(e)}")
+            return {
+                'success': False,
+                'message': 'Erro ao obter status da sincronização',
+                'details': str(e)
+            }, 500
+    
+    @log_endpoint_access
+    def get_backfill_status(self) -> Tuple[Dict[str, Any], int]:
+        """
+        GET /api/backfill/status
+        Progresso das unidades de ingestão de um intervalo
+        """
+        try:
+            result = self.system_service.get_backfill_status(
+                request.args.get('data_inicio'), request.args.get('data_fim')
+            )
+            if result['success']:
+                return result, 200
+            return result, 400 if result.get('error_type') == 'validation' else 500
+        except Exception as e:
+            logger.error(f"Erro ao obter status do backfill: {str(e)}")
+            return {
+                'success': False,
+                'message': 'Erro ao obter status do backfill',
+                'details': str(e)
+            }, 500
@@ -20,6 +20,7 @@ import io
 from datetime import datetime
 from supabase import create_client, Client
 from services.storage_service import StorageService
+from matching.circuit_breaker import get_circuit_breaker, get_negative_cache, CircuitOpenError
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -142,7 +143,18 @@ class UnifiedDocumentProcessor:
     # ================================
     
     def processar_resposta_pncp(self, url: str, licitacao_id: str) -> Optional[List[Dict]]:
-        """PASSO 4: Processa resposta da API PNCP (flexível para JSON ou ZIP)"""
+        """
+        PASSO 4: Processa resposta da API PNCP (flexível para JSON ou ZIP)
+        Com o endpoint de arquivos instável o circuito abre e a chamada falha na hora;
+        licitações sem documentos ficam no cache negativo por PNCP_NEGATIVE_CACHE_TTL.
+        """
+        breaker = get_circuit_breaker('pncp_arquivos')
+        negative_cache = get_negative_cache('pncp_arquivos')
+        
+        if negative_cache.contains(url):
+            logger.info(f"📭 PASSO 4: Licitação sem documentos no PNCP (cache), pulando requisição")
+            return []
+        
         try:
             logger.info(f"🌐 PASSO 4: Fazendo requisição para API PNCP")
             
@@ -151,7 +163,19 @@ class UnifiedDocumentProcessor:
                 'Accept': 'application/json, application/zip, */*'
             }
             
-            response = requests.get(url, headers=headers, timeout=60)
+            breaker.before_call()
+            try:
+                response = requests.get(url, headers=headers, timeout=(5, 60))
+            except requests.exceptions.RequestException:
+                breaker.record_failure()
+                raise
+            
+            if response.status_code >= 500 or response.status_code == 429:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+                if response.status_code == 404:
+                    negative_cache.add(url)
             response.raise_for_status()
             
             content_type = response.headers.get('content-type', '').lower()
@@ -160,7 +184,10 @@ class UnifiedDocumentProcessor:
             # Detectar tipo de resposta
             if 'json' in content_type:
                 logger.info(f"📋 Resposta JSON: Lista de documentos")
-                return self._processar_lista_documentos(response.json(), licitacao_id)
+                documentos_lista = response.json()
+                if not documentos_lista:
+                    negative_cache.add(url)
+                return self._processar_lista_documentos(documentos_lista, licitacao_id)
             
             elif 'zip' in content_type or 'application/octet-stream' in content_type:
                 logger.info(f"📦 Resposta ZIP: Arquivo compactado")
@@ -176,6 +203,9 @@ class UnifiedDocumentProcessor:
                     # Tentar como ZIP
                     return self._processar_arquivo_zip(response.content, licitacao_id)
             
+        except CircuitOpenError as e:
+            logger.warning(f"⚡ PASSO 4: {e}, requisição não realizada")
+            return None
         except Exception as e:
             logger.error(f"❌ ERRO PASSO 4: {e}")
             return None
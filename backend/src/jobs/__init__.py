@@ -0,0 +1,30 @@
+"""
+Módulo jobs - Fila durável de jobs em background
+
+Jobs são gravados na tabela background_jobs e consumidos por um pool de
+workers (no próprio processo web ou em processo separado via run_worker.py)
+usando FOR UPDATE SKIP LOCKED, com prioridades, retentativas e duração por job.
+"""
+
+from .job_queue import JobQueue, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from .worker import (
+    WorkerPool,
+    NonRetryableJobError,
+    register_handler,
+    get_worker_pool,
+    ensure_inprocess_pool,
+    JOB_WORKER_MODE
+)
+
+__all__ = [
+    'JobQueue',
+    'PRIORITY_HIGH',
+    'PRIORITY_NORMAL',
+    'PRIORITY_LOW',
+    'WorkerPool',
+    'NonRetryableJobError',
+    'register_handler',
+    'get_worker_pool',
+    'ensure_inprocess_pool',
+    'JOB_WORKER_MODE'
+]
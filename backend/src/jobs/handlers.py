@@ -0,0 +1,175 @@
+"""
+Handlers dos jobs em background
+Cada handler recebe o payload do job e retorna um dict serializável que é
+gravado em background_jobs.result. Exceções fazem o job voltar para a fila
+(com backoff) até esgotar max_attempts.
+"""
+import os
+import socket
+import asyncio
+import logging
+import threading
+from typing import Dict, Any
+
+from jobs.worker import register_handler, NonRetryableJobError
+
+logger = logging.getLogger(__name__)
+
+
+def create_vectorizer(vectorizer_type: str = None):
+    """Criar vetorizador conforme VECTORIZER_TYPE (hybrid, openai, voyage, mock)"""
+    vectorizer_type = vectorizer_type or os.getenv('VECTORIZER_TYPE', 'hybrid')
+
+    if vectorizer_type == 'hybrid':
+        from matching.vectorizers import HybridTextVectorizer
+        return HybridTextVectorizer()
+    elif vectorizer_type == 'openai':
+        from matching.vectorizers import OpenAITextVectorizer
+        return OpenAITextVectorizer()
+    elif vectorizer_type == 'voyage':
+        from matching.vectorizers import VoyageAITextVectorizer
+        return VoyageAITextVectorizer()
+    else:
+        from matching.vectorizers import MockTextVectorizer
+        return MockTextVectorizer()
+
+
+@register_handler('daily_search')
+def run_daily_search(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Busca diária de novas licitações no PNCP + matching (retoma do checkpoint)"""
+    from datetime import datetime
+    from matching import process_daily_bids, get_checkpoint
+
+    logger.info("🔍 Iniciando busca REAL de licitações do PNCP...")
+    vectorizer = create_vectorizer(payload.get('vectorizer'))
+    result = process_daily_bids(vectorizer)
+    if result is None:
+        raise NonRetryableJobError('Nenhuma empresa encontrada no banco')
+    logger.info("✅ Busca diária REAL concluída")
+
+    # Snapshot final do checkpoint + vazão por modalidade
+    checkpoint = get_checkpoint(f"daily:{datetime.now().strftime('%Y%m%d')}") or {}
+    return {
+        'message': 'Busca de novas licitações concluída com sucesso!',
+        'stats': checkpoint.get('stats'),
+        'por_modalidade': result['por_modalidade'],
+        'duracao_segundos': result['duracao_segundos']
+    }
+
+
+@register_handler('backfill')
+def run_backfill(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Ingestão retroativa de um intervalo de datas (unidades dia × UF × página)"""
+    from datetime import date
+    from matching import backfill_bids, INGESTION_CONCURRENCY
+
+    try:
+        start_date = date.fromisoformat(payload['data_inicio'])
+        end_date = date.fromisoformat(payload['data_fim'])
+    except (KeyError, TypeError, ValueError):
+        raise NonRetryableJobError('data_inicio e data_fim (YYYY-MM-DD) são obrigatórios')
+
+    vectorizer = create_vectorizer(payload.get('vectorizer'))
+    result = backfill_bids(
+        vectorizer, start_date, end_date,
+        ufs=payload.get('ufs') or None,
+        modalidades=payload.get('modalidades') or None,
+        concurrency=int(payload.get('concorrencia') or INGESTION_CONCURRENCY)
+    )
+    if result is None:
+        raise NonRetryableJobError('Nenhuma empresa encontrada no banco')
+    return result
+
+
+@register_handler('sync_updates')
+def run_sync_updates(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Sincronização incremental das contratações alteradas no PNCP desde a marca d'água"""
+    from matching import sync_updated_bids
+
+    # Sem matching, as contratações novas ficam como 'coletada' para a próxima busca diária
+    vectorizer = create_vectorizer(payload.get('vectorizer')) if payload.get('matching', True) else None
+    return sync_updated_bids(vectorizer)
+
+
+@register_handler('reevaluate')
+def run_reevaluation(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reavaliação das licitações existentes contra todas as empresas.
+    Com REEVALUATE_SHARDS > 1 apenas prepara a execução em shards e enfileira um
+    job 'reevaluate_shards' por shard; qualquer worker (processo ou host) os consome.
+    """
+    from matching import reevaluate_existing_bids, start_sharded_reevaluation, REEVALUATE_SHARDS
+    from jobs.job_queue import JobQueue, PRIORITY_HIGH
+
+    vectorizer = create_vectorizer(payload.get('vectorizer'))
+    clear_matches = payload.get(
+        'clear_matches',
+        os.getenv('CLEAR_MATCHES_BEFORE_REEVALUATE', 'true').lower() == 'true'
+    )
+    shard_count = int(payload.get('shards', REEVALUATE_SHARDS))
+
+    if shard_count > 1:
+        run_id = start_sharded_reevaluation(vectorizer, shard_count, clear_matches=clear_matches)
+        if not run_id:
+            raise NonRetryableJobError('Nenhuma empresa encontrada no banco')
+
+        queue = JobQueue()
+        for i in range(shard_count):
+            queue.enqueue(
+                'reevaluate_shards', {'run_id': run_id, 'vectorizer': payload.get('vectorizer')},
+                priority=PRIORITY_HIGH, dedupe_key=f"reevaluate_shards:{run_id}:{i}"
+            )
+        logger.info(f"🧩 Reavaliação em {shard_count} shards enfileirada (run {run_id})")
+        return {'run_id': run_id, 'shards': shard_count, 'message': 'Shards enfileirados'}
+
+    logger.info("🔄 Iniciando reavaliação REAL de licitações...")
+    result = reevaluate_existing_bids(vectorizer, clear_matches=clear_matches)
+    logger.info("✅ Reavaliação REAL concluída")
+    return result if isinstance(result, dict) else {'message': 'Reavaliação concluída com sucesso'}
+
+
+@register_handler('reevaluate_shards')
+def run_reevaluation_shards_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Consome shards de uma execução da reavaliação até não restar nenhum"""
+    from matching import run_reevaluation_shards
+
+    run_id = payload.get('run_id')
+    if not run_id:
+        raise NonRetryableJobError('run_id é obrigatório')
+
+    worker = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    vectorizer = create_vectorizer(payload.get('vectorizer'))
+    return run_reevaluation_shards(vectorizer, run_id, worker)
+
+
+@register_handler('process_documents')
+def run_process_documents(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Download, extração e armazenamento dos documentos de uma licitação"""
+    from config.database import get_db_manager
+    from core.unified_document_processor import UnifiedDocumentProcessor
+
+    licitacao_id = payload.get('licitacao_id')
+    if not licitacao_id:
+        raise NonRetryableJobError('licitacao_id é obrigatório')
+
+    processor = UnifiedDocumentProcessor(
+        db_manager=get_db_manager(),
+        supabase_url=os.getenv('SUPABASE_URL'),
+        supabase_key=os.getenv('SUPABASE_SERVICE_KEY')
+    )
+
+    if payload.get('forcar_reprocessamento'):
+        logger.info(f"🗑️ Limpando documentos existentes para: {licitacao_id}")
+        processor._limpar_documentos_licitacao(licitacao_id)
+
+    # O worker roda em thread própria, então não há event loop ativo aqui
+    result = asyncio.run(processor.processar_documentos_licitacao(licitacao_id))
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Erro desconhecido no processamento de documentos'))
+
+    return {
+        'licitacao_id': licitacao_id,
+        'documentos_processados': result.get('documentos_processados', 0),
+        'storage_provider': result.get('storage_provider', 'supabase'),
+        'pasta_nuvem': result.get('pasta_nuvem')
+    }
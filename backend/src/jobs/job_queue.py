@@ -0,0 +1,239 @@
+"""
+Fila durável de jobs em Postgres
+Enfileiramento, claim com FOR UPDATE SKIP LOCKED, retentativas com backoff
+e registro de duração por job.
+"""
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from psycopg2.extras import DictCursor
+
+from config.database import get_db_manager
+
+logger = logging.getLogger(__name__)
+
+# --- Configurações da fila ---
+JOB_RETRY_BASE_SECONDS = int(os.getenv('JOB_RETRY_BASE_SECONDS', '30'))
+JOB_STALE_AFTER_SECONDS = int(os.getenv('JOB_STALE_AFTER_SECONDS', '300'))
+
+# Prioridades (menor valor = executa antes)
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 100
+PRIORITY_LOW = 200
+
+
+def _json_default(value):
+    """Serializa datas e decimais em payloads/resultados"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class JobQueue:
+    """Operações sobre a tabela background_jobs"""
+
+    def enqueue(self, job_type: str, payload: Optional[Dict[str, Any]] = None,
+                priority: int = PRIORITY_NORMAL, max_attempts: int = 3,
+                dedupe_key: Optional[str] = None, delay_seconds: int = 0) -> Dict[str, Any]:
+        """
+        Enfileira um job. Com dedupe_key, se já houver job ativo com a mesma chave
+        retorna o existente (created=False) em vez de criar outro.
+        """
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cursor:
+                cursor.execute("""
+                    INSERT INTO background_jobs (job_type, payload, priority, max_attempts,
+                                                 dedupe_key, run_after)
+                    VALUES (%s, %s::jsonb, %s, %s, %s, NOW() + make_interval(secs => %s))
+                    ON CONFLICT (dedupe_key) WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running')
+                    DO NOTHING
+                    RETURNING id, status, created_at
+                """, (job_type, json.dumps(payload or {}, default=_json_default), priority,
+                      max_attempts, dedupe_key, delay_seconds))
+                row = cursor.fetchone()
+                if row:
+                    logger.info(f"📥 Job enfileirado: {job_type} ({row['id']}) prioridade {priority}")
+                    return {'id': str(row['id']), 'status': row['status'], 'created': True}
+
+                cursor.execute("""
+                    SELECT id, status FROM background_jobs
+                    WHERE dedupe_key = %s AND status IN ('queued', 'running')
+                """, (dedupe_key,))
+                existing = cursor.fetchone()
+                return {
+                    'id': str(existing['id']) if existing else None,
+                    'status': existing['status'] if existing else None,
+                    'created': False
+                }
+
+    def claim(self, worker_id: str, job_types: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Reserva o próximo job da fila (por prioridade) para este worker"""
+        type_filter = "AND job_type = ANY(%s)" if job_types else ""
+        params = [worker_id] + ([job_types] if job_types else [])
+
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cursor:
+                cursor.execute(f"""
+                    UPDATE background_jobs j
+                    SET status = 'running',
+                        locked_by = %s,
+                        locked_at = NOW(),
+                        heartbeat_at = NOW(),
+                        started_at = NOW(),
+                        finished_at = NULL,
+                        attempts = j.attempts + 1,
+                        updated_at = NOW()
+                    WHERE j.id = (
+                        SELECT id FROM background_jobs
+                        WHERE status = 'queued' AND run_after <= NOW() {type_filter}
+                        ORDER BY priority, run_after, created_at
+                        FOR UPDATE SKIP LOCKED
+                        LIMIT 1
+                    )
+                    RETURNING j.id, j.job_type, j.payload, j.priority, j.attempts,
+                              j.max_attempts, j.created_at, j.started_at
+                """, params)
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                job = dict(row)
+                job['id'] = str(job['id'])
+                return job
+
+    def heartbeat(self, job_id: str):
+        """Sinal de vida de um job em execução"""
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE background_jobs SET heartbeat_at = NOW()
+                    WHERE id = %s AND status = 'running'
+                """, (job_id,))
+
+    def complete(self, job_id: str, result: Optional[Dict[str, Any]], duration_ms: int):
+        """Marca o job como concluído com resultado e duração"""
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE background_jobs
+                    SET status = 'done', result = %s::jsonb, duration_ms = %s,
+                        finished_at = NOW(), locked_by = NULL, last_error = NULL, updated_at = NOW()
+                    WHERE id = %s
+                """, (json.dumps(result or {}, default=_json_default), duration_ms, job_id))
+
+    def fail(self, job_id: str, error: str, duration_ms: int, retry: bool = True) -> str:
+        """
+        Registra falha. Se ainda houver tentativas, volta para a fila com backoff
+        exponencial; caso contrário fica como failed. Retorna o novo status.
+        """
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE background_jobs
+                    SET status = CASE WHEN %s AND attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                        run_after = NOW() + make_interval(secs => %s * power(2, GREATEST(attempts - 1, 0))),
+                        last_error = %s, duration_ms = %s, finished_at = NOW(),
+                        locked_by = NULL, updated_at = NOW()
+                    WHERE id = %s
+                    RETURNING status
+                """, (retry, JOB_RETRY_BASE_SECONDS, error[:4000], duration_ms, job_id))
+                row = cursor.fetchone()
+                return row[0] if row else 'failed'
+
+    def requeue_stale(self, stale_after_seconds: int = JOB_STALE_AFTER_SECONDS) -> int:
+        """
+        Devolve para a fila jobs 'running' sem heartbeat recente (worker morto por
+        deploy/OOM). Jobs de matching retomam do checkpoint ao serem executados de novo.
+        """
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE background_jobs
+                    SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                        last_error = 'Worker sem heartbeat (interrompido)',
+                        locked_by = NULL, updated_at = NOW()
+                    WHERE status = 'running'
+                      AND heartbeat_at < NOW() - make_interval(secs => %s)
+                """, (stale_after_seconds,))
+                requeued = cursor.rowcount
+        if requeued:
+            logger.warning(f"♻️ {requeued} jobs interrompidos devolvidos para a fila")
+        return requeued
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Buscar job por ID"""
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cursor:
+                cursor.execute("SELECT * FROM background_jobs WHERE id = %s", (job_id,))
+                row = cursor.fetchone()
+                return self._format_job(row) if row else None
+
+    def get_latest(self, job_type: str) -> Optional[Dict[str, Any]]:
+        """Job mais recente de um tipo"""
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cursor:
+                cursor.execute("""
+                    SELECT * FROM background_jobs
+                    WHERE job_type = %s
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                """, (job_type,))
+                row = cursor.fetchone()
+                return self._format_job(row) if row else None
+
+    def list_jobs(self, job_type: Optional[str] = None, status: Optional[str] = None,
+                  limit: int = 50) -> List[Dict[str, Any]]:
+        """Listar jobs recentes com filtros opcionais"""
+        conditions = []
+        params: List[Any] = []
+        if job_type:
+            conditions.append("job_type = %s")
+            params.append(job_type)
+        if status:
+            conditions.append("status = %s")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cursor:
+                cursor.execute(f"""
+                    SELECT * FROM background_jobs
+                    {where}
+                    ORDER BY created_at DESC
+                    LIMIT %s
+                """, params)
+                return [self._format_job(row) for row in cursor.fetchall()]
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """Contagem por tipo/status e tempos médios (espera e execução)"""
+        with get_db_manager().get_connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cursor:
+                cursor.execute("""
+                    SELECT job_type, status, COUNT(*) AS total,
+                           AVG(duration_ms) AS avg_duration_ms,
+                           AVG(EXTRACT(EPOCH FROM (started_at - created_at)) * 1000) AS avg_wait_ms
+                    FROM background_jobs
+                    WHERE created_at >= NOW() - INTERVAL '7 days'
+                    GROUP BY job_type, status
+                    ORDER BY job_type, status
+                """)
+                stats: Dict[str, Any] = {}
+                for row in cursor.fetchall():
+                    stats.setdefault(row['job_type'], {})[row['status']] = {
+                        'total': row['total'],
+                        'avg_duration_ms': round(float(row['avg_duration_ms']), 1) if row['avg_duration_ms'] is not None else None,
+                        'avg_wait_ms': round(float(row['avg_wait_ms']), 1) if row['avg_wait_ms'] is not None else None
+                    }
+                return stats
+
+    @staticmethod
+    def _format_job(row) -> Dict[str, Any]:
+        """Converter linha do banco para dict serializável"""
+        job = dict(row)
+        job['id'] = str(job['id'])
+        for key, value in job.items():
+            if isinstance(value, datetime):
+                job[key] = value.isoformat()
+        return job
@@ -0,0 +1,237 @@
+"""
+Pool de workers da fila de jobs
+Roda dentro do processo web (JOB_WORKER_MODE=inprocess) ou como processo
+separado (python -m jobs.worker / run_worker.py), com N threads consumindo
+a fila via FOR UPDATE SKIP LOCKED.
+"""
+import os
+import sys
+import time
+import socket
+import signal
+import logging
+import threading
+import traceback
+from typing import Dict, Any, Callable, List, Optional
+
+from jobs.job_queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+# --- Configurações do pool ---
+JOB_WORKER_MODE = os.getenv('JOB_WORKER_MODE', 'inprocess')  # inprocess | external
+JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', '1'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '5'))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '30'))
+
+# Registro de handlers: job_type -> função(payload) -> resultado
+_handlers: Dict[str, Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = {}
+
+
+def register_handler(job_type: str):
+    """Decorator para registrar o handler de um tipo de job"""
+    def decorator(func: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def get_registered_job_types() -> List[str]:
+    """Tipos de job com handler registrado"""
+    return sorted(_handlers.keys())
+
+
+class NonRetryableJobError(Exception):
+    """Falha definitiva: o job não deve voltar para a fila"""
+
+
+class WorkerPool:
+    """Pool de threads que consome a fila de jobs"""
+
+    def __init__(self, concurrency: int = JOB_WORKER_CONCURRENCY,
+                 job_types: Optional[List[str]] = None,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.concurrency = max(1, concurrency)
+        self.job_types = job_types
+        self.poll_interval = poll_interval
+        self.queue = JobQueue()
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._metrics_lock = threading.Lock()
+        self.metrics = {'claimed': 0, 'done': 0, 'failed': 0, 'retried': 0, 'busy': 0}
+
+    def start(self):
+        """Inicia as threads do pool (idempotente)"""
+        if self._threads:
+            return
+        # Importa os handlers padrão (registro via decorator)
+        import jobs.handlers  # noqa: F401
+
+        types = self.job_types or get_registered_job_types()
+        logger.info(f"👷 Iniciando pool de workers: {self.concurrency} threads ({self.worker_prefix}) - tipos: {', '.join(types)}")
+        for i in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._run, args=(f"{self.worker_prefix}:{i}",),
+                name=f"job-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10):
+        """Sinaliza parada e aguarda as threads terminarem o job atual"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        logger.info("🛑 Pool de workers finalizado")
+
+    def run_forever(self):
+        """Executa o pool em primeiro plano (modo processo separado)"""
+        self.start()
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Contadores do pool neste processo"""
+        with self._metrics_lock:
+            return {
+                **self.metrics,
+                'worker': self.worker_prefix,
+                'concurrency': self.concurrency,
+                'alive_threads': sum(1 for t in self._threads if t.is_alive())
+            }
+
+    def _count(self, key: str, delta: int = 1):
+        with self._metrics_lock:
+            self.metrics[key] += delta
+
+    def _run(self, worker_id: str):
+        """Loop de uma thread: recupera jobs órfãos, faz claim e executa"""
+        while not self._stop.is_set():
+            try:
+                self.queue.requeue_stale()
+                job = self.queue.claim(worker_id, self.job_types or get_registered_job_types())
+            except Exception as e:
+                logger.error(f"❌ Erro ao buscar job na fila: {e}")
+                job = None
+
+            if not job:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            self._count('claimed')
+            self._execute(job)
+
+    def _execute(self, job: Dict[str, Any]):
+        """Executa um job com heartbeat, registrando duração, resultado ou falha"""
+        job_id = job['id']
+        handler = _handlers.get(job['job_type'])
+        heartbeat_stop = threading.Event()
+
+        def heartbeat():
+            while not heartbeat_stop.wait(JOB_HEARTBEAT_INTERVAL):
+                try:
+                    self.queue.heartbeat(job_id)
+                except Exception as e:
+                    logger.warning(f"⚠️ Falha no heartbeat do job {job_id}: {e}")
+
+        heartbeat_thread = threading.Thread(target=heartbeat, name=f"job-heartbeat-{job_id}", daemon=True)
+        heartbeat_thread.start()
+
+        logger.info(f"▶️ Executando job {job['job_type']} ({job_id}) - tentativa {job['attempts']}/{job['max_attempts']}")
+        self._count('busy')
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise NonRetryableJobError(f"Nenhum handler registrado para '{job['job_type']}'")
+
+            result = handler(job.get('payload') or {})
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            self.queue.complete(job_id, result, duration_ms)
+            self._count('done')
+            logger.info(f"✅ Job {job['job_type']} ({job_id}) concluído em {duration_ms}ms")
+
+        except Exception as e:
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            retry = not isinstance(e, NonRetryableJobError)
+            error = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}"
+            status = self.queue.fail(job_id, error, duration_ms, retry=retry)
+            self._count('retried' if status == 'queued' else 'failed')
+            logger.error(f"❌ Job {job['job_type']} ({job_id}) falhou em {duration_ms}ms: {e} → {status}")
+
+        finally:
+            self._count('busy', -1)
+            heartbeat_stop.set()
+
+
+# Pool do processo atual (modo inprocess)
+_pool: Optional[WorkerPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> Optional[WorkerPool]:
+    """Pool ativo neste processo (se houver)"""
+    return _pool if _pool_pid == os.getpid() else None
+
+
+def ensure_inprocess_pool() -> Optional[WorkerPool]:
+    """
+    Inicia o pool no processo atual se JOB_WORKER_MODE=inprocess.
+    Verifica o PID porque, com gunicorn --preload, threads criadas antes do fork
+    não existem nos workers.
+    """
+    global _pool, _pool_pid
+    if JOB_WORKER_MODE != 'inprocess':
+        return None
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = WorkerPool()
+            _pool_pid = os.getpid()
+            _pool.start()
+    return _pool
+
+
+def main():
+    """Entrada do processo worker separado"""
+    logging.basicConfig(
+        level=os.getenv('LOG_LEVEL', 'INFO'),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        from config.env_loader import load_environment
+        load_environment()
+    except Exception:
+        pass
+
+    from config.database import get_db_manager
+    get_db_manager()
+
+    job_types = [t for t in os.getenv('JOB_WORKER_TYPES', '').split(',') if t] or None
+    pool = WorkerPool(job_types=job_types)
+
+    def handle_signal(signum, frame):
+        logger.info(f"📴 Sinal {signum} recebido, finalizando após os jobs atuais...")
+        pool._stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    print("=" * 60)
+    print(f"👷 Alicit Job Worker - {pool.concurrency} threads")
+    print("=" * 60)
+    pool.run_forever()
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,22 +15,80 @@ from .vectorizers import (
 from .pncp_api import (
     get_db_connection,
     get_all_companies_from_db,
+    iter_all_companies_from_db,
     get_processed_bid_ids,
     fetch_bids_from_pncp,
     fetch_bid_items_from_pncp,
     save_bid_to_db,
     save_bid_items_to_db,
     save_match_to_db,
+    save_matches_to_db,
+    replace_matches_for_bids,
     update_bid_status,
     get_existing_bids_from_db,
+    iter_existing_bids_from_db,
+    count_existing_bids_from_db,
+    stream_rows,
     get_bid_items_from_db,
+    get_items_for_bids_from_db,
     clear_existing_matches,
-    ESTADOS_BRASIL
+    ESTADOS_BRASIL,
+    MODALIDADES_PNCP,
+    PNCP_MODALIDADES
+)
+
+from .score_matrix import (
+    ScoreMatrixRecorder,
+    ScoreMatrix,
+    load_score_matrix,
+    list_score_runs,
+    simulate_thresholds
+)
+
+from .archive import (
+    pncp_archive,
+    reprocess_archive,
+    read_archived_payload,
+    PNCP_ARCHIVE_DIR
+)
+
+from .summaries import (
+    refresh_summaries,
+    SUMMARY_VIEWS
+)
+
+from .circuit_breaker import (
+    CircuitOpenError,
+    get_circuit_breaker,
+    get_negative_cache,
+    get_resilience_status
+)
+
+from .checkpoints import (
+    load_checkpoint,
+    get_checkpoint,
+    MATCHING_CHECKPOINT_EVERY
+)
+
+from .ingestion import (
+    get_backfill_progress,
+    get_sync_state,
+    INGESTION_CONCURRENCY
+)
+
+from .sharding import (
+    get_run_progress,
+    REEVALUATE_SHARDS
 )
 
 from .matching_engine import (
     process_daily_bids,
-    reevaluate_existing_bids
+    reevaluate_existing_bids,
+    backfill_bids,
+    sync_updated_bids,
+    start_sharded_reevaluation,
+    run_reevaluation_shards,
+    finalize_sharded_reevaluation
 )
 
 __all__ = [
@@ -46,19 +104,70 @@ __all__ = [
     # PNCP API
     'get_db_connection',
     'get_all_companies_from_db',
+    'iter_all_companies_from_db',
     'get_processed_bid_ids',
     'fetch_bids_from_pncp',
     'fetch_bid_items_from_pncp',
     'save_bid_to_db',
     'save_bid_items_to_db',
     'save_match_to_db',
+    'save_matches_to_db',
+    'replace_matches_for_bids',
     'update_bid_status',
     'get_existing_bids_from_db',
+    'iter_existing_bids_from_db',
+    'count_existing_bids_from_db',
+    'stream_rows',
     'get_bid_items_from_db',
+    'get_items_for_bids_from_db',
     'clear_existing_matches',
     'ESTADOS_BRASIL',
+    'MODALIDADES_PNCP',
+    'PNCP_MODALIDADES',
+    
+    # Score matrix
+    'ScoreMatrixRecorder',
+    'ScoreMatrix',
+    'load_score_matrix',
+    'list_score_runs',
+    'simulate_thresholds',
+    
+    # Archive
+    'pncp_archive',
+    'reprocess_archive',
+    'read_archived_payload',
+    'PNCP_ARCHIVE_DIR',
+    
+    # Views de resumo do dashboard
+    'refresh_summaries',
+    'SUMMARY_VIEWS',
+    
+    # Circuit breaker / cache negativo
+    'CircuitOpenError',
+    'get_circuit_breaker',
+    'get_negative_cache',
+    'get_resilience_status',
+    
+    # Checkpoints
+    'load_checkpoint',
+    'get_checkpoint',
+    'MATCHING_CHECKPOINT_EVERY',
+    
+    # Ingestion
+    'get_backfill_progress',
+    'get_sync_state',
+    'INGESTION_CONCURRENCY',
+    
+    # Sharding
+    'get_run_progress',
+    'REEVALUATE_SHARDS',
     
     # Main functions
     'process_daily_bids',
-    'reevaluate_existing_bids'
+    'reevaluate_existing_bids',
+    'backfill_bids',
+    'sync_updated_bids',
+    'start_sharded_reevaluation',
+    'run_reevaluation_shards',
+    'finalize_sharded_reevaluation'
 ] 
\ No newline at end of file
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Arquivo dos payloads brutos do PNCP
+Cada contratação (API de publicação/atualização) e cada lista de itens recebida é
+gravada como um frame zstd independente em segmentos JSONL por data/UF
+({PNCP_ARCHIVE_DIR}/{AAAA-MM-DD}/{UF}/{host}-{pid}-{n}.jsonl.zst). A tabela
+pncp_archive_index localiza o último payload de cada pncp_id (segmento, offset,
+tamanho). O reprocessamento reconstrói licitacoes/licitacao_itens lendo apenas o
+disco, sem chamadas à API. Desabilitado por padrão (PNCP_ARCHIVE_ENABLED); os dias
+de publicação além de PNCP_ARCHIVE_RETENTION_DAYS são removidos após cada ingestão.
+"""
+
+import os
+import json
+import time
+import shutil
+import socket
+import datetime
+import threading
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+from psycopg2.extras import execute_values
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependência opcional em ambientes sem arquivo
+    zstandard = None
+
+# --- Configurações do arquivo ---
+PNCP_ARCHIVE_ENABLED = os.getenv('PNCP_ARCHIVE_ENABLED', 'false').lower() == 'true'  # Opt-in: ocupa disco
+PNCP_ARCHIVE_DIR = os.getenv(
+    'PNCP_ARCHIVE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'pncp_archive')
+)
+PNCP_ARCHIVE_SEGMENT_MB = int(os.getenv('PNCP_ARCHIVE_SEGMENT_MB', '64'))
+PNCP_ARCHIVE_INDEX_BATCH = int(os.getenv('PNCP_ARCHIVE_INDEX_BATCH', '500'))
+PNCP_ARCHIVE_LEVEL = int(os.getenv('PNCP_ARCHIVE_LEVEL', '3'))
+PNCP_ARCHIVE_RETENTION_DAYS = int(os.getenv('PNCP_ARCHIVE_RETENTION_DAYS', '90'))  # Por data de publicação (0 = sem limite)
+
+KIND_BID = 'bid'
+KIND_ITEMS = 'items'
+
+
+def _get_db_connection():
+    # Import tardio: pncp_api importa este módulo para arquivar as respostas
+    from .pncp_api import get_db_connection
+    return get_db_connection()
+
+
+def bid_archive_key(bid: Dict[str, Any]) -> Tuple[str, str]:
+    """(data de publicação AAAA-MM-DD, UF) usados para localizar o segmento da contratação"""
+    data = str(bid.get("dataPublicacaoPncp") or bid.get("dataInclusao") or "")[:10] or "sem-data"
+    uf = (bid.get("unidadeOrgao") or {}).get("ufSigla") or "XX"
+    return data, uf
+
+
+class PNCPArchive:
+    """
+    Escritor thread-safe dos segmentos. Cada processo escreve seus próprios
+    arquivos (host-pid no nome), então não há escrita concorrente entre processos.
+    As entradas do índice são acumuladas e gravadas em lote.
+    """
+
+    def __init__(self, base_dir: str = PNCP_ARCHIVE_DIR, enabled: bool = PNCP_ARCHIVE_ENABLED):
+        self.base_dir = base_dir
+        self.enabled = enabled and zstandard is not None
+        self._lock = threading.Lock()
+        self._segments: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._pending_index: List[Tuple] = []
+        self._prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self._pid = os.getpid()
+        self._local = threading.local()  # ZstdCompressor não é thread-safe
+        self.records = 0
+        self.bytes_written = 0
+        if enabled and zstandard is None:
+            print("⚠️ zstandard não instalado: arquivo de payloads do PNCP desabilitado")
+
+    def append_bids(self, bids: List[Dict[str, Any]], source: str):
+        """Arquiva as contratações de uma página da API de publicação/atualização"""
+        for bid in bids:
+            if bid.get("numeroControlePNCP"):
+                data, uf = bid_archive_key(bid)
+                self._append(KIND_BID, bid["numeroControlePNCP"], data, uf, bid, source)
+
+    def append_items(self, bid: Dict[str, Any], items: List[Dict[str, Any]], source: str):
+        """Arquiva a resposta da API de itens de uma contratação"""
+        if bid.get("numeroControlePNCP"):
+            data, uf = bid_archive_key(bid)
+            self._append(KIND_ITEMS, bid["numeroControlePNCP"], data, uf, items, source)
+
+    def _append(self, kind: str, pncp_id: str, data: str, uf: str, payload: Any, source: str):
+        if not self.enabled:
+            return
+        record = json.dumps({
+            'kind': kind,
+            'pncp_id': pncp_id,
+            'fetched_at': datetime.datetime.now().isoformat(),
+            'source': source,
+            'payload': payload
+        }, ensure_ascii=False, separators=(',', ':')) + "\n"
+        # Frame independente: permite ler um registro isolado pelo offset do índice
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=PNCP_ARCHIVE_LEVEL)
+        frame = compressor.compress(record.encode('utf-8'))
+
+        flush = False
+        with self._lock:
+            if self._pid != os.getpid():
+                # Processo filho (fork): não reaproveitar arquivos abertos do pai
+                self._segments, self._pending_index = {}, []
+                self._prefix, self._pid = f"{socket.gethostname()}-{os.getpid()}", os.getpid()
+            segment = self._segment(data, uf)
+            offset = segment['size']
+            segment['file'].write(frame)
+            segment['file'].flush()
+            segment['size'] += len(frame)
+            self.records += 1
+            self.bytes_written += len(frame)
+            self._pending_index.append((
+                pncp_id, kind, data if data != "sem-data" else None, uf,
+                segment['relpath'], offset, len(frame)
+            ))
+            flush = len(self._pending_index) >= PNCP_ARCHIVE_INDEX_BATCH
+
+        if flush:
+            self.flush_index()
+
+    def _segment(self, data: str, uf: str) -> Dict[str, Any]:
+        """Segmento aberto para data/UF (rotaciona ao atingir PNCP_ARCHIVE_SEGMENT_MB)"""
+        key = (data, uf)
+        segment = self._segments.get(key)
+        if segment and segment['size'] < PNCP_ARCHIVE_SEGMENT_MB * 1024 * 1024:
+            return segment
+        if segment:
+            segment['file'].close()
+
+        directory = os.path.join(self.base_dir, data, uf)
+        os.makedirs(directory, exist_ok=True)
+        seq = 0
+        while True:
+            relpath = os.path.join(data, uf, f"{self._prefix}-{seq:04d}.jsonl.zst")
+            path = os.path.join(self.base_dir, relpath)
+            if not os.path.exists(path) or os.path.getsize(path) < PNCP_ARCHIVE_SEGMENT_MB * 1024 * 1024:
+                break
+            seq += 1
+        handle = open(path, 'ab')
+        segment = {'file': handle, 'relpath': relpath, 'size': handle.tell()}
+        self._segments[key] = segment
+        return segment
+
+    def flush_index(self):
+        """Grava no banco as entradas pendentes do índice"""
+        with self._lock:
+            rows, self._pending_index = self._pending_index, []
+        if not rows:
+            return
+        # Um pncp_id/tipo por lote (o último payload prevalece)
+        latest = {(row[0], row[1]): row for row in rows}
+        conn = _get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                execute_values(cursor, """
+                    INSERT INTO pncp_archive_index (pncp_id, kind, data_publicacao, uf, segment, frame_offset, frame_length)
+                    VALUES %s
+                    ON CONFLICT (pncp_id, kind) DO UPDATE SET
+                        data_publicacao = EXCLUDED.data_publicacao,
+                        uf = EXCLUDED.uf,
+                        segment = EXCLUDED.segment,
+                        frame_offset = EXCLUDED.frame_offset,
+                        frame_length = EXCLUDED.frame_length,
+                        archived_at = NOW()
+                """, list(latest.values()), page_size=500)
+                conn.commit()
+        except Exception as e:
+            # O segmento já está em disco; o reprocessamento não depende do índice
+            print(f"⚠️ Erro ao gravar índice do arquivo PNCP: {e}")
+        finally:
+            conn.close()
+
+    def prune(self, retention_days: int = PNCP_ARCHIVE_RETENTION_DAYS) -> int:
+        """
+        Remove os segmentos (e as entradas do índice) de datas de publicação
+        anteriores à retenção. Retorna o número de dias removidos.
+        """
+        if not self.enabled or retention_days <= 0 or not os.path.isdir(self.base_dir):
+            return 0
+        cutoff = datetime.date.today() - datetime.timedelta(days=retention_days)
+
+        expired = []
+        for name in os.listdir(self.base_dir):
+            try:
+                day = datetime.date.fromisoformat(name)
+            except ValueError:
+                continue  # "sem-data" e outros diretórios não entram na retenção
+            if day < cutoff:
+                expired.append(name)
+        if not expired:
+            return 0
+
+        self.flush_index()
+        with self._lock:
+            for key in [key for key in self._segments if key[0] in expired]:
+                self._segments.pop(key)['file'].close()
+            for name in expired:
+                shutil.rmtree(os.path.join(self.base_dir, name), ignore_errors=True)
+
+        conn = _get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM pncp_archive_index WHERE data_publicacao < %s", (cutoff,))
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️ Erro ao limpar índice do arquivo PNCP: {e}")
+        finally:
+            conn.close()
+
+        print(f"🧹 Arquivo PNCP: {len(expired)} dias anteriores a {cutoff.isoformat()} removidos")
+        return len(expired)
+
+    def close(self):
+        """Grava o índice pendente e fecha os segmentos abertos"""
+        self.flush_index()
+        with self._lock:
+            for segment in self._segments.values():
+                segment['file'].close()
+            self._segments = {}
+
+
+# Arquivo do processo atual
+pncp_archive = PNCPArchive()
+
+
+def iter_archive_records(start_date: datetime.date, end_date: datetime.date,
+                         ufs: Optional[List[str]] = None,
+                         base_dir: str = PNCP_ARCHIVE_DIR) -> Iterator[Dict[str, Any]]:
+    """Lê sequencialmente os registros dos segmentos do intervalo (sem rede, sem banco)"""
+    if zstandard is None:
+        raise RuntimeError("zstandard não instalado: não é possível ler o arquivo de payloads")
+
+    day = start_date
+    while day <= end_date:
+        day_dir = os.path.join(base_dir, day.isoformat())
+        if os.path.isdir(day_dir):
+            for uf in sorted(os.listdir(day_dir)):
+                if ufs and uf not in ufs:
+                    continue
+                uf_dir = os.path.join(day_dir, uf)
+                for name in sorted(os.listdir(uf_dir)):
+                    if not name.endswith('.jsonl.zst'):
+                        continue
+                    yield from _iter_segment(os.path.join(uf_dir, name))
+        day += datetime.timedelta(days=1)
+
+
+def _iter_segment(path: str) -> Iterator[Dict[str, Any]]:
+    """Registros de um segmento (frames concatenados formam um único JSONL)"""
+    with open(path, 'rb') as handle:
+        reader = zstandard.ZstdDecompressor().stream_reader(handle, read_across_frames=True)
+        buffer = b""
+        while True:
+            chunk = reader.read(1024 * 1024)
+            if not chunk:
+                break
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line:
+                    yield json.loads(line)
+        if buffer.strip():
+            yield json.loads(buffer)
+
+
+def read_archived_payload(pncp_id: str, kind: str = KIND_BID,
+                          base_dir: str = PNCP_ARCHIVE_DIR) -> Optional[Dict[str, Any]]:
+    """Último payload arquivado de uma contratação, lido direto pelo offset do índice"""
+    if zstandard is None:
+        return None
+    conn = _get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT segment, frame_offset, frame_length
+                FROM pncp_archive_index WHERE pncp_id = %s AND kind = %s
+            """, (pncp_id, kind))
+            row = cursor.fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+
+    with open(os.path.join(base_dir, row[0]), 'rb') as handle:
+        handle.seek(row[1])
+        frame = handle.read(row[2])
+    return json.loads(zstandard.ZstdDecompressor().decompress(frame))
+
+
+def reprocess_archive(start_date: datetime.date, end_date: datetime.date,
+                      ufs: Optional[List[str]] = None, base_dir: str = PNCP_ARCHIVE_DIR) -> Dict[str, Any]:
+    """
+    Reconstrói licitacoes/licitacao_itens a partir do arquivo, dia a dia, usando o
+    mapeamento atual. Sem chamadas ao PNCP; o último payload de cada pncp_id prevalece.
+    """
+    from .pncp_api import get_db_connection, upsert_changed_bids, upsert_bid_items_bulk
+    from .summaries import refresh_summaries
+
+    print("=" * 80)
+    print(f"📼 REPROCESSAMENTO DO ARQUIVO PNCP: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}")
+    print(f"📁 {base_dir}")
+    print("=" * 80)
+
+    started = time.perf_counter()
+    stats = {'registros': 0, 'licitacoes': 0, 'inseridas': 0, 'atualizadas': 0, 'inalteradas': 0, 'itens': 0}
+
+    day = start_date
+    while day <= end_date:
+        bids: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        items: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+        for record in iter_archive_records(day, day, ufs, base_dir):
+            stats['registros'] += 1
+            target = bids if record['kind'] == KIND_BID else items
+            current = target.get(record['pncp_id'])
+            if current is None or record['fetched_at'] >= current[0]:
+                target[record['pncp_id']] = (record['fetched_at'], record['payload'])
+
+        if bids:
+            result = upsert_changed_bids([payload for _, payload in bids.values()])
+            stats['licitacoes'] += len(bids)
+            for key in ('inseridas', 'atualizadas', 'inalteradas'):
+                stats[key] += result[key]
+
+        if items:
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT pncp_id, id FROM licitacoes WHERE pncp_id = ANY(%s)",
+                        (list(items.keys()),)
+                    )
+                    ids = {row[0]: str(row[1]) for row in cursor.fetchall()}
+            finally:
+                conn.close()
+            stats['itens'] += upsert_bid_items_bulk({
+                ids[pncp_id]: payload for pncp_id, (_, payload) in items.items() if pncp_id in ids
+            })
+
+        if bids or items:
+            print(f"   📅 {day.strftime('%d/%m/%Y')}: {len(bids)} licitações, {len(items)} listas de itens")
+        day += datetime.timedelta(days=1)
+
+    refresh_summaries('licitacoes', force=True)
+    duration = time.perf_counter() - started
+    stats['duracao_segundos'] = round(duration, 1)
+    stats['registros_por_segundo'] = round(stats['registros'] / duration, 1) if duration > 0 else None
+    print(f"\n🎯 Reprocessamento: {stats['registros']} registros lidos, {stats['licitacoes']} licitações "
+          f"({stats['inseridas']} novas, {stats['atualizadas']} atualizadas), {stats['itens']} itens "
+          f"em {stats['duracao_segundos']}s")
+    return stats
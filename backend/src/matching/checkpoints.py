@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Checkpoints duráveis dos jobs de matching
+Permite que a busca diária e a reavaliação retomem do último ponto salvo
+após um restart (deploy, OOM) em vez de recomeçar do zero.
+"""
+
+import os
+import json
+from typing import Dict, Any, Optional
+from psycopg2.extras import DictCursor
+
+from .pncp_api import get_db_connection
+
+# Licitações processadas entre checkpoints da reavaliação
+MATCHING_CHECKPOINT_EVERY = int(os.getenv('MATCHING_CHECKPOINT_EVERY', '25'))
+
+
+def _json_default(value):
+    """Serializa datas e decimais do snapshot"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return float(value)
+
+
+def load_checkpoint(job_name: str) -> Optional[Dict[str, Any]]:
+    """Retorna o checkpoint de um job interrompido (status running) ou None"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute("""
+                SELECT job_name, status, cursor, stats, resumed_count, started_at, updated_at
+                FROM matching_job_checkpoints
+                WHERE job_name = %s AND status = 'running'
+            """, (job_name,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def get_checkpoint(job_name: str) -> Optional[Dict[str, Any]]:
+    """Retorna o último checkpoint de um job (qualquer status) para exibição"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute("""
+                SELECT job_name, status, cursor, stats, resumed_count,
+                       started_at, updated_at, completed_at
+                FROM matching_job_checkpoints
+                WHERE job_name = %s
+            """, (job_name,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            checkpoint = dict(row)
+            for key in ('started_at', 'updated_at', 'completed_at'):
+                if checkpoint.get(key):
+                    checkpoint[key] = checkpoint[key].isoformat()
+            return checkpoint
+    finally:
+        conn.close()
+
+
+def start_checkpoint(job_name: str, cursor_data: Dict[str, Any], stats: Dict[str, Any]):
+    """Inicia (ou reinicia do zero) o checkpoint de um job"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO matching_job_checkpoints (job_name, status, cursor, stats, resumed_count,
+                                                      started_at, updated_at, completed_at)
+                VALUES (%s, 'running', %s::jsonb, %s::jsonb, 0, NOW(), NOW(), NULL)
+                ON CONFLICT (job_name) DO UPDATE SET
+                    status = 'running',
+                    cursor = EXCLUDED.cursor,
+                    stats = EXCLUDED.stats,
+                    resumed_count = 0,
+                    started_at = NOW(),
+                    updated_at = NOW(),
+                    completed_at = NULL
+            """, (job_name, json.dumps(cursor_data, default=_json_default),
+                  json.dumps(stats, default=_json_default)))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def mark_resumed(job_name: str):
+    """Registra que o job foi retomado a partir do checkpoint"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_job_checkpoints
+                SET resumed_count = resumed_count + 1, updated_at = NOW()
+                WHERE job_name = %s
+            """, (job_name,))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def save_checkpoint(job_name: str, cursor_data: Dict[str, Any], stats: Dict[str, Any]):
+    """Grava a posição atual e o snapshot das estatísticas"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_job_checkpoints
+                SET cursor = %s::jsonb, stats = %s::jsonb, updated_at = NOW()
+                WHERE job_name = %s
+            """, (json.dumps(cursor_data, default=_json_default),
+                  json.dumps(stats, default=_json_default), job_name))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def complete_checkpoint(job_name: str, stats: Dict[str, Any]):
+    """Marca o job como concluído (não será mais retomado)"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_job_checkpoints
+                SET status = 'completed', stats = %s::jsonb,
+                    updated_at = NOW(), completed_at = NOW()
+                WHERE job_name = %s
+            """, (json.dumps(stats, default=_json_default), job_name))
+            conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker e cache negativo para os endpoints do PNCP
+Com o PNCP instável, cada licitação esperaria o timeout completo da requisição.
+O breaker abre após falhas consecutivas de um endpoint e passa a falhar
+imediatamente até o tempo de recuperação; depois libera uma requisição de teste
+(meio-aberto). O cache negativo guarda por um TTL as respostas "sem itens" /
+"sem documentos", evitando consultar de novo o que já se sabe estar vazio.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Hashable
+
+# --- Configurações ---
+PNCP_BREAKER_FAILURE_THRESHOLD = int(os.getenv('PNCP_BREAKER_FAILURE_THRESHOLD', '5'))
+PNCP_BREAKER_RECOVERY_SECONDS = float(os.getenv('PNCP_BREAKER_RECOVERY_SECONDS', '30'))
+PNCP_NEGATIVE_CACHE_TTL = int(os.getenv('PNCP_NEGATIVE_CACHE_TTL', '21600'))  # 6 horas
+PNCP_NEGATIVE_CACHE_SIZE = int(os.getenv('PNCP_NEGATIVE_CACHE_SIZE', '50000'))
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """O endpoint está com o circuito aberto: a chamada não foi feita"""
+
+
+class CircuitBreaker:
+    """Breaker thread-safe de um endpoint (fechado → aberto → meio-aberto → fechado)"""
+
+    def __init__(self, name: str, failure_threshold: int = PNCP_BREAKER_FAILURE_THRESHOLD,
+                 recovery_seconds: float = PNCP_BREAKER_RECOVERY_SECONDS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.metrics = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self) -> bool:
+        """Decide se a chamada pode ser feita (no meio-aberto, só uma requisição de teste por vez)"""
+        with self._lock:
+            if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+                self._state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == STATE_CLOSED or (self._state == STATE_HALF_OPEN and not self._probe_in_flight):
+                if self._state == STATE_HALF_OPEN:
+                    self._probe_in_flight = True
+                self.metrics['calls'] += 1
+                return True
+            self.metrics['rejected'] += 1
+            return False
+
+    def before_call(self):
+        """Levanta CircuitOpenError se o circuito não permitir a chamada"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuito '{self.name}' aberto")
+
+    def record_success(self):
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.metrics['failures'] += 1
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != STATE_OPEN:
+                    self.metrics['opened'] += 1
+                    print(f"🔌 Circuito '{self.name}' aberto após {self._failures} falhas "
+                          f"(nova tentativa em {self.recovery_seconds:.0f}s)")
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self._state == STATE_OPEN:
+                retry_in = round(max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at)), 1)
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'retry_in_seconds': retry_in,
+                **self.metrics
+            }
+
+
+class NegativeCache:
+    """Conjunto de chaves com TTL e tamanho máximo (LRU) para respostas vazias"""
+
+    def __init__(self, ttl_seconds: int = PNCP_NEGATIVE_CACHE_TTL, max_size: int = PNCP_NEGATIVE_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def add(self, key: Hashable):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def contains(self, key: Hashable) -> bool:
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._entries[key]
+                return False
+            self.hits += 1
+            return True
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'ttl_seconds': self.ttl_seconds}
+
+
+# Breakers e caches negativos do processo, por endpoint
+_breakers: Dict[str, CircuitBreaker] = {}
+_negative_caches: Dict[str, NegativeCache] = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    """Breaker compartilhado de um endpoint (ex: 'pncp_itens', 'pncp_arquivos')"""
+    with _registry_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+        return _breakers[endpoint]
+
+
+def get_negative_cache(endpoint: str) -> NegativeCache:
+    """Cache negativo compartilhado de um endpoint"""
+    with _registry_lock:
+        if endpoint not in _negative_caches:
+            _negative_caches[endpoint] = NegativeCache()
+        return _negative_caches[endpoint]
+
+
+def get_resilience_status() -> Dict[str, Any]:
+    """Estado dos breakers e caches negativos deste processo"""
+    with _registry_lock:
+        breakers, caches = dict(_breakers), dict(_negative_caches)
+    return {
+        'circuit_breakers': {name: breaker.status() for name, breaker in breakers.items()},
+        'negative_caches': {name: cache.status() for name, cache in caches.items()}
+    }
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Unidades de trabalho da ingestão do PNCP
+O backfill divide um intervalo de datas em unidades dia × UF × modalidade × página, reservadas
+com FOR UPDATE SKIP LOCKED. Unidades concluídas ficam registradas e não são
+refeitas quando o mesmo intervalo é executado novamente.
+"""
+
+import os
+import json
+import datetime
+from typing import Dict, Any, List, Optional
+from psycopg2.extras import DictCursor, execute_values
+
+from .pncp_api import get_db_connection, MODALIDADES_PNCP, PNCP_MODALIDADES
+
+# --- Configurações da ingestão ---
+INGESTION_CONCURRENCY = int(os.getenv('INGESTION_CONCURRENCY', '4'))
+INGESTION_UNIT_MAX_ATTEMPTS = int(os.getenv('INGESTION_UNIT_MAX_ATTEMPTS', '3'))
+INGESTION_UNIT_STALE_SECONDS = int(os.getenv('INGESTION_UNIT_STALE_SECONDS', '900'))
+PNCP_SYNC_LOOKBACK_DAYS = int(os.getenv('PNCP_SYNC_LOOKBACK_DAYS', '1'))  # Primeira sincronização
+
+
+def date_range(start_date: datetime.date, end_date: datetime.date) -> List[datetime.date]:
+    """Dias do intervalo (inclusivo)"""
+    return [start_date + datetime.timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+
+def get_db_now() -> datetime.datetime:
+    """Horário do banco (referência para filtrar matches gravados pela execução)"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT NOW()")
+            return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def seed_units(days: List[datetime.date], ufs: List[str],
+               modalidades: Optional[List[int]] = None) -> int:
+    """Cria a primeira página de cada dia × UF × modalidade (as demais surgem do totalPaginas)"""
+    rows = [
+        (day, uf, modalidade, 1)
+        for day in days for modalidade in (modalidades or PNCP_MODALIDADES) for uf in ufs
+    ]
+    if not rows:
+        return 0
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            execute_values(cursor, """
+                INSERT INTO pncp_ingestion_units (data_publicacao, uf, modalidade, pagina)
+                VALUES %s
+                ON CONFLICT (data_publicacao, uf, modalidade, pagina) DO NOTHING
+            """, rows, page_size=500)
+            inserted = cursor.rowcount
+            conn.commit()
+            return inserted
+    finally:
+        conn.close()
+
+
+def reset_failed_units(start_date: datetime.date, end_date: datetime.date) -> int:
+    """Devolve para a fila as unidades que esgotaram as tentativas numa execução anterior"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE pncp_ingestion_units
+                SET status = 'pending', attempts = 0, worker = NULL
+                WHERE status = 'failed' AND data_publicacao BETWEEN %s AND %s
+            """, (start_date, end_date))
+            reset = cursor.rowcount
+            conn.commit()
+            return reset
+    finally:
+        conn.close()
+
+
+def reopen_units(start_date: datetime.date, end_date: datetime.date) -> int:
+    """
+    Devolve para a fila todas as unidades do intervalo, inclusive as concluídas.
+    Usado pela busca diária: o dia corrente continua recebendo publicações.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE pncp_ingestion_units
+                SET status = 'pending', attempts = 0, worker = NULL
+                WHERE status IN ('done', 'failed') AND data_publicacao BETWEEN %s AND %s
+            """, (start_date, end_date))
+            reopened = cursor.rowcount
+            conn.commit()
+            return reopened
+    finally:
+        conn.close()
+
+
+def claim_unit(start_date: datetime.date, end_date: datetime.date, worker: str,
+               ufs: Optional[List[str]] = None,
+               modalidades: Optional[List[int]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Reserva a próxima unidade pendente (ou abandonada) do intervalo.
+    Unidades abandonadas em 'running' que já esgotaram as tentativas ficam como failed.
+    """
+    uf_filter = "AND uf = ANY(%s)" if ufs else ""
+    modalidade_filter = "AND modalidade = ANY(%s)" if modalidades else ""
+    range_params = [start_date, end_date] + ([ufs] if ufs else []) + ([modalidades] if modalidades else [])
+    params = [worker] + range_params + [INGESTION_UNIT_MAX_ATTEMPTS, INGESTION_UNIT_STALE_SECONDS]
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute(f"""
+                UPDATE pncp_ingestion_units
+                SET status = 'failed', worker = NULL,
+                    last_error = 'Abandonada em execução após ' || attempts || ' tentativas'
+                WHERE data_publicacao BETWEEN %s AND %s {uf_filter} {modalidade_filter}
+                  AND status = 'running'
+                  AND attempts >= %s
+                  AND started_at < NOW() - make_interval(secs => %s)
+            """, range_params + [INGESTION_UNIT_MAX_ATTEMPTS, INGESTION_UNIT_STALE_SECONDS])
+            if cursor.rowcount:
+                print(f"❌ {cursor.rowcount} unidades abandonadas sem tentativas restantes marcadas como failed")
+            
+            cursor.execute(f"""
+                UPDATE pncp_ingestion_units u
+                SET status = 'running', worker = %s, attempts = u.attempts + 1,
+                    started_at = NOW(), last_error = NULL
+                WHERE u.id = (
+                    SELECT id FROM pncp_ingestion_units
+                    WHERE data_publicacao BETWEEN %s AND %s {uf_filter} {modalidade_filter}
+                      AND attempts < %s
+                      AND (status = 'pending'
+                           OR (status = 'running' AND started_at < NOW() - make_interval(secs => %s)))
+                    ORDER BY data_publicacao, pagina, uf, modalidade
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING u.id, u.data_publicacao, u.uf, u.modalidade, u.pagina, u.attempts
+            """, params)
+            row = cursor.fetchone()
+            conn.commit()
+            return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def complete_unit(unit: Dict[str, Any], bids_found: int, bids_new: int, matches_saved: int,
+                  duration_ms: int, next_pages: List[int],
+                  total_registros: Optional[int] = None, total_paginas: Optional[int] = None):
+    """
+    Marca a unidade como concluída e cria as unidades das páginas seguintes.
+    Na primeira página, com totalPaginas conhecido, todas as demais páginas entram
+    na fila de uma vez e são reservadas em paralelo pelas outras threads.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE pncp_ingestion_units
+                SET status = 'done', bids_found = %s, bids_new = %s, matches_saved = %s,
+                    duration_ms = %s, completed_at = NOW(),
+                    total_registros = %s, total_paginas = %s
+                WHERE id = %s
+            """, (bids_found, bids_new, matches_saved, duration_ms,
+                  total_registros, total_paginas, unit['id']))
+            if next_pages:
+                execute_values(cursor, """
+                    INSERT INTO pncp_ingestion_units (data_publicacao, uf, modalidade, pagina)
+                    VALUES %s
+                    ON CONFLICT (data_publicacao, uf, modalidade, pagina) DO NOTHING
+                """, [(unit['data_publicacao'], unit['uf'], unit['modalidade'], page) for page in next_pages],
+                    page_size=500)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def fail_unit(unit: Dict[str, Any], error: str):
+    """Registra a falha; a unidade volta para a fila até esgotar as tentativas"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE pncp_ingestion_units
+                SET status = CASE WHEN attempts < %s THEN 'pending' ELSE 'failed' END,
+                    worker = NULL, last_error = %s, completed_at = NULL
+                WHERE id = %s
+            """, (INGESTION_UNIT_MAX_ATTEMPTS, error[:4000], unit['id']))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def get_backfill_progress(start_date: datetime.date, end_date: datetime.date) -> Dict[str, Any]:
+    """Unidades do intervalo por status, com licitações e matches acumulados"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute("""
+                SELECT status, COUNT(*) AS unidades, COALESCE(SUM(bids_found), 0) AS encontradas,
+                       COALESCE(SUM(bids_new), 0) AS novas, COALESCE(SUM(matches_saved), 0) AS matches,
+                       AVG(duration_ms) AS avg_duration_ms
+                FROM pncp_ingestion_units
+                WHERE data_publicacao BETWEEN %s AND %s
+                GROUP BY status
+            """, (start_date, end_date))
+            por_status = {
+                row['status']: {
+                    'unidades': row['unidades'],
+                    'licitacoes_encontradas': int(row['encontradas']),
+                    'licitacoes_novas': int(row['novas']),
+                    'matches': int(row['matches']),
+                    'avg_duration_ms': round(float(row['avg_duration_ms']), 1) if row['avg_duration_ms'] is not None else None
+                }
+                for row in cursor.fetchall()
+            }
+
+            # Progresso e vazão por modalidade (janela entre a primeira e a última unidade concluída)
+            cursor.execute("""
+                SELECT modalidade, COUNT(*) AS unidades,
+                       COUNT(*) FILTER (WHERE status = 'done') AS concluidas,
+                       COUNT(*) FILTER (WHERE status = 'failed') AS falhas,
+                       COALESCE(SUM(bids_found), 0) AS encontradas,
+                       COALESCE(SUM(bids_new), 0) AS novas, COALESCE(SUM(matches_saved), 0) AS matches,
+                       COALESCE(SUM(total_registros) FILTER (WHERE pagina = 1), 0) AS esperadas,
+                       AVG(duration_ms) AS avg_duration_ms,
+                       EXTRACT(EPOCH FROM MAX(completed_at) - MIN(started_at)) AS janela_segundos
+                FROM pncp_ingestion_units
+                WHERE data_publicacao BETWEEN %s AND %s
+                GROUP BY modalidade
+                ORDER BY modalidade
+            """, (start_date, end_date))
+            por_modalidade = {}
+            for row in cursor.fetchall():
+                janela = float(row['janela_segundos'] or 0)
+                por_modalidade[str(row['modalidade'])] = {
+                    'nome': MODALIDADES_PNCP.get(row['modalidade'], str(row['modalidade'])),
+                    'unidades': row['unidades'],
+                    'unidades_concluidas': row['concluidas'],
+                    'unidades_com_falha': row['falhas'],
+                    'licitacoes_esperadas': int(row['esperadas']),
+                    'licitacoes_encontradas': int(row['encontradas']),
+                    'licitacoes_novas': int(row['novas']),
+                    'matches': int(row['matches']),
+                    'avg_duration_ms': round(float(row['avg_duration_ms']), 1) if row['avg_duration_ms'] is not None else None,
+                    'licitacoes_por_segundo': round(int(row['encontradas']) / janela, 2) if janela > 0 else None
+                }
+
+            cursor.execute("""
+                SELECT data_publicacao, uf, modalidade, pagina, attempts, last_error
+                FROM pncp_ingestion_units
+                WHERE data_publicacao BETWEEN %s AND %s AND status = 'failed'
+                ORDER BY data_publicacao, uf, modalidade, pagina
+                LIMIT 50
+            """, (start_date, end_date))
+            falhas = [
+                {**dict(row), 'data_publicacao': row['data_publicacao'].isoformat()}
+                for row in cursor.fetchall()
+            ]
+
+            total = sum(s['unidades'] for s in por_status.values())
+            concluidas = por_status.get('done', {}).get('unidades', 0)
+            return {
+                'data_inicio': start_date.isoformat(),
+                'data_fim': end_date.isoformat(),
+                'unidades_total': total,
+                'unidades_concluidas': concluidas,
+                'completo': total > 0 and concluidas == total,
+                'por_status': por_status,
+                'por_modalidade': por_modalidade,
+                'falhas': falhas
+            }
+    finally:
+        conn.close()
+
+
+def get_sync_state(sync_name: str) -> Optional[Dict[str, Any]]:
+    """Estado da sincronização incremental (marca d'água e última execução)"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute("""
+                SELECT sync_name, watermark, last_run_at, last_stats, updated_at
+                FROM pncp_sync_state WHERE sync_name = %s
+            """, (sync_name,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def save_sync_state(sync_name: str, watermark: Optional[datetime.datetime], stats: Dict[str, Any]):
+    """Avança a marca d'água (nunca retrocede) e registra as estatísticas da execução"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO pncp_sync_state (sync_name, watermark, last_run_at, last_stats, updated_at)
+                VALUES (%s, %s, NOW(), %s::jsonb, NOW())
+                ON CONFLICT (sync_name) DO UPDATE SET
+                    watermark = GREATEST(pncp_sync_state.watermark, EXCLUDED.watermark),
+                    last_run_at = NOW(),
+                    last_stats = EXCLUDED.last_stats,
+                    updated_at = NOW()
+            """, (sync_name, watermark, json.dumps(stats, default=str)))
+            conn.commit()
+    finally:
+        conn.close()
@@ -5,8 +5,12 @@ Busca licitações do dia atual em todos os estados brasileiros e faz matching s
 """
 
 import os
+import socket
 import datetime
-from typing import Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Any, List, Optional, Callable, Iterable, Iterator, Tuple
 import time
 from psycopg2.extras import DictCursor
 
@@ -14,23 +18,51 @@ from .vectorizers import (
     BaseTextVectorizer, OpenAITextVectorizer, VoyageAITextVectorizer,
     HybridTextVectorizer, MockTextVectorizer, calculate_enhanced_similarity
 )
+from .scoring import CompanyMatrix, MatchSelector, MATCH_TOP_K_PER_BID, MATCH_TOP_K_PER_COMPANY
+from .score_matrix import (
+    ScoreMatrixRecorder, SCORE_MATRIX_ENABLED, ITEMS_NOT_EVALUATED, ITEMS_ABSENT, ITEMS_SCORED
+)
 from .pncp_api import (
     get_db_connection, get_all_companies_from_db, get_processed_bid_ids,
     fetch_bids_from_pncp, fetch_bid_items_from_pncp, save_bid_to_db,
-    save_bid_items_to_db, save_match_to_db, update_bid_status,
-    get_existing_bids_from_db, get_bid_items_from_db, clear_existing_matches,
-    ESTADOS_BRASIL, PNCP_MAX_PAGES
+    save_bid_items_to_db, save_matches_to_db, update_bid_status,
+    iter_existing_bids_from_db, count_existing_bids_from_db, get_items_for_bids_from_db, clear_existing_matches,
+    delete_matches_by_pairs, get_match_scores_from_db, trim_run_matches_per_company,
+    fetch_bids_page, fetch_updated_bids_page, upsert_changed_bids, bid_updated_at,
+    fetch_all_pages, pncp_total_pages, pncp_rate_limiter, ESTADOS_BRASIL, MODALIDADES_PNCP,
+    PNCP_MODALIDADES, PNCP_PAGE_SIZE
+)
+from .archive import pncp_archive
+from .summaries import refresh_summaries
+from .checkpoints import (
+    load_checkpoint, start_checkpoint, save_checkpoint, complete_checkpoint,
+    mark_resumed, MATCHING_CHECKPOINT_EVERY
+)
+from .ingestion import (
+    date_range, get_db_now, seed_units, reset_failed_units, reopen_units, claim_unit,
+    complete_unit, fail_unit, get_backfill_progress, get_sync_state, save_sync_state,
+    INGESTION_CONCURRENCY, PNCP_SYNC_LOOKBACK_DAYS
+)
+from .sharding import (
+    create_run, get_active_run, load_company_embeddings, claim_shard, heartbeat_shard,
+    complete_shard, release_shard, get_shard_results, complete_run, REEVALUATE_SHARDS,
+    heartbeat_thread, claim_stale_finalization, heartbeat_run, fail_run, get_run_started_at
 )
 
 # --- Configurações do Matching ---
 SIMILARITY_THRESHOLD_PHASE1 = float(os.getenv('SIMILARITY_THRESHOLD_PHASE1', '0.65'))
 SIMILARITY_THRESHOLD_PHASE2 = float(os.getenv('SIMILARITY_THRESHOLD_PHASE2', '0.70'))
+MATCHING_BID_PAUSE_SECONDS = float(os.getenv('MATCHING_BID_PAUSE_SECONDS', '0.2'))  # Pausa após cada licitação
+MATCHING_ITEMS_BATCH = int(os.getenv('MATCHING_ITEMS_BATCH', '200'))  # Licitações por consulta de itens na reavaliação
 
 
-def process_daily_bids(vectorizer: BaseTextVectorizer):
+def process_daily_bids(vectorizer: BaseTextVectorizer, resume: bool = True) -> Optional[Dict[str, Any]]:
     """
     Função principal que busca licitações do PNCP, faz o matching e salva resultados.
     VERSÃO APRIMORADA com melhor análise semântica.
+    Usa o mesmo escalonador do backfill: as unidades UF × modalidade × página do dia
+    (PNCP_MODALIDADES) são processadas em paralelo. Uma execução interrompida retoma
+    das unidades pendentes; uma nova execução no mesmo dia reabre as unidades do dia.
     """
     print("🚀 Iniciando busca de licitações reais do PNCP...")
     print(f"🔧 Vectorizador: {type(vectorizer).__name__}")
@@ -38,389 +70,910 @@ def process_daily_bids(vectorizer: BaseTextVectorizer):
     
     # Data de hoje
     today = datetime.date.today()
-    date_str = today.strftime("%Y%m%d")
+    job_name = f"daily:{today.strftime('%Y%m%d')}"
     
     print(f"📅 Buscando licitações do dia: {today.strftime('%d/%m/%Y')}")
     
-    # 1. Carregar empresas e vetorizar
-    print("\n🏢 Carregando empresas do banco...")
-    companies = get_all_companies_from_db()
-    print(f"   ✅ {len(companies)} empresas carregadas")
+    checkpoint = load_checkpoint(job_name) if resume else None
+    if checkpoint:
+        mark_resumed(job_name)
+        print("♻️  Retomando das unidades pendentes do dia")
+    else:
+        reopened = reopen_units(today, today)
+        if reopened:
+            print(f"🔁 {reopened} unidades do dia reabertas")
+        start_checkpoint(job_name, {'data': today.isoformat()}, _statistics_snapshot(_new_statistics(), 0, 0))
     
-    if not companies:
-        print("❌ Nenhuma empresa encontrada no banco. Cadastre empresas primeiro.")
-        return
+    result = backfill_bids(vectorizer, today, today, run_type="daily")
+    if result is None:
+        return None
     
-    # Vetorizar descrições das empresas
-    print("🔢 Vetorizando descrições das empresas...")
-    company_texts = [comp["descricao_servicos_produtos"] for comp in companies]
-    company_embeddings = vectorizer.batch_vectorize(company_texts)
+    complete_checkpoint(job_name, {
+        **_statistics_snapshot(result['estatisticas'], result['matches_encontrados'], result['licitacoes_novas']),
+        'por_modalidade': result['por_modalidade']
+    })
     
-    for i, company in enumerate(companies):
-        company["embedding"] = company_embeddings[i] if i < len(company_embeddings) else []
+    if result['licitacoes_novas'] == 0:
+        print("ℹ️  Nenhuma licitação nova encontrada para hoje.")
+    return result
+
+
+def _process_new_bid(bid: Dict[str, Any], vectorizer: BaseTextVectorizer, company_matrix: CompanyMatrix,
+                     selector: MatchSelector, recorder: Optional[ScoreMatrixRecorder],
+                     estatisticas: Dict[str, int], pending_status: Optional[List[str]] = None) -> int:
+    """
+    Salva uma licitação nova com seus itens e executa o matching. Retorna matches gravados.
+    Com limite por empresa os matches ficam retidos no seletor: o pncp_id vai para
+    pending_status e o chamador marca a licitação como processada após o flush.
+    """
+    pncp_id = bid["numeroControlePNCP"]
+    objeto_compra = bid.get("objetoCompra", "")
+    
+    print(f"\n🔍 Processando: {pncp_id}")
+    print(f"   📝 Objeto: {objeto_compra[:100]}...")
+    
+    if not objeto_compra:
+        print("   ⚠️  Objeto da compra vazio, pulando...")
+        return 0
+    
+    # Salvar licitação no banco
+    licitacao_id = save_bid_to_db(bid)
+    
+    # Buscar itens da licitação
+    items = fetch_bid_items_from_pncp(bid)
+    if items:
+        save_bid_items_to_db(licitacao_id, items)
+    
+    # Vetorizar objeto da compra
+    bid_embedding = vectorizer.vectorize(objeto_compra)
     
-    # 2. Buscar licitações do PNCP
-    print(f"\n🌐 Buscando licitações do PNCP para todos os estados...")
+    if not bid_embedding:
+        print("   ❌ Erro ao vetorizar objeto da compra")
+        estatisticas['vetorizacao_falhou'] += 1
+        return 0
+    
+    estatisticas['total_processadas'] += 1
+    
+    bid_matches = _match_bid(
+        vectorizer, company_matrix, bid_embedding, objeto_compra,
+        lambda: items, estatisticas,
+        licitacao_id=licitacao_id, recorder=recorder
+    )
+    selector.add(licitacao_id, bid_matches)
+    
+    # Sem limite por empresa, os matches da licitação são gravados antes de marcá-la como processada
+    saved = 0
+    if not selector.buffers_matches:
+        saved = _flush_matches(selector, estatisticas)
+    
+    # Atualizar status da licitação
+    if selector.buffers_matches and pending_status is not None:
+        pending_status.append(pncp_id)
+    else:
+        update_bid_status(pncp_id, "processada")
+    
+    # Pausa entre processamentos
+    if MATCHING_BID_PAUSE_SECONDS > 0:
+        time.sleep(MATCHING_BID_PAUSE_SECONDS)
+    return saved
+
+
+def backfill_bids(vectorizer: BaseTextVectorizer, start_date: datetime.date, end_date: datetime.date,
+                  ufs: Optional[List[str]] = None, concurrency: int = INGESTION_CONCURRENCY,
+                  modalidades: Optional[List[int]] = None, run_type: str = "backfill") -> Optional[Dict[str, Any]]:
+    """
+    Ingestão de um intervalo de datas (backfill e busca diária).
+    Divide o intervalo em unidades dia × UF × modalidade × página (tabela
+    pncp_ingestion_units) e as processa em paralelo sob o orçamento de requisições
+    do PNCP. Unidades concluídas são puladas ao executar novamente o mesmo intervalo.
+    """
+    ufs = ufs or ESTADOS_BRASIL
+    modalidades = modalidades or PNCP_MODALIDADES
+    days = date_range(start_date, end_date)
+    
+    print("=" * 80)
+    print(f"⏪ {run_type.upper()} PNCP: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}")
+    print("=" * 80)
+    print(f"🔧 Vectorizador: {type(vectorizer).__name__}")
+    print(f"🧵 {concurrency} threads | {len(days)} dias × {len(ufs)} UFs × {len(modalidades)} modalidades "
+          f"({', '.join(MODALIDADES_PNCP.get(m, str(m)) for m in modalidades)})")
+    
+    reset = reset_failed_units(start_date, end_date)
+    seeded = seed_units(days, ufs, modalidades)
+    print(f"📦 {seeded} unidades novas criadas" + (f", {reset} unidades com falha reabertas" if reset else ""))
+    
+    company_matrix = _load_company_matrix(vectorizer)
+    if company_matrix is None:
+        return None
+    
+    started_at = get_db_now()
+    started = time.perf_counter()
     processed_bid_ids = get_processed_bid_ids()
-    new_bids = []
-    total_found = 0
+    processed_lock = threading.Lock()
+    worker_base = f"{socket.gethostname()}:{os.getpid()}"
     
-    for uf in ESTADOS_BRASIL:
-        page = 1
-        uf_bids = 0
+    def worker_loop(worker_index: int) -> Dict[str, Any]:
+        # Cada thread tem seu seletor (top-K por licitação), estatísticas e matriz de scores;
+        # o limite por empresa (por execução) é aplicado ao final sobre os matches gravados no backfill
+        estatisticas = _new_statistics()
+        selector = MatchSelector(top_k_per_company=0)
+        recorder = _new_recorder(run_type, vectorizer)
+        matches_encontrados = 0
+        total_found = 0
+        por_modalidade: Dict[int, Dict[str, int]] = {}
         
-        while page <= PNCP_MAX_PAGES:
-            bids, has_more_pages = fetch_bids_from_pncp(date_str, date_str, uf, page)
-            
-            if not bids:
+        while True:
+            unit = claim_unit(start_date, end_date, f"{worker_base}:{worker_index}", ufs, modalidades)
+            if not unit:
                 break
             
-            for bid in bids:
-                pncp_id = bid["numeroControlePNCP"]
-                if pncp_id not in processed_bid_ids:
-                    new_bids.append(bid)
-                    uf_bids += 1
-                    total_found += 1
+            date_str = unit['data_publicacao'].strftime("%Y%m%d")
+            unit_started = time.perf_counter()
+            new_ids = []
+            try:
+                print(f"🔍 [{unit['data_publicacao'].strftime('%d/%m')}] {unit['uf']}, "
+                      f"modalidade {unit['modalidade']}, página {unit['pagina']}...")
+                data = fetch_bids_page(date_str, date_str, unit['uf'], unit['pagina'], unit['modalidade'])
+                bids = data.get("data", [])
+                
+                with processed_lock:
+                    new_bids = [bid for bid in bids if bid["numeroControlePNCP"] not in processed_bid_ids]
+                    new_ids = [bid["numeroControlePNCP"] for bid in new_bids]
+                    processed_bid_ids.update(new_ids)
+                
+                unit_matches = 0
+                for bid in new_bids:
+                    unit_matches += _process_new_bid(
+                        bid, vectorizer, company_matrix, selector, recorder, estatisticas
+                    )
+                unit_matches += _flush_matches(selector, estatisticas)
+            except Exception as e:
+                print(f"❌ Erro na unidade {unit['uf']}/{date_str}/m{unit['modalidade']}/p{unit['pagina']}: {e}")
+                # Licitações da unidade voltam a ser elegíveis na nova tentativa
+                with processed_lock:
+                    processed_bid_ids.difference_update(new_ids)
+                fail_unit(unit, f"{type(e).__name__}: {e}")
+                continue
             
-            if not has_more_pages:
-                break
+            # A primeira página informa o total: as demais viram unidades de uma vez
+            total_pages = pncp_total_pages(data)
+            if total_pages is not None:
+                next_pages = list(range(2, total_pages + 1)) if unit['pagina'] == 1 else []
+            else:
+                next_pages = [unit['pagina'] + 1] if len(bids) == PNCP_PAGE_SIZE else []
+            
+            unit_duration_ms = int((time.perf_counter() - unit_started) * 1000)
+            complete_unit(
+                unit, len(bids), len(new_bids), unit_matches, unit_duration_ms,
+                next_pages=next_pages, total_registros=data.get("totalRegistros"), total_paginas=total_pages
+            )
+            matches_encontrados += unit_matches
+            total_found += len(new_bids)
+            refresh_summaries()  # Dashboard acompanha execuções longas (limitado por intervalo)
             
-            page += 1
-            time.sleep(0.5)  # Pausa para não sobrecarregar a API
+            counters = por_modalidade.setdefault(unit['modalidade'], {
+                'unidades': 0, 'licitacoes_encontradas': 0, 'licitacoes_novas': 0, 'matches': 0, 'duracao_ms': 0
+            })
+            counters['unidades'] += 1
+            counters['licitacoes_encontradas'] += len(bids)
+            counters['licitacoes_novas'] += len(new_bids)
+            counters['matches'] += unit_matches
+            counters['duracao_ms'] += unit_duration_ms
         
-        if uf_bids > 0:
-            print(f"   📍 {uf}: {uf_bids} novas licitações")
+        estatisticas['matches_descartados_top_k'] += selector.discarded
+        return {
+            'estatisticas': estatisticas,
+            'matches_encontrados': matches_encontrados,
+            'total_found': total_found,
+            'por_modalidade': por_modalidade,
+            'recorder': recorder
+        }
     
-    print(f"\n🎯 Total de novas licitações encontradas: {total_found}")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix=run_type) as executor:
+        results = list(executor.map(worker_loop, range(max(1, concurrency))))
     
-    if not new_bids:
-        print("ℹ️  Nenhuma licitação nova encontrada para hoje.")
-        return
-    
-    # 3. Processar licitações para matching
-    print(f"\n⚡ Iniciando processo de matching APRIMORADO...")
+    # Consolidar resultados das threads
+    estatisticas = _new_statistics()
     matches_encontrados = 0
-    estatisticas = {
-        'total_processadas': 0,
-        'com_matches': 0,
-        'sem_matches': 0,
-        'matches_fase1_apenas': 0,
-        'matches_fase2': 0
+    total_found = 0
+    por_modalidade: Dict[int, Dict[str, Any]] = {}
+    recorder = _new_recorder(run_type, vectorizer)
+    for result in results:
+        for key, value in result['estatisticas'].items():
+            estatisticas[key] += value
+        matches_encontrados += result['matches_encontrados']
+        total_found += result['total_found']
+        for modalidade, counters in result['por_modalidade'].items():
+            merged = por_modalidade.setdefault(modalidade, dict.fromkeys(counters, 0))
+            for key, value in counters.items():
+                merged[key] += value
+        if recorder is not None and result['recorder'] is not None and len(result['recorder']):
+            recorder.add_payload(result['recorder'].to_payload())
+    
+    pncp_archive.flush_index()
+    pncp_archive.prune()
+    removed = trim_run_matches_per_company(MATCH_TOP_K_PER_COMPANY, run_started_at=started_at)
+    estatisticas['matches_descartados_top_k'] += removed
+    matches_encontrados -= removed
+    _save_score_matrix(recorder)
+    refresh_summaries(force=True)
+    
+    duration = time.perf_counter() - started
+    progress = get_backfill_progress(start_date, end_date)
+    print(f"\n🎯 {run_type.capitalize()}: {total_found} novas licitações em {duration:.1f}s "
+          f"({pncp_rate_limiter.requests} requisições, {pncp_rate_limiter.throttled} respostas 429/503)")
+    print(f"📦 Unidades: {progress['unidades_concluidas']}/{progress['unidades_total']} concluídas")
+    
+    # Vazão por modalidade: licitações recebidas por segundo de trabalho nas unidades da modalidade
+    resumo_modalidades = {}
+    for modalidade, counters in sorted(por_modalidade.items()):
+        busy_seconds = counters['duracao_ms'] / 1000
+        resumo_modalidades[str(modalidade)] = {
+            **counters,
+            'nome': MODALIDADES_PNCP.get(modalidade, str(modalidade)),
+            'licitacoes_por_segundo': round(counters['licitacoes_encontradas'] / busy_seconds, 2) if busy_seconds else None
+        }
+        print(f"   🏷️  {resumo_modalidades[str(modalidade)]['nome']}: {counters['unidades']} unidades, "
+              f"{counters['licitacoes_encontradas']} recebidas, {counters['licitacoes_novas']} novas, "
+              f"{counters['matches']} matches")
+    _print_final_report(matches_encontrados, estatisticas)
+    
+    return {
+        'matches_encontrados': matches_encontrados,
+        'licitacoes_novas': total_found,
+        'estatisticas': estatisticas,
+        'duracao_segundos': round(duration, 1),
+        'por_modalidade': resumo_modalidades,
+        'unidades': progress
+    }
+
+
+PNCP_SYNC_NAME = 'contratacoes_atualizacao'
+
+
+def sync_updated_bids(vectorizer: Optional[BaseTextVectorizer] = None) -> Dict[str, Any]:
+    """
+    Sincronização incremental pela consulta de contratações por data de atualização.
+    Busca (em todo o país) o que mudou desde a marca d'água persistida, grava em lote
+    apenas as linhas alteradas (ON CONFLICT com IS DISTINCT FROM) e avança a marca
+    d'água para a maior dataAtualizacao vista. Contratações que ainda não existiam
+    passam pelo fluxo normal de itens + matching quando um vectorizador é informado.
+    """
+    state = get_sync_state(PNCP_SYNC_NAME)
+    watermark = state['watermark'] if state else None
+    today = datetime.date.today()
+    start_date = watermark.date() if watermark else today - datetime.timedelta(days=PNCP_SYNC_LOOKBACK_DAYS)
+    start_str, end_str = start_date.strftime("%Y%m%d"), today.strftime("%Y%m%d")
+    
+    print("=" * 80)
+    print(f"🔄 SINCRONIZAÇÃO INCREMENTAL PNCP: {start_date.strftime('%d/%m/%Y')} a {today.strftime('%d/%m/%Y')}")
+    print(f"💧 Marca d'água: {watermark.isoformat() if watermark else 'nenhuma (primeira execução)'}")
+    print("=" * 80)
+    
+    started = time.perf_counter()
+    requests_before = pncp_rate_limiter.requests
+    stats = {
+        'paginas': 0, 'recebidas': 0, 'alteradas': 0,
+        'inseridas': 0, 'atualizadas': 0, 'inalteradas': 0
     }
+    new_bids: Dict[str, Dict[str, Any]] = {}
+    max_seen = watermark
     
-    for i, bid in enumerate(new_bids, 1):
-        pncp_id = bid["numeroControlePNCP"]
-        objeto_compra = bid.get("objetoCompra", "")
-        
-        print(f"\n[{i}/{len(new_bids)}] 🔍 Processando: {pncp_id}")
-        print(f"   📝 Objeto: {objeto_compra[:100]}...")
-        
-        if not objeto_compra:
-            print("   ⚠️  Objeto da compra vazio, pulando...")
-            continue
-        
-        # Salvar licitação no banco
-        licitacao_id = save_bid_to_db(bid)
-        
-        # Buscar itens da licitação
-        items = fetch_bid_items_from_pncp(bid)
-        if items:
-            save_bid_items_to_db(licitacao_id, items)
-        
-        # Vetorizar objeto da compra
-        bid_embedding = vectorizer.vectorize(objeto_compra)
-        
-        if not bid_embedding:
-            print("   ❌ Erro ao vetorizar objeto da compra")
-            continue
-        
-        estatisticas['total_processadas'] += 1
-        
-        # FASE 1: Matching do objeto completo
-        potential_matches = []
-        print("   🔍 FASE 1 - Análise semântica do objeto da compra:")
-        
-        for company in companies:
-            if not company.get("embedding"):
-                print(f"      ⚠️  {company['nome']}: Sem embedding, pulando...")
+    for modalidade in PNCP_MODALIDADES:
+        pages = fetch_all_pages(
+            lambda page: fetch_updated_bids_page(start_str, end_str, page, modalidade),
+            INGESTION_CONCURRENCY
+        )
+        for page, data in pages:
+            records = data.get("data", [])
+            if not records:
                 continue
+            stats['paginas'] += 1
+            stats['recebidas'] += len(records)
             
-            # Usar similaridade aprimorada
-            score, justificativa = calculate_enhanced_similarity(
-                bid_embedding, 
-                company["embedding"], 
-                objeto_compra, 
-                company["descricao_servicos_produtos"]
-            )
-            
-            print(f"      🏢 {company['nome']}: Score = {score:.3f} (threshold: {SIMILARITY_THRESHOLD_PHASE1})")
-            print(f"         💡 {justificativa}")
+            # Mesmo timestamp da marca d'água é reprocessado: a escrita é idempotente
+            changed = []
+            for bid in records:
+                updated_at = bid_updated_at(bid)
+                if watermark is None or updated_at is None or updated_at >= watermark:
+                    changed.append(bid)
+                if updated_at and (max_seen is None or updated_at > max_seen):
+                    max_seen = updated_at
             
-            if score >= SIMILARITY_THRESHOLD_PHASE1:
-                potential_matches.append((company, score, justificativa))
-                print(f"         ✅ POTENCIAL MATCH!")
-        
-        if potential_matches:
-            print(f"   🎯 {len(potential_matches)} potenciais matches encontrados!")
-            estatisticas['com_matches'] += 1
+            if changed:
+                result = upsert_changed_bids(changed)
+                stats['alteradas'] += len(changed)
+                for key in ('inseridas', 'atualizadas', 'inalteradas'):
+                    stats[key] += result[key]
+                novas = set(result['novas_ids'])
+                new_bids.update({bid["numeroControlePNCP"]: bid for bid in changed if bid.get("numeroControlePNCP") in novas})
             
-            # FASE 2: Refinamento com itens (se disponível)
-            if items:
-                print(f"   📋 {len(items)} itens encontrados. Iniciando FASE 2...")
-                item_descriptions = [item.get("descricao", "") for item in items]
-                item_embeddings = vectorizer.batch_vectorize(item_descriptions)
-                
-                for company, score_fase1, justificativa_fase1 in potential_matches:
-                    item_matches = 0
-                    total_item_score = 0.0
-                    best_item_matches = []
-                    
-                    print(f"\n      🏢 Analisando {company['nome']} (Score Fase 1: {score_fase1:.3f})")
-                    
-                    for idx, item_embedding in enumerate(item_embeddings):
-                        if not item_embedding:
-                            continue
-                        
-                        item_score, item_justificativa = calculate_enhanced_similarity(
-                            item_embedding, 
-                            company["embedding"],
-                            item_descriptions[idx],
-                            company["descricao_servicos_produtos"]
-                        )
-                        
-                        item_desc = item_descriptions[idx][:50] + "..." if len(item_descriptions[idx]) > 50 else item_descriptions[idx]
-                        
-                        print(f"         📋 Item {idx+1}: '{item_desc}'")
-                        print(f"             📊 Score: {item_score:.3f} (threshold: {SIMILARITY_THRESHOLD_PHASE2})")
-                        print(f"             💡 {item_justificativa}")
-                        
-                        if item_score >= SIMILARITY_THRESHOLD_PHASE2:
-                            item_matches += 1
-                            total_item_score += item_score
-                            best_item_matches.append((item_desc, item_score))
-                            print(f"             ✅ MATCH no item!")
-                        else:
-                            print(f"             ❌ Não passou no threshold")
-                    
-                    if item_matches > 0:
-                        final_score = (score_fase1 + (total_item_score / item_matches)) / 2
-                        
-                        # Justificativa combinada
-                        combined_justificativa = f"Fase 1: {justificativa_fase1} | Fase 2: {item_matches} itens matched (média: {total_item_score/item_matches:.3f})"
-                        
-                        save_match_to_db(pncp_id, company["id"], final_score, "objeto_e_itens", combined_justificativa)
-                        matches_encontrados += 1
-                        estatisticas['matches_fase2'] += 1
-                        
-                        print(f"\n      🎯 MATCH FINAL! {company['nome']} - Score: {final_score:.3f}")
-                        print(f"         📋 Melhores itens: {', '.join([f'{desc}({score:.2f})' for desc, score in best_item_matches[:2]])}")
-                    else:
-                        print(f"\n      ❌ {company['nome']}: Nenhum item passou no threshold da Fase 2")
-            else:
-                print("   📋 Sem itens - usando apenas Fase 1")
-                # Sem itens, usar apenas Fase 1
-                for company, score, justificativa in potential_matches:
-                    save_match_to_db(pncp_id, company["id"], score, "objeto_completo", 
-                                    f"Apenas Fase 1: {justificativa}")
-                    matches_encontrados += 1
-                    estatisticas['matches_fase1_apenas'] += 1
-                    print(f"      🎯 MATCH! {company['nome']} - Score: {score:.3f}")
-        else:
-            print("   ❌ Nenhum potencial match na Fase 1")
-            estatisticas['sem_matches'] += 1
-        
-        # Atualizar status da licitação
-        update_bid_status(pncp_id, "processada")
-        
-        # Pausa entre processamentos
-        time.sleep(0.2)
+            print(f"   📄 {MODALIDADES_PNCP.get(modalidade, modalidade)} - página {page}/{pncp_total_pages(data) or '?'}: "
+                  f"{len(records)} recebidas, {len(changed)} alteradas")
     
-    # Relatório final
-    _print_final_report(matches_encontrados, estatisticas)
+    # Contratações novas: itens + matching (sem vectorizador ficam como 'coletada')
+    matches_encontrados = 0
+    estatisticas = _new_statistics()
+    if vectorizer is not None and new_bids:
+        company_matrix = _load_company_matrix(vectorizer)
+        if company_matrix is not None:
+            selector = MatchSelector()
+            recorder = _new_recorder("sync", vectorizer)
+            pending_status: List[str] = []
+            for bid in new_bids.values():
+                matches_encontrados += _process_new_bid(
+                    bid, vectorizer, company_matrix, selector, recorder, estatisticas, pending_status
+                )
+            matches_encontrados += _flush_matches(selector, estatisticas)
+            # Só depois do flush os matches retidos pelo limite por empresa estão gravados
+            for pncp_id in pending_status:
+                update_bid_status(pncp_id, "processada")
+            estatisticas['matches_descartados_top_k'] += selector.discarded
+            _save_score_matrix(recorder)
+    
+    pncp_archive.flush_index()
+    pncp_archive.prune()
+    refresh_summaries(force=True)
+    stats['requisicoes_pncp'] = pncp_rate_limiter.requests - requests_before
+    stats['matches_encontrados'] = matches_encontrados
+    stats['duracao_segundos'] = round(time.perf_counter() - started, 1)
+    save_sync_state(PNCP_SYNC_NAME, max_seen, stats)
+    
+    print(f"\n🎯 Sincronização: {stats['alteradas']} alteradas de {stats['recebidas']} recebidas "
+          f"({stats['inseridas']} novas, {stats['atualizadas']} atualizadas, {stats['inalteradas']} sem mudança) "
+          f"em {stats['requisicoes_pncp']} requisições, {stats['duracao_segundos']}s")
+    
+    return {
+        **stats,
+        'estatisticas': estatisticas,
+        'watermark_anterior': watermark.isoformat() if watermark else None,
+        'watermark': max_seen.isoformat() if max_seen else None
+    }
 
 
-def reevaluate_existing_bids(vectorizer: BaseTextVectorizer, clear_matches: bool = True):
+def reevaluate_existing_bids(vectorizer: BaseTextVectorizer, clear_matches: bool = True, resume: bool = True):
     """
     Reavalia todas as licitações existentes no banco contra as empresas cadastradas
     VERSÃO APRIMORADA com análise semântica avançada
+    A cada MATCHING_CHECKPOINT_EVERY licitações grava os matches e um checkpoint
+    (última licitação + estatísticas); uma execução interrompida retoma desse ponto.
     """
+    job_name = "reevaluate"
+    
     print("=" * 80)
     print("🔄 REAVALIAÇÃO APRIMORADA DE LICITAÇÕES EXISTENTES")
     print("=" * 80)
     print(f"🔧 Vectorizador: {type(vectorizer).__name__}")
     print(f"📊 Thresholds: Fase 1 = {SIMILARITY_THRESHOLD_PHASE1} | Fase 2 = {SIMILARITY_THRESHOLD_PHASE2}")
     
-    if clear_matches:
+    checkpoint = load_checkpoint(job_name) if resume else None
+    
+    # Ao retomar, os matches já gravados pela execução interrompida são mantidos
+    if clear_matches and not checkpoint:
         clear_existing_matches()
 
     # 1. Carregar empresas e vetorizar
-    print("\n🏢 Carregando empresas do banco...")
-    companies = get_all_companies_from_db()
-    print(f"   ✅ {len(companies)} empresas carregadas")
-    
-    if not companies:
-        print("❌ Nenhuma empresa encontrada no banco. Cadastre empresas primeiro.")
+    company_matrix = _load_company_matrix(vectorizer, verbose=True)
+    if company_matrix is None:
         return
     
-    # Vetorizar descrições das empresas
-    print("🔢 Vetorizando descrições das empresas...")
-    company_texts = [comp["descricao_servicos_produtos"] for comp in companies]
-    company_embeddings = vectorizer.batch_vectorize(company_texts)
+    selector = MatchSelector()
+    recorder = _new_recorder("reevaluation", vectorizer)
     
-    for i, company in enumerate(companies):
-        company["embedding"] = company_embeddings[i] if i < len(company_embeddings) else []
-        if company["embedding"]:
-            print(f"   📋 {company['nome']}: {len(company['embedding'])} dimensões")
-        else:
-            print(f"   ⚠️  {company['nome']}: Falha na vetorização")
+    if checkpoint:
+        cursor_data = checkpoint['cursor']
+        after = (cursor_data['last_created_at'], cursor_data['last_bid_id']) if cursor_data.get('last_bid_id') else None
+        estatisticas, matches_encontrados, offset = _restore_statistics(checkpoint)
+        _resume_selector(selector, checkpoint)
+        mark_resumed(job_name)
+        print(f"♻️  Retomando do checkpoint: {offset} licitações já reavaliadas")
+    else:
+        after = None
+        estatisticas, matches_encontrados, offset = _new_statistics(), 0, 0
+        start_checkpoint(job_name, {}, _statistics_snapshot(estatisticas, 0, 0))
     
-    # 2. Carregar licitações existentes
-    print(f"\n📄 Carregando licitações do banco...")
-    existing_bids = get_existing_bids_from_db()
-    print(f"   ✅ {len(existing_bids)} licitações encontradas")
+    # 2. Licitações existentes: lidas em páginas por keyset, memória constante
+    print(f"\n📄 Contando licitações do banco...")
+    pending_bids = count_existing_bids_from_db(after=after)
+    print(f"   ✅ {pending_bids} licitações a reavaliar")
     
-    if not existing_bids:
+    if not pending_bids and not checkpoint:
         print("❌ Nenhuma licitação encontrada no banco.")
+        complete_checkpoint(job_name, _statistics_snapshot(estatisticas, 0, 0))
         return
     
     # 3. Processar cada licitação
     print(f"\n⚡ Iniciando reavaliação APRIMORADA...")
-    matches_encontrados = 0
-    estatisticas = {
-        'total_processadas': 0,
-        'com_matches': 0,
-        'sem_matches': 0,
-        'matches_fase1_apenas': 0,
-        'matches_fase2': 0,
-        'vetorizacao_falhou': 0
-    }
+    total_bids = offset + pending_bids
+    existing_bids = iter_existing_bids_from_db(after=after)
+    
+    def checkpoint_fn(bid: Dict[str, Any], progresso: int, matches: int):
+        save_checkpoint(
+            job_name,
+            {'last_bid_id': bid['id'], 'last_created_at': bid['created_at']},
+            _statistics_snapshot(estatisticas, matches, progresso)
+        )
     
-    for i, bid in enumerate(existing_bids, 1):
+    matches_encontrados = _reevaluate_bids(
+        vectorizer, company_matrix, existing_bids, selector, recorder,
+        estatisticas, matches_encontrados, offset, total_bids, checkpoint_fn
+    )
+    
+    estatisticas['matches_descartados_top_k'] += selector.discarded
+    _save_score_matrix(recorder)
+    complete_checkpoint(job_name, _statistics_snapshot(estatisticas, matches_encontrados, total_bids))
+    refresh_summaries('matches', force=True)
+    
+    # Relatório final detalhado
+    result = _print_detailed_final_report(matches_encontrados, estatisticas)
+    
+    print(f"🚀 Processo de reavaliação finalizado com sucesso!")
+    return result
+
+
+def _reevaluate_bids(vectorizer: BaseTextVectorizer, company_matrix: CompanyMatrix,
+                     bids: Iterable[Dict[str, Any]], selector: MatchSelector,
+                     recorder: Optional[ScoreMatrixRecorder], estatisticas: Dict[str, int],
+                     matches_encontrados: int, offset: int, total_bids: int,
+                     checkpoint_fn: Callable[[Dict[str, Any], int, int], None]) -> int:
+    """
+    Reavalia as licitações (lista ou stream), gravando os matches e chamando checkpoint_fn
+    (licitação, progresso, matches) a cada MATCHING_CHECKPOINT_EVERY licitações.
+    Retorna o total de matches gravados (incluindo o flush final).
+    """
+    since_checkpoint = 0
+    
+    for i, (bid, bid_items) in enumerate(_with_items(bids), offset + 1):
         objeto_compra = bid['objeto_compra']
         pncp_id = bid['pncp_id']
         
-        print(f"\n[{i}/{len(existing_bids)}] 🔍 Reavaliando: {pncp_id}")
-        print(f"   📝 Objeto: {objeto_compra[:100]}...")
+        print(f"\n[{i}/{total_bids}] 🔍 Reavaliando: {pncp_id}")
+        print(f"   📝 Objeto: {(objeto_compra or '')[:100]}...")
         print(f"   📍 UF: {bid['uf']} | 💰 Valor: R$ {bid['valor_total_estimado'] or 'N/A'}")
         
-        if not objeto_compra:
+        if objeto_compra:
+            # Vetorizar objeto da compra
+            bid_embedding = vectorizer.vectorize(objeto_compra)
+            
+            if bid_embedding:
+                print(f"   🔢 Embedding gerado: {len(bid_embedding)} dimensões")
+                estatisticas['total_processadas'] += 1
+                
+                bid_matches = _match_bid(
+                    vectorizer, company_matrix, bid_embedding, objeto_compra,
+                    lambda: bid_items, estatisticas,
+                    prefixo_justificativa="Reavaliação - ",
+                    licitacao_id=bid['id'], recorder=recorder
+                )
+                selector.add(bid['id'], bid_matches)
+            else:
+                print("   ❌ Erro ao vetorizar objeto da compra")
+                estatisticas['vetorizacao_falhou'] += 1
+        else:
             print("   ⚠️  Objeto da compra vazio, pulando...")
-            continue
         
-        # Vetorizar objeto da compra
-        bid_embedding = vectorizer.vectorize(objeto_compra)
+        since_checkpoint += 1
+        if since_checkpoint >= MATCHING_CHECKPOINT_EVERY or not selector.buffers_matches:
+            matches_encontrados += _flush_matches(selector, estatisticas)
+        if since_checkpoint >= MATCHING_CHECKPOINT_EVERY:
+            checkpoint_fn(bid, i, matches_encontrados)
+            since_checkpoint = 0
         
-        if not bid_embedding:
-            print("   ❌ Erro ao vetorizar objeto da compra")
-            estatisticas['vetorizacao_falhou'] += 1
-            continue
+        print("-" * 60)
+    
+    return matches_encontrados + _flush_matches(selector, estatisticas)
+
+
+def _with_items(bids: Iterable[Dict[str, Any]],
+                batch_size: int = MATCHING_ITEMS_BATCH) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Percorre as licitações em lotes, carregando os itens de cada lote em uma única consulta"""
+    iterator = iter(bids)
+    while True:
+        batch = list(islice(iterator, max(1, batch_size)))
+        if not batch:
+            return
+        items_by_bid = get_items_for_bids_from_db([bid['id'] for bid in batch])
+        for bid in batch:
+            yield bid, items_by_bid.get(str(bid['id']), [])
+
+
+def start_sharded_reevaluation(vectorizer: BaseTextVectorizer, shard_count: int = REEVALUATE_SHARDS,
+                               clear_matches: bool = True) -> Optional[str]:
+    """
+    Prepara uma reavaliação em shards: limpa os matches (opcional), vetoriza as
+    empresas uma única vez e cria os N shards na tabela de trabalho.
+    Se já houver execução em andamento, retorna a existente (retomada).
+    """
+    active = get_active_run()
+    if active:
+        print(f"♻️  Reavaliação em shards já em andamento: {active['id']} ({active['shard_count']} shards)")
+        return active['id']
+    
+    print("=" * 80)
+    print(f"🔄 REAVALIAÇÃO EM SHARDS ({shard_count} shards)")
+    print("=" * 80)
+    
+    companies = get_all_companies_from_db()
+    if not companies:
+        print("❌ Nenhuma empresa encontrada no banco. Cadastre empresas primeiro.")
+        return None
+    
+    if clear_matches:
+        clear_existing_matches()
+    
+    print(f"🔢 Vetorizando {len(companies)} empresas (compartilhado entre os shards)...")
+    embeddings = vectorizer.batch_vectorize([c["descricao_servicos_produtos"] for c in companies])
+    run_id = create_run(
+        shard_count, clear_matches, type(vectorizer).__name__,
+        [c["id"] for c in companies], embeddings
+    )
+    print(f"   ✅ Execução {run_id} criada com {shard_count} shards")
+    return run_id
+
+
+def _load_shard_company_matrix(vectorizer: BaseTextVectorizer, run_id: str) -> Optional[CompanyMatrix]:
+    """Monta a matriz de empresas com os embeddings da execução (vetoriza só empresas novas)"""
+    companies = get_all_companies_from_db()
+    if not companies:
+        return None
+    
+    embeddings = load_company_embeddings(run_id)
+    missing = [c for c in companies if c["id"] not in embeddings]
+    if missing:
+        print(f"   🔢 Vetorizando {len(missing)} empresas sem embedding na execução...")
+        new_embeddings = vectorizer.batch_vectorize([c["descricao_servicos_produtos"] for c in missing])
+        for company, embedding in zip(missing, new_embeddings):
+            embeddings[company["id"]] = embedding
+    
+    for company in companies:
+        company["embedding"] = embeddings.get(company["id"]) or []
+    return CompanyMatrix(companies)
+
+
+def reevaluate_shard(vectorizer: BaseTextVectorizer, company_matrix: CompanyMatrix,
+                     run_id: str, shard_index: int, shard_count: int, worker: str) -> tuple:
+    """
+    Reavalia as licitações de um shard (bucket de hash do id).
+    O heartbeat do shard é enviado por uma thread, independente do ritmo das licitações.
+    O limite top-K por empresa é aplicado na finalização, pois é global.
+    Retorna (snapshot das estatísticas, matriz de scores serializada ou None).
+    """
+    job_name = f"reevaluate:{run_id}:{shard_index}"
+    checkpoint = load_checkpoint(job_name)
+    selector = MatchSelector(top_k_per_company=0)
+    recorder = _new_recorder("reevaluation", vectorizer)
+    
+    if checkpoint:
+        cursor_data = checkpoint['cursor']
+        after = (cursor_data['last_created_at'], cursor_data['last_bid_id']) if cursor_data.get('last_bid_id') else None
+        estatisticas, matches_encontrados, offset = _restore_statistics(checkpoint)
+        mark_resumed(job_name)
+        print(f"♻️  Shard {shard_index}: retomando do checkpoint ({offset} licitações já reavaliadas)")
+    else:
+        after = None
+        estatisticas, matches_encontrados, offset = _new_statistics(), 0, 0
+        start_checkpoint(job_name, {}, _statistics_snapshot(estatisticas, 0, 0))
+    
+    pending_bids = count_existing_bids_from_db(after=after, shard=(shard_index, shard_count))
+    bids = iter_existing_bids_from_db(after=after, shard=(shard_index, shard_count))
+    total_bids = offset + pending_bids
+    print(f"\n🧩 Shard {shard_index + 1}/{shard_count}: {pending_bids} licitações a reavaliar")
+    progress = {'progresso': offset}
+    
+    def checkpoint_fn(bid: Dict[str, Any], progresso: int, matches: int):
+        save_checkpoint(
+            job_name,
+            {'last_bid_id': bid['id'], 'last_created_at': bid['created_at']},
+            _statistics_snapshot(estatisticas, matches, progresso)
+        )
+        progress['progresso'] = progresso
+    
+    def beat():
+        if not heartbeat_shard(run_id, shard_index, worker, progress['progresso']):
+            print(f"⚠️ Shard {shard_index} não pertence mais a {worker}")
+    
+    with heartbeat_thread(beat, f"shard-heartbeat-{shard_index}"):
+        matches_encontrados = _reevaluate_bids(
+            vectorizer, company_matrix, bids, selector, recorder,
+            estatisticas, matches_encontrados, offset, total_bids, checkpoint_fn
+        )
+    estatisticas['matches_descartados_top_k'] += selector.discarded
+    
+    snapshot = _statistics_snapshot(estatisticas, matches_encontrados, total_bids)
+    complete_checkpoint(job_name, snapshot)
+    payload = recorder.to_payload() if recorder is not None and len(recorder) else None
+    return snapshot, payload
+
+
+def run_reevaluation_shards(vectorizer: BaseTextVectorizer, run_id: str, worker: str) -> Dict[str, Any]:
+    """
+    Loop de um worker: reserva shards da execução até não restar nenhum.
+    Quem concluir o último shard executa a finalização; uma finalização
+    interrompida (sem heartbeat recente) é retomada pelo próximo worker.
+    """
+    company_matrix = None
+    processed = []
+    finalized = None
+    
+    while True:
+        claimed = claim_shard(run_id, worker)
+        if not claimed:
+            break
+        shard_index, shard_count = claimed
         
-        print(f"   🔢 Embedding gerado: {len(bid_embedding)} dimensões")
-        estatisticas['total_processadas'] += 1
+        if company_matrix is None:
+            company_matrix = _load_shard_company_matrix(vectorizer, run_id)
+            if company_matrix is None:
+                release_shard(run_id, shard_index, worker, "Nenhuma empresa encontrada no banco")
+                break
         
-        # FASE 1: Matching do objeto completo
-        potential_matches = []
-        print("   🔍 FASE 1 - Análise semântica do objeto da compra:")
+        started = time.perf_counter()
+        try:
+            snapshot, payload = reevaluate_shard(vectorizer, company_matrix, run_id, shard_index, shard_count, worker)
+        except Exception as e:
+            release_shard(run_id, shard_index, worker, f"{type(e).__name__}: {e}")
+            raise
         
-        for company in companies:
-            if not company.get("embedding"):
-                print(f"      ⚠️  {company['nome']}: Sem embedding, pulando...")
-                continue
-            
-            # Usar similaridade aprimorada
-            score, justificativa = calculate_enhanced_similarity(
-                bid_embedding, 
-                company["embedding"], 
-                objeto_compra, 
-                company["descricao_servicos_produtos"]
-            )
-            
-            print(f"      🏢 {company['nome']}: Score = {score:.3f} (threshold: {SIMILARITY_THRESHOLD_PHASE1})")
-            print(f"         💡 {justificativa}")
-            
-            if score >= SIMILARITY_THRESHOLD_PHASE1:
-                potential_matches.append((company, score, justificativa))
-                print(f"         ✅ POTENCIAL MATCH!")
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        processed.append(shard_index)
+        print(f"✅ Shard {shard_index + 1}/{shard_count} concluído em {duration_ms / 1000:.1f}s "
+              f"({snapshot['progresso']} licitações, {snapshot['matches_encontrados']} matches)")
         
-        if potential_matches:
-            print(f"   🎯 {len(potential_matches)} potenciais matches encontrados!")
-            estatisticas['com_matches'] += 1
-            
-            # Buscar itens da licitação
-            items = get_bid_items_from_db(bid['id'])
+        if complete_shard(run_id, shard_index, worker, snapshot, payload, duration_ms):
+            finalized = _run_finalization(run_id, vectorizer)
+    
+    if finalized is None and claim_stale_finalization(run_id):
+        print(f"♻️  Retomando finalização interrompida da execução {run_id}")
+        finalized = _run_finalization(run_id, vectorizer)
+    
+    return {
+        'run_id': run_id,
+        'worker': worker,
+        'shards_processados': processed,
+        'finalizado': finalized is not None,
+        'resultado': finalized
+    }
+
+
+def _run_finalization(run_id: str, vectorizer: BaseTextVectorizer) -> Dict[str, Any]:
+    """Finaliza com heartbeat da execução; um erro marca a execução como failed"""
+    try:
+        with heartbeat_thread(lambda: heartbeat_run(run_id), f"run-heartbeat-{run_id}"):
+            return finalize_sharded_reevaluation(run_id, vectorizer)
+    except Exception as e:
+        fail_run(run_id, f"Finalização: {type(e).__name__}: {e}")
+        raise
+
+
+def finalize_sharded_reevaluation(run_id: str, vectorizer: BaseTextVectorizer) -> Dict[str, Any]:
+    """
+    Consolida a execução: aplica o top-K por empresa aos matches gravados pela
+    execução (desde a criação da execução), soma as estatísticas dos shards e grava
+    uma única matriz de scores. Matches de execuções anteriores não são tocados.
+    """
+    print(f"\n🧩 Finalizando reavaliação em shards {run_id}...")
+    estatisticas = _new_statistics()
+    matches_encontrados = 0
+    progresso = 0
+    recorder = _new_recorder("reevaluation", vectorizer)
+    
+    for shard in get_shard_results(run_id):
+        stats = shard['stats'] or {}
+        for key, value in (stats.get('estatisticas') or {}).items():
+            estatisticas[key] = estatisticas.get(key, 0) + value
+        matches_encontrados += stats.get('matches_encontrados', 0)
+        progresso += stats.get('progresso', 0)
+        if recorder is not None and shard['score_payload']:
+            recorder.add_payload(bytes(shard['score_payload']))
+    
+    run_started_at = get_run_started_at(run_id)
+    removed = trim_run_matches_per_company(MATCH_TOP_K_PER_COMPANY, run_started_at=run_started_at) if run_started_at else 0
+    if removed:
+        print(f"   ✂️  {removed} matches removidos pelo top-K por empresa")
+    estatisticas['matches_descartados_top_k'] += removed
+    matches_encontrados -= removed
+    
+    _save_score_matrix(recorder)
+    complete_run(run_id, _statistics_snapshot(estatisticas, matches_encontrados, progresso))
+    refresh_summaries('matches', force=True)
+    
+    result = _print_detailed_final_report(matches_encontrados, estatisticas)
+    result['run_id'] = run_id
+    print(f"🚀 Reavaliação em shards finalizada com sucesso!")
+    return result
+
+
+def _statistics_snapshot(estatisticas: Dict[str, int], matches_encontrados: int, progresso: int) -> Dict[str, Any]:
+    """Snapshot parcial das estatísticas gravado no checkpoint"""
+    return {
+        'estatisticas': estatisticas,
+        'matches_encontrados': matches_encontrados,
+        'progresso': progresso
+    }
+
+
+def _restore_statistics(checkpoint: Dict[str, Any]) -> tuple:
+    """Restaura (estatisticas, matches_encontrados, progresso) de um checkpoint"""
+    stats = checkpoint.get('stats') or {}
+    estatisticas = _new_statistics()
+    estatisticas.update(stats.get('estatisticas', {}))
+    return estatisticas, stats.get('matches_encontrados', 0), stats.get('progresso', 0)
+
+
+def _resume_selector(selector: MatchSelector, checkpoint: Dict[str, Any]):
+    """Recarrega no seletor os matches gravados pela execução interrompida (limite por empresa)"""
+    if selector.buffers_matches:
+        selector.seed(get_match_scores_from_db(since=checkpoint['started_at']))
+
+
+def _new_statistics() -> Dict[str, int]:
+    """Contadores de uma execução de matching"""
+    return {
+        'total_processadas': 0,
+        'com_matches': 0,
+        'sem_matches': 0,
+        'matches_fase1_apenas': 0,
+        'matches_fase2': 0,
+        'vetorizacao_falhou': 0,
+        'matches_descartados_top_k': 0
+    }
+
+
+def _new_recorder(run_type: str, vectorizer: BaseTextVectorizer) -> Optional[ScoreMatrixRecorder]:
+    """Cria o registrador da matriz de scores da execução (se habilitado)"""
+    if not SCORE_MATRIX_ENABLED:
+        return None
+    return ScoreMatrixRecorder(
+        run_type, type(vectorizer).__name__,
+        SIMILARITY_THRESHOLD_PHASE1, SIMILARITY_THRESHOLD_PHASE2
+    )
+
+
+def _save_score_matrix(recorder: Optional[ScoreMatrixRecorder]):
+    """Persiste a matriz de scores sem interromper a execução em caso de falha"""
+    if recorder is None:
+        return
+    try:
+        recorder.save()
+    except Exception as e:
+        print(f"⚠️  Erro ao salvar matriz de scores: {e}")
+
+
+def _load_company_matrix(vectorizer: BaseTextVectorizer, verbose: bool = False) -> Optional[CompanyMatrix]:
+    """Carrega as empresas, vetoriza suas descrições e monta a matriz de embeddings"""
+    print("\n🏢 Carregando empresas do banco...")
+    companies = get_all_companies_from_db()
+    print(f"   ✅ {len(companies)} empresas carregadas")
+    
+    if not companies:
+        print("❌ Nenhuma empresa encontrada no banco. Cadastre empresas primeiro.")
+        return None
+    
+    # Vetorizar descrições das empresas
+    print("🔢 Vetorizando descrições das empresas...")
+    company_texts = [comp["descricao_servicos_produtos"] for comp in companies]
+    company_embeddings = vectorizer.batch_vectorize(company_texts)
+    
+    for i, company in enumerate(companies):
+        company["embedding"] = company_embeddings[i] if i < len(company_embeddings) else []
+        if not company["embedding"]:
+            print(f"   ⚠️  {company['nome']}: Falha na vetorização")
+        elif verbose:
+            print(f"   📋 {company['nome']}: {len(company['embedding'])} dimensões")
+    
+    company_matrix = CompanyMatrix(companies)
+    print(f"   🧮 Matriz de empresas: {len(company_matrix)} × {company_matrix.dimensions}")
+    print(f"   ✂️  Top-K: {MATCH_TOP_K_PER_BID or '∞'} por licitação | {MATCH_TOP_K_PER_COMPANY or '∞'} por empresa (por execução)")
+    return company_matrix
+
+
+def _match_bid(vectorizer: BaseTextVectorizer, company_matrix: CompanyMatrix,
+               bid_embedding: List[float], objeto_compra: str,
+               load_items: Callable[[], List[Dict[str, Any]]],
+               estatisticas: Dict[str, int], prefixo_justificativa: str = "",
+               licitacao_id: Optional[str] = None,
+               recorder: Optional[ScoreMatrixRecorder] = None) -> List[Dict[str, Any]]:
+    """
+    Executa as fases 1 e 2 de uma licitação com o scorer vetorizado.
+    Retorna os matches candidatos (antes da seleção top-K).
+    Com recorder, registra também os top-N scores abaixo do threshold (até o piso da matriz).
+    """
+    # FASE 1: Matching do objeto completo
+    print("   🔍 FASE 1 - Análise semântica do objeto da compra:")
+    floor = min(SIMILARITY_THRESHOLD_PHASE1, recorder.min_score) if recorder is not None else SIMILARITY_THRESHOLD_PHASE1
+    candidates = company_matrix.phase1(bid_embedding, objeto_compra, floor)
+    potential_matches = [m for m in candidates if m[1] >= SIMILARITY_THRESHOLD_PHASE1]
+    bid_matches = []
+    
+    if not potential_matches:
+        print("   ❌ Nenhum potencial match na Fase 1")
+        estatisticas['sem_matches'] += 1
+        if recorder is not None:
+            recorder.add_bid(licitacao_id, candidates, None, ITEMS_NOT_EVALUATED)
+        return bid_matches
+    
+    print(f"   🎯 {len(potential_matches)} potenciais matches encontrados!")
+    estatisticas['com_matches'] += 1
+    for company, score, justificativa in potential_matches:
+        print(f"      🏢 {company['nome']}: Score = {score:.3f} | 💡 {justificativa}")
+    
+    # FASE 2: Refinamento com itens (se disponível)
+    items = load_items()
+    if items:
+        print(f"   📋 {len(items)} itens encontrados. Iniciando FASE 2...")
+        item_descriptions = [item.get("descricao", "") or "" for item in items]
+        item_embeddings = vectorizer.batch_vectorize(item_descriptions)
+        
+        # Potenciais matches são um prefixo dos candidatos (ordenados por score);
+        # com recorder, os top-N registrados também recebem scores de itens
+        phase2_targets = candidates[:max(len(potential_matches), recorder.top_n)] if recorder is not None else potential_matches
+        phase2_floor = min(SIMILARITY_THRESHOLD_PHASE2, recorder.min_score) if recorder is not None else SIMILARITY_THRESHOLD_PHASE2
+        item_scores_by_company = company_matrix.phase2(
+            item_embeddings, item_descriptions, phase2_targets, phase2_floor
+        )
+        if recorder is not None:
+            recorder.add_bid(licitacao_id, candidates, item_scores_by_company, ITEMS_SCORED)
+        
+        for company, score_fase1, justificativa_fase1 in potential_matches:
+            item_matches = [
+                (desc, score) for desc, score in item_scores_by_company.get(company["id"], [])
+                if score >= SIMILARITY_THRESHOLD_PHASE2
+            ]
             
-            # FASE 2: Refinamento com itens (se disponível)
-            if items:
-                print(f"   📋 {len(items)} itens encontrados. Iniciando FASE 2...")
-                item_descriptions = [item.get("descricao", "") for item in items]
-                item_embeddings = vectorizer.batch_vectorize(item_descriptions)
+            if item_matches:
+                media_itens = sum(score for _, score in item_matches) / len(item_matches)
+                final_score = (score_fase1 + media_itens) / 2
                 
-                for company, score_fase1, justificativa_fase1 in potential_matches:
-                    item_matches = 0
-                    total_item_score = 0.0
-                    best_item_matches = []
-                    
-                    print(f"\n      🏢 Analisando {company['nome']} (Score Fase 1: {score_fase1:.3f})")
-                    
-                    for idx, item_embedding in enumerate(item_embeddings):
-                        if not item_embedding:
-                            continue
-                        
-                        item_score, item_justificativa = calculate_enhanced_similarity(
-                            item_embedding, 
-                            company["embedding"],
-                            item_descriptions[idx],
-                            company["descricao_servicos_produtos"]
-                        )
-                        
-                        item_desc = item_descriptions[idx][:50] + "..." if len(item_descriptions[idx]) > 50 else item_descriptions[idx]
-                        
-                        print(f"         📋 Item {idx+1}: '{item_desc}'")
-                        print(f"             📊 Score: {item_score:.3f} (threshold: {SIMILARITY_THRESHOLD_PHASE2})")
-                        print(f"             💡 {item_justificativa}")
-                        
-                        if item_score >= SIMILARITY_THRESHOLD_PHASE2:
-                            item_matches += 1
-                            total_item_score += item_score
-                            best_item_matches.append((item_desc, item_score))
-                            print(f"             ✅ MATCH no item!")
-                        else:
-                            print(f"             ❌ Não passou no threshold")
-                    
-                    if item_matches > 0:
-                        final_score = (score_fase1 + (total_item_score / item_matches)) / 2
-                        
-                        # Justificativa combinada
-                        combined_justificativa = f"Reavaliação - Fase 1: {justificativa_fase1} | Fase 2: {item_matches} itens matched (média: {total_item_score/item_matches:.3f})"
-                        
-                        save_match_to_db(pncp_id, company["id"], final_score, "objeto_e_itens", combined_justificativa)
-                        matches_encontrados += 1
-                        estatisticas['matches_fase2'] += 1
-                        
-                        print(f"\n      🎯 MATCH FINAL! {company['nome']} - Score: {final_score:.3f}")
-                        print(f"         📋 Melhores itens: {', '.join([f'{desc}({score:.2f})' for desc, score in best_item_matches[:2]])}")
-                    else:
-                        print(f"\n      ❌ {company['nome']}: Nenhum item passou no threshold da Fase 2")
+                # Justificativa combinada
+                combined_justificativa = f"{prefixo_justificativa}Fase 1: {justificativa_fase1} | Fase 2: {len(item_matches)} itens matched (média: {media_itens:.3f})"
+                
+                bid_matches.append({
+                    'empresa_id': company["id"],
+                    'score': final_score,
+                    'match_type': "objeto_e_itens",
+                    'justificativa': combined_justificativa
+                })
+                
+                best_items = sorted(item_matches, key=lambda m: m[1], reverse=True)[:2]
+                print(f"      🎯 MATCH FINAL! {company['nome']} - Score: {final_score:.3f}")
+                print(f"         📋 Melhores itens: {', '.join([f'{desc[:50]}({score:.2f})' for desc, score in best_items])}")
             else:
-                print("   📋 Sem itens - usando apenas Fase 1")
-                # Sem itens, usar apenas Fase 1
-                for company, score, justificativa in potential_matches:
-                    save_match_to_db(pncp_id, company["id"], score, "objeto_completo", 
-                                    f"Reavaliação - Apenas Fase 1: {justificativa}")
-                    matches_encontrados += 1
-                    estatisticas['matches_fase1_apenas'] += 1
-                    print(f"      🎯 MATCH! {company['nome']} - Score: {score:.3f}")
-        else:
-            print("   ❌ Nenhum potencial match na Fase 1")
-            estatisticas['sem_matches'] += 1
-        
-        print("-" * 60)
+                print(f"      ❌ {company['nome']}: Nenhum item passou no threshold da Fase 2")
+    else:
+        print("   📋 Sem itens - usando apenas Fase 1")
+        if recorder is not None:
+            recorder.add_bid(licitacao_id, candidates, None, ITEMS_ABSENT)
+        # Sem itens, usar apenas Fase 1
+        for company, score, justificativa in potential_matches:
+            bid_matches.append({
+                'empresa_id': company["id"],
+                'score': score,
+                'match_type': "objeto_completo",
+                'justificativa': f"{prefixo_justificativa}Apenas Fase 1: {justificativa}"
+            })
     
-    # Relatório final detalhado
-    result = _print_detailed_final_report(matches_encontrados, estatisticas)
+    return bid_matches
+
+
+def _flush_matches(selector: MatchSelector, estatisticas: Dict[str, int]) -> int:
+    """
+    Grava (upsert) os matches selecionados ainda pendentes, remove os que saíram
+    do top-K por empresa e atualiza as estatísticas por tipo
+    """
+    saved = 0
+    for licitacao_id, matches in selector.drain().items():
+        saved += save_matches_to_db(licitacao_id, matches)
+        for match in matches:
+            if match['match_type'] == "objeto_e_itens":
+                estatisticas['matches_fase2'] += 1
+            else:
+                estatisticas['matches_fase1_apenas'] += 1
     
-    print(f"🚀 Processo de reavaliação finalizado com sucesso!")
-    return result
+    evicted = selector.pop_evicted()
+    if evicted:
+        delete_matches_by_pairs(evicted)
+        saved -= len(evicted)
+    return saved
 
 
 def _print_final_report(matches_encontrados: int, estatisticas: Dict[str, int]):
@@ -434,6 +987,7 @@ def _print_final_report(matches_encontrados: int, estatisticas: Dict[str, int]):
     print(f"   ❌ Licitações sem matches: {estatisticas['sem_matches']}")
     print(f"   📋 Matches apenas Fase 1: {estatisticas['matches_fase1_apenas']}")
     print(f"   🔬 Matches com Fase 2: {estatisticas['matches_fase2']}")
+    print(f"   ✂️  Descartados pelo top-K: {estatisticas.get('matches_descartados_top_k', 0)}")
     print(f"   🎯 Total de matches: {matches_encontrados}")
     
     if estatisticas['total_processadas'] > 0:
@@ -453,6 +1007,7 @@ def _print_detailed_final_report(matches_encontrados: int, estatisticas: Dict[st
     print(f"   ❌ Licitações sem matches: {estatisticas['sem_matches']}")
     print(f"   📋 Matches apenas Fase 1: {estatisticas['matches_fase1_apenas']}")
     print(f"   🔬 Matches com Fase 2: {estatisticas['matches_fase2']}")
+    print(f"   ✂️  Descartados pelo top-K: {estatisticas.get('matches_descartados_top_k', 0)}")
     print(f"   🎯 Total de matches: {matches_encontrados}")
     
     if estatisticas['total_processadas'] > 0:
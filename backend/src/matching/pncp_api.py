@@ -4,23 +4,131 @@ Módulo para integração com API do PNCP e operações de banco de dados
 """
 
 import os
-import psycopg2
-from psycopg2.extras import DictCursor
+from psycopg2.extras import DictCursor, execute_values
 import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Callable, Iterator
 import requests
 import time
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
+from config.connection_pool import get_connection_pool, DB_STREAM_ITERSIZE
+
+from .archive import pncp_archive
+from .circuit_breaker import get_circuit_breaker, get_negative_cache, CircuitOpenError
+
 # --- Configurações da API PNCP ---
-PNCP_BASE_URL_PUBLICACAO = "https://pncp.gov.br/api/consulta/v1/contratacoes/publicacao"
-PNCP_BASE_URL_ITENS = "https://pncp.gov.br/api/pncp/v1/orgaos/{cnpj}/compras/{anoCompra}/{sequencialCompra}/itens"
-PNCP_PAGE_SIZE = 50  # Quantidade de licitações por página
-PNCP_MAX_PAGES = 5   # Limite de páginas por UF para evitar sobrecarga
+# PNCP_API_HOST aponta para outro servidor (ex: replay local em benchmarks)
+PNCP_API_HOST = os.getenv('PNCP_API_HOST', 'https://pncp.gov.br').rstrip('/')
+PNCP_BASE_URL_PUBLICACAO = f"{PNCP_API_HOST}/api/consulta/v1/contratacoes/publicacao"
+PNCP_BASE_URL_ATUALIZACAO = f"{PNCP_API_HOST}/api/consulta/v1/contratacoes/atualizacao"
+PNCP_BASE_URL_ITENS = PNCP_API_HOST + "/api/pncp/v1/orgaos/{cnpj}/compras/{anoCompra}/{sequencialCompra}/itens"
+PNCP_PAGE_SIZE = 50  # tamanhoPagina: máximo aceito pelas consultas de contratações
+
+# --- Modalidades de contratação (códigos do PNCP) ---
+MODALIDADES_PNCP = {
+    1: "Leilão - Eletrônico",
+    2: "Diálogo Competitivo",
+    3: "Concurso",
+    4: "Concorrência - Eletrônica",
+    5: "Concorrência - Presencial",
+    6: "Pregão - Eletrônico",
+    7: "Pregão - Presencial",
+    8: "Dispensa de Licitação",
+    9: "Inexigibilidade",
+    10: "Manifestação de Interesse",
+    11: "Pré-qualificação",
+    12: "Credenciamento",
+    13: "Leilão - Presencial"
+}
+PNCP_MODALIDADE_PADRAO = 6  # Pregão eletrônico
+# Modalidades coletadas na busca diária/backfill (ex: PNCP_MODALIDADES=6,8,4)
+PNCP_MODALIDADES = [
+    int(code) for code in os.getenv('PNCP_MODALIDADES', str(PNCP_MODALIDADE_PADRAO)).split(',')
+    if code.strip()
+]
+
+# --- Orçamento de requisições ao PNCP (compartilhado entre threads do processo) ---
+PNCP_RATE_LIMIT_PER_SECOND = float(os.getenv('PNCP_RATE_LIMIT_PER_SECOND', '4'))
+PNCP_RATE_LIMIT_BURST = int(os.getenv('PNCP_RATE_LIMIT_BURST', '4'))
+PNCP_MAX_RETRIES = int(os.getenv('PNCP_MAX_RETRIES', '4'))
+PNCP_CONNECT_TIMEOUT = float(os.getenv('PNCP_CONNECT_TIMEOUT', '5'))  # Host fora do ar falha em segundos
+
+
+class PNCPRateLimiter:
+    """
+    Token bucket thread-safe para as chamadas ao PNCP.
+    Respostas 429 pausam todas as threads pelo Retry-After informado.
+    """
+
+    def __init__(self, rate: float = PNCP_RATE_LIMIT_PER_SECOND, burst: int = PNCP_RATE_LIMIT_BURST):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+
+    def acquire(self):
+        """Bloqueia até haver orçamento para uma requisição"""
+        if self.rate <= 0:
+            with self._lock:
+                self.requests += 1
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.requests += 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Suspende todas as requisições (ex: resposta 429)"""
+        with self._lock:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+pncp_rate_limiter = PNCPRateLimiter()
+
+
+def pncp_get(url: str, params: Optional[Dict[str, Any]] = None, timeout: int = 30) -> requests.Response:
+    """
+    GET no PNCP respeitando o orçamento de requisições.
+    Em 429/503 aguarda (Retry-After ou backoff exponencial) e tenta de novo;
+    demais erros HTTP são propagados via raise_for_status.
+    """
+    for attempt in range(PNCP_MAX_RETRIES + 1):
+        pncp_rate_limiter.acquire()
+        response = requests.get(url, params=params, timeout=(PNCP_CONNECT_TIMEOUT, timeout))
+        if response.status_code not in (429, 503) or attempt == PNCP_MAX_RETRIES:
+            response.raise_for_status()
+            return response
+
+        retry_after = response.headers.get('Retry-After')
+        try:
+            wait = float(retry_after) if retry_after else 2 ** attempt
+        except ValueError:
+            wait = 2 ** attempt
+        print(f"   ⏳ PNCP respondeu {response.status_code}, aguardando {wait:.1f}s...")
+        pncp_rate_limiter.pause(wait)
+    return response
+
 
 # --- Estados brasileiros ---
 ESTADOS_BRASIL = [
@@ -31,73 +139,160 @@ ESTADOS_BRASIL = [
 
 
 def get_db_connection():
-    """Conecta ao banco Supabase usando DATABASE_URL"""
+    """
+    Conexão do pool compartilhado (mesmo pool dos repositórios)
+    close() devolve a conexão ao pool; transação não confirmada é desfeita
+    """
     database_url = os.getenv('DATABASE_URL')
     if not database_url:
         raise ValueError("DATABASE_URL não encontrada nas variáveis de ambiente")
     
-    return psycopg2.connect(database_url)
+    return get_connection_pool().getconn()
 
 
-def get_all_companies_from_db() -> List[Dict[str, Any]]:
-    """Busca todas as empresas do banco de dados"""
+def stream_rows(query: str, params: Any = (), itersize: Optional[int] = None,
+                name: str = "stream") -> Iterator[Tuple]:
+    """
+    Executa um SELECT com cursor nomeado (server-side) e devolve as linhas como tuplas,
+    buscando itersize linhas por vez. A conexão fica emprestada (em transação) até o
+    fim da iteração: use para varreduras curtas; varreduras longas paginam por keyset.
+    """
     conn = get_db_connection()
     try:
-        with conn.cursor(cursor_factory=DictCursor) as cursor:
-            cursor.execute("""
-                SELECT id, nome_fantasia, razao_social, cnpj, 
-                       descricao_servicos_produtos, palavras_chave, setor_atuacao
-                FROM empresas
-                ORDER BY nome_fantasia
-            """)
-            companies = []
-            for row in cursor.fetchall():
-                companies.append({
-                    'id': str(row['id']),
-                    'nome': row['nome_fantasia'],
-                    'razao_social': row['razao_social'],
-                    'cnpj': row['cnpj'],
-                    'descricao_servicos_produtos': row['descricao_servicos_produtos'],
-                    'palavras_chave': row['palavras_chave'],
-                    'setor_atuacao': row['setor_atuacao']
-                })
-            return companies
+        cursor_name = f"{name}_{threading.get_ident()}_{int(time.time() * 1000)}"
+        with conn.cursor(name=cursor_name) as cursor:
+            cursor.itersize = itersize or DB_STREAM_ITERSIZE
+            cursor.execute(query, params)
+            for row in cursor:
+                yield row
     finally:
         conn.close()
 
 
+def iter_all_companies_from_db(itersize: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Percorre as empresas do banco em streaming"""
+    rows = stream_rows("""
+        SELECT id, nome_fantasia, razao_social, cnpj, 
+               descricao_servicos_produtos, palavras_chave, setor_atuacao
+        FROM empresas
+        ORDER BY nome_fantasia
+    """, itersize=itersize, name="empresas")
+    for id_, nome, razao_social, cnpj, descricao, palavras_chave, setor in rows:
+        yield {
+            'id': str(id_),
+            'nome': nome,
+            'razao_social': razao_social,
+            'cnpj': cnpj,
+            'descricao_servicos_produtos': descricao,
+            'palavras_chave': palavras_chave,
+            'setor_atuacao': setor
+        }
+
+
+def get_all_companies_from_db() -> List[Dict[str, Any]]:
+    """Busca todas as empresas do banco de dados"""
+    return list(iter_all_companies_from_db())
+
+
 def get_processed_bid_ids() -> set:
-    """Retorna conjunto de IDs de licitações já processadas"""
+    """
+    Retorna conjunto de IDs de licitações já processadas.
+    Licitações ainda com status 'coletada' (matching interrompido) não entram
+    no conjunto e são reprocessadas na próxima execução.
+    """
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("SELECT DISTINCT pncp_id FROM licitacoes")
+            cursor.execute("SELECT DISTINCT pncp_id FROM licitacoes WHERE status <> 'coletada'")
             return {row[0] for row in cursor.fetchall()}
     finally:
         conn.close()
 
 
-def fetch_bids_from_pncp(start_date: str, end_date: str, uf: str, page: int) -> Tuple[List[Dict], bool]:
+def fetch_bids_page(start_date: str, end_date: str, uf: str, page: int,
+                    modalidade: int = PNCP_MODALIDADE_PADRAO) -> Dict[str, Any]:
     """
-    Busca licitações na API do PNCP para um UF e página específicos.
-    Retorna a lista de licitações e um booleano indicando se há mais páginas.
+    Busca uma página de licitações publicadas no PNCP (UF/modalidade/página).
+    Propaga erros de rede/HTTP para que a unidade de trabalho possa ser repetida.
     """
     params = {
         "dataInicial": start_date,
         "dataFinal": end_date,
         "uf": uf,
         "pagina": page,
-        "quantidade": PNCP_PAGE_SIZE,
-        "codigoModalidadeContratacao": 6  # Pregão eletrônico
+        "tamanhoPagina": PNCP_PAGE_SIZE,
+        "codigoModalidadeContratacao": modalidade
     }
-    
+    response = pncp_get(PNCP_BASE_URL_PUBLICACAO, params=params)
+    # 204: nenhuma licitação para o filtro
+    data = response.json() if response.content else {"data": []}
+    pncp_archive.append_bids(data.get("data") or [], "publicacao")
+    return data
+
+
+def fetch_updated_bids_page(start_date: str, end_date: str, page: int,
+                            modalidade: int = PNCP_MODALIDADE_PADRAO) -> Dict[str, Any]:
+    """
+    Busca uma página de contratações atualizadas no intervalo (consulta por data
+    de atualização, todas as UFs). Usada pela sincronização incremental.
+    """
+    params = {
+        "dataInicial": start_date,
+        "dataFinal": end_date,
+        "pagina": page,
+        "tamanhoPagina": PNCP_PAGE_SIZE,
+        "codigoModalidadeContratacao": modalidade
+    }
+    response = pncp_get(PNCP_BASE_URL_ATUALIZACAO, params=params)
+    data = response.json() if response.content else {"data": []}
+    pncp_archive.append_bids(data.get("data") or [], "atualizacao")
+    return data
+
+
+def pncp_total_pages(data: Dict[str, Any]) -> Optional[int]:
+    """Total de páginas informado na resposta paginada do PNCP (None se ausente)"""
+    total_pages = data.get("totalPaginas")
+    if total_pages is None and data.get("totalRegistros") is not None:
+        total_pages = -(-int(data["totalRegistros"]) // PNCP_PAGE_SIZE)
+    return int(total_pages) if total_pages is not None else None
+
+
+def fetch_all_pages(fetch_page: Callable[[int], Dict[str, Any]], concurrency: int = 4) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Percorre todas as páginas de uma consulta: busca a primeira, lê totalPaginas e
+    dispara as demais de uma vez (limitadas pelo orçamento de requisições).
+    Retorna (página, resposta) na ordem das páginas; nenhuma página vazia é requisitada.
+    """
+    first = fetch_page(1)
+    yield 1, first
+    total_pages = pncp_total_pages(first)
+    if total_pages is None:
+        # Resposta sem contadores: segue enquanto as páginas vierem cheias
+        page, data = 1, first
+        while len(data.get("data", [])) == PNCP_PAGE_SIZE:
+            page += 1
+            data = fetch_page(page)
+            yield page, data
+        return
+    if total_pages <= 1:
+        return
+    pages = range(2, total_pages + 1)
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pages))), thread_name_prefix="pncp-pages") as executor:
+        yield from zip(pages, executor.map(fetch_page, pages))
+
+
+def fetch_bids_from_pncp(start_date: str, end_date: str, uf: str, page: int,
+                         modalidade: int = PNCP_MODALIDADE_PADRAO) -> Tuple[List[Dict], bool]:
+    """
+    Busca licitações na API do PNCP para um UF, modalidade e página específicos.
+    Retorna a lista de licitações e um booleano indicando se há mais páginas.
+    """
     try:
         print(f"🔍 Buscando licitações em {uf}, página {page}...")
-        response = requests.get(PNCP_BASE_URL_PUBLICACAO, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        data = fetch_bids_page(start_date, end_date, uf, page, modalidade)
         bids = data.get("data", [])
-        has_more_pages = len(bids) == PNCP_PAGE_SIZE
+        total_pages = pncp_total_pages(data)
+        has_more_pages = page < total_pages if total_pages is not None else len(bids) == PNCP_PAGE_SIZE
         print(f"   ✅ Encontradas {len(bids)} licitações em {uf}")
         return bids, has_more_pages
     except requests.exceptions.RequestException as e:
@@ -119,16 +314,137 @@ def fetch_bid_items_from_pncp(licitacao: Dict) -> List[Dict]:
         sequencialCompra=sequencial_compra
     )
     
+    pncp_id = licitacao['numeroControlePNCP']
+    breaker = get_circuit_breaker('pncp_itens')
+    negative_cache = get_negative_cache('pncp_itens')
+    
+    if negative_cache.contains(pncp_id):
+        print(f"   📋 Licitação {pncp_id} sem itens no PNCP (cache), pulando busca")
+        return []
+    
     try:
-        print(f"   📋 Buscando itens para licitação {licitacao['numeroControlePNCP']}...")
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        items = response.json()
-        print(f"      ✅ {len(items)} itens encontrados")
-        return items
+        breaker.before_call()
+        print(f"   📋 Buscando itens para licitação {pncp_id}...")
+        response = pncp_get(url)
+    except CircuitOpenError as e:
+        print(f"      ⚡ {e}: itens de {pncp_id} não buscados")
+        return []
+    except requests.exceptions.HTTPError as e:
+        status = e.response.status_code if e.response is not None else 500
+        if status < 500 and status != 429:
+            # Host saudável; a compra não tem itens publicados
+            breaker.record_success()
+            if status == 404:
+                negative_cache.add(pncp_id)
+        else:
+            breaker.record_failure()
+        print(f"      ❌ Erro ao buscar itens da licitação {pncp_id}: {e}")
+        return []
     except requests.exceptions.RequestException as e:
-        print(f"      ❌ Erro ao buscar itens da licitação {licitacao['numeroControlePNCP']}: {e}")
+        breaker.record_failure()
+        print(f"      ❌ Erro ao buscar itens da licitação {pncp_id}: {e}")
         return []
+    
+    breaker.record_success()
+    items = response.json() if response.content else []
+    if not items:
+        negative_cache.add(pncp_id)
+    pncp_archive.append_items(licitacao, items, "itens")
+    print(f"      ✅ {len(items)} itens encontrados")
+    return items
+
+
+def _clamp_valor(valor) -> Optional[float]:
+    """Converte um valor monetário limitando ao DECIMAL(15,2) (0 a 999 bilhões)"""
+    if valor is None:
+        return None
+    try:
+        valor = float(valor)
+    except (ValueError, TypeError):
+        return None
+    if valor > 999999999999.99:
+        return 999999999999.99
+    if valor < 0:
+        return 0
+    return valor
+
+
+# Colunas de licitacoes preenchidas a partir de uma contratação do PNCP
+LICITACAO_COLUMNS = [
+    'pncp_id', 'orgao_cnpj', 'ano_compra', 'sequencial_compra',
+    'objeto_compra', 'link_sistema_origem', 'data_publicacao',
+    'valor_total_estimado', 'uf', 'status',
+    'numero_controle_pncp', 'numero_compra', 'processo',
+    'valor_total_homologado', 'data_abertura_proposta', 'data_encerramento_proposta',
+    'modo_disputa_id', 'modo_disputa_nome', 'srp',
+    'link_processo_eletronico', 'justificativa_presencial', 'razao_social',
+    'uf_nome', 'nome_unidade', 'municipio_nome', 'codigo_ibge', 'codigo_unidade',
+    'situacao_compra_id', 'situacao_compra_nome', 'data_atualizacao_pncp',
+    'modalidade_id', 'modalidade_nome'
+]
+
+# Colunas que o PNCP pode alterar após a publicação (atualizadas no ON CONFLICT)
+LICITACAO_MUTABLE_COLUMNS = [
+    'objeto_compra', 'link_sistema_origem', 'valor_total_estimado',
+    'numero_controle_pncp', 'numero_compra', 'processo',
+    'valor_total_homologado', 'data_abertura_proposta', 'data_encerramento_proposta',
+    'modo_disputa_id', 'modo_disputa_nome', 'srp',
+    'link_processo_eletronico', 'justificativa_presencial', 'razao_social',
+    'uf_nome', 'nome_unidade', 'municipio_nome', 'codigo_ibge', 'codigo_unidade',
+    'situacao_compra_id', 'situacao_compra_nome', 'data_atualizacao_pncp',
+    'modalidade_id', 'modalidade_nome'
+]
+
+
+def bid_updated_at(bid: Dict) -> Optional[datetime.datetime]:
+    """Data da última atualização da contratação no PNCP (horário do PNCP, sem fuso)"""
+    value = bid.get("dataAtualizacaoGlobal") or bid.get("dataAtualizacao")
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(str(value)[:19])
+    except ValueError:
+        return None
+
+
+def _bid_to_row(bid: Dict) -> Dict[str, Any]:
+    """Mapeia uma contratação do PNCP para as colunas de licitacoes"""
+    orgao = bid.get("orgaoEntidade") or {}
+    unidade_orgao = bid.get("unidadeOrgao") or {}
+    return {
+        'pncp_id': bid["numeroControlePNCP"],
+        'orgao_cnpj': orgao.get("cnpj"),
+        'ano_compra': bid["anoCompra"],
+        'sequencial_compra': bid["sequencialCompra"],
+        'objeto_compra': bid["objetoCompra"],
+        'link_sistema_origem': bid.get("linkSistemaOrigem", ""),
+        'data_publicacao': bid.get("dataPublicacaoPncp"),
+        'valor_total_estimado': _clamp_valor(bid.get("valorTotalEstimado")),
+        'uf': unidade_orgao.get("ufSigla"),
+        'status': "coletada",
+        'numero_controle_pncp': bid.get("numeroControlePNCP"),
+        'numero_compra': bid.get("numeroCompra"),
+        'processo': bid.get("processo"),
+        'valor_total_homologado': _clamp_valor(bid.get("valorTotalHomologado")),
+        'data_abertura_proposta': bid.get("dataAberturaProposta"),
+        'data_encerramento_proposta': bid.get("dataEncerramentoProposta"),
+        'modo_disputa_id': bid.get("modoDisputaId"),
+        'modo_disputa_nome': bid.get("modoDisputaNome"),
+        'srp': bid.get("srp"),  # Booleano - Sistema de Registro de Preços
+        'link_processo_eletronico': bid.get("linkProcessoEletronico"),
+        'justificativa_presencial': bid.get("justificativaPresencial"),
+        'razao_social': orgao.get("razaoSocial"),
+        'uf_nome': unidade_orgao.get("ufNome"),
+        'nome_unidade': unidade_orgao.get("nomeUnidade"),
+        'municipio_nome': unidade_orgao.get("municipioNome"),
+        'codigo_ibge': unidade_orgao.get("codigoIbge"),
+        'codigo_unidade': unidade_orgao.get("codigoUnidade"),
+        'situacao_compra_id': bid.get("situacaoCompraId"),
+        'situacao_compra_nome': bid.get("situacaoCompraNome"),
+        'data_atualizacao_pncp': bid.get("dataAtualizacaoGlobal") or bid.get("dataAtualizacao"),
+        'modalidade_id': bid.get("modalidadeId"),
+        'modalidade_nome': bid.get("modalidadeNome")
+    }
 
 
 def save_bid_to_db(bid: Dict) -> str:
@@ -149,122 +465,32 @@ def save_bid_to_db(bid: Dict) -> str:
     print(f"📄 Processo: {bid.get('processo')}")
     print(f"🔢 Número Compra: {bid.get('numeroCompra')}")
     
-    # Validar e limitar valor total estimado
-    valor_total = bid.get("valorTotalEstimado")
-    if valor_total is not None:
-        try:
-            valor_total = float(valor_total)
-            # Limitar a 999 bilhões (limite do DECIMAL(15,2))
-            if valor_total > 999999999999.99:
-                valor_total = 999999999999.99
-            elif valor_total < 0:
-                valor_total = 0
-        except (ValueError, TypeError):
-            valor_total = None
-
-    # Validar e limitar valor total homologado
-    valor_homologado = bid.get("valorTotalHomologado")
-    if valor_homologado is not None:
-        try:
-            valor_homologado = float(valor_homologado)
-            if valor_homologado > 999999999999.99:
-                valor_homologado = 999999999999.99
-            elif valor_homologado < 0:
-                valor_homologado = 0
-        except (ValueError, TypeError):
-            valor_homologado = None
-    
-    # Extrair campos aninhados corretamente
-    orgao_cnpj = bid.get("orgaoEntidade", {}).get("cnpj") if bid.get("orgaoEntidade") else None
-    razao_social = bid.get("orgaoEntidade", {}).get("razaoSocial") if bid.get("orgaoEntidade") else None
-    
-    # Extrair dados da unidadeOrgao
-    unidade_orgao = bid.get("unidadeOrgao", {}) if bid.get("unidadeOrgao") else {}
-    uf_sigla = unidade_orgao.get("ufSigla")
-    uf_nome = unidade_orgao.get("ufNome")
-    nome_unidade = unidade_orgao.get("nomeUnidade")
-    municipio_nome = unidade_orgao.get("municipioNome")
-    codigo_ibge = unidade_orgao.get("codigoIbge")
-    codigo_unidade = unidade_orgao.get("codigoUnidade")
+    row = _bid_to_row(bid)
     
     print(f"✅ Valores processados:")
-    print(f"   💰 Valor Total (processado): {valor_total}")
-    print(f"   💸 Valor Homologado (processado): {valor_homologado}")
-    print(f"   🏢 CNPJ (extraído): {orgao_cnpj}")
-    print(f"   🏛️ Razão Social (extraído): {razao_social}")
-    print(f"   📍 UF Sigla (extraído): {uf_sigla}")
-    print(f"   🌎 UF Nome (extraído): {uf_nome}")
-    print(f"   🏢 Nome Unidade (extraído): {nome_unidade}")
-    print(f"   🏙️ Município (extraído): {municipio_nome}")
-    print(f"   🆔 Código IBGE (extraído): {codigo_ibge}")
+    print(f"   💰 Valor Total (processado): {row['valor_total_estimado']}")
+    print(f"   💸 Valor Homologado (processado): {row['valor_total_homologado']}")
+    print(f"   🏢 CNPJ (extraído): {row['orgao_cnpj']}")
+    print(f"   🏛️ Razão Social (extraído): {row['razao_social']}")
+    print(f"   📍 UF Sigla (extraído): {row['uf']}")
+    print(f"   🌎 UF Nome (extraído): {row['uf_nome']}")
+    print(f"   🏢 Nome Unidade (extraído): {row['nome_unidade']}")
+    print(f"   🏙️ Município (extraído): {row['municipio_nome']}")
+    print(f"   🆔 Código IBGE (extraído): {row['codigo_ibge']}")
     print(f"   📋 Objeto: {bid.get('objetoCompra', '')[:100]}...")
     print(f"===========================================\n")
     
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO licitacoes (
-                    pncp_id, orgao_cnpj, ano_compra, sequencial_compra,
-                    objeto_compra, link_sistema_origem, data_publicacao,
-                    valor_total_estimado, uf, status,
-                    numero_controle_pncp, numero_compra, processo,
-                    valor_total_homologado, data_abertura_proposta, data_encerramento_proposta,
-                    modo_disputa_id, modo_disputa_nome, srp, 
-                    link_processo_eletronico, justificativa_presencial, razao_social,
-                    uf_nome, nome_unidade, municipio_nome, codigo_ibge, codigo_unidade
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            cursor.execute(f"""
+                INSERT INTO licitacoes ({', '.join(LICITACAO_COLUMNS)})
+                VALUES ({', '.join(['%s'] * len(LICITACAO_COLUMNS))})
                 ON CONFLICT (pncp_id) DO UPDATE SET
                     updated_at = NOW(),
-                    numero_controle_pncp = EXCLUDED.numero_controle_pncp,
-                    numero_compra = EXCLUDED.numero_compra,
-                    processo = EXCLUDED.processo,
-                    valor_total_homologado = EXCLUDED.valor_total_homologado,
-                    data_abertura_proposta = EXCLUDED.data_abertura_proposta,
-                    data_encerramento_proposta = EXCLUDED.data_encerramento_proposta,
-                    modo_disputa_id = EXCLUDED.modo_disputa_id,
-                    modo_disputa_nome = EXCLUDED.modo_disputa_nome,
-                    srp = EXCLUDED.srp,
-                    link_processo_eletronico = EXCLUDED.link_processo_eletronico,
-                    justificativa_presencial = EXCLUDED.justificativa_presencial,
-                    razao_social = EXCLUDED.razao_social,
-                    uf_nome = EXCLUDED.uf_nome,
-                    nome_unidade = EXCLUDED.nome_unidade,
-                    municipio_nome = EXCLUDED.municipio_nome,
-                    codigo_ibge = EXCLUDED.codigo_ibge,
-                    codigo_unidade = EXCLUDED.codigo_unidade
+                    {', '.join(f'{col} = EXCLUDED.{col}' for col in LICITACAO_MUTABLE_COLUMNS)}
                 RETURNING id
-            """, (
-                bid["numeroControlePNCP"],
-                orgao_cnpj,  # Usando variável extraída corretamente
-                bid["anoCompra"],
-                bid["sequencialCompra"],
-                bid["objetoCompra"],
-                bid.get("linkSistemaOrigem", ""),
-                bid.get("dataPublicacaoPncp"),  # Corrigido: era "dataPublicacao"
-                valor_total,
-                uf_sigla,  # Usando variável extraída corretamente
-                "coletada",
-                # Novos campos da API
-                bid.get("numeroControlePNCP"),  # Mesmo que pncp_id, mas vamos manter separado
-                bid.get("numeroCompra"),
-                bid.get("processo"),
-                valor_homologado,
-                bid.get("dataAberturaProposta"),
-                bid.get("dataEncerramentoProposta"),
-                bid.get("modoDisputaId"),
-                bid.get("modoDisputaNome"),
-                bid.get("srp"),  # Booleano - Sistema de Registro de Preços
-                bid.get("linkProcessoEletronico"),
-                bid.get("justificativaPresencial"),
-                razao_social,  # Nova razão social extraída
-                # Novos campos da unidadeOrgao
-                uf_nome,
-                nome_unidade,
-                municipio_nome,
-                codigo_ibge,
-                codigo_unidade
-            ))
+            """, [row[col] for col in LICITACAO_COLUMNS])
             result = cursor.fetchone()
             conn.commit()
             return str(result[0])
@@ -272,6 +498,109 @@ def save_bid_to_db(bid: Dict) -> str:
         conn.close()
 
 
+def upsert_changed_bids(bids: List[Dict]) -> Dict[str, int]:
+    """
+    Sincronização incremental: grava em lote contratações alteradas no PNCP pelo
+    mesmo caminho ON CONFLICT (pncp_id). Linhas existentes só são reescritas quando
+    alguma coluna mutável mudou (IS DISTINCT FROM); as demais não geram escrita.
+    Retorna as contagens {'inseridas', 'atualizadas', 'inalteradas'} e os
+    pncp_ids inseridos ('novas_ids'), que ainda precisam de itens e matching.
+    """
+    rows = {}
+    for bid in bids:
+        if bid.get("numeroControlePNCP") and bid.get("objetoCompra"):
+            rows[bid["numeroControlePNCP"]] = _bid_to_row(bid)  # último estado por pncp_id
+    if not rows:
+        return {'inseridas': 0, 'atualizadas': 0, 'inalteradas': 0, 'novas_ids': []}
+    
+    mutable_current = ', '.join(f'licitacoes.{col}' for col in LICITACAO_MUTABLE_COLUMNS)
+    mutable_new = ', '.join(f'EXCLUDED.{col}' for col in LICITACAO_MUTABLE_COLUMNS)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            results = execute_values(cursor, f"""
+                INSERT INTO licitacoes ({', '.join(LICITACAO_COLUMNS)})
+                VALUES %s
+                ON CONFLICT (pncp_id) DO UPDATE SET
+                    updated_at = NOW(),
+                    {', '.join(f'{col} = EXCLUDED.{col}' for col in LICITACAO_MUTABLE_COLUMNS)}
+                WHERE ({mutable_current}) IS DISTINCT FROM ({mutable_new})
+                RETURNING pncp_id, (xmax = 0) AS inserida
+            """, [tuple(row[col] for col in LICITACAO_COLUMNS) for row in rows.values()],
+                page_size=500, fetch=True)
+            conn.commit()
+    finally:
+        conn.close()
+    
+    novas_ids = [r[0] for r in results if r[1]]
+    return {
+        'inseridas': len(novas_ids),
+        'atualizadas': len(results) - len(novas_ids),
+        'inalteradas': len(rows) - len(results),
+        'novas_ids': novas_ids
+    }
+
+
+# Colunas de licitacao_itens preenchidas a partir da API de itens
+ITEM_COLUMNS = [
+    'licitacao_id', 'numero_item', 'descricao', 'quantidade',
+    'unidade_medida', 'valor_unitario_estimado',
+    'material_ou_servico', 'ncm_nbs_codigo',
+    'criterio_julgamento_id', 'criterio_julgamento_nome',
+    'tipo_beneficio_id', 'tipo_beneficio_nome',
+    'situacao_item_id', 'situacao_item_nome',
+    'aplicabilidade_margem_preferencia', 'percentual_margem_preferencia',
+    'tem_resultado'
+]
+# Colunas atualizadas quando o item já existe (campos da API 2)
+ITEM_INCREMENTAL_COLUMNS = ITEM_COLUMNS[6:]
+
+
+def _item_to_row(licitacao_id: str, item: Dict, index: int) -> Dict[str, Any]:
+    """Mapeia um item da API do PNCP para as colunas de licitacao_itens (com validação de valores)"""
+    # Limitar valor unitário ao DECIMAL(15,2)
+    valor_unitario = _clamp_valor(item.get("valorUnitarioEstimado", 0)) or 0
+    
+    # Validar quantidade
+    quantidade = item.get("quantidade", 0)
+    try:
+        quantidade = float(quantidade) if quantidade is not None else 0
+        if quantidade < 0:
+            quantidade = 0
+    except (ValueError, TypeError):
+        quantidade = 0
+    
+    # Validar percentual de margem preferencial
+    percentual_margem = item.get("percentualMargemPreferenciaNormal")
+    if percentual_margem is not None:
+        try:
+            percentual_margem = float(percentual_margem)
+            if percentual_margem < 0 or percentual_margem > 100:
+                percentual_margem = None
+        except (ValueError, TypeError):
+            percentual_margem = None
+    
+    return {
+        'licitacao_id': licitacao_id,
+        'numero_item': item.get("numeroItem", index),
+        'descricao': item.get("descricao", "") or "",
+        'quantidade': quantidade,
+        'unidade_medida': item.get("unidadeMedida", ""),
+        'valor_unitario_estimado': valor_unitario,
+        'material_ou_servico': item.get("materialOuServico"),  # 'M' ou 'S'
+        'ncm_nbs_codigo': item.get("ncmNbsCodigo"),
+        'criterio_julgamento_id': item.get("criterioJulgamentoId"),
+        'criterio_julgamento_nome': item.get("criterioJulgamentoNome"),
+        'tipo_beneficio_id': item.get("tipoBeneficio"),
+        'tipo_beneficio_nome': item.get("tipoBeneficioNome"),
+        'situacao_item_id': item.get("situacaoCompraItem"),
+        'situacao_item_nome': item.get("situacaoCompraItemNome"),
+        'aplicabilidade_margem_preferencia': item.get("aplicabilidadeMargemPreferenciaNormal", False),
+        'percentual_margem_preferencia': percentual_margem,
+        'tem_resultado': item.get("temResultado", False)
+    }
+
+
 def save_bid_items_to_db(licitacao_id: str, items: List[Dict]):
     """Salva os itens de uma licitação no banco"""
     if not items:
@@ -302,126 +631,246 @@ def save_bid_items_to_db(licitacao_id: str, items: List[Dict]):
     try:
         with conn.cursor() as cursor:
             for i, item in enumerate(items, 1):
-                # ===== VALIDAÇÕES DE VALORES =====
+                row = _item_to_row(licitacao_id, item, i)
                 
-                # Validar e limitar valor unitário estimado
-                valor_unitario = item.get("valorUnitarioEstimado", 0)
-                try:
-                    valor_unitario = float(valor_unitario) if valor_unitario is not None else 0
-                    # Limitar a 999 bilhões (limite do DECIMAL(15,2))
-                    if valor_unitario > 999999999999.99:
-                        valor_unitario = 999999999999.99
-                    elif valor_unitario < 0:
-                        valor_unitario = 0
-                except (ValueError, TypeError):
-                    valor_unitario = 0
-                
-                # Validar quantidade
-                quantidade = item.get("quantidade", 0)
-                try:
-                    quantidade = float(quantidade) if quantidade is not None else 0
-                    if quantidade < 0:
-                        quantidade = 0
-                except (ValueError, TypeError):
-                    quantidade = 0
-
-                # Validar percentual de margem preferencial
-                percentual_margem = item.get("percentualMargemPreferenciaNormal")
-                if percentual_margem is not None:
-                    try:
-                        percentual_margem = float(percentual_margem)
-                        if percentual_margem < 0 or percentual_margem > 100:
-                            percentual_margem = None
-                    except (ValueError, TypeError):
-                        percentual_margem = None
-
                 # ===== LOG DEBUG PARA ITEM INDIVIDUAL =====
-                print(f"      📦 Item {item.get('numeroItem', i)}:")
-                print(f"         📝 {item.get('descricao', '')[:40]}...")
+                print(f"      📦 Item {row['numero_item']}:")
+                print(f"         📝 {row['descricao'][:40]}...")
                 print(f"         🏷️  {item.get('materialOuServico')} - {item.get('materialOuServicoNome')}")
                 print(f"         🔍 NCM: {item.get('ncmNbsCodigo')}")
                 print(f"         ⚖️  Critério: {item.get('criterioJulgamentoNome')} (ID: {item.get('criterioJulgamentoId')})")
                 print(f"         🎯 Benefício: {item.get('tipoBeneficioNome')} (ID: {item.get('tipoBeneficio')})")
                 print(f"         📊 Status: {item.get('situacaoCompraItemNome')} (ID: {item.get('situacaoCompraItem')})")
-                print(f"         💰 Valor unitário: {valor_unitario}")
+                print(f"         💰 Valor unitário: {row['valor_unitario_estimado']}")
                 
-                cursor.execute("""
-                    INSERT INTO licitacao_itens (
-                        licitacao_id, numero_item, descricao, quantidade,
-                        unidade_medida, valor_unitario_estimado,
-                        material_ou_servico, ncm_nbs_codigo,
-                        criterio_julgamento_id, criterio_julgamento_nome,
-                        tipo_beneficio_id, tipo_beneficio_nome,
-                        situacao_item_id, situacao_item_nome,
-                        aplicabilidade_margem_preferencia, percentual_margem_preferencia,
-                        tem_resultado
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                cursor.execute(f"""
+                    INSERT INTO licitacao_itens ({', '.join(ITEM_COLUMNS)})
+                    VALUES ({', '.join(['%s'] * len(ITEM_COLUMNS))})
                     ON CONFLICT (licitacao_id, numero_item) DO UPDATE SET
-                        material_ou_servico = EXCLUDED.material_ou_servico,
-                        ncm_nbs_codigo = EXCLUDED.ncm_nbs_codigo,
-                        criterio_julgamento_id = EXCLUDED.criterio_julgamento_id,
-                        criterio_julgamento_nome = EXCLUDED.criterio_julgamento_nome,
-                        tipo_beneficio_id = EXCLUDED.tipo_beneficio_id,
-                        tipo_beneficio_nome = EXCLUDED.tipo_beneficio_nome,
-                        situacao_item_id = EXCLUDED.situacao_item_id,
-                        situacao_item_nome = EXCLUDED.situacao_item_nome,
-                        aplicabilidade_margem_preferencia = EXCLUDED.aplicabilidade_margem_preferencia,
-                        percentual_margem_preferencia = EXCLUDED.percentual_margem_preferencia,
-                        tem_resultado = EXCLUDED.tem_resultado,
+                        {', '.join(f'{col} = EXCLUDED.{col}' for col in ITEM_INCREMENTAL_COLUMNS)},
                         updated_at = NOW()
-                """, (
-                    licitacao_id,
-                    item.get("numeroItem", i),
-                    item.get("descricao", ""),
-                    quantidade,
-                    item.get("unidadeMedida", ""),
-                    valor_unitario,
-                    # Novos campos da API 2
-                    item.get("materialOuServico"),  # 'M' ou 'S'
-                    item.get("ncmNbsCodigo"),  # Código NCM/NBS
-                    item.get("criterioJulgamentoId"),  # ID do critério
-                    item.get("criterioJulgamentoNome"),  # Nome do critério
-                    item.get("tipoBeneficio"),  # ID do tipo de benefício
-                    item.get("tipoBeneficioNome"),  # Nome do tipo de benefício
-                    item.get("situacaoCompraItem"),  # ID da situação
-                    item.get("situacaoCompraItemNome"),  # Nome da situação
-                    item.get("aplicabilidadeMargemPreferenciaNormal", False),  # Booleano
-                    percentual_margem,  # Percentual validado
-                    item.get("temResultado", False)  # Booleano
-                ))
+                """, tuple(row[col] for col in ITEM_COLUMNS))
             conn.commit()
     finally:
         conn.close()
 
 
-def save_match_to_db(licitacao_id: str, empresa_id: str, score: float, match_type: str, justificativa: str = ""):
-    """Salva um match no banco de dados"""
-    # Converter score para float Python nativo se for numpy
+def upsert_bid_items_bulk(items_by_licitacao: Dict[str, List[Dict]]) -> int:
+    """
+    Grava em lote os itens de várias licitações, reescrevendo todas as colunas
+    mapeadas (usado no reprocessamento a partir do arquivo de payloads).
+    Retorna o número de itens gravados.
+    """
+    rows = {}
+    for licitacao_id, items in items_by_licitacao.items():
+        for i, item in enumerate(items or [], 1):
+            row = _item_to_row(licitacao_id, item, i)
+            rows[(licitacao_id, row['numero_item'])] = row  # um item por (licitação, número)
+    if not rows:
+        return 0
+    
+    updatable = [col for col in ITEM_COLUMNS if col not in ('licitacao_id', 'numero_item')]
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            execute_values(cursor, f"""
+                INSERT INTO licitacao_itens ({', '.join(ITEM_COLUMNS)})
+                VALUES %s
+                ON CONFLICT (licitacao_id, numero_item) DO UPDATE SET
+                    {', '.join(f'{col} = EXCLUDED.{col}' for col in updatable)},
+                    updated_at = NOW()
+            """, [tuple(row[col] for col in ITEM_COLUMNS) for row in rows.values()], page_size=1000)
+            conn.commit()
+            return len(rows)
+    finally:
+        conn.close()
+
+
+MATCH_UPSERT_SQL = """
+    INSERT INTO matches (
+        licitacao_id, empresa_id, score_similaridade,
+        match_type, justificativa_match
+    ) VALUES %s
+    ON CONFLICT (licitacao_id, empresa_id) DO UPDATE SET
+        score_similaridade = EXCLUDED.score_similaridade,
+        match_type = EXCLUDED.match_type,
+        justificativa_match = EXCLUDED.justificativa_match,
+        data_match = NOW()
+"""
+
+
+def _to_native_score(score) -> float:
+    """Converte score para float Python nativo (numpy -> float)"""
     if hasattr(score, 'item'):
-        score = float(score.item())
-    else:
-        score = float(score)
+        return float(score.item())
+    return float(score)
+
+
+def save_matches_to_db(licitacao_id: str, matches: List[Dict[str, Any]]) -> int:
+    """
+    Salva (upsert) em lote os matches de uma licitação.
+    Cada match é um dict com empresa_id, score, match_type e justificativa.
+    Idempotente: reexecuções atualizam o par (licitacao_id, empresa_id) existente.
+    """
+    if not matches:
+        return 0
+    
+    # Deduplicar por empresa dentro do lote (ON CONFLICT não aceita o mesmo par duas vezes)
+    rows_by_company = {}
+    for match in matches:
+        rows_by_company[match['empresa_id']] = (
+            licitacao_id,
+            match['empresa_id'],
+            _to_native_score(match['score']),
+            match['match_type'],
+            match.get('justificativa', '')
+        )
+    rows = list(rows_by_company.values())
     
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO matches (
-                    licitacao_id, empresa_id, score_similaridade, 
-                    match_type, justificativa_match
-                ) VALUES (
-                    (SELECT id FROM licitacoes WHERE pncp_id = %s), 
-                    %s, %s, %s, %s
-                )
-            """, (licitacao_id, empresa_id, score, match_type, justificativa))
+            execute_values(cursor, MATCH_UPSERT_SQL, rows, page_size=500)
+            conn.commit()
+            print(f"      ✅ {len(rows)} matches salvos (upsert)")
+            return len(rows)
+    finally:
+        conn.close()
+
+
+def replace_matches_for_bids(licitacao_ids: List[str], matches_by_bid: Dict[str, List[Dict[str, Any]]]) -> int:
+    """
+    Substitui, em uma única transação, os matches das licitações informadas
+    pelo novo conjunto (usado ao confirmar o recálculo de thresholds).
+    """
+    rows = [
+        (licitacao_id, match['empresa_id'], _to_native_score(match['score']),
+         match['match_type'], match.get('justificativa', ''))
+        for licitacao_id, matches in matches_by_bid.items()
+        for match in matches
+    ]
+    
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM matches WHERE licitacao_id = ANY(%s::uuid[])",
+                (licitacao_ids,)
+            )
+            removed = cursor.rowcount
+            if rows:
+                execute_values(cursor, MATCH_UPSERT_SQL, rows, page_size=500)
+            conn.commit()
+            print(f"🔁 Matches substituídos: {removed} removidos, {len(rows)} gravados")
+            return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def delete_matches_by_pairs(pairs: List[Tuple[str, str]]) -> int:
+    """Remove matches pelos pares (licitacao_id, empresa_id)"""
+    if not pairs:
+        return 0
+    
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            execute_values(cursor, """
+                DELETE FROM matches m
+                USING (VALUES %s) AS p(licitacao_id, empresa_id)
+                WHERE m.licitacao_id = p.licitacao_id::uuid
+                  AND m.empresa_id = p.empresa_id::uuid
+            """, pairs, page_size=500)
             conn.commit()
-            print(f"      ✅ Match salvo: Score {score:.3f} - {match_type}")
-            if justificativa:
-                print(f"         💡 Justificativa: {justificativa}")
+            return len(pairs)
     finally:
         conn.close()
 
 
+def get_match_scores_from_db(since: Optional[Any] = None) -> List[Tuple[str, str, float]]:
+    """Retorna (licitacao_id, empresa_id, score) dos matches gravados (opcionalmente desde uma data)"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            if since:
+                cursor.execute("""
+                    SELECT licitacao_id, empresa_id, score_similaridade
+                    FROM matches WHERE data_match >= %s
+                """, (since,))
+            else:
+                cursor.execute("SELECT licitacao_id, empresa_id, score_similaridade FROM matches")
+            return [(str(row[0]), str(row[1]), float(row[2])) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def trim_run_matches_per_company(top_k: int, run_started_at: Optional[Any] = None) -> int:
+    """
+    Limite por execução: mantém os top-K matches (por score) de cada empresa entre os
+    gravados a partir de run_started_at. Não é um limite global — matches de execuções
+    anteriores não contam para o limite nem são removidos.
+    Usado ao final do backfill e da reavaliação em shards, onde o limite é aplicado
+    depois das gravações paralelas. Sem run_started_at considera todos os matches.
+    """
+    if top_k <= 0:
+        return 0
+    where = "WHERE data_match >= %s" if run_started_at is not None else ""
+    params = ([run_started_at] if run_started_at is not None else []) + [top_k]
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                DELETE FROM matches m
+                USING (
+                    SELECT licitacao_id, empresa_id,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY empresa_id
+                               ORDER BY score_similaridade DESC, licitacao_id
+                           ) AS posicao
+                    FROM matches
+                    {where}
+                ) ranked
+                WHERE ranked.posicao > %s
+                  AND m.licitacao_id = ranked.licitacao_id
+                  AND m.empresa_id = ranked.empresa_id
+            """, params)
+            removed = cursor.rowcount
+            conn.commit()
+            return removed
+    finally:
+        conn.close()
+
+
+def save_match_to_db(pncp_id: str, empresa_id: str, score: float, match_type: str, justificativa: str = ""):
+    """
+    Salva (upsert) um único match no banco de dados
+    A licitação é identificada pelo pncp_id (numeroControlePNCP), como antes do upsert em lote.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM licitacoes WHERE pncp_id = %s", (pncp_id,))
+            row = cursor.fetchone()
+    finally:
+        conn.close()
+    if not row:
+        print(f"      ⚠️ Licitação {pncp_id} não encontrada: match não salvo")
+        return
+    
+    save_matches_to_db(str(row[0]), [{
+        'empresa_id': empresa_id,
+        'score': score,
+        'match_type': match_type,
+        'justificativa': justificativa
+    }])
+    print(f"         📊 Score {_to_native_score(score):.3f} - {match_type}")
+    if justificativa:
+        print(f"         💡 Justificativa: {justificativa}")
+
+
 def update_bid_status(pncp_id: str, status: str):
     """Atualiza o status de uma licitação"""
     conn = get_db_connection()
@@ -437,56 +886,123 @@ def update_bid_status(pncp_id: str, status: str):
         conn.close()
 
 
-def get_existing_bids_from_db() -> List[Dict[str, Any]]:
-    """Busca todas as licitações já armazenadas no banco de dados"""
+# Bucket de uma licitação para reavaliação em shards (hash estável do id, sempre não negativo)
+SHARD_BUCKET_SQL = "mod(hashtext(l.id::text)::bigint + 2147483648, %s)"
+
+
+def _existing_bids_filter(after: Optional[Tuple[Any, str]],
+                          shard: Optional[Tuple[int, int]]) -> Tuple[str, List[Any]]:
+    """WHERE da varredura de licitações: after=(created_at, id) e bucket de shard"""
+    conditions = []
+    params = []
+    if after:
+        conditions.append("(l.created_at, l.id) < (%s, %s::uuid)")
+        params.extend([after[0], after[1]])
+    if shard:
+        conditions.append(f"{SHARD_BUCKET_SQL} = %s")
+        params.extend([shard[1], shard[0]])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+
+def count_existing_bids_from_db(after: Optional[Tuple[Any, str]] = None,
+                                shard: Optional[Tuple[int, int]] = None) -> int:
+    """Quantidade de licitações que iter_existing_bids_from_db vai percorrer"""
+    where, params = _existing_bids_filter(after, shard)
     conn = get_db_connection()
     try:
-        with conn.cursor(cursor_factory=DictCursor) as cursor:
-            cursor.execute("""
-                SELECT 
-                    l.id, l.pncp_id, l.objeto_compra, l.uf, l.valor_total_estimado,
-                    l.data_publicacao, l.status, l.created_at
-                FROM licitacoes l
-                ORDER BY l.created_at DESC
-            """)
-            bids = []
-            for row in cursor.fetchall():
-                bids.append({
-                    'id': str(row['id']),
-                    'pncp_id': row['pncp_id'],
-                    'objeto_compra': row['objeto_compra'],
-                    'uf': row['uf'],
-                    'valor_total_estimado': row['valor_total_estimado'],
-                    'data_publicacao': row['data_publicacao'],
-                    'status': row['status'],
-                    'created_at': row['created_at']
-                })
-            return bids
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM licitacoes l {where}", params)
+            return cursor.fetchone()[0]
     finally:
         conn.close()
 
 
+def iter_existing_bids_from_db(after: Optional[Tuple[Any, str]] = None,
+                               shard: Optional[Tuple[int, int]] = None,
+                               page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Percorre as licitações já armazenadas em páginas por keyset (page_size por consulta).
+    Cada página é uma consulta curta: a conexão volta ao pool entre as páginas, sem
+    transação aberta durante a reavaliação (que leva horas).
+    Ordem estável (created_at DESC, id DESC); after=(created_at, id) retoma após essa licitação.
+    shard=(índice, total) restringe ao bucket de hash do id (reavaliação em shards).
+    """
+    page_size = page_size or DB_STREAM_ITERSIZE
+    while True:
+        where, params = _existing_bids_filter(after, shard)
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT 
+                        l.id, l.pncp_id, l.objeto_compra, l.uf, l.valor_total_estimado,
+                        l.data_publicacao, l.status, l.created_at
+                    FROM licitacoes l
+                    {where}
+                    ORDER BY l.created_at DESC, l.id DESC
+                    LIMIT %s
+                """, params + [page_size])
+                rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        for id_, pncp_id, objeto_compra, uf, valor, data_publicacao, status, created_at in rows:
+            yield {
+                'id': str(id_),
+                'pncp_id': pncp_id,
+                'objeto_compra': objeto_compra,
+                'uf': uf,
+                'valor_total_estimado': valor,
+                'data_publicacao': data_publicacao,
+                'status': status,
+                'created_at': created_at
+            }
+        if len(rows) < page_size:
+            return
+        after = (rows[-1][7], str(rows[-1][0]))
+
+
+def get_existing_bids_from_db(after: Optional[Tuple[Any, str]] = None,
+                              shard: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Busca todas as licitações já armazenadas no banco de dados (lista).
+    Para a tabela inteira prefira iter_existing_bids_from_db.
+    """
+    return list(iter_existing_bids_from_db(after=after, shard=shard))
+
+
 def get_bid_items_from_db(licitacao_id: str) -> List[Dict[str, Any]]:
     """Busca os itens de uma licitação específica do banco"""
+    return get_items_for_bids_from_db([licitacao_id]).get(licitacao_id, [])
+
+
+def get_items_for_bids_from_db(licitacao_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Busca os itens de várias licitações em uma consulta (licitacao_id = ANY)
+    Retorna {licitacao_id: [itens ordenados por número]}; licitações sem itens ficam de fora.
+    """
+    if not licitacao_ids:
+        return {}
     conn = get_db_connection()
     try:
         with conn.cursor(cursor_factory=DictCursor) as cursor:
             cursor.execute("""
-                SELECT numero_item, descricao, quantidade, unidade_medida, valor_unitario_estimado
+                SELECT licitacao_id, numero_item, descricao, quantidade, unidade_medida, valor_unitario_estimado
                 FROM licitacao_itens
-                WHERE licitacao_id = %s
-                ORDER BY numero_item
-            """, (licitacao_id,))
-            items = []
+                WHERE licitacao_id = ANY(%s::uuid[])
+                ORDER BY licitacao_id, numero_item
+            """, (list(licitacao_ids),))
+            items_by_bid: Dict[str, List[Dict[str, Any]]] = {}
             for row in cursor.fetchall():
-                items.append({
+                items_by_bid.setdefault(str(row['licitacao_id']), []).append({
                     'numeroItem': row['numero_item'],
                     'descricao': row['descricao'],
                     'quantidade': row['quantidade'],
                     'unidadeMedida': row['unidade_medida'],
                     'valorUnitarioEstimado': row['valor_unitario_estimado']
                 })
-            return items
+            return items_by_bid
     finally:
         conn.close()
 
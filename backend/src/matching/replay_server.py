@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Servidor de replay do PNCP
+Substituto local das APIs de publicação/atualização e de itens para benchmarks e
+testes de regressão de vazão sem acessar pncp.gov.br. Serve contratações gravadas
+no arquivo de payloads (PNCP_ARCHIVE_DIR) ou sintéticas, com latência, taxa de
+erros e respostas 429 configuráveis. Aponte o pncp_api para ele com
+PNCP_API_HOST=http://127.0.0.1:<porta>.
+"""
+
+import json
+import time
+import random
+import datetime
+import threading
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+PATH_PUBLICACAO = "/api/consulta/v1/contratacoes/publicacao"
+PATH_ATUALIZACAO = "/api/consulta/v1/contratacoes/atualizacao"
+PATH_ITENS_PREFIX = "/api/pncp/v1/orgaos/"
+
+OBJETOS_SINTETICOS = [
+    "Aquisição de material de expediente para as unidades administrativas",
+    "Contratação de empresa para prestação de serviços de limpeza e conservação predial",
+    "Aquisição de gêneros alimentícios para a merenda escolar",
+    "Registro de preços para aquisição de medicamentos da farmácia básica",
+    "Contratação de serviços de manutenção preventiva e corretiva de veículos",
+    "Aquisição de equipamentos de informática e periféricos",
+    "Prestação de serviços de vigilância patrimonial armada e desarmada",
+    "Aquisição de materiais de construção para reforma de escolas municipais",
+    "Contratação de serviços de locação de impressoras multifuncionais",
+    "Fornecimento de combustível para a frota municipal"
+]
+UFS_NOMES = {
+    "AC": "Acre", "AL": "Alagoas", "AP": "Amapá", "AM": "Amazonas", "BA": "Bahia", "CE": "Ceará",
+    "DF": "Distrito Federal", "ES": "Espírito Santo", "GO": "Goiás", "MA": "Maranhão",
+    "MT": "Mato Grosso", "MS": "Mato Grosso do Sul", "MG": "Minas Gerais", "PA": "Pará",
+    "PB": "Paraíba", "PR": "Paraná", "PE": "Pernambuco", "PI": "Piauí", "RJ": "Rio de Janeiro",
+    "RN": "Rio Grande do Norte", "RS": "Rio Grande do Sul", "RO": "Rondônia", "RR": "Roraima",
+    "SC": "Santa Catarina", "SP": "São Paulo", "SE": "Sergipe", "TO": "Tocantins"
+}
+
+
+@dataclass
+class ReplayConfig:
+    """Comportamento simulado do servidor"""
+    latency_ms: float = 50.0          # Latência média por resposta
+    jitter_ms: float = 20.0           # Variação uniforme (+/-) da latência
+    error_rate: float = 0.0           # Fração de respostas 500
+    throttle_rate: float = 0.0        # Fração de respostas 429 aleatórias
+    max_rps: float = 0.0              # Acima disso responde 429 (0 = sem limite)
+    retry_after: float = 1.0          # Retry-After enviado nas respostas 429
+    bids_per_unit: int = 120          # Contratações sintéticas por dia × UF × modalidade
+    items_per_bid: int = 5            # Itens sintéticos por contratação
+    seed: int = 42
+
+
+class ReplayDataset:
+    """Contratações e itens servidos pelo replay (gravados ou sintéticos)"""
+
+    def __init__(self, config: ReplayConfig):
+        self.config = config
+        self._recorded: Optional[Dict[Tuple[str, str, int], List[Dict[str, Any]]]] = None
+        self._recorded_items: Dict[str, List[Dict[str, Any]]] = {}
+        self._recorded_keys: Dict[Tuple[str, int, int], str] = {}  # (cnpj, ano, sequencial) -> pncp_id
+
+    def load_archive(self, start_date: datetime.date, end_date: datetime.date, base_dir: Optional[str] = None) -> int:
+        """Carrega contratações e itens gravados no arquivo de payloads"""
+        from .archive import iter_archive_records, KIND_BID, PNCP_ARCHIVE_DIR
+
+        self._recorded = {}
+        total = 0
+        for record in iter_archive_records(start_date, end_date, base_dir=base_dir or PNCP_ARCHIVE_DIR):
+            payload = record['payload']
+            if record['kind'] == KIND_BID:
+                key = (
+                    str(payload.get("dataPublicacaoPncp", ""))[:10].replace("-", ""),
+                    (payload.get("unidadeOrgao") or {}).get("ufSigla", ""),
+                    int(payload.get("modalidadeId") or 6)
+                )
+                self._recorded.setdefault(key, []).append(payload)
+                self._recorded_keys[(
+                    (payload.get("orgaoEntidade") or {}).get("cnpj", ""),
+                    int(payload.get("anoCompra") or 0), int(payload.get("sequencialCompra") or 0)
+                )] = record['pncp_id']
+                total += 1
+            else:
+                self._recorded_items[record['pncp_id']] = payload
+        return total
+
+    def bids(self, date_str: str, uf: Optional[str], modalidade: int) -> List[Dict[str, Any]]:
+        """Contratações de um dia (AAAAMMDD), UF (None = todas) e modalidade"""
+        if self._recorded is not None:
+            return [
+                bid for (day, bid_uf, mod), bids in self._recorded.items()
+                if day == date_str and mod == modalidade and (uf is None or bid_uf == uf)
+                for bid in bids
+            ]
+        ufs = [uf] if uf else list(UFS_NOMES)
+        return [bid for u in ufs for bid in self._synthetic_bids(date_str, u, modalidade)]
+
+    def items(self, cnpj: str, ano: int, sequencial: int) -> List[Dict[str, Any]]:
+        """Itens de uma contratação"""
+        if self._recorded is not None:
+            pncp_id = self._recorded_keys.get((cnpj, int(ano), int(sequencial)))
+            return self._recorded_items.get(pncp_id, []) if pncp_id else []
+        rng = random.Random(f"{self.config.seed}:{cnpj}:{ano}:{sequencial}")
+        return [
+            {
+                "numeroItem": i,
+                "descricao": f"{rng.choice(OBJETOS_SINTETICOS)} - item {i}",
+                "materialOuServico": rng.choice(["M", "S"]),
+                "materialOuServicoNome": "Material",
+                "valorUnitarioEstimado": round(rng.uniform(1, 5000), 2),
+                "quantidade": rng.randint(1, 500),
+                "unidadeMedida": "UN",
+                "criterioJulgamentoId": 1,
+                "criterioJulgamentoNome": "Menor preço",
+                "situacaoCompraItem": 1,
+                "situacaoCompraItemNome": "Em Andamento",
+                "tipoBeneficio": 4,
+                "tipoBeneficioNome": "Sem benefício",
+                "temResultado": False
+            }
+            for i in range(1, self.config.items_per_bid + 1)
+        ]
+
+    def _synthetic_bids(self, date_str: str, uf: str, modalidade: int) -> List[Dict[str, Any]]:
+        """Contratações determinísticas para dia × UF × modalidade"""
+        rng = random.Random(f"{self.config.seed}:{date_str}:{uf}:{modalidade}")
+        day = datetime.datetime.strptime(date_str, "%Y%m%d")
+        uf_index = list(UFS_NOMES).index(uf) if uf in UFS_NOMES else 0
+        bids = []
+        for n in range(self.config.bids_per_unit):
+            cnpj = f"{10 + uf_index:02d}{modalidade:02d}{n:010d}"
+            sequencial = int(date_str[-4:]) * 10000 + n
+            published = day + datetime.timedelta(minutes=rng.randint(0, 1439))
+            bids.append({
+                "numeroControlePNCP": f"{cnpj}-1-{sequencial:06d}/{day.year}",
+                "anoCompra": day.year,
+                "sequencialCompra": sequencial,
+                "numeroCompra": str(n + 1),
+                "processo": f"{n + 1}/{day.year}",
+                "objetoCompra": rng.choice(OBJETOS_SINTETICOS),
+                "modalidadeId": modalidade,
+                "valorTotalEstimado": round(rng.uniform(1000, 5000000), 2),
+                "valorTotalHomologado": None,
+                "dataPublicacaoPncp": published.isoformat(),
+                "dataAtualizacao": published.isoformat(),
+                "dataAberturaProposta": (published + datetime.timedelta(days=8)).isoformat(),
+                "dataEncerramentoProposta": (published + datetime.timedelta(days=15)).isoformat(),
+                "modoDisputaId": 1,
+                "modoDisputaNome": "Aberto",
+                "situacaoCompraId": 1,
+                "situacaoCompraNome": "Divulgada no PNCP",
+                "srp": rng.random() < 0.5,
+                "linkSistemaOrigem": "",
+                "orgaoEntidade": {"cnpj": cnpj, "razaoSocial": f"MUNICIPIO SINTETICO {uf} {n}"},
+                "unidadeOrgao": {
+                    "ufSigla": uf, "ufNome": UFS_NOMES.get(uf, uf),
+                    "municipioNome": f"Município {n % 50}", "codigoIbge": str(1000000 + n),
+                    "codigoUnidade": str(n), "nomeUnidade": "Secretaria de Administração"
+                }
+            })
+        return bids
+
+
+class ReplayStats:
+    """Contadores do servidor (expostos em /__stats)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'listagens': 0, 'itens': 0, 'erros_500': 0, 'respostas_429': 0, 'nao_encontrado': 0}
+        self.started = time.monotonic()
+        self._window: List[float] = []
+
+    def count(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    def over_rate(self, max_rps: float) -> bool:
+        """Janela deslizante de 1s para simular o limite de requisições do PNCP"""
+        if max_rps <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= max_rps:
+                return True
+            self._window.append(now)
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                **self.counters,
+                'segundos': round(elapsed, 2),
+                'requests_por_segundo': round(self.counters['requests'] / elapsed, 2) if elapsed > 0 else None
+            }
+
+    def reset(self):
+        with self._lock:
+            for key in self.counters:
+                self.counters[key] = 0
+            self.started = time.monotonic()
+            self._window = []
+
+
+def _make_handler(dataset: ReplayDataset, config: ReplayConfig, stats: ReplayStats):
+    rng = random.Random(config.seed)
+    rng_lock = threading.Lock()
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - assinatura do BaseHTTPRequestHandler
+            pass
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path == "/__stats":
+                return self._send_json(200, stats.snapshot())
+            if parsed.path == "/__reset":
+                stats.reset()
+                return self._send_json(200, {'ok': True})
+
+            stats.count('requests')
+            with rng_lock:
+                delay = max(0.0, config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+                roll = rng.random()
+            time.sleep(delay)
+
+            if stats.over_rate(config.max_rps) or roll < config.throttle_rate:
+                stats.count('respostas_429')
+                return self._send_json(429, {'message': 'Too Many Requests'}, {'Retry-After': str(config.retry_after)})
+            if roll < config.throttle_rate + config.error_rate:
+                stats.count('erros_500')
+                return self._send_json(500, {'message': 'Erro simulado'})
+
+            params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+            if parsed.path in (PATH_PUBLICACAO, PATH_ATUALIZACAO):
+                return self._listing(params)
+            if parsed.path.startswith(PATH_ITENS_PREFIX) and parsed.path.endswith("/itens"):
+                return self._items(parsed.path)
+            stats.count('nao_encontrado')
+            return self._send_json(404, {'message': 'Não encontrado'})
+
+        def _listing(self, params: Dict[str, str]):
+            stats.count('listagens')
+            try:
+                start = datetime.datetime.strptime(params["dataInicial"], "%Y%m%d").date()
+                end = datetime.datetime.strptime(params["dataFinal"], "%Y%m%d").date()
+                page = int(params.get("pagina", 1))
+                size = min(int(params.get("tamanhoPagina", 50)), 50)
+                modalidade = int(params.get("codigoModalidadeContratacao", 6))
+            except (KeyError, ValueError):
+                return self._send_json(400, {'message': 'Parâmetros inválidos'})
+
+            records = []
+            day = start
+            while day <= end:
+                records.extend(dataset.bids(day.strftime("%Y%m%d"), params.get("uf"), modalidade))
+                day += datetime.timedelta(days=1)
+
+            total_pages = -(-len(records) // size) if records else 0
+            page_records = records[(page - 1) * size: page * size]
+            if not page_records:
+                # Mesmo comportamento do PNCP: 204 sem corpo
+                return self._send(204, b"", {})
+            return self._send_json(200, {
+                'data': page_records,
+                'totalRegistros': len(records),
+                'totalPaginas': total_pages,
+                'numeroPagina': page,
+                'paginasRestantes': max(0, total_pages - page),
+                'empty': False
+            })
+
+        def _items(self, path: str):
+            stats.count('itens')
+            parts = path[len(PATH_ITENS_PREFIX):].split("/")
+            try:
+                cnpj, ano, sequencial = parts[0], int(parts[2]), int(parts[3])
+            except (IndexError, ValueError):
+                return self._send_json(400, {'message': 'Caminho inválido'})
+            return self._send_json(200, dataset.items(cnpj, ano, sequencial))
+
+        def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self._send(status, payload, {'Content-Type': 'application/json; charset=utf-8', **(headers or {})})
+
+        def _send(self, status: int, payload: bytes, headers: Dict[str, str]):
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            if payload:
+                self.wfile.write(payload)
+
+    return ReplayHandler
+
+
+class PNCPReplayServer:
+    """Servidor HTTP de replay (roda em thread própria)"""
+
+    def __init__(self, config: Optional[ReplayConfig] = None, dataset: Optional[ReplayDataset] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.config = config or ReplayConfig()
+        self.dataset = dataset or ReplayDataset(self.config)
+        self.stats = ReplayStats()
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self.dataset, self.config, self.stats))
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "PNCPReplayServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="pncp-replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Matriz esparsa de scores por execução do matching
+Registra os top-N scores licitação × empresa (Fase 1) e os scores de itens (Fase 2)
+de cada execução e permite recalcular o conjunto de matches para novos thresholds
+sem novas chamadas de embedding.
+"""
+
+import os
+import io
+import time
+import numpy as np
+from typing import List, Dict, Any, Tuple, Optional
+from psycopg2.extras import DictCursor
+
+from .pncp_api import get_db_connection, replace_matches_for_bids
+from .scoring import MATCH_TOP_K_PER_BID, MATCH_TOP_K_PER_COMPANY
+from .summaries import refresh_summaries
+
+# --- Configurações da matriz de scores ---
+SCORE_MATRIX_ENABLED = os.getenv('SCORE_MATRIX_ENABLED', 'true').lower() == 'true'
+SCORE_MATRIX_TOP_N = int(os.getenv('SCORE_MATRIX_TOP_N', '50'))
+SCORE_MATRIX_MIN_SCORE = float(os.getenv('SCORE_MATRIX_MIN_SCORE', '0.45'))
+SCORE_MATRIX_KEEP_RUNS = int(os.getenv('SCORE_MATRIX_KEEP_RUNS', '10'))
+
+# Situação dos itens de cada licitação na execução
+ITEMS_NOT_EVALUATED = -1  # Sem candidatos no threshold da execução: itens não vetorizados
+ITEMS_ABSENT = 0          # Licitação sem itens (apenas Fase 1)
+ITEMS_SCORED = 1          # Scores de itens registrados para os pares da licitação
+
+
+class ScoreMatrixRecorder:
+    """Acumula a matriz esparsa (formato COO + CSR para itens) durante uma execução"""
+
+    def __init__(self, run_type: str, vectorizer_name: str,
+                 threshold_phase1: float, threshold_phase2: float,
+                 top_n: Optional[int] = None, min_score: Optional[float] = None):
+        self.run_type = run_type
+        self.vectorizer_name = vectorizer_name
+        self.threshold_phase1 = threshold_phase1
+        self.threshold_phase2 = threshold_phase2
+        self.top_n = SCORE_MATRIX_TOP_N if top_n is None else top_n
+        # O piso nunca fica acima dos thresholds da própria execução
+        floor = SCORE_MATRIX_MIN_SCORE if min_score is None else min_score
+        self.min_score = min(floor, threshold_phase1, threshold_phase2)
+
+        self._bid_ids: List[str] = []
+        self._bid_items: List[int] = []
+        self._company_ids: List[str] = []
+        self._company_index: Dict[str, int] = {}
+        self._pair_bid: List[int] = []
+        self._pair_company: List[int] = []
+        self._pair_phase1: List[float] = []
+        self._item_lengths: List[int] = []
+        self._item_scores: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._pair_bid)
+
+    def _company_position(self, company_id: str) -> int:
+        position = self._company_index.get(company_id)
+        if position is None:
+            position = len(self._company_ids)
+            self._company_index[company_id] = position
+            self._company_ids.append(company_id)
+        return position
+
+    def add_bid(self, licitacao_id: str, candidates: List[Tuple[Dict[str, Any], float, str]],
+                item_scores_by_company: Optional[Dict[str, List[Tuple[str, float]]]],
+                items_status: int):
+        """
+        Registra uma licitação: candidatos (empresa, score fase 1, justificativa) já ordenados
+        e, se disponíveis, os scores de itens por empresa.
+        """
+        bid_position = len(self._bid_ids)
+        self._bid_ids.append(licitacao_id)
+        self._bid_items.append(items_status)
+
+        for company, score, _ in candidates[:self.top_n]:
+            if score < self.min_score:
+                break
+            self._pair_bid.append(bid_position)
+            self._pair_company.append(self._company_position(company["id"]))
+            self._pair_phase1.append(score)
+
+            item_scores = []
+            if item_scores_by_company:
+                item_scores = [s for _, s in item_scores_by_company.get(company["id"], []) if s >= self.min_score]
+            self._item_lengths.append(len(item_scores))
+            self._item_scores.extend(item_scores)
+
+    def to_payload(self) -> bytes:
+        """Serializa a matriz em npz comprimido"""
+        offsets = np.zeros(len(self._item_lengths) + 1, dtype=np.int64)
+        np.cumsum(self._item_lengths, out=offsets[1:])
+
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            bid_ids=np.asarray(self._bid_ids, dtype=str),
+            bid_items=np.asarray(self._bid_items, dtype=np.int8),
+            company_ids=np.asarray(self._company_ids, dtype=str),
+            pair_bid=np.asarray(self._pair_bid, dtype=np.int32),
+            pair_company=np.asarray(self._pair_company, dtype=np.int32),
+            pair_phase1=np.asarray(self._pair_phase1, dtype=np.float32),
+            item_offsets=offsets,
+            item_scores=np.asarray(self._item_scores, dtype=np.float32)
+        )
+        return buffer.getvalue()
+
+    def add_payload(self, payload: bytes):
+        """Incorpora a matriz serializada de outra parte da execução (ex: um shard da reavaliação)"""
+        with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+            bid_offset = len(self._bid_ids)
+            self._bid_ids.extend(data['bid_ids'].tolist())
+            self._bid_items.extend(data['bid_items'].tolist())
+
+            company_positions = np.asarray(
+                [self._company_position(c) for c in data['company_ids'].tolist()], dtype=np.int32
+            )
+            self._pair_bid.extend((data['pair_bid'] + bid_offset).tolist())
+            if len(data['pair_company']):
+                self._pair_company.extend(company_positions[data['pair_company']].tolist())
+            self._pair_phase1.extend(data['pair_phase1'].tolist())
+            self._item_lengths.extend(np.diff(data['item_offsets']).tolist())
+            self._item_scores.extend(data['item_scores'].astype(np.float32).tolist())
+
+    def save(self) -> Optional[str]:
+        """Persiste a matriz da execução e remove execuções antigas. Retorna o id da execução."""
+        if not self._bid_ids:
+            return None
+
+        payload = self.to_payload()
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO matching_score_runs (
+                        run_type, vectorizer, threshold_phase1, threshold_phase2,
+                        top_n, min_score, n_bids, n_companies, nnz, payload, payload_bytes
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    RETURNING id
+                """, (
+                    self.run_type, self.vectorizer_name, self.threshold_phase1, self.threshold_phase2,
+                    self.top_n, self.min_score, len(self._bid_ids), len(self._company_ids),
+                    len(self._pair_bid), bytes(payload), len(payload)
+                ))
+                run_id = str(cursor.fetchone()[0])
+
+                if SCORE_MATRIX_KEEP_RUNS > 0:
+                    cursor.execute("""
+                        DELETE FROM matching_score_runs
+                        WHERE id NOT IN (
+                            SELECT id FROM matching_score_runs
+                            ORDER BY created_at DESC
+                            LIMIT %s
+                        )
+                    """, (SCORE_MATRIX_KEEP_RUNS,))
+                conn.commit()
+
+            print(f"🧮 Matriz de scores salva: {len(self._pair_bid)} pares, "
+                  f"{len(self._item_scores)} scores de itens ({len(payload) / 1024:.1f} KB) - run {run_id}")
+            return run_id
+        finally:
+            conn.close()
+
+
+class ScoreMatrix:
+    """Matriz de scores carregada de uma execução, com recálculo vetorizado de thresholds"""
+
+    def __init__(self, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.meta = meta
+        self.bid_ids = arrays['bid_ids']
+        self.bid_items = arrays['bid_items']
+        self.company_ids = arrays['company_ids']
+        self.pair_bid = arrays['pair_bid']
+        self.pair_company = arrays['pair_company']
+        self.pair_phase1 = arrays['pair_phase1']
+        self.item_offsets = arrays['item_offsets']
+        self.item_scores = arrays['item_scores'].astype(np.float32)
+
+        # Índice do par de cada score de item (para agregações com bincount)
+        self.item_pair = np.repeat(
+            np.arange(len(self.pair_bid), dtype=np.int64), np.diff(self.item_offsets)
+        )
+
+    @classmethod
+    def from_payload(cls, meta: Dict[str, Any], payload: bytes) -> 'ScoreMatrix':
+        with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        return cls(meta, arrays)
+
+    def rethreshold(self, threshold_phase1: float, threshold_phase2: float,
+                    top_k_per_bid: int = 0, top_k_per_company: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """
+        Recalcula os matches para novos thresholds.
+        Retorna (índices dos pares, score final, usou fase 2, resumo).
+        """
+        nnz = len(self.pair_bid)
+        phase1 = self.pair_phase1
+        items_status = self.bid_items[self.pair_bid]
+
+        # Agregados da Fase 2 por par: soma e quantidade de itens acima do threshold
+        passing = self.item_scores >= threshold_phase2
+        item_sum = np.bincount(self.item_pair, weights=np.where(passing, self.item_scores, 0.0), minlength=nnz)
+        item_count = np.bincount(self.item_pair, weights=passing.astype(np.float32), minlength=nnz)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            phase2_score = (phase1 + item_sum / np.maximum(item_count, 1)) / 2
+
+        scored = items_status == ITEMS_SCORED
+        accepted = (phase1 >= threshold_phase1) & (~scored | (item_count > 0))
+        final_score = np.where(scored, phase2_score, phase1)
+
+        pairs = np.nonzero(accepted)[0]
+        pairs = self._apply_top_k(pairs, final_score, self.pair_bid, top_k_per_bid)
+        pairs = self._apply_top_k(pairs, final_score, self.pair_company, top_k_per_company)
+
+        min_score = float(self.meta.get('min_score', 0))
+        summary = {
+            'total_matches': int(len(pairs)),
+            'licitacoes_com_matches': int(len(np.unique(self.pair_bid[pairs]))),
+            'empresas_com_matches': int(len(np.unique(self.pair_company[pairs]))),
+            'matches_fase2': int(scored[pairs].sum()),
+            'matches_fase1_apenas': int((~scored[pairs]).sum()),
+            'score_medio': round(float(final_score[pairs].mean()), 4) if len(pairs) else 0.0,
+            # Licitações sem candidatos na execução original não tiveram itens vetorizados:
+            # com threshold da Fase 1 menor, esses pares usam apenas a Fase 1
+            'matches_aproximados': int((items_status[pairs] == ITEMS_NOT_EVALUATED).sum()),
+            'abaixo_do_piso_registrado': bool(threshold_phase1 < min_score or threshold_phase2 < min_score)
+        }
+        return pairs, final_score[pairs], scored[pairs], summary
+
+    @staticmethod
+    def _apply_top_k(pairs: np.ndarray, scores: np.ndarray, groups: np.ndarray, k: int) -> np.ndarray:
+        """Mantém os k maiores scores por grupo (licitação ou empresa)"""
+        if k <= 0 or len(pairs) == 0:
+            return pairs
+        group = groups[pairs]
+        order = np.lexsort((-scores[pairs], group))
+        sorted_group = group[order]
+        starts = np.r_[0, np.nonzero(np.diff(sorted_group))[0] + 1]
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        return np.sort(pairs[order[rank < k]])
+
+    def build_matches(self, pairs: np.ndarray, scores: np.ndarray, used_phase2: np.ndarray,
+                      threshold_phase1: float, threshold_phase2: float) -> Dict[str, List[Dict[str, Any]]]:
+        """Monta os matches agrupados por licitação no formato de save_matches_to_db"""
+        matches_by_bid: Dict[str, List[Dict[str, Any]]] = {}
+        for pair, score, phase2 in zip(pairs, scores, used_phase2):
+            licitacao_id = str(self.bid_ids[self.pair_bid[pair]])
+            justificativa = (
+                f"Thresholds recalculados (Fase 1: {threshold_phase1:.2f} | Fase 2: {threshold_phase2:.2f}) - "
+                f"score Fase 1: {self.pair_phase1[pair]:.3f}"
+            )
+            matches_by_bid.setdefault(licitacao_id, []).append({
+                'empresa_id': str(self.company_ids[self.pair_company[pair]]),
+                'score': float(score),
+                'match_type': "objeto_e_itens" if phase2 else "objeto_completo",
+                'justificativa': justificativa
+            })
+        return matches_by_bid
+
+
+def list_score_runs(limit: int = 10) -> List[Dict[str, Any]]:
+    """Lista as execuções com matriz de scores persistida (sem o payload)"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute("""
+                SELECT id, run_type, vectorizer, threshold_phase1, threshold_phase2,
+                       top_n, min_score, n_bids, n_companies, nnz, payload_bytes, created_at
+                FROM matching_score_runs
+                ORDER BY created_at DESC
+                LIMIT %s
+            """, (limit,))
+            runs = []
+            for row in cursor.fetchall():
+                run = dict(row)
+                run['id'] = str(run['id'])
+                run['created_at'] = run['created_at'].isoformat() if run['created_at'] else None
+                runs.append(run)
+            return runs
+    finally:
+        conn.close()
+
+
+def load_score_matrix(run_id: Optional[str] = None) -> Optional[ScoreMatrix]:
+    """Carrega a matriz de uma execução (a mais recente se run_id não for informado)"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            query = """
+                SELECT id, run_type, vectorizer, threshold_phase1, threshold_phase2,
+                       top_n, min_score, n_bids, n_companies, nnz, payload, created_at
+                FROM matching_score_runs
+            """
+            if run_id:
+                cursor.execute(query + " WHERE id = %s", (run_id,))
+            else:
+                cursor.execute(query + " ORDER BY created_at DESC LIMIT 1")
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            meta = {key: row[key] for key in row.keys() if key != 'payload'}
+            meta['id'] = str(meta['id'])
+            meta['created_at'] = meta['created_at'].isoformat() if meta['created_at'] else None
+            return ScoreMatrix.from_payload(meta, bytes(row['payload']))
+    finally:
+        conn.close()
+
+
+def _commit_blocked_reason(summary: Dict[str, Any]) -> Optional[str]:
+    """Motivo para não gravar uma simulação aproximada (None se pode gravar)"""
+    if summary.get('abaixo_do_piso_registrado'):
+        return 'Thresholds abaixo do menor score registrado na execução: pares abaixo do piso não foram gravados'
+    if summary.get('matches_aproximados'):
+        return (f"{summary['matches_aproximados']} matches aproximados (licitações sem itens avaliados na execução): "
+                "execute uma reavaliação com os novos thresholds")
+    return None
+
+
+def simulate_thresholds(threshold_phase1: float, threshold_phase2: float,
+                        run_id: Optional[str] = None, top_k_per_bid: Optional[int] = None,
+                        top_k_per_company: Optional[int] = None, commit: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Recalcula o conjunto de matches de uma execução para novos thresholds.
+    Limites top-K não informados seguem MATCH_TOP_K_PER_BID / MATCH_TOP_K_PER_COMPANY
+    (0 explícito = sem limite).
+    Com commit=True substitui os matches das licitações da execução pelo novo conjunto,
+    exceto quando a simulação é aproximada (pares sem itens avaliados ou thresholds
+    abaixo do menor score registrado): o motivo fica em 'commit_blocked'.
+    """
+    if top_k_per_bid is None:
+        top_k_per_bid = MATCH_TOP_K_PER_BID
+    if top_k_per_company is None:
+        top_k_per_company = MATCH_TOP_K_PER_COMPANY
+
+    started = time.perf_counter()
+    matrix = load_score_matrix(run_id)
+    if matrix is None:
+        return None
+    loaded = time.perf_counter()
+
+    pairs, scores, used_phase2, summary = matrix.rethreshold(
+        threshold_phase1, threshold_phase2, top_k_per_bid, top_k_per_company
+    )
+    computed = time.perf_counter()
+
+    result = {
+        'run': matrix.meta,
+        'thresholds': {'phase1': threshold_phase1, 'phase2': threshold_phase2},
+        'top_k': {'per_bid': top_k_per_bid, 'per_company': top_k_per_company},
+        'summary': summary,
+        'committed': False,
+        'timing_ms': {
+            'load': round((loaded - started) * 1000, 2),
+            'rethreshold': round((computed - loaded) * 1000, 2)
+        }
+    }
+
+    if commit:
+        blocked = _commit_blocked_reason(summary)
+        if blocked:
+            result['commit_blocked'] = blocked
+            return result
+
+        matches_by_bid = matrix.build_matches(pairs, scores, used_phase2, threshold_phase1, threshold_phase2)
+        saved = replace_matches_for_bids([str(bid_id) for bid_id in matrix.bid_ids], matches_by_bid)
+        refresh_summaries('matches', force=True)
+        result['committed'] = True
+        result['matches_saved'] = saved
+        result['timing_ms']['commit'] = round((time.perf_counter() - computed) * 1000, 2)
+
+    return result
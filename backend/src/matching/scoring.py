@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Scorer vetorizado do matching e seleção top-K dos matches
+Calcula os cossenos de uma licitação contra todas as empresas com uma única
+multiplicação de matrizes e limita os matches por licitação e por empresa
+antes de qualquer escrita no banco.
+"""
+
+import os
+import heapq
+import numpy as np
+from typing import List, Dict, Any, Tuple, Optional
+
+from .vectorizers import enhanced_score_from_cosine, MAX_TEXT_BONUS
+
+# --- Limites de matches (0 = sem limite) ---
+MATCH_TOP_K_PER_BID = int(os.getenv('MATCH_TOP_K_PER_BID', '0'))  # Opt-in: preserva todos os matches acima do threshold
+MATCH_TOP_K_PER_COMPANY = int(os.getenv('MATCH_TOP_K_PER_COMPANY', '0'))  # Por execução: não limita o total acumulado da empresa
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza as linhas da matriz (norma L2), mantendo linhas nulas como zero"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _embeddings_to_matrix(embeddings: List[List[float]]) -> Tuple[np.ndarray, List[int]]:
+    """
+    Converte uma lista de embeddings em matriz normalizada.
+    Retorna (matriz, posições válidas) - embeddings vazios ou de dimensão divergente são ignorados.
+    """
+    dims = [len(e) for e in embeddings if e]
+    if not dims:
+        return np.zeros((0, 0), dtype=np.float32), []
+
+    dim = max(set(dims), key=dims.count)
+    valid = [i for i, e in enumerate(embeddings) if e and len(e) == dim]
+    matrix = np.asarray([embeddings[i] for i in valid], dtype=np.float32)
+    return _normalize_rows(matrix), valid
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices dos k maiores scores em ordem decrescente (argpartition, O(n))"""
+    if k <= 0 or k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class CompanyMatrix:
+    """Embeddings normalizados das empresas para scoring vetorizado"""
+
+    def __init__(self, companies: List[Dict[str, Any]]):
+        self.all_companies = companies
+        matrix, valid = _embeddings_to_matrix([c.get("embedding") or [] for c in companies])
+        self.matrix = matrix
+        self.companies = [companies[i] for i in valid]
+        self.dimensions = matrix.shape[1] if len(valid) else 0
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    def cosine_scores(self, embedding: List[float]) -> np.ndarray:
+        """Cossenos de um embedding contra todas as empresas"""
+        if not embedding or len(embedding) != self.dimensions:
+            return np.zeros(len(self.companies), dtype=np.float32)
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return np.zeros(len(self.companies), dtype=np.float32)
+        return self.matrix @ (vector / norm)
+
+    def phase1(self, bid_embedding: List[float], objeto_compra: str,
+               threshold: float) -> List[Tuple[Dict[str, Any], float, str]]:
+        """
+        FASE 1 vetorizada: retorna [(empresa, score, justificativa)] acima do threshold,
+        ordenado por score decrescente.
+        Só calcula bônus textuais para empresas cujo cosseno ainda pode atingir o threshold.
+        """
+        cosines = self.cosine_scores(bid_embedding)
+        candidates = np.nonzero(cosines >= threshold - MAX_TEXT_BONUS)[0]
+
+        potential_matches = []
+        for idx in candidates:
+            company = self.companies[idx]
+            score, justificativa = enhanced_score_from_cosine(
+                cosines[idx], objeto_compra, company["descricao_servicos_produtos"]
+            )
+            if score >= threshold:
+                potential_matches.append((company, score, justificativa))
+
+        potential_matches.sort(key=lambda m: m[1], reverse=True)
+        return potential_matches
+
+    def phase2(self, item_embeddings: List[List[float]], item_descriptions: List[str],
+               potential_matches: List[Tuple[Dict[str, Any], float, str]],
+               threshold: float) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        FASE 2 vetorizada: cossenos itens × empresas candidatas em uma única multiplicação.
+        Retorna {empresa_id: [(descrição do item, score)]} com os itens acima do threshold.
+        """
+        item_matrix, valid_items = _embeddings_to_matrix(item_embeddings)
+        result = {company["id"]: [] for company, _, _ in potential_matches}
+        if not valid_items or item_matrix.shape[1] != self.dimensions or not potential_matches:
+            return result
+
+        positions = {company["id"]: i for i, company in enumerate(self.companies)}
+        candidate_rows = [positions[company["id"]] for company, _, _ in potential_matches]
+        cosines = item_matrix @ self.matrix[candidate_rows].T  # (itens × candidatas)
+
+        item_idx, cand_idx = np.nonzero(cosines >= threshold - MAX_TEXT_BONUS)
+        for i, c in zip(item_idx, cand_idx):
+            company = potential_matches[c][0]
+            description = item_descriptions[valid_items[i]]
+            item_score, _ = enhanced_score_from_cosine(
+                cosines[i, c], description, company["descricao_servicos_produtos"]
+            )
+            if item_score >= threshold:
+                result[company["id"]].append((description, item_score))
+
+        return result
+
+
+class MatchSelector:
+    """
+    Aplica os limites top-K por licitação e por empresa antes da escrita.
+    Por licitação: heapq.nlargest sobre os matches da licitação.
+    Por empresa: min-heap de tamanho K por empresa ao longo da execução.
+    Matches já gravados (flush em checkpoint) que forem superados depois
+    são devolvidos por pop_evicted() para remoção.
+    """
+
+    def __init__(self, top_k_per_bid: Optional[int] = None, top_k_per_company: Optional[int] = None):
+        self.top_k_per_bid = MATCH_TOP_K_PER_BID if top_k_per_bid is None else top_k_per_bid
+        self.top_k_per_company = MATCH_TOP_K_PER_COMPANY if top_k_per_company is None else top_k_per_company
+        self._company_heaps: Dict[str, List[Tuple[float, int, str, Optional[Dict[str, Any]]]]] = {}
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._written: set = set()
+        self._evicted: List[Tuple[str, str]] = []
+        self._sequence = 0
+        self.discarded = 0
+
+    @property
+    def buffers_matches(self) -> bool:
+        """Com limite por empresa os matches ficam retidos até o flush"""
+        return self.top_k_per_company > 0
+
+    def select_for_bid(self, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Mantém apenas os top-K matches da licitação (por score)"""
+        if self.top_k_per_bid > 0 and len(matches) > self.top_k_per_bid:
+            selected = heapq.nlargest(self.top_k_per_bid, matches, key=lambda m: m['score'])
+            self.discarded += len(matches) - len(selected)
+            return selected
+        return matches
+
+    def _push(self, empresa_id: str, score: float, licitacao_id: str, match: Optional[Dict[str, Any]]):
+        """Insere no heap da empresa, descartando o menor score quando o limite é excedido"""
+        heap = self._company_heaps.setdefault(empresa_id, [])
+        self._sequence += 1
+        entry = (score, self._sequence, licitacao_id, match)
+        if len(heap) < self.top_k_per_company:
+            heapq.heappush(heap, entry)
+            return
+        if entry[0] > heap[0][0]:
+            evicted = heapq.heapreplace(heap, entry)
+        else:
+            evicted = entry
+        self.discarded += 1
+        key = (evicted[2], empresa_id)
+        if key in self._written:
+            self._written.discard(key)
+            self._evicted.append(key)
+
+    def seed(self, existing: List[Tuple[str, str, float]]):
+        """
+        Carrega matches já gravados (licitacao_id, empresa_id, score) nos heaps por empresa.
+        Usado ao retomar uma execução para manter o limite por empresa exato.
+        """
+        if not self.buffers_matches:
+            return
+        for licitacao_id, empresa_id, score in existing:
+            self._written.add((licitacao_id, empresa_id))
+            self._push(empresa_id, float(score), licitacao_id, None)
+
+    def add(self, licitacao_id: str, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Registra os matches de uma licitação e retorna os que sobreviveram ao top-K por licitação"""
+        selected = self.select_for_bid(matches)
+
+        if not self.buffers_matches:
+            if selected:
+                self._pending.setdefault(licitacao_id, []).extend(selected)
+            return selected
+
+        for match in selected:
+            self._push(match['empresa_id'], match['score'], licitacao_id, match)
+        return selected
+
+    def drain(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Retorna os matches ainda não gravados, agrupados por licitacao_id"""
+        if not self.buffers_matches:
+            pending, self._pending = self._pending, {}
+            return pending
+
+        by_bid: Dict[str, List[Dict[str, Any]]] = {}
+        for empresa_id, heap in self._company_heaps.items():
+            for _, _, licitacao_id, match in heap:
+                key = (licitacao_id, empresa_id)
+                if match is None or key in self._written:
+                    continue
+                self._written.add(key)
+                by_bid.setdefault(licitacao_id, []).append(match)
+        return by_bid
+
+    def pop_evicted(self) -> List[Tuple[str, str]]:
+        """Retorna e limpa os pares (licitacao_id, empresa_id) gravados que saíram do top-K"""
+        evicted, self._evicted = self._evicted, []
+        return evicted
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Reavaliação em shards
+Divide a reavaliação em buckets de hash do id da licitação. Os shards ficam em
+uma tabela de trabalho compartilhada e são reservados (FOR UPDATE SKIP LOCKED)
+por qualquer número de processos ou hosts; o último shard concluído dispara a
+finalização da execução.
+"""
+
+import os
+import io
+import json
+import threading
+from contextlib import contextmanager
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from psycopg2.extras import DictCursor
+
+from .pncp_api import get_db_connection
+
+# --- Configurações dos shards ---
+REEVALUATE_SHARDS = int(os.getenv('REEVALUATE_SHARDS', '1'))  # 1 = reavaliação em processo único
+REEVALUATE_SHARD_MAX_ATTEMPTS = int(os.getenv('REEVALUATE_SHARD_MAX_ATTEMPTS', '3'))
+REEVALUATE_SHARD_STALE_SECONDS = int(os.getenv('REEVALUATE_SHARD_STALE_SECONDS', '600'))
+REEVALUATE_SHARD_HEARTBEAT_INTERVAL = float(os.getenv('REEVALUATE_SHARD_HEARTBEAT_INTERVAL', '30'))
+
+
+def _json_default(value):
+    """Serializa datas e decimais das estatísticas"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return float(value)
+
+
+def _pack_embeddings(company_ids: List[str], embeddings: List[List[float]]) -> bytes:
+    """Serializa os embeddings das empresas em npz comprimido"""
+    valid = [i for i, e in enumerate(embeddings) if e]
+    dims = len(embeddings[valid[0]]) if valid else 0
+    valid = [i for i in valid if len(embeddings[i]) == dims]
+
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        company_ids=np.asarray([company_ids[i] for i in valid], dtype=str),
+        embeddings=np.asarray([embeddings[i] for i in valid], dtype=np.float32).reshape(len(valid), dims)
+    )
+    return buffer.getvalue()
+
+
+def _unpack_embeddings(payload: bytes) -> Dict[str, List[float]]:
+    """Reconstrói {empresa_id: embedding} a partir do npz da execução"""
+    with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+        return {
+            company_id: embedding.tolist()
+            for company_id, embedding in zip(data['company_ids'].tolist(), data['embeddings'])
+        }
+
+
+def create_run(shard_count: int, clear_matches: bool, vectorizer_name: str,
+               company_ids: List[str], embeddings: List[List[float]]) -> str:
+    """Cria a execução com seus N shards pendentes. Retorna o id da execução."""
+    payload = _pack_embeddings(company_ids, embeddings)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO matching_reevaluation_runs (shard_count, clear_matches, vectorizer, company_embeddings)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+            """, (shard_count, clear_matches, vectorizer_name, bytes(payload)))
+            run_id = str(cursor.fetchone()[0])
+            cursor.execute("""
+                INSERT INTO matching_reevaluation_shards (run_id, shard_index)
+                SELECT %s, generate_series(0, %s - 1)
+            """, (run_id, shard_count))
+            conn.commit()
+            return run_id
+    finally:
+        conn.close()
+
+
+def get_active_run() -> Optional[Dict[str, Any]]:
+    """Execução em andamento (running/finalizing), se houver"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute("""
+                SELECT id, status, shard_count, clear_matches, vectorizer, created_at
+                FROM matching_reevaluation_runs
+                WHERE status IN ('running', 'finalizing')
+                ORDER BY created_at DESC
+                LIMIT 1
+            """)
+            row = cursor.fetchone()
+            if not row:
+                return None
+            run = dict(row)
+            run['id'] = str(run['id'])
+            return run
+    finally:
+        conn.close()
+
+
+def get_run_started_at(run_id: str):
+    """Início da execução (relógio do banco, o mesmo de matches.data_match)"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT created_at FROM matching_reevaluation_runs WHERE id = %s", (run_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def load_company_embeddings(run_id: str) -> Dict[str, List[float]]:
+    """Embeddings das empresas calculados na criação da execução"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT company_embeddings FROM matching_reevaluation_runs WHERE id = %s", (run_id,))
+            row = cursor.fetchone()
+            if not row or row[0] is None:
+                return {}
+            return _unpack_embeddings(bytes(row[0]))
+    finally:
+        conn.close()
+
+
+def claim_shard(run_id: str, worker: str) -> Optional[Tuple[int, int]]:
+    """
+    Reserva o próximo shard pendente (ou abandonado, sem heartbeat recente) da execução.
+    Shards abandonados que já esgotaram as tentativas ficam como failed, junto com a execução.
+    Retorna (shard_index, shard_count) ou None quando não há mais shards disponíveis.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_reevaluation_shards
+                SET status = 'failed', worker = NULL,
+                    last_error = 'Sem heartbeat após ' || attempts || ' tentativas'
+                WHERE run_id = %s
+                  AND status = 'running'
+                  AND attempts >= %s
+                  AND heartbeat_at < NOW() - make_interval(secs => %s)
+                RETURNING shard_index
+            """, (run_id, REEVALUATE_SHARD_MAX_ATTEMPTS, REEVALUATE_SHARD_STALE_SECONDS))
+            exhausted = [row[0] for row in cursor.fetchall()]
+            if exhausted:
+                cursor.execute("""
+                    UPDATE matching_reevaluation_runs
+                    SET status = 'failed', completed_at = NOW(),
+                        last_error = %s
+                    WHERE id = %s AND status = 'running'
+                """, (f"Shards {exhausted} abandonados após {REEVALUATE_SHARD_MAX_ATTEMPTS} tentativas", run_id))
+                conn.commit()
+                print(f"❌ Execução {run_id} falhou: shards {exhausted} sem heartbeat e sem tentativas restantes")
+                return None
+
+            cursor.execute("""
+                UPDATE matching_reevaluation_shards s
+                SET status = 'running', worker = %s, attempts = s.attempts + 1,
+                    started_at = COALESCE(s.started_at, NOW()), heartbeat_at = NOW()
+                FROM matching_reevaluation_runs r
+                WHERE r.id = s.run_id
+                  AND r.status = 'running'
+                  AND (s.run_id, s.shard_index) = (
+                      SELECT run_id, shard_index FROM matching_reevaluation_shards
+                      WHERE run_id = %s
+                        AND attempts < %s
+                        AND (status = 'pending'
+                             OR (status = 'running' AND heartbeat_at < NOW() - make_interval(secs => %s)))
+                      ORDER BY shard_index
+                      FOR UPDATE SKIP LOCKED
+                      LIMIT 1
+                  )
+                RETURNING s.shard_index, r.shard_count
+            """, (worker, run_id, REEVALUATE_SHARD_MAX_ATTEMPTS, REEVALUATE_SHARD_STALE_SECONDS))
+            row = cursor.fetchone()
+            conn.commit()
+            return (row[0], row[1]) if row else None
+    finally:
+        conn.close()
+
+
+def heartbeat_shard(run_id: str, shard_index: int, worker: str, bids_processed: int) -> bool:
+    """Sinal de vida e progresso do shard. Retorna False se o shard não pertence mais ao worker."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_reevaluation_shards
+                SET heartbeat_at = NOW(), bids_processed = %s
+                WHERE run_id = %s AND shard_index = %s AND worker = %s AND status = 'running'
+            """, (bids_processed, run_id, shard_index, worker))
+            owned = cursor.rowcount > 0
+            conn.commit()
+            return owned
+    finally:
+        conn.close()
+
+
+@contextmanager
+def heartbeat_thread(beat: Callable[[], None], name: str,
+                     interval: float = REEVALUATE_SHARD_HEARTBEAT_INTERVAL):
+    """Chama beat() a cada interval segundos em uma thread enquanto o bloco executa"""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                beat()
+            except Exception as e:
+                print(f"⚠️ Falha no heartbeat ({name}): {e}")
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+
+
+def complete_shard(run_id: str, shard_index: int, worker: str, stats: Dict[str, Any],
+                   score_payload: Optional[bytes], duration_ms: int) -> bool:
+    """
+    Marca o shard como concluído. Retorna True se este foi o último shard
+    (a execução passa para 'finalizing' e cabe a quem chamou finalizá-la).
+    Se o shard foi reservado por outro worker (heartbeat perdido), nada é alterado.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_reevaluation_shards
+                SET status = 'done', stats = %s::jsonb, score_payload = %s,
+                    bids_processed = %s, matches_saved = %s, last_error = NULL,
+                    completed_at = NOW(), duration_ms = %s
+                WHERE run_id = %s AND shard_index = %s AND worker = %s AND status = 'running'
+            """, (
+                json.dumps(stats, default=_json_default),
+                bytes(score_payload) if score_payload else None,
+                stats.get('progresso', 0), stats.get('matches_encontrados', 0),
+                duration_ms, run_id, shard_index, worker
+            ))
+            owned = cursor.rowcount > 0
+            conn.commit()
+            if not owned:
+                print(f"⚠️ Shard {shard_index} da execução {run_id} foi reservado por outro worker")
+                return False
+
+            # Só uma transação consegue a transição running -> finalizing
+            cursor.execute("""
+                UPDATE matching_reevaluation_runs
+                SET status = 'finalizing', heartbeat_at = NOW()
+                WHERE id = %s AND status = 'running'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM matching_reevaluation_shards
+                      WHERE run_id = %s AND status <> 'done'
+                  )
+                RETURNING id
+            """, (run_id, run_id))
+            finalize = cursor.fetchone() is not None
+            conn.commit()
+            return finalize
+    finally:
+        conn.close()
+
+
+def claim_stale_finalization(run_id: str) -> bool:
+    """
+    Assume a finalização de uma execução parada em 'finalizing' (quem finalizava
+    morreu sem heartbeat recente). Retorna True se este worker deve finalizá-la.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_reevaluation_runs
+                SET heartbeat_at = NOW()
+                WHERE id = %s AND status = 'finalizing'
+                  AND (heartbeat_at IS NULL OR heartbeat_at < NOW() - make_interval(secs => %s))
+                RETURNING id
+            """, (run_id, REEVALUATE_SHARD_STALE_SECONDS))
+            claimed = cursor.fetchone() is not None
+            conn.commit()
+            return claimed
+    finally:
+        conn.close()
+
+
+def heartbeat_run(run_id: str):
+    """Sinal de vida da finalização"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_reevaluation_runs SET heartbeat_at = NOW()
+                WHERE id = %s AND status = 'finalizing'
+            """, (run_id,))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def fail_run(run_id: str, error: str):
+    """Marca a execução como failed (erro na finalização)"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_reevaluation_runs
+                SET status = 'failed', last_error = %s, completed_at = NOW()
+                WHERE id = %s AND status IN ('running', 'finalizing')
+            """, (error[:4000], run_id))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def release_shard(run_id: str, shard_index: int, worker: str, error: str):
+    """
+    Devolve um shard que falhou para a fila de shards. Esgotadas as tentativas,
+    o shard e a execução ficam como failed.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_reevaluation_shards
+                SET status = CASE WHEN attempts < %s THEN 'pending' ELSE 'failed' END,
+                    worker = NULL, last_error = %s
+                WHERE run_id = %s AND shard_index = %s AND worker = %s AND status = 'running'
+                RETURNING status
+            """, (REEVALUATE_SHARD_MAX_ATTEMPTS, error[:4000], run_id, shard_index, worker))
+            row = cursor.fetchone()
+            if row and row[0] == 'failed':
+                cursor.execute("""
+                    UPDATE matching_reevaluation_runs
+                    SET status = 'failed', last_error = %s, completed_at = NOW()
+                    WHERE id = %s AND status = 'running'
+                """, (f"Shard {shard_index}: {error[:1000]}", run_id))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def get_shard_results(run_id: str) -> List[Dict[str, Any]]:
+    """Estatísticas e matrizes de scores dos shards concluídos"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute("""
+                SELECT shard_index, stats, score_payload
+                FROM matching_reevaluation_shards
+                WHERE run_id = %s AND status = 'done'
+                ORDER BY shard_index
+            """, (run_id,))
+            return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def complete_run(run_id: str, stats: Dict[str, Any]):
+    """Marca a execução como concluída com as estatísticas consolidadas"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE matching_reevaluation_runs
+                SET status = 'completed', stats = %s::jsonb, completed_at = NOW(),
+                    company_embeddings = NULL
+                WHERE id = %s
+            """, (json.dumps(stats, default=_json_default), run_id))
+            cursor.execute("""
+                UPDATE matching_reevaluation_shards SET score_payload = NULL WHERE run_id = %s
+            """, (run_id,))
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def get_run_progress(run_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Progresso de uma execução (ou da mais recente): shards por status e licitações processadas"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cursor:
+            if run_id:
+                cursor.execute("""
+                    SELECT id, status, shard_count, stats, last_error, created_at, completed_at
+                    FROM matching_reevaluation_runs WHERE id = %s
+                """, (run_id,))
+            else:
+                cursor.execute("""
+                    SELECT id, status, shard_count, stats, last_error, created_at, completed_at
+                    FROM matching_reevaluation_runs ORDER BY created_at DESC LIMIT 1
+                """)
+            run = cursor.fetchone()
+            if not run:
+                return None
+
+            cursor.execute("""
+                SELECT status, COUNT(*) AS total, SUM(bids_processed) AS bids,
+                       SUM(matches_saved) AS matches, AVG(duration_ms) AS avg_duration_ms,
+                       COUNT(DISTINCT worker) AS workers
+                FROM matching_reevaluation_shards
+                WHERE run_id = %s
+                GROUP BY status
+            """, (run['id'],))
+            shards = {
+                row['status']: {
+                    'total': row['total'],
+                    'licitacoes': int(row['bids'] or 0),
+                    'matches': int(row['matches'] or 0),
+                    'avg_duration_ms': round(float(row['avg_duration_ms']), 1) if row['avg_duration_ms'] is not None else None,
+                    'workers': row['workers']
+                }
+                for row in cursor.fetchall()
+            }
+
+            progress = dict(run)
+            progress['id'] = str(progress['id'])
+            progress['shards'] = shards
+            for key in ('created_at', 'completed_at'):
+                if progress.get(key):
+                    progress[key] = progress[key].isoformat()
+            return progress
+    finally:
+        conn.close()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Atualização das views materializadas de resumo do dashboard
+As estatísticas de licitações e matches são lidas de views pequenas
+(migrations/create_dashboard_summary_views.sql). Quem escreve — ingestão e
+matching — chama refresh_summaries ao longo e ao final da execução; o REFRESH
+CONCURRENTLY não bloqueia as leituras do dashboard.
+"""
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional
+
+from .pncp_api import get_db_connection
+
+# Views por grupo de escrita
+SUMMARY_VIEWS: Dict[str, List[str]] = {
+    'licitacoes': ['mv_licitacoes_estatisticas', 'mv_licitacao_itens_tipos'],
+    'matches': ['mv_matches_resumo', 'mv_matches_por_empresa'],
+}
+SUMMARY_REFRESH_MIN_INTERVAL = float(os.getenv('SUMMARY_REFRESH_MIN_INTERVAL', '300'))  # Segundos entre refreshes durante a execução
+SUMMARY_REFRESH_DEBOUNCE = float(os.getenv('SUMMARY_REFRESH_DEBOUNCE', '5'))  # Segundos entre uma escrita da API e o refresh agendado
+SUMMARY_REFRESH_LOCK = "dashboard_summary_refresh"
+# Tags do cache de respostas da API afetadas por cada grupo (middleware/response_cache.py)
+SUMMARY_CACHE_TAGS: Dict[str, List[str]] = {
+    'licitacoes': ['bids'],
+    'matches': ['matches'],
+}
+
+_last_refresh: Dict[str, float] = {}
+_refreshing: set = set()
+_refresh_lock = threading.Lock()
+_scheduled_groups: set = set()
+_scheduled_timer: Optional[threading.Timer] = None
+
+
+def refresh_summaries(*groups: str, force: bool = False) -> List[str]:
+    """
+    Atualiza as views dos grupos informados (padrão: todos).
+    Sem force respeita SUMMARY_REFRESH_MIN_INTERVAL por grupo e pula se outro
+    processo já estiver atualizando; com force (fim de execução) espera a vez.
+    Falhas são registradas sem interromper quem escreve. Também invalida as respostas
+    em cache da API ligadas aos grupos. O intervalo conta a partir do último refresh
+    bem-sucedido. Retorna as views atualizadas.
+    """
+    groups = groups or tuple(SUMMARY_VIEWS)
+    now = time.monotonic()
+    with _refresh_lock:
+        due = [
+            group for group in groups
+            if force or (group not in _refreshing
+                         and now - _last_refresh.get(group, float('-inf')) >= SUMMARY_REFRESH_MIN_INTERVAL)
+        ]
+        _refreshing.update(due)
+    if not due:
+        return []
+    try:
+        refreshed = _refresh_views(due, force)
+    finally:
+        with _refresh_lock:
+            _refreshing.difference_update(due)
+    if refreshed:
+        finished = time.monotonic()
+        with _refresh_lock:
+            for group in due:
+                _last_refresh[group] = finished
+    _invalidate_response_cache(due)
+    return refreshed
+
+
+def _refresh_views(due: List[str], force: bool) -> List[str]:
+    """REFRESH das views dos grupos sob o advisory lock; [] se pulou ou falhou"""
+    refreshed = []
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            # Um refresh por vez entre todos os workers/processos
+            if force:
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (SUMMARY_REFRESH_LOCK,))
+            else:
+                cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s))", (SUMMARY_REFRESH_LOCK,))
+                if not cursor.fetchone()[0]:
+                    conn.rollback()
+                    return []
+
+            started = time.perf_counter()
+            for group in due:
+                for view in SUMMARY_VIEWS[group]:
+                    cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+                    refreshed.append(view)
+        conn.commit()
+        print(f"📊 Views de resumo atualizadas ({', '.join(due)}) em {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️  Erro ao atualizar views de resumo: {e}")
+        refreshed = []
+    finally:
+        conn.close()
+    return refreshed
+
+
+def schedule_refresh(*groups: str):
+    """
+    Agenda um refresh (force) dos grupos para daqui a SUMMARY_REFRESH_DEBOUNCE segundos.
+    Usado pelas escritas da API: escritas seguidas viram um único refresh em segundo plano.
+    """
+    global _scheduled_timer
+    with _refresh_lock:
+        _scheduled_groups.update(groups or SUMMARY_VIEWS)
+        if _scheduled_timer is not None:
+            return
+        timer = threading.Timer(SUMMARY_REFRESH_DEBOUNCE, _run_scheduled_refresh)
+        timer.daemon = True
+        _scheduled_timer = timer
+    timer.start()
+
+
+def _run_scheduled_refresh():
+    global _scheduled_timer
+    with _refresh_lock:
+        groups = tuple(_scheduled_groups)
+        _scheduled_groups.clear()
+        _scheduled_timer = None
+    if groups:
+        refresh_summaries(*groups, force=True)
+
+
+def _invalidate_response_cache(groups: List[str]):
+    """Invalida o cache de respostas da API (Redis compartilhado com o servidor)"""
+    try:
+        from middleware.response_cache import invalidate_cache_tags
+    except ImportError:
+        return
+    tags = [tag for group in groups for tag in SUMMARY_CACHE_TAGS.get(group, [])]
+    if tags:
+        invalidate_cache_tags(*tags)
@@ -483,15 +483,16 @@ def calculate_cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     return similarity
 
 
-def calculate_enhanced_similarity(vec1: List[float], vec2: List[float], text1: str = "", text2: str = "") -> tuple[float, str]:
+# Bônus máximo que os fatores textuais podem somar ao cosseno (palavras + termos técnicos)
+MAX_TEXT_BONUS = 0.3
+
+
+def calculate_text_bonus(text1: str, text2: str) -> tuple[float, List[str]]:
     """
-    Calcula similaridade aprimorada combinando cosseno com outros fatores
-    Retorna (score, justificativa)
+    Calcula o bônus textual (palavras exatas e termos técnicos em comum)
+    Retorna (bonus, fatores)
     """
-    # Similaridade base (cosseno)
-    cosine_score = calculate_cosine_similarity(vec1, vec2)
-    
-    # Fatores adicionais se textos forem fornecidos
+    bonus = 0.0
     bonus_factors = []
     
     if text1 and text2:
@@ -505,7 +506,7 @@ def calculate_enhanced_similarity(vec1: List[float], vec2: List[float], text1: s
         
         if common_words:
             word_bonus = min(len(common_words) * 0.05, 0.2)  # Máximo 20% bonus
-            cosine_score += word_bonus
+            bonus += word_bonus
             bonus_factors.append(f"palavras comuns: {', '.join(list(common_words)[:3])}")
         
         # Bonus por siglas/acrônimos
@@ -513,9 +514,20 @@ def calculate_enhanced_similarity(vec1: List[float], vec2: List[float], text1: s
         common_tech = [term for term in tech_terms if term in text1_lower and term in text2_lower]
         if common_tech:
             tech_bonus = min(len(common_tech) * 0.03, 0.1)  # Máximo 10% bonus
-            cosine_score += tech_bonus
+            bonus += tech_bonus
             bonus_factors.append(f"termos técnicos: {', '.join(common_tech)}")
     
+    return bonus, bonus_factors
+
+
+def enhanced_score_from_cosine(cosine_score: float, text1: str = "", text2: str = "") -> tuple[float, str]:
+    """
+    Aplica os bônus textuais sobre um cosseno já calculado (usado pelo scorer vetorizado)
+    Retorna (score, justificativa)
+    """
+    bonus, bonus_factors = calculate_text_bonus(text1, text2)
+    cosine_score = float(cosine_score) + bonus
+    
     # Garantir que não passe de 1.0
     final_score = min(cosine_score, 1.0)
     
@@ -524,4 +536,13 @@ def calculate_enhanced_similarity(vec1: List[float], vec2: List[float], text1: s
     if bonus_factors:
         justificativa += f" + bônus ({'; '.join(bonus_factors)})"
     
-    return final_score, justificativa 
\ No newline at end of file
+    return final_score, justificativa
+
+
+def calculate_enhanced_similarity(vec1: List[float], vec2: List[float], text1: str = "", text2: str = "") -> tuple[float, str]:
+    """
+    Calcula similaridade aprimorada combinando cosseno com outros fatores
+    Retorna (score, justificativa)
+    """
+    # Similaridade base (cosseno) + fatores adicionais se textos forem fornecidos
+    return enhanced_score_from_cosine(calculate_cosine_similarity(vec1, vec2), text1, text2)
@@ -0,0 +1,207 @@
+"""
+Cache de respostas para endpoints de dashboard e listagens
+As respostas mudam só quando a ingestão ou o matching escrevem, mas cada acesso
+ia ao Postgres. Dois níveis: LRU em memória no processo e Redis (CacheManager),
+com chave por endpoint + parâmetros e TTL por rota.
+
+Invalidação por tags ('bids', 'matches', 'companies'): cada tag tem uma versão
+(contador no Redis, ou local sem Redis) que entra na chave da entrada. Quem escreve
+chama invalidate_cache_tags e a versão sobe; entradas antigas deixam de ser lidas
+e expiram sozinhas. Outros processos percebem a nova versão em até
+RESPONSE_CACHE_VERSION_CHECK segundos (sem Redis, só pelo TTL).
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Any, Optional, Tuple, Iterable
+
+from flask import request, make_response
+
+logger = logging.getLogger(__name__)
+
+# --- Configurações ---
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '512'))
+RESPONSE_CACHE_DEFAULT_TTL = int(os.getenv('RESPONSE_CACHE_DEFAULT_TTL', '300'))
+RESPONSE_CACHE_VERSION_CHECK = float(os.getenv('RESPONSE_CACHE_VERSION_CHECK', '5'))  # Segundos entre leituras das versões no Redis
+
+KEY_PREFIX = 'resp'
+
+
+class ResponseCache:
+    """Cache de respostas em dois níveis (LRU local + Redis) com versões por tag"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes, str]]" = OrderedDict()  # chave -> (expira, corpo, mimetype)
+        self._versions: Dict[str, int] = {}
+        self._versions_checked_at = float('-inf')
+        self._lock = threading.Lock()
+        self._cache_manager = None
+        self._redis_checked = False
+        self.metrics = {'memory_hits': 0, 'redis_hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0}
+
+    def _redis(self):
+        """CacheManager compartilhado (None se redis não estiver instalado/disponível)"""
+        if not self._redis_checked:
+            self._redis_checked = True
+            try:
+                from rag.cache_manager import CacheManager
+                manager = CacheManager(
+                    redis_host=os.getenv('REDIS_HOST', 'localhost'),
+                    redis_port=int(os.getenv('REDIS_PORT', '6379')),
+                    redis_db=int(os.getenv('REDIS_DB', '0'))
+                )
+                self._cache_manager = manager if manager.redis_client else None
+            except ImportError as e:
+                logger.warning(f"⚠️ Redis indisponível para o cache de respostas: {e}")
+        return self._cache_manager
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{KEY_PREFIX}:tag:{tag}"
+
+    def tag_versions(self, tags: Iterable[str]) -> Tuple[int, ...]:
+        """Versões atuais das tags (relidas do Redis a cada RESPONSE_CACHE_VERSION_CHECK)"""
+        tags = tuple(tags)
+        redis_cache = self._redis()
+        if redis_cache is not None and time.monotonic() - self._versions_checked_at >= RESPONSE_CACHE_VERSION_CHECK:
+            with self._lock:
+                known = sorted(set(self._versions) | set(tags))
+            counters = redis_cache.get_counters([self._tag_key(tag) for tag in known])
+            if counters is not None:
+                with self._lock:
+                    self._versions.update(zip(known, counters))
+                    self._versions_checked_at = time.monotonic()
+        with self._lock:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Busca na memória e depois no Redis (que repovoa a memória)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.metrics['memory_hits'] += 1
+                    return entry[1], entry[2]
+                del self._entries[key]
+
+        redis_cache = self._redis()
+        if redis_cache is not None:
+            cached = redis_cache.get_value(key)
+            if cached is not None:
+                body, mimetype, expires_at = cached
+                # Na memória a entrada vale só pelo TTL restante no Redis
+                remaining = expires_at - time.time()
+                if remaining > 0:
+                    self._store_local(key, body, mimetype, remaining)
+                    with self._lock:
+                        self.metrics['redis_hits'] += 1
+                    return body, mimetype
+
+        with self._lock:
+            self.metrics['misses'] += 1
+        return None
+
+    def set(self, key: str, body: bytes, mimetype: str, ttl: int):
+        self._store_local(key, body, mimetype, ttl)
+        redis_cache = self._redis()
+        if redis_cache is not None:
+            # Expiração absoluta junto do corpo: quem ler do Redis herda o TTL restante
+            redis_cache.set_value(key, (body, mimetype, time.time() + ttl), ttl)
+        with self._lock:
+            self.metrics['stores'] += 1
+
+    def _store_local(self, key: str, body: bytes, mimetype: str, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, body, mimetype)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tags: str):
+        """Sobe a versão das tags: entradas que dependem delas deixam de ser servidas"""
+        redis_cache = self._redis()
+        for tag in tags:
+            version = redis_cache.increment_counter(self._tag_key(tag)) if redis_cache is not None else None
+            with self._lock:
+                self._versions[tag] = version if version is not None else self._versions.get(tag, 0) + 1
+                self.metrics['invalidations'] += 1
+        if tags:
+            logger.info(f"🧹 Cache de respostas invalidado: {', '.join(tags)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.metrics['memory_hits'] + self.metrics['redis_hits'] + self.metrics['misses']
+            hits = self.metrics['memory_hits'] + self.metrics['redis_hits']
+            return {
+                'enabled': RESPONSE_CACHE_ENABLED,
+                'redis': self._cache_manager is not None,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'tag_versions': dict(self._versions),
+                'hit_ratio': round(hits / lookups, 3) if lookups else None,
+                **self.metrics
+            }
+
+
+# Cache do processo
+_response_cache = ResponseCache()
+
+
+def get_response_cache() -> ResponseCache:
+    """Cache de respostas compartilhado pelas rotas"""
+    return _response_cache
+
+
+def invalidate_cache_tags(*tags: str):
+    """Invalidar respostas em cache das tags (chamado por quem escreve: serviços, ingestão, matching)"""
+    try:
+        _response_cache.invalidate(*tags)
+    except Exception as e:
+        logger.error(f"❌ Erro ao invalidar cache de respostas {tags}: {e}")
+
+
+def cached_response(tags: Iterable[str], ttl: int = RESPONSE_CACHE_DEFAULT_TTL):
+    """
+    Decorator de rota: serve a resposta do cache quando houver e guarda respostas 200
+    Chave = caminho + parâmetros da query + versões das tags.
+    """
+    tags = tuple(tags)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not RESPONSE_CACHE_ENABLED or request.method != 'GET':
+                return func(*args, **kwargs)
+
+            params = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+            versions = _response_cache.tag_versions(tags)
+            digest = hashlib.md5(f"{request.path}?{params}|{versions}".encode()).hexdigest()
+            key = f"{KEY_PREFIX}:entry:{digest}"
+
+            cached = _response_cache.get(key)
+            if cached is not None:
+                response = make_response(cached[0], 200)
+                response.mimetype = cached[1]
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(func(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                _response_cache.set(key, response.get_data(), response.mimetype, ttl)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
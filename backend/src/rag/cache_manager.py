@@ -149,6 +149,52 @@ class CacheManager:
             logger.error(f"❌ Erro ao invalidar cache: {e}")
             return 0
     
+    def get_value(self, key: str) -> Optional[Any]:
+        """Recupera valor cacheado por chave exata (None se ausente ou Redis indisponível)"""
+        if not self.redis_client:
+            return None
+        
+        try:
+            cached = self.redis_client.get(key)
+            return pickle.loads(cached) if cached else None
+        except Exception as e:
+            logger.error(f"❌ Erro ao recuperar chave {key}: {e}")
+            return None
+    
+    def set_value(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Cacheia valor por chave exata com TTL"""
+        if not self.redis_client:
+            return False
+        
+        try:
+            return self.redis_client.setex(key, ttl or self.default_ttl, pickle.dumps(value))
+        except Exception as e:
+            logger.error(f"❌ Erro ao cachear chave {key}: {e}")
+            return False
+    
+    def get_counters(self, keys: List[str]) -> Optional[List[int]]:
+        """Lê contadores inteiros (0 se ausentes); None se Redis indisponível"""
+        if not self.redis_client:
+            return None
+        
+        try:
+            values = self.redis_client.mget(keys) if keys else []
+            return [int(value) if value else 0 for value in values]
+        except Exception as e:
+            logger.error(f"❌ Erro ao ler contadores: {e}")
+            return None
+    
+    def increment_counter(self, key: str) -> Optional[int]:
+        """Incrementa contador inteiro; None se Redis indisponível"""
+        if not self.redis_client:
+            return None
+        
+        try:
+            return int(self.redis_client.incr(key))
+        except Exception as e:
+            logger.error(f"❌ Erro ao incrementar contador {key}: {e}")
+            return None
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas do cache"""
         if not self.redis_client:
@@ -5,9 +5,19 @@ import psycopg2
 from typing import List, Dict, Any, Optional
 import numpy as np
 import json
+from config.prepared_statements import register_statement, execute_prepared
 
 logger = logging.getLogger(__name__)
 
+# Consultas da busca híbrida preparadas por conexão (config/prepared_statements.py)
+register_statement('chunks_por_licitacao_count', """
+    SELECT COUNT(*) FROM documentos_chunks 
+    WHERE licitacao_id = %s
+""", ('uuid',))
+register_statement('hybrid_search_chunks', """
+    SELECT * FROM hybrid_search(%s::vector(1024), %s::text, %s::uuid, %s::integer, %s::double precision, %s::double precision)
+""", ('vector(1024)', 'text', 'uuid', 'integer', 'double precision', 'double precision'))
+
 class VectorStore:
     """Armazenamento vetorial usando PostgreSQL + pgvector - Otimizado para VoyageAI"""
     
@@ -84,13 +94,10 @@ class VectorStore:
                 logger.error(f"❌ Query embedding tem {len(query_embedding)} dimensões, esperado {self.embedding_dim}")
                 return []
             
-            with self.db_manager.get_connection() as conn:
+            with self.db_manager.get_read_connection() as conn:
                 with conn.cursor() as cursor:
                     # Verificar se temos chunks para esta licitação
-                    cursor.execute("""
-                        SELECT COUNT(*) FROM documentos_chunks 
-                        WHERE licitacao_id = %s
-                    """, (licitacao_id,))
+                    execute_prepared(cursor, 'chunks_por_licitacao_count', (licitacao_id,))
                     
                     total_chunks = cursor.fetchone()[0]
                     logger.info(f"📋 Total de chunks disponíveis para esta licitação: {total_chunks}")
@@ -117,9 +124,7 @@ class VectorStore:
                     
                     # Executar busca híbrida com casting explícito
                     try:
-                        cursor.execute("""
-                            SELECT * FROM hybrid_search(%s::vector(1024), %s::text, %s::uuid, %s::integer, %s::double precision, %s::double precision)
-                        """, (
+                        execute_prepared(cursor, 'hybrid_search_chunks', (
                             query_embedding,
                             query_text,
                             licitacao_id,
@@ -198,7 +203,7 @@ class VectorStore:
     def check_vectorization_status(self, licitacao_id: str) -> Dict[str, Any]:
         """Verifica status de vetorização de uma licitação"""
         try:
-            with self.db_manager.get_connection() as conn:
+            with self.db_manager.get_read_connection() as conn:
                 with conn.cursor() as cursor:
                     cursor.execute("""
                         SELECT 
@@ -226,7 +231,7 @@ class VectorStore:
     def count_document_chunks(self, documento_id: str) -> int:
         """Conta chunks de um documento específico"""
         try:
-            with self.db_manager.get_connection() as conn:
+            with self.db_manager.get_read_connection() as conn:
                 with conn.cursor() as cursor:
                     cursor.execute("""
                         SELECT COUNT(*) FROM documentos_chunks 
@@ -7,10 +7,15 @@ from .base_repository import BaseRepository
 from .company_repository import CompanyRepository
 from .licitacao_repository import LicitacaoRepository
 from .match_repository import MatchRepository
+from .schema_cache import SchemaCache, TableMetadata, get_schema_cache, invalidate_schema_cache
 
 __all__ = [
     'BaseRepository',
     'CompanyRepository', 
     'LicitacaoRepository',
-    'MatchRepository'
+    'MatchRepository',
+    'SchemaCache',
+    'TableMetadata',
+    'get_schema_cache',
+    'invalidate_schema_cache'
 ] 
\ No newline at end of file
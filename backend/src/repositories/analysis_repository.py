@@ -5,6 +5,7 @@ Operações CRUD e consultas específicas para análises de editais
 from typing import List, Dict, Any, Optional
 from .base_repository import BaseRepository
 import logging
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +40,7 @@ class AnalysisRepository(BaseRepository):
             'id': checklist_id,
             'licitacao_id': licitacao_id,
             'status_geracao': 'processando',
-            'created_at': self.db_manager.get_connection().__enter__().cursor().execute("SELECT NOW()").fetchone()[0]
+            'created_at': datetime.now()
         }
         return self.create(data)
     
@@ -3,14 +3,23 @@ Repository Base para padronizar operações CRUD com PostgreSQL
 Elimina repetições de conexão/cursor e padroniza acesso a dados
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Union, Tuple
-from psycopg2.extras import DictCursor
+from typing import List, Dict, Any, Optional, Union, Tuple, Iterator
+from psycopg2.extras import DictCursor, execute_values
+from psycopg2.extensions import AsIs
+import os
 import logging
 import uuid
+import json
+import base64
 from datetime import datetime
+from config.connection_pool import DB_STREAM_ITERSIZE
+from config.prepared_statements import execute_prepared
+from .schema_cache import TableMetadata, get_schema_cache
 
 logger = logging.getLogger(__name__)
 
+BULK_INSERT_PAGE_SIZE = int(os.getenv('BULK_INSERT_PAGE_SIZE', '1000'))  # Linhas por INSERT nos lotes
+
 class BaseRepository(ABC):
     """Repository base com operações CRUD padronizadas usando pool PostgreSQL"""
     
@@ -29,11 +38,27 @@ class BaseRepository(ABC):
         """Nome da chave primária"""
         pass
     
+    # Colunas internas que não saem nas consultas (ex: tsvector gerado para a busca textual)
+    hidden_columns: Tuple[str, ...] = ()
+    
+    @property
+    def select_columns(self) -> str:
+        """
+        Lista de colunas do SELECT: todas as da tabela menos hidden_columns,
+        segundo o cache de schema ('*' sem colunas ocultas ou sem metadados)
+        """
+        if not self.hidden_columns:
+            return "*"
+        metadata = self.metadata
+        if metadata is None:
+            return "*"
+        return ", ".join(column for column in metadata.columns if column not in self.hidden_columns)
+    
     def find_all(self, limit: Optional[int] = None, offset: Optional[int] = None) -> List[Dict[str, Any]]:
         """Buscar todos os registros com paginação opcional"""
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor() as cursor:
-                query = f"SELECT * FROM {self.table_name}"
+                query = f"SELECT {self.select_columns} FROM {self.table_name}"
                 params = []
                 
                 if limit:
@@ -47,11 +72,34 @@ class BaseRepository(ABC):
                 cursor.execute(query, params)
                 return [dict(row) for row in cursor.fetchall()]
     
+    def stream_query(self, query: str, params: Tuple = (), itersize: Optional[int] = None,
+                     as_dict: bool = True) -> Iterator[Union[Dict[str, Any], Tuple]]:
+        """
+        Executar SELECT com cursor nomeado (server-side), buscando itersize linhas por vez
+        A memória fica constante independente do tamanho da tabela. A conexão fica
+        emprestada até o iterador terminar (ou ser fechado).
+        as_dict=False devolve tuplas, mais compactas que dicts.
+        """
+        with self.db_manager.get_connection() as conn:
+            cursor_name = f"stream_{self.table_name}_{uuid.uuid4().hex[:12]}"
+            with conn.cursor(name=cursor_name, cursor_factory=DictCursor if as_dict else None) as cursor:
+                cursor.itersize = itersize or DB_STREAM_ITERSIZE
+                cursor.execute(query, params)
+                for row in cursor:
+                    yield dict(row) if as_dict else tuple(row)
+    
+    def iter_all(self, columns: Optional[List[str]] = None, itersize: Optional[int] = None,
+                 as_dict: bool = True) -> Iterator[Union[Dict[str, Any], Tuple]]:
+        """Percorrer todos os registros em streaming (apenas as colunas pedidas)"""
+        select = ", ".join(columns) if columns else "*"
+        query = f"SELECT {select} FROM {self.table_name}"
+        return self.stream_query(query, (), itersize=itersize, as_dict=as_dict)
+    
     def find_by_id(self, record_id: Union[str, int]) -> Optional[Dict[str, Any]]:
         """Buscar registro por ID"""
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor() as cursor:
-                query = f"SELECT * FROM {self.table_name} WHERE {self.primary_key} = %s"
+                query = f"SELECT {self.select_columns} FROM {self.table_name} WHERE {self.primary_key} = %s"
                 cursor.execute(query, (record_id,))
                 row = cursor.fetchone()
                 return dict(row) if row else None
@@ -61,7 +109,7 @@ class BaseRepository(ABC):
         if not filters:
             return self.find_all(limit=limit)
         
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor() as cursor:
                 # Construir WHERE dinamicamente
                 where_clauses = []
@@ -74,7 +122,7 @@ class BaseRepository(ABC):
                         where_clauses.append(f"{key} = %s")
                         params.append(value)
                 
-                query = f"SELECT * FROM {self.table_name} WHERE {' AND '.join(where_clauses)}"
+                query = f"SELECT {self.select_columns} FROM {self.table_name} WHERE {' AND '.join(where_clauses)}"
                 
                 if limit:
                     query += " LIMIT %s"
@@ -85,18 +133,19 @@ class BaseRepository(ABC):
     
     def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Criar novo registro"""
+        metadata = self.metadata
+        # Adicionar timestamps se a tabela tiver as colunas e não vierem nos dados
+        if metadata is None or metadata.has_created_at:
+            data.setdefault('created_at', datetime.now())
+        if metadata is None or metadata.has_updated_at:
+            data.setdefault('updated_at', datetime.now())
+        columns = self._writable_columns(data)
+        
         with self.db_manager.get_connection() as conn:
             with conn.cursor() as cursor:
-                # Adicionar timestamps se não existirem
-                if 'created_at' not in data:
-                    data['created_at'] = datetime.now()
-                if 'updated_at' not in data:
-                    data['updated_at'] = datetime.now()
-                
                 # Construir INSERT dinamicamente
-                columns = list(data.keys())
                 placeholders = ['%s'] * len(columns)
-                values = list(data.values())
+                values = [data[column] for column in columns]
                 
                 query = f"""
                     INSERT INTO {self.table_name} ({', '.join(columns)})
@@ -112,19 +161,17 @@ class BaseRepository(ABC):
         if not data:
             return self.find_by_id(record_id)
         
+        metadata = self.metadata
+        # Adicionar timestamp de atualização
+        if metadata is None or metadata.has_updated_at:
+            data['updated_at'] = datetime.now()
+        columns = self._writable_columns(data)
+        
         with self.db_manager.get_connection() as conn:
             with conn.cursor() as cursor:
-                # Adicionar timestamp de atualização
-                data['updated_at'] = datetime.now()
-                
                 # Construir UPDATE dinamicamente
-                set_clauses = []
-                params = []
-                
-                for key, value in data.items():
-                    set_clauses.append(f"{key} = %s")
-                    params.append(value)
-                
+                set_clauses = [f"{column} = %s" for column in columns]
+                params = [data[column] for column in columns]
                 params.append(record_id)
                 
                 query = f"""
@@ -138,6 +185,54 @@ class BaseRepository(ABC):
                 row = cursor.fetchone()
                 return dict(row) if row else None
     
+    def bulk_insert(self, records: List[Dict[str, Any]], page_size: int = BULK_INSERT_PAGE_SIZE,
+                    on_conflict: Optional[str] = None) -> List[Any]:
+        """
+        Inserir muitos registros em uma transação com execute_values (page_size linhas por INSERT)
+        Colunas ausentes em um registro usam DEFAULT. A ordem do RETURNING não é garantida:
+        os ids saem na ordem de entrada só quando são conhecidos aqui (chave uuid gerada no
+        cliente ou informada em todos os registros); caso contrário (ex: serial) a lista de
+        ids não segue a ordem dos registros.
+        on_conflict: cláusula ON CONFLICT anexada ao INSERT (ex: upsert por chave única).
+        Com ela os ids vêm sempre do RETURNING, pois linhas existentes mantêm o id original.
+        """
+        if not records:
+            return []
+        
+        metadata = self.metadata
+        now = datetime.now()
+        generate_ids = metadata is not None and metadata.column_types.get(self.primary_key) == 'uuid'
+        
+        rows = []
+        for record in records:
+            row = dict(record)
+            if metadata is None or metadata.has_created_at:
+                row.setdefault('created_at', now)
+            if metadata is None or metadata.has_updated_at:
+                row.setdefault('updated_at', now)
+            if generate_ids and row.get(self.primary_key) is None:
+                row[self.primary_key] = str(uuid.uuid4())
+            rows.append(row)
+        
+        columns = self._writable_columns(dict.fromkeys(key for row in rows for key in row))
+        default = AsIs('DEFAULT')
+        values = [tuple(row[column] if column in row else default for column in columns) for row in rows]
+        
+        query = f"""
+            INSERT INTO {self.table_name} ({', '.join(columns)})
+            VALUES %s
+            {on_conflict or ''}
+            RETURNING {self.primary_key}
+        """
+        
+        with self.db_manager.get_transaction() as conn:
+            with conn.cursor() as cursor:
+                returned = execute_values(cursor, query, values, page_size=page_size, fetch=True)
+        
+        if on_conflict is None and all(row.get(self.primary_key) is not None for row in rows):
+            return [row[self.primary_key] for row in rows]
+        return [row[0] for row in returned]
+    
     def delete(self, record_id: Union[str, int]) -> bool:
         """Deletar registro por ID"""
         with self.db_manager.get_connection() as conn:
@@ -148,7 +243,7 @@ class BaseRepository(ABC):
     
     def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
         """Contar registros com filtros opcionais"""
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor() as cursor:
                 if not filters:
                     query = f"SELECT COUNT(*) FROM {self.table_name}"
@@ -171,7 +266,7 @@ class BaseRepository(ABC):
     
     def exists(self, record_id: Union[str, int]) -> bool:
         """Verificar se registro existe"""
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor() as cursor:
                 query = f"SELECT 1 FROM {self.table_name} WHERE {self.primary_key} = %s LIMIT 1"
                 cursor.execute(query, (record_id,))
@@ -179,11 +274,18 @@ class BaseRepository(ABC):
     
     def execute_custom_query(self, query: str, params: Tuple = ()) -> List[Dict[str, Any]]:
         """Executar query personalizada (SELECT)"""
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(query, params)
                 return [dict(row) for row in cursor.fetchall()]
     
+    def execute_prepared_query(self, name: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        """Executar prepared statement registrado (SELECT); SQL ad-hoc segue em execute_custom_query"""
+        with self.db_manager.get_read_connection() as conn:
+            with conn.cursor() as cursor:
+                execute_prepared(cursor, name, params)
+                return [dict(row) for row in cursor.fetchall()]
+    
     def execute_custom_command(self, command: str, params: Tuple = ()) -> int:
         """Executar comando personalizado (INSERT/UPDATE/DELETE)"""
         with self.db_manager.get_connection() as conn:
@@ -197,7 +299,7 @@ class BaseRepository(ABC):
         """Buscar com paginação e metadados"""
         offset = (page - 1) * per_page
         
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor(cursor_factory=DictCursor) as cursor:
                 # Contar total
                 count_query = f"SELECT COUNT(*) FROM {self.table_name}"
@@ -208,7 +310,7 @@ class BaseRepository(ABC):
                 total_count = cursor.fetchone()[0]
                 
                 # Buscar dados
-                query = f"SELECT * FROM {self.table_name}"
+                query = f"SELECT {self.select_columns} FROM {self.table_name}"
                 if where_clause:
                     query += f" WHERE {where_clause}"
                 
@@ -235,17 +337,144 @@ class BaseRepository(ABC):
                 
                 return records, pagination_meta
     
+    def find_with_keyset_pagination(self, per_page: int = 20, cursor: Optional[str] = None,
+                                    where_clause: str = "", params: List[Any] = None,
+                                    keys: Optional[List[Tuple[str, str]]] = None,
+                                    select_sql: Optional[str] = None, from_sql: Optional[str] = None,
+                                    count: str = 'estimate') -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Paginação por keyset (cursor): a próxima página começa logo após a última linha
+        da anterior, pela ordem das chaves (todas DESC), sem OFFSET. O custo da página
+        não cresce com a profundidade.
+        
+        keys: [(expressão SQL, campo no resultado)], a última deve ser única (ex: id).
+        cursor: valor opaco devolvido em next_cursor (None = primeira página).
+        count: 'estimate' (estatísticas do planner), 'exact' (COUNT(*)) ou 'none'.
+        """
+        keys = keys or [(self.primary_key, self.primary_key)]
+        select_sql = select_sql or f"SELECT {self.select_columns}"
+        from_sql = from_sql or f"FROM {self.table_name}"
+        params = list(params or [])
+        
+        conditions = [where_clause] if where_clause else []
+        page_params = list(params)
+        if cursor:
+            values = self._decode_cursor(cursor, len(keys))
+            keyset_sql, keyset_params = self._keyset_condition([k[0] for k in keys], values)
+            conditions.append(keyset_sql)
+            page_params.extend(keyset_params)
+        
+        where_sql = f" WHERE {' AND '.join(f'({c})' for c in conditions)}" if conditions else ""
+        order_sql = ", ".join(f"{expr} DESC" for expr, _ in keys)
+        query = f"{select_sql} {from_sql}{where_sql} ORDER BY {order_sql} LIMIT %s"
+        
+        with self.db_manager.get_read_connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as db_cursor:
+                # Uma linha a mais indica se existe próxima página
+                db_cursor.execute(query, page_params + [per_page + 1])
+                records = [dict(row) for row in db_cursor.fetchall()]
+                
+                total_count = None
+                if count in ('estimate', 'exact'):
+                    filter_sql = f" WHERE {where_clause}" if where_clause else ""
+                    total_count = self._count_rows(db_cursor, f"{from_sql}{filter_sql}", params,
+                                                   exact=(count == 'exact'))
+        
+        has_next = len(records) > per_page
+        records = records[:per_page]
+        next_cursor = None
+        if has_next and records:
+            next_cursor = self._encode_cursor([records[-1].get(field) for _, field in keys])
+        
+        pagination_meta = {
+            'per_page': per_page,
+            'has_next': has_next,
+            'next_cursor': next_cursor,
+            'total_count': total_count,
+            'total_is_estimate': count == 'estimate'
+        }
+        return records, pagination_meta
+    
+    def _count_rows(self, db_cursor, from_where_sql: str, params: List[Any], exact: bool = False) -> int:
+        """Total de linhas: COUNT(*) exato ou estimativa do planner (EXPLAIN, sem varrer a tabela)"""
+        if exact:
+            db_cursor.execute(f"SELECT COUNT(*) {from_where_sql}", params)
+            return db_cursor.fetchone()[0]
+        db_cursor.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 {from_where_sql}", params)
+        plan = db_cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    
+    @staticmethod
+    def _keyset_condition(columns: List[str], values: List[Any]) -> Tuple[str, List[Any]]:
+        """
+        Condição "linhas depois do cursor" para ORDER BY col1 DESC, col2 DESC, ...
+        Com valores não nulos vira uma comparação de linha (usa o índice); colunas nulas
+        no cursor seguem a regra do DESC (NULLS FIRST).
+        """
+        if all(value is not None for value in values):
+            placeholders = ", ".join(["%s"] * len(values))
+            return f"({', '.join(columns)}) < ({placeholders})", list(values)
+        
+        column, value = columns[0], values[0]
+        if len(columns) == 1:
+            return (f"{column} IS NOT NULL", []) if value is None else (f"{column} < %s", [value])
+        rest_sql, rest_params = BaseRepository._keyset_condition(columns[1:], values[1:])
+        if value is None:
+            return f"(({column} IS NULL AND {rest_sql}) OR {column} IS NOT NULL)", rest_params
+        return f"({column} < %s OR ({column} = %s AND {rest_sql}))", [value, value] + rest_params
+    
+    @staticmethod
+    def _encode_cursor(values: List[Any]) -> str:
+        """Cursor opaco (base64 url-safe de JSON)"""
+        raw = json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str, size: int) -> List[Any]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw.decode('utf-8'))
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Cursor de paginação inválido")
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("Cursor de paginação inválido")
+        return values
+    
+    @property
+    def metadata(self) -> Optional[TableMetadata]:
+        """Metadados da tabela (colunas, tipos, chave primária), em cache no processo"""
+        return get_schema_cache().get(self.db_manager, self.table_name)
+    
+    def invalidate_metadata(self):
+        """Descartar os metadados em cache desta tabela (ex: após migração)"""
+        get_schema_cache().invalidate(self.table_name)
+    
+    def _writable_columns(self, data: Dict[str, Any]) -> List[str]:
+        """
+        Colunas de data aceitas pela tabela, segundo o cache de schema
+        Colunas desconhecidas recarregam os metadados uma vez (schema pode ter mudado)
+        antes de gerar ValueError; sem metadados, usa as chaves como vieram.
+        """
+        metadata = self.metadata
+        if metadata is None:
+            return list(data.keys())
+        
+        invalid = [key for key in data if key not in metadata.writable_columns]
+        if invalid:
+            self.invalidate_metadata()
+            metadata = self.metadata
+            if metadata is not None:
+                invalid = [key for key in data if key not in metadata.writable_columns]
+            if invalid:
+                raise ValueError(f"Colunas inválidas para {self.table_name}: {', '.join(invalid)}")
+        return list(data.keys())
+    
     def _has_timestamps(self) -> bool:
         """Verificar se a tabela tem colunas de timestamp"""
-        with self.db_manager.get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute("""
-                    SELECT column_name FROM information_schema.columns
-                    WHERE table_name = %s AND column_name IN ('created_at', 'updated_at')
-                """, (self.table_name,))
-                
-                timestamp_columns = [row[0] for row in cursor.fetchall()]
-                return 'created_at' in timestamp_columns and 'updated_at' in timestamp_columns
+        metadata = self.metadata
+        return metadata is not None and metadata.has_timestamps
     
     def _decimal_to_float(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Converter campos Decimal para float para serialização JSON"""
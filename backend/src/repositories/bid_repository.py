@@ -6,12 +6,23 @@ import logging
 from typing import List, Dict, Any, Optional, Tuple
 from psycopg2.extras import DictCursor
 from .base_repository import BaseRepository
+from config.prepared_statements import register_statement, execute_prepared
 
 logger = logging.getLogger(__name__)
 
+# Consultas quentes preparadas por conexão (config/prepared_statements.py)
+register_statement('bid_por_pncp_id', "SELECT * FROM licitacoes WHERE pncp_id = %s", ('text',))
+register_statement('bid_itens_por_licitacao', """
+    SELECT * FROM licitacao_itens 
+    WHERE licitacao_id = %s 
+    ORDER BY numero_item
+""", ('uuid',))
+
 class BidRepository(BaseRepository):
     """Repository para operações com licitações"""
     
+    hidden_columns = ('objeto_busca',)  # tsvector gerado da busca textual, não vai para os clientes
+    
     @property
     def table_name(self) -> str:
         return "licitacoes"
@@ -37,7 +48,7 @@ class BidRepository(BaseRepository):
                 'uf': bid.get('uf', ''),
                 'status': bid.get('status', ''),
                 'data_publicacao': bid.get('data_publicacao', ''),
-                'modalidade_compra': 'Pregão Eletrônico'  # Valor padrão pois não está no BD
+                'modalidade_compra': bid.get('modalidade_nome') or 'Pregão Eletrônico'  # Licitações anteriores à coluna
             })
         
         return formatted_bids
@@ -47,19 +58,18 @@ class BidRepository(BaseRepository):
         Buscar licitação por pncp_id
         Migração dos endpoints de busca específica do api.py
         """
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor(cursor_factory=DictCursor) as cursor:
-                cursor.execute(
-                    "SELECT * FROM licitacoes WHERE pncp_id = %s",
-                    (pncp_id,)
-                )
+                execute_prepared(cursor, 'bid_por_pncp_id', (pncp_id,))
                 row = cursor.fetchone()
                 
                 if not row:
                     return None
                 
-                # Converter para dict e formatar dados
+                # Converter para dict e formatar dados (a consulta preparada usa SELECT *)
                 bid_dict = dict(row)
+                for column in self.hidden_columns:
+                    bid_dict.pop(column, None)
                 return self._format_for_json(bid_dict)
     
     def find_by_pncp_id_with_items(self, pncp_id: str) -> Optional[Dict[str, Any]]:
@@ -84,28 +94,25 @@ class BidRepository(BaseRepository):
         Buscar itens de uma licitação pelo pncp_id
         Migração dos endpoints GET /api/bids/<pncp_id>/items e /api/bids/items
         """
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor(cursor_factory=DictCursor) as cursor:
                 # Primeiro, buscar o ID da licitação pelo pncp_id
                 cursor.execute("SELECT id FROM licitacoes WHERE pncp_id = %s", (pncp_id,))
                 bid = cursor.fetchone()
-                
-                if not bid:
-                    return []
-                
-                return self.find_items_by_bid_id(bid['id'])
+        
+        if not bid:
+            return []
+        
+        # Conexão já devolvida ao pool antes da segunda consulta
+        return self.find_items_by_bid_id(bid['id'])
     
     def find_items_by_bid_id(self, bid_id: str) -> List[Dict[str, Any]]:
         """
         Buscar itens de uma licitação pelo ID interno
         """
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor(cursor_factory=DictCursor) as cursor:
-                cursor.execute("""
-                    SELECT * FROM licitacao_itens 
-                    WHERE licitacao_id = %s 
-                    ORDER BY numero_item
-                """, (bid_id,))
+                execute_prepared(cursor, 'bid_itens_por_licitacao', (bid_id,))
                 
                 items = cursor.fetchall()
                 items_list = []
@@ -117,11 +124,20 @@ class BidRepository(BaseRepository):
                 
                 return items_list
     
+    # Ordem da listagem detalhada; id desempata e torna o cursor único
+    DETAILED_KEYSET = [('data_publicacao', 'data_publicacao'), ('created_at', 'created_at'), ('id', 'id')]
+    
     def find_detailed_with_pagination(self, page: int = 1, per_page: int = 20, 
-                                    filters: Dict[str, Any] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+                                    filters: Dict[str, Any] = None, cursor: Optional[str] = None,
+                                    keyset: bool = False,
+                                    count: str = 'estimate') -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         """
         Buscar licitações com informações detalhadas e paginação
         Migração do endpoint GET /api/bids/detailed do api.py linha 1276-1355
+        
+        keyset=True (ou cursor informado): paginação por cursor em (data_publicacao,
+        created_at, id), custo constante em qualquer profundidade; o total é estimado
+        a menos que count='exact'. Sem keyset mantém page/OFFSET com COUNT exato.
         """
         # Construir filtros
         where_conditions = []
@@ -144,15 +160,25 @@ class BidRepository(BaseRepository):
         if where_conditions:
             where_clause = " AND ".join(where_conditions)
         
-        # Usar método de paginação da classe base
-        order_by = "data_publicacao DESC, created_at DESC"
-        records, pagination_meta = self.find_with_pagination(
-            page=page,
-            per_page=per_page,
-            where_clause=where_clause,
-            params=params,
-            order_by=order_by
-        )
+        if keyset or cursor:
+            records, pagination_meta = self.find_with_keyset_pagination(
+                per_page=per_page,
+                cursor=cursor,
+                where_clause=where_clause,
+                params=params,
+                keys=self.DETAILED_KEYSET,
+                count=count
+            )
+        else:
+            # Usar método de paginação da classe base
+            order_by = "data_publicacao DESC, created_at DESC"
+            records, pagination_meta = self.find_with_pagination(
+                page=page,
+                per_page=per_page,
+                where_clause=where_clause,
+                params=params,
+                order_by=order_by
+            )
         
         # Formatar registros para JSON
         formatted_records = [self._format_for_json(record) for record in records]
@@ -165,10 +191,10 @@ class BidRepository(BaseRepository):
     
     def find_recent(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Buscar licitações mais recentes"""
-        with self.db_manager.get_connection() as conn:
+        with self.db_manager.get_read_connection() as conn:
             with conn.cursor(cursor_factory=DictCursor) as cursor:
-                cursor.execute("""
-                    SELECT * FROM licitacoes 
+                cursor.execute(f"""
+                    SELECT {self.select_columns} FROM licitacoes 
                     ORDER BY data_publicacao DESC, created_at DESC
                     LIMIT %s
                 """, (limit,))
@@ -37,40 +37,33 @@ class CompanyRepository(BaseRepository):
         return self.execute_custom_query(query, (search_pattern, search_pattern, limit))
     
     def search_by_keywords(self, keywords: List[str], limit: int = 50) -> List[Dict[str, Any]]:
-        """Buscar empresas por palavras-chave nos serviços/produtos"""
+        """
+        Buscar empresas por palavras-chave nos serviços/produtos
+        Usa o vetor ponderado (busca_vetor) e o array normalizado (palavras_chave_norm),
+        ambos com índice GIN (migrations/add_empresas_keyword_search.sql). A relevância
+        soma o ts_rank do vetor e a quantidade de palavras-chave cadastradas que casaram.
+        """
+        keywords = [kw.strip() for kw in keywords if kw and kw.strip()]
         if not keywords:
             return []
         
-        # Construir condições para cada palavra-chave
-        keyword_conditions = []
-        params = []
-        
-        for keyword in keywords:
-            keyword_pattern = f"%{keyword}%"
-            keyword_conditions.append("""
-                (descricao_servicos_produtos ILIKE %s 
-                 OR palavras_chave::text ILIKE %s
-                 OR setor_atuacao ILIKE %s)
-            """)
-            params.extend([keyword_pattern, keyword_pattern, keyword_pattern])
+        # OR das palavras (|| entre tsquery); cada parte vira constante no planejamento
+        tsquery = ' || '.join(["websearch_to_tsquery('portuguese', f_unaccent(%s))"] * len(keywords))
+        normalized = "(SELECT array_agg(lower(f_unaccent(kw))) FROM unnest(%s::text[]) AS kw)"
         
         query = f"""
             SELECT *, 
-                   (CASE 
-                    WHEN nome_fantasia ILIKE ANY(ARRAY[{','.join(['%s'] * len(keywords))}]) THEN 3
-                    WHEN descricao_servicos_produtos ILIKE ANY(ARRAY[{','.join(['%s'] * len(keywords))}]) THEN 2
-                    ELSE 1
-                   END) as relevance_score
+                   ts_rank(busca_vetor, {tsquery})
+                   + (SELECT COUNT(*) FROM unnest(palavras_chave_norm) AS pc
+                      WHERE pc = ANY({normalized})) AS relevance_score
             FROM empresas 
-            WHERE {' OR '.join(keyword_conditions)}
+            WHERE busca_vetor @@ ({tsquery})
+               OR palavras_chave_norm && {normalized}
             ORDER BY relevance_score DESC, nome_fantasia
             LIMIT %s
         """
         
-        # Adicionar keywords para os ARRAY[]
-        keyword_patterns = [f"%{kw}%" for kw in keywords]
-        all_params = keyword_patterns + keyword_patterns + params + [limit]
-        
+        all_params = keywords + [keywords] + keywords + [keywords] + [limit]
         return self.execute_custom_query(query, tuple(all_params))
     
     def get_companies_by_sector(self, sector: str, limit: int = 100) -> List[Dict[str, Any]]:
@@ -133,32 +126,8 @@ class CompanyRepository(BaseRepository):
         return self.update(company_id, {'palavras_chave': json.dumps(keywords)})
     
     def bulk_create(self, companies_data: List[Dict[str, Any]]) -> List[str]:
-        """Criar múltiplas empresas em uma transação"""
-        created_ids = []
-        
-        with self.db_manager.get_transaction() as conn:
-            with conn.cursor() as cursor:
-                for company_data in companies_data:
-                    # Adicionar timestamps
-                    from datetime import datetime
-                    if 'created_at' not in company_data:
-                        company_data['created_at'] = datetime.now()
-                    if 'updated_at' not in company_data:
-                        company_data['updated_at'] = datetime.now()
-                    
-                    # Construir INSERT
-                    columns = list(company_data.keys())
-                    placeholders = ['%s'] * len(columns)
-                    values = list(company_data.values())
-                    
-                    query = f"""
-                        INSERT INTO empresas ({', '.join(columns)})
-                        VALUES ({', '.join(placeholders)})
-                        RETURNING id
-                    """
-                    
-                    cursor.execute(query, values)
-                    created_ids.append(cursor.fetchone()[0])
+        """Criar múltiplas empresas em uma transação (INSERT em lote; chave uuid gerada no cliente, ids na ordem de entrada)"""
+        created_ids = self.bulk_insert(companies_data)
         
         logger.info(f"Criadas {len(created_ids)} empresas em lote")
         return created_ids 
\ No newline at end of file
@@ -2,15 +2,108 @@
 Repository específico para licitações
 Operações CRUD e consultas específicas para a tabela 'licitacoes'
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from .base_repository import BaseRepository
+from config.prepared_statements import register_statement
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Consultas quentes preparadas por conexão (config/prepared_statements.py)
+register_statement('licitacao_por_pncp_id', """
+    SELECT 
+        id, pncp_id, orgao_cnpj, ano_compra, sequencial_compra,
+        objeto_compra, link_sistema_origem, data_publicacao,
+        valor_total_estimado, uf, status, created_at, updated_at,
+        -- Novos campos da API 1
+        numero_controle_pncp, numero_compra, processo,
+        valor_total_homologado, data_abertura_proposta, data_encerramento_proposta,
+        modo_disputa_id, modo_disputa_nome, srp,
+        link_processo_eletronico, justificativa_presencial, razao_social,
+        -- Novos campos da unidadeOrgao
+        uf_nome, nome_unidade, municipio_nome, codigo_ibge, codigo_unidade
+    FROM licitacoes 
+    WHERE pncp_id = %s
+    LIMIT 1
+""", ('text',))
+
+register_statement('itens_por_licitacao', """
+    SELECT 
+        id, licitacao_id, numero_item, descricao, quantidade,
+        unidade_medida, valor_unitario_estimado, created_at, updated_at,
+        -- Novos campos da API 2
+        material_ou_servico, ncm_nbs_codigo,
+        criterio_julgamento_id, criterio_julgamento_nome,
+        tipo_beneficio_id, tipo_beneficio_nome,
+        situacao_item_id, situacao_item_nome,
+        aplicabilidade_margem_preferencia, percentual_margem_preferencia,
+        tem_resultado
+    FROM licitacao_itens 
+    WHERE licitacao_id = %s 
+    ORDER BY numero_item
+""", ('uuid',))
+
+# Itens como JSON agregado (detalhe da licitação em uma consulta)
+ITENS_JSON_SQL = """
+    COALESCE((
+        SELECT json_agg(i ORDER BY i.numero_item)
+        FROM (
+            SELECT 
+                id, licitacao_id, numero_item, descricao, quantidade,
+                unidade_medida, valor_unitario_estimado, created_at, updated_at,
+                material_ou_servico, ncm_nbs_codigo,
+                criterio_julgamento_id, criterio_julgamento_nome,
+                tipo_beneficio_id, tipo_beneficio_nome,
+                situacao_item_id, situacao_item_nome,
+                aplicabilidade_margem_preferencia, percentual_margem_preferencia,
+                tem_resultado
+            FROM licitacao_itens
+            WHERE licitacao_id = l.id
+        ) i
+    ), '[]'::json)
+"""
+
+register_statement('itens_por_pncp_id', f"""
+    SELECT l.id, {ITENS_JSON_SQL} AS itens
+    FROM licitacoes l
+    WHERE l.pncp_id = %s
+    LIMIT 1
+""", ('text',))
+
+register_statement('licitacao_detalhe_por_pncp_id', f"""
+    SELECT 
+        l.id, l.pncp_id, l.orgao_cnpj, l.ano_compra, l.sequencial_compra,
+        l.objeto_compra, l.link_sistema_origem, l.data_publicacao,
+        l.valor_total_estimado, l.uf, l.status, l.created_at, l.updated_at,
+        l.numero_controle_pncp, l.numero_compra, l.processo,
+        l.valor_total_homologado, l.data_abertura_proposta, l.data_encerramento_proposta,
+        l.modo_disputa_id, l.modo_disputa_nome, l.srp,
+        l.link_processo_eletronico, l.justificativa_presencial, l.razao_social,
+        l.uf_nome, l.nome_unidade, l.municipio_nome, l.codigo_ibge, l.codigo_unidade,
+        {ITENS_JSON_SQL} AS itens,
+        COALESCE((
+            SELECT json_agg(m ORDER BY m.score_similaridade DESC)
+            FROM (
+                SELECT 
+                    mt.id, mt.empresa_id, mt.score_similaridade, mt.match_type, mt.data_match,
+                    e.nome_fantasia AS empresa_nome, e.razao_social AS empresa_razao_social,
+                    e.cnpj AS empresa_cnpj
+                FROM matches mt
+                JOIN empresas e ON e.id = mt.empresa_id
+                WHERE mt.licitacao_id = l.id
+            ) m
+        ), '[]'::json) AS matches
+    FROM licitacoes l
+    WHERE l.pncp_id = %s
+    LIMIT 1
+""", ('text',))
+
 class LicitacaoRepository(BaseRepository):
     """Repository para operações com a tabela licitacoes"""
     
+    SEARCH_MAX_LIMIT = 500  # Teto do top-N das buscas textuais
+    hidden_columns = ('objeto_busca',)  # tsvector gerado da busca textual, não vai para os clientes
+    
     @property
     def table_name(self) -> str:
         return "licitacoes"
@@ -21,33 +114,27 @@ class LicitacaoRepository(BaseRepository):
     
     def find_by_id(self, id: str) -> Optional[Dict[str, Any]]:
         """Buscar licitação por ID"""
-        query = """
-            SELECT * FROM licitacoes WHERE id = %s
+        query = f"""
+            SELECT {self.select_columns} FROM licitacoes WHERE id = %s
         """
         results = self.execute_custom_query(query, (id,))
         return results[0] if results else None
     
     def find_by_pncp_id(self, pncp_id: str) -> Optional[Dict[str, Any]]:
         """Buscar licitação por ID do PNCP com todos os campos novos"""
-        query = """
-            SELECT 
-                id, pncp_id, orgao_cnpj, ano_compra, sequencial_compra,
-                objeto_compra, link_sistema_origem, data_publicacao,
-                valor_total_estimado, uf, status, created_at, updated_at,
-                -- Novos campos da API 1
-                numero_controle_pncp, numero_compra, processo,
-                valor_total_homologado, data_abertura_proposta, data_encerramento_proposta,
-                modo_disputa_id, modo_disputa_nome, srp,
-                link_processo_eletronico, justificativa_presencial, razao_social,
-                -- Novos campos da unidadeOrgao
-                uf_nome, nome_unidade, municipio_nome, codigo_ibge, codigo_unidade
-            FROM licitacoes 
-            WHERE pncp_id = %s
-            LIMIT 1
-        """
-        results = self.execute_custom_query(query, (pncp_id,))
+        results = self.execute_prepared_query('licitacao_por_pncp_id', (pncp_id,))
+        return results[0] if results else None
+    
+    def find_detail_by_pncp_id(self, pncp_id: str) -> Optional[Dict[str, Any]]:
+        """Licitação com itens e matches agregados (json_agg) em uma única consulta"""
+        results = self.execute_prepared_query('licitacao_detalhe_por_pncp_id', (pncp_id,))
         return results[0] if results else None
     
+    def find_items_by_pncp_id(self, pncp_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Itens de uma licitação pelo PNCP ID em uma consulta; None se a licitação não existir"""
+        results = self.execute_prepared_query('itens_por_pncp_id', (pncp_id,))
+        return results[0]['itens'] if results else None
+    
     def find_by_status(self, status: str, limit: int = 100) -> List[Dict[str, Any]]:
         """Buscar licitações por status"""
         return self.find_by_filters({'status': status}, limit=limit)
@@ -56,16 +143,30 @@ class LicitacaoRepository(BaseRepository):
         """Buscar licitações pendentes para processamento"""
         return self.find_by_status('coletada', limit=limit)
     
+    def _objeto_search(self, search_term: str) -> Tuple[str, str, List[Any], List[Any]]:
+        """
+        Expressões da busca textual no objeto (migrations/add_licitacoes_text_search.sql)
+        Casa por palavras (tsvector em português, sem acentos) ou por trecho (trigramas);
+        ambos os lados usam índice GIN. Retorna (ranking, condição, params do ranking, params da condição).
+        """
+        term = (search_term or '').strip()
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        tsquery = "websearch_to_tsquery('portuguese', f_unaccent(%s))"
+        rank = f"ts_rank_cd(objeto_busca, {tsquery})"
+        condition = f"(objeto_busca @@ {tsquery} OR f_unaccent(objeto_compra) ILIKE f_unaccent(%s))"
+        return rank, condition, [term], [term, pattern]
+    
     def search_by_object(self, search_term: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Buscar licitações por objeto"""
-        query = """
-            SELECT * FROM licitacoes 
-            WHERE objeto_compra ILIKE %s
-            ORDER BY data_publicacao DESC, valor_total_estimado DESC
+        """Buscar licitações por objeto, ordenadas por relevância"""
+        rank, condition, rank_params, condition_params = self._objeto_search(search_term)
+        query = f"""
+            SELECT {self.select_columns}, {rank} AS relevancia FROM licitacoes 
+            WHERE {condition}
+            ORDER BY relevancia DESC, data_publicacao DESC, valor_total_estimado DESC
             LIMIT %s
         """
-        search_pattern = f"%{search_term}%"
-        return self.execute_custom_query(query, (search_pattern, limit))
+        params = rank_params + condition_params + [min(limit, self.SEARCH_MAX_LIMIT)]
+        return self.execute_custom_query(query, tuple(params))
     
     def find_by_value_range(self, min_value: Optional[float] = None, 
                            max_value: Optional[float] = None, 
@@ -86,7 +187,7 @@ class LicitacaoRepository(BaseRepository):
             return self.find_all(limit=limit)
         
         query = f"""
-            SELECT * FROM licitacoes 
+            SELECT {self.select_columns} FROM licitacoes 
             WHERE {' AND '.join(where_clauses)}
             ORDER BY valor_total_estimado DESC
             LIMIT %s
@@ -102,8 +203,8 @@ class LicitacaoRepository(BaseRepository):
     def find_by_date_range(self, start_date: str, end_date: str, 
                           limit: int = 100) -> List[Dict[str, Any]]:
         """Buscar licitações por período de publicação"""
-        query = """
-            SELECT * FROM licitacoes 
+        query = f"""
+            SELECT {self.select_columns} FROM licitacoes 
             WHERE data_publicacao BETWEEN %s AND %s
             ORDER BY data_publicacao DESC
             LIMIT %s
@@ -114,49 +215,57 @@ class LicitacaoRepository(BaseRepository):
         """Buscar licitações por modalidade"""
         return self.find_by_filters({'modalidade_id': modalidade_id}, limit=limit)
     
-    def get_licitacoes_statistics(self) -> Dict[str, Any]:
-        """Obter estatísticas das licitações"""
-        stats_query = """
-            SELECT 
-                COUNT(*) as total_licitacoes,
-                COUNT(DISTINCT uf) as total_ufs,
-                COUNT(DISTINCT modalidade_id) as total_modalidades,
-                SUM(CASE WHEN valor_total_estimado IS NOT NULL THEN valor_total_estimado ELSE 0 END) as valor_total_estimado,
-                AVG(CASE WHEN valor_total_estimado IS NOT NULL THEN valor_total_estimado ELSE NULL END) as valor_medio,
-                COUNT(CASE WHEN status = 'coletada' THEN 1 END) as coletadas,
-                COUNT(CASE WHEN status = 'processada' THEN 1 END) as processadas,
-                COUNT(CASE WHEN status = 'matched' THEN 1 END) as com_matches,
-                MAX(data_publicacao) as ultima_publicacao,
-                MIN(data_publicacao) as primeira_publicacao
-            FROM licitacoes
+    def _summary_rows(self, dimensoes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Linhas da view de resumo mv_licitacoes_estatisticas (poucas dezenas de linhas)
+        Atualizada pela ingestão/matching (matching.summaries), não a cada requisição
         """
+        if dimensoes:
+            return self.execute_custom_query(
+                "SELECT * FROM mv_licitacoes_estatisticas WHERE dimensao = ANY(%s)", (dimensoes,)
+            )
+        return self.execute_custom_query("SELECT * FROM mv_licitacoes_estatisticas")
+    
+    def get_licitacoes_statistics(self) -> Dict[str, Any]:
+        """Obter estatísticas das licitações (da view de resumo)"""
+        rows = self._summary_rows(['total', 'modalidade', 'uf', 'status'])
+        total = next((row for row in rows if row['dimensao'] == 'total'), None)
         
-        result = self.execute_custom_query(stats_query)
-        if result:
-            stats = result[0]
+        if total and total['quantidade']:
+            by_dim = lambda dimensao: [row for row in rows if row['dimensao'] == dimensao]
+            status_count = {row['chave']: row['quantidade'] for row in by_dim('status')}
+            modalidades = [row for row in by_dim('modalidade') if row['chave']]
+            ufs = [row for row in by_dim('uf') if row['chave']]
             
-            # Buscar modalidades mais comuns
-            modalidades_query = """
-                SELECT modalidade_nome, modalidade_id, COUNT(*) as quantidade
-                FROM licitacoes 
-                WHERE modalidade_nome IS NOT NULL
-                GROUP BY modalidade_nome, modalidade_id
-                ORDER BY quantidade DESC
-                LIMIT 10
-            """
+            stats = {
+                'total_licitacoes': total['quantidade'],
+                'total_ufs': len(ufs),
+                'total_modalidades': len({row['chave_id'] for row in by_dim('modalidade') if row['chave_id'] != -1}),
+                'valor_total_estimado': total['soma_valor'],
+                'valor_medio': total['soma_valor'] / total['qtd_com_valor'] if total['qtd_com_valor'] else None,
+                'coletadas': status_count.get('coletada', 0),
+                'processadas': status_count.get('processada', 0),
+                'com_matches': status_count.get('matched', 0),
+                'ultima_publicacao': total['ultima_publicacao'],
+                'primeira_publicacao': total['primeira_publicacao'],
+                'atualizado_em': total['atualizado_em']
+            }
             
-            # Buscar UFs mais ativas
-            ufs_query = """
-                SELECT uf, COUNT(*) as quantidade
-                FROM licitacoes 
-                WHERE uf IS NOT NULL
-                GROUP BY uf
-                ORDER BY quantidade DESC
-                LIMIT 10
-            """
+            # Modalidades mais comuns
+            stats['modalidades_principais'] = [
+                {
+                    'modalidade_nome': row['chave'],
+                    'modalidade_id': None if row['chave_id'] == -1 else row['chave_id'],
+                    'quantidade': row['quantidade']
+                }
+                for row in sorted(modalidades, key=lambda r: r['quantidade'], reverse=True)[:10]
+            ]
             
-            stats['modalidades_principais'] = self.execute_custom_query(modalidades_query)
-            stats['ufs_mais_ativas'] = self.execute_custom_query(ufs_query)
+            # UFs mais ativas
+            stats['ufs_mais_ativas'] = [
+                {'uf': row['chave'], 'quantidade': row['quantidade']}
+                for row in sorted(ufs, key=lambda r: r['quantidade'], reverse=True)[:10]
+            ]
             
             return stats
         
@@ -173,6 +282,32 @@ class LicitacaoRepository(BaseRepository):
             'ufs_mais_ativas': []
         }
     
+    def get_statistics_aggregates(self) -> List[Dict[str, Any]]:
+        """
+        Agregados de /api/bids/statistics (da view de resumo)
+        Uma linha por dimensão/chave: dimensao = 'total', 'modalidade', 'uf' ou 'status'
+        """
+        query = """
+            SELECT 
+                dimensao,
+                CASE 
+                    WHEN chave <> '' THEN chave
+                    WHEN dimensao = 'modalidade' THEN 'Não especificada'
+                    ELSE 'Não especificado'
+                END as chave,
+                SUM(quantidade) as quantidade,
+                SUM(qtd_valor_positivo) as licitacoes_com_valor,
+                SUM(soma_valor_positivo) as valor_total_estimado,
+                COALESCE(MIN(min_valor_positivo), 0) as valor_minimo,
+                COALESCE(MAX(max_valor_positivo), 0) as valor_maximo,
+                SUM(recentes_30_dias) as recentes_30_dias,
+                MAX(ultima_atualizacao) as last_updated
+            FROM mv_licitacoes_estatisticas
+            WHERE dimensao IN ('total', 'modalidade', 'uf', 'status')
+            GROUP BY 1, 2
+        """
+        return self.execute_custom_query(query)
+    
     def update_status(self, licitacao_id: str, new_status: str) -> Optional[Dict[str, Any]]:
         """Atualizar status de uma licitação"""
         return self.update(licitacao_id, {'status': new_status})
@@ -194,10 +329,16 @@ class LicitacaoRepository(BaseRepository):
         where_clauses = []
         params = []
         
-        # Filtro por objeto (ILIKE)
+        # Filtro por objeto (busca textual indexada, ordenada por relevância)
+        select_rank = ""
+        order_by = "data_publicacao DESC, valor_total_estimado DESC"
+        rank_params: List[Any] = []
         if filters.get('objeto'):
-            where_clauses.append("objeto_compra ILIKE %s")
-            params.append(f"%{filters['objeto']}%")
+            rank, condition, rank_params, condition_params = self._objeto_search(filters['objeto'])
+            select_rank = f", {rank} AS relevancia"
+            order_by = "relevancia DESC, " + order_by
+            where_clauses.append(condition)
+            params.extend(condition_params)
         
         # Filtro por UF
         if filters.get('uf'):
@@ -238,15 +379,22 @@ class LicitacaoRepository(BaseRepository):
             return self.find_all(limit=limit)
         
         query = f"""
-            SELECT * FROM licitacoes 
+            SELECT {self.select_columns}{select_rank} FROM licitacoes 
             WHERE {' AND '.join(where_clauses)}
-            ORDER BY data_publicacao DESC, valor_total_estimado DESC
+            ORDER BY {order_by}
             LIMIT %s
         """
-        params.append(limit)
+        params = rank_params + params + [min(limit, self.SEARCH_MAX_LIMIT)]
         
         return self.execute_custom_query(query, tuple(params))
     
+    def bulk_create_bids(self, bids_data: List[Dict[str, Any]]) -> List[str]:
+        """Criar múltiplas licitações em uma transação (INSERT em lote; chave uuid gerada no cliente, ids na ordem de entrada)"""
+        created_ids = self.bulk_insert(bids_data)
+        
+        logger.info(f"Criadas {len(created_ids)} licitações em lote")
+        return created_ids
+    
     def bulk_update_status(self, licitacao_ids: List[str], new_status: str) -> int:
         """Atualizar status de múltiplas licitações"""
         if not licitacao_ids:
@@ -265,8 +413,8 @@ class LicitacaoRepository(BaseRepository):
     
     def find_recent(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Buscar licitações mais recentes baseado na data de publicação"""
-        query = """
-            SELECT * FROM licitacoes 
+        query = f"""
+            SELECT {self.select_columns} FROM licitacoes 
             ORDER BY 
                 CASE 
                     WHEN data_publicacao IS NOT NULL THEN data_publicacao
@@ -279,28 +427,12 @@ class LicitacaoRepository(BaseRepository):
     
     def find_items_by_licitacao_id(self, licitacao_id: str) -> List[Dict[str, Any]]:
         """Buscar itens de uma licitação específica pelo ID interno com todos os campos novos"""
-        query = """
-            SELECT 
-                id, licitacao_id, numero_item, descricao, quantidade,
-                unidade_medida, valor_unitario_estimado, created_at, updated_at,
-                -- Novos campos da API 2
-                material_ou_servico, ncm_nbs_codigo,
-                criterio_julgamento_id, criterio_julgamento_nome,
-                tipo_beneficio_id, tipo_beneficio_nome,
-                situacao_item_id, situacao_item_nome,
-                aplicabilidade_margem_preferencia, percentual_margem_preferencia,
-                tem_resultado
-            FROM licitacao_itens 
-            WHERE licitacao_id = %s 
-            ORDER BY numero_item
-        """
-        
-        return self.execute_custom_query(query, (licitacao_id,))
+        return self.execute_prepared_query('itens_por_licitacao', (licitacao_id,))
     
     def find_active_bids(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Buscar licitações ativas (ainda em prazo)"""
-        query = """
-            SELECT * FROM licitacoes 
+        query = f"""
+            SELECT {self.select_columns} FROM licitacoes 
             WHERE 
                 (data_abertura IS NULL OR data_abertura >= CURRENT_DATE)
                 AND status != 'cancelada'
@@ -312,8 +444,8 @@ class LicitacaoRepository(BaseRepository):
     def find_active_bids_after_date(self, after_date: str = None, limit: int = 50) -> List[Dict[str, Any]]:
         """Buscar licitações ativas (data_encerramento_proposta > data especificada)"""
         if after_date:
-            query = """
-                SELECT * FROM licitacoes 
+            query = f"""
+                SELECT {self.select_columns} FROM licitacoes 
                 WHERE 
                     data_encerramento_proposta > %s
                     AND status != 'cancelada'
@@ -323,8 +455,8 @@ class LicitacaoRepository(BaseRepository):
             return self.execute_custom_query(query, (after_date, limit))
         else:
             # Se não especificar data, usar hoje
-            query = """
-                SELECT * FROM licitacoes 
+            query = f"""
+                SELECT {self.select_columns} FROM licitacoes 
                 WHERE 
                     data_encerramento_proposta > CURRENT_DATE
                     AND status != 'cancelada'
@@ -335,8 +467,8 @@ class LicitacaoRepository(BaseRepository):
     
     def find_high_value_bids(self, min_value: float = 1000000, limit: int = 50) -> List[Dict[str, Any]]:
         """Buscar licitações de alto valor"""
-        query = """
-            SELECT * FROM licitacoes 
+        query = f"""
+            SELECT {self.select_columns} FROM licitacoes 
             WHERE valor_total_estimado >= %s
             ORDER BY valor_total_estimado DESC
             LIMIT %s
@@ -349,8 +481,8 @@ class LicitacaoRepository(BaseRepository):
     
     def find_by_modality(self, modalidade: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Buscar licitações por modalidade (nome)"""
-        query = """
-            SELECT * FROM licitacoes 
+        query = f"""
+            SELECT {self.select_columns} FROM licitacoes 
             WHERE modalidade_nome ILIKE %s
             ORDER BY data_publicacao DESC
             LIMIT %s
@@ -389,8 +521,8 @@ class LicitacaoRepository(BaseRepository):
     
     def find_by_modo_disputa(self, modo_disputa_id: int, limit: int = 50) -> List[Dict[str, Any]]:
         """Buscar licitações por modo de disputa (aberto, fechado, etc.)"""
-        query = """
-            SELECT * FROM licitacoes 
+        query = f"""
+            SELECT {self.select_columns} FROM licitacoes 
             WHERE modo_disputa_id = %s
             ORDER BY data_publicacao DESC
             LIMIT %s
@@ -438,46 +570,31 @@ class LicitacaoRepository(BaseRepository):
         return self.execute_custom_query(query, (limit,))
     
     def get_enhanced_statistics(self) -> Dict[str, Any]:
-        """Estatísticas aprimoradas com os novos campos"""
+        """Estatísticas aprimoradas com os novos campos (das views de resumo)"""
         stats = self.get_licitacoes_statistics()
+        rows = self._summary_rows(['srp', 'modo_disputa'])
         
         # Estatísticas SRP
-        srp_query = """
-            SELECT 
-                COUNT(*) as total_srp,
-                AVG(valor_total_estimado) as valor_medio_srp,
-                COUNT(CASE WHEN data_encerramento_proposta > NOW() THEN 1 END) as srp_abertas
-            FROM licitacoes 
-            WHERE srp = true
-        """
-        srp_stats = self.execute_custom_query(srp_query)
-        if srp_stats:
-            stats.update(srp_stats[0])
+        srp = next((row for row in rows if row['dimensao'] == 'srp' and row['chave'] == 'true'), None)
+        stats['total_srp'] = srp['quantidade'] if srp else 0
+        stats['valor_medio_srp'] = srp['soma_valor'] / srp['qtd_com_valor'] if srp and srp['qtd_com_valor'] else None
+        stats['srp_abertas'] = srp['propostas_abertas'] if srp else 0
         
         # Estatísticas de itens por tipo
-        items_type_query = """
-            SELECT 
-                material_ou_servico,
-                COUNT(*) as quantidade,
-                AVG(valor_unitario_estimado) as valor_medio,
-                SUM(valor_unitario_estimado * quantidade) as valor_total
-            FROM licitacao_itens 
-            WHERE material_ou_servico IS NOT NULL
-            GROUP BY material_ou_servico
-        """
-        stats['tipos_item'] = self.execute_custom_query(items_type_query)
+        stats['tipos_item'] = self.execute_custom_query("""
+            SELECT material_ou_servico, quantidade, valor_medio, valor_total
+            FROM mv_licitacao_itens_tipos
+        """)
         
         # Estatísticas de modo de disputa
-        modo_disputa_query = """
-            SELECT 
-                modo_disputa_nome,
-                COUNT(*) as quantidade,
-                AVG(valor_total_estimado) as valor_medio
-            FROM licitacoes 
-            WHERE modo_disputa_nome IS NOT NULL
-            GROUP BY modo_disputa_nome
-            ORDER BY quantidade DESC
-        """
-        stats['modos_disputa'] = self.execute_custom_query(modo_disputa_query)
+        modos = [row for row in rows if row['dimensao'] == 'modo_disputa' and row['chave']]
+        stats['modos_disputa'] = [
+            {
+                'modo_disputa_nome': row['chave'],
+                'quantidade': row['quantidade'],
+                'valor_medio': row['soma_valor'] / row['qtd_com_valor'] if row['qtd_com_valor'] else None
+            }
+            for row in sorted(modos, key=lambda r: r['quantidade'], reverse=True)
+        ]
         
         return stats 
\ No newline at end of file
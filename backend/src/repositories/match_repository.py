@@ -2,12 +2,49 @@
 Repository específico para matches
 Operações CRUD e consultas específicas para a tabela 'matches'
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from .base_repository import BaseRepository
+from config.prepared_statements import register_statement
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Upsert por par licitação × empresa (mesma semântica de MATCH_UPSERT_SQL no matching)
+MATCH_BULK_ON_CONFLICT = """
+    ON CONFLICT (licitacao_id, empresa_id) DO UPDATE SET
+        score_similaridade = EXCLUDED.score_similaridade,
+        match_type = EXCLUDED.match_type,
+        justificativa_match = EXCLUDED.justificativa_match,
+        data_match = NOW()
+"""
+
+# Consultas quentes preparadas por conexão (config/prepared_statements.py)
+register_statement('matches_recentes', """
+    SELECT 
+        m.id as match_id,
+        m.score_similaridade,
+        m.match_type as tipo_match,
+        m.data_match as match_timestamp,
+        -- Dados da empresa
+        e.id as empresa_id,
+        e.nome_fantasia as empresa_nome,
+        e.razao_social as empresa_razao_social,
+        e.cnpj as empresa_cnpj,
+        -- Dados da licitação
+        l.id as licitacao_id,
+        l.pncp_id as licitacao_pncp_id,
+        l.objeto_compra as licitacao_objeto,
+        l.valor_total_estimado as licitacao_valor,
+        l.uf as licitacao_uf,
+        l.data_publicacao as licitacao_data_publicacao,
+        l.data_encerramento_proposta as licitacao_data_encerramento
+    FROM matches m
+    JOIN empresas e ON m.empresa_id = e.id
+    JOIN licitacoes l ON m.licitacao_id = l.id
+    ORDER BY m.data_match DESC
+    LIMIT %s
+""", ('integer',))
+
 class MatchRepository(BaseRepository):
     """Repository para operações com a tabela matches"""
     
@@ -58,6 +95,55 @@ class MatchRepository(BaseRepository):
         """
         return self.execute_custom_query(query, (limit,))
     
+    # Ordem das listagens de matches; id desempata e torna o cursor único
+    LISTING_KEYSET = [('m.score_similaridade', 'score_similaridade'), ('m.created_at', 'created_at'), ('m.id', 'id')]
+    
+    def find_matches_page(self, per_page: int = 50, cursor: Optional[str] = None,
+                          empresa_id: Optional[str] = None, licitacao_id: Optional[str] = None,
+                          min_score: Optional[float] = None,
+                          count: str = 'estimate') -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Matches com detalhes de empresa e licitação, paginados por cursor
+        (score_similaridade, created_at, id); total estimado salvo count='exact'
+        """
+        conditions = []
+        params = []
+        if empresa_id:
+            conditions.append("m.empresa_id = %s")
+            params.append(empresa_id)
+        if licitacao_id:
+            conditions.append("m.licitacao_id = %s")
+            params.append(licitacao_id)
+        if min_score is not None:
+            conditions.append("m.score_similaridade >= %s")
+            params.append(min_score)
+        
+        return self.find_with_keyset_pagination(
+            per_page=per_page,
+            cursor=cursor,
+            where_clause=" AND ".join(conditions),
+            params=params,
+            keys=self.LISTING_KEYSET,
+            select_sql="""
+                SELECT 
+                    m.*,
+                    e.nome_fantasia as empresa_nome,
+                    e.razao_social as empresa_razao_social,
+                    e.cnpj as empresa_cnpj,
+                    l.objeto_compra as licitacao_objeto,
+                    l.valor_total_estimado as licitacao_valor,
+                    l.data_publicacao as licitacao_data_publicacao,
+                    l.uf as licitacao_uf,
+                    l.modalidade_nome as licitacao_modalidade
+            """,
+            from_sql="""
+                FROM matches m
+                JOIN empresas e ON m.empresa_id = e.id
+                JOIN licitacoes l ON m.licitacao_id = l.id
+            """,
+            count=count
+        )
+    
     def find_matches_by_company_with_details(self, empresa_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Buscar matches de uma empresa com detalhes da licitação"""
         query = """
@@ -95,69 +181,42 @@ class MatchRepository(BaseRepository):
         """
         return self.execute_custom_query(query, (licitacao_id, limit))
     
+    # Faixas de score da view mv_matches_resumo (coluna, rótulo)
+    SCORE_BUCKETS = [
+        ('faixa_09_10', '0.9-1.0'), ('faixa_08_09', '0.8-0.9'), ('faixa_07_08', '0.7-0.8'),
+        ('faixa_06_07', '0.6-0.7'), ('faixa_05_06', '0.5-0.6'), ('faixa_00_05', '0.0-0.5')
+    ]
+    
     def get_matches_statistics(self) -> Dict[str, Any]:
-        """Obter estatísticas dos matches"""
-        stats_query = """
-            SELECT 
-                COUNT(*) as total_matches,
-                AVG(score_similaridade) as score_medio,
-                MAX(score_similaridade) as melhor_score,
-                MIN(score_similaridade) as pior_score,
-                COUNT(CASE WHEN score_similaridade >= 0.9 THEN 1 END) as matches_excelentes,
-                COUNT(CASE WHEN score_similaridade >= 0.8 THEN 1 END) as matches_bons,
-                COUNT(CASE WHEN score_similaridade >= 0.7 THEN 1 END) as matches_regulares,
-                COUNT(DISTINCT empresa_id) as empresas_com_matches,
-                COUNT(DISTINCT licitacao_id) as licitacoes_com_matches,
-                MAX(created_at) as ultimo_match_criado,
-                MIN(created_at) as primeiro_match_criado
-            FROM matches
         """
-        
-        result = self.execute_custom_query(stats_query)
-        if result:
-            stats = result[0]
+        Obter estatísticas dos matches
+        Lidas das views mv_matches_resumo / mv_matches_por_empresa, atualizadas pelo matching
+        """
+        result = self.execute_custom_query("SELECT * FROM mv_matches_resumo")
+        if result and result[0]['total_matches']:
+            resumo = result[0]
+            stats = {
+                key: resumo[key] for key in (
+                    'total_matches', 'score_medio', 'melhor_score', 'pior_score',
+                    'matches_excelentes', 'matches_bons', 'matches_regulares',
+                    'empresas_com_matches', 'licitacoes_com_matches',
+                    'ultimo_match_criado', 'primeiro_match_criado', 'atualizado_em'
+                )
+            }
             
-            # Buscar empresas com mais matches
-            top_empresas_query = """
-                SELECT 
-                    e.nome_fantasia,
-                    e.razao_social,
-                    COUNT(m.id) as total_matches,
-                    AVG(m.score_similaridade) as score_medio
-                FROM matches m
-                JOIN empresas e ON m.empresa_id = e.id
-                GROUP BY e.id, e.nome_fantasia, e.razao_social
-                ORDER BY COUNT(m.id) DESC, AVG(m.score_similaridade) DESC
+            # Empresas com mais matches
+            stats['top_empresas'] = self.execute_custom_query("""
+                SELECT empresa_nome as nome_fantasia, razao_social, total_matches, score_medio
+                FROM mv_matches_por_empresa
+                ORDER BY total_matches DESC, score_medio DESC
                 LIMIT 10
-            """
+            """)
             
-            # Buscar score distribution
-            score_distribution_query = """
-                SELECT 
-                    CASE 
-                        WHEN score_similaridade >= 0.9 THEN '0.9-1.0'
-                        WHEN score_similaridade >= 0.8 THEN '0.8-0.9'
-                        WHEN score_similaridade >= 0.7 THEN '0.7-0.8'
-                        WHEN score_similaridade >= 0.6 THEN '0.6-0.7'
-                        WHEN score_similaridade >= 0.5 THEN '0.5-0.6'
-                        ELSE '0.0-0.5'
-                    END as faixa_score,
-                    COUNT(*) as quantidade
-                FROM matches
-                GROUP BY 
-                    CASE 
-                        WHEN score_similaridade >= 0.9 THEN '0.9-1.0'
-                        WHEN score_similaridade >= 0.8 THEN '0.8-0.9'
-                        WHEN score_similaridade >= 0.7 THEN '0.7-0.8'
-                        WHEN score_similaridade >= 0.6 THEN '0.6-0.7'
-                        WHEN score_similaridade >= 0.5 THEN '0.5-0.6'
-                        ELSE '0.0-0.5'
-                    END
-                ORDER BY faixa_score DESC
-            """
-            
-            stats['top_empresas'] = self.execute_custom_query(top_empresas_query)
-            stats['distribuicao_scores'] = self.execute_custom_query(score_distribution_query)
+            # Distribuição de scores (só faixas com matches, da maior para a menor)
+            stats['distribuicao_scores'] = [
+                {'faixa_score': label, 'quantidade': resumo[column]}
+                for column, label in self.SCORE_BUCKETS if resumo[column]
+            ]
             
             return stats
         
@@ -186,23 +245,13 @@ class MatchRepository(BaseRepository):
         return self.execute_custom_query(query, (min_score, max_score, limit))
     
     def get_companies_with_matches_summary(self) -> List[Dict[str, Any]]:
-        """Buscar empresas com resumo de matches (equivalente ao endpoint antigo)"""
+        """Buscar empresas com resumo de matches (da view mv_matches_por_empresa)"""
         query = """
             SELECT 
-                e.id as empresa_id,
-                e.nome_fantasia as empresa_nome,
-                e.razao_social,
-                e.cnpj,
-                e.setor_atuacao,
-                COUNT(m.id) as total_matches,
-                AVG(m.score_similaridade) as score_medio,
-                MAX(m.score_similaridade) as melhor_score,
-                MIN(m.score_similaridade) as pior_score
-            FROM empresas e
-            JOIN matches m ON e.id = m.empresa_id
-            GROUP BY e.id, e.nome_fantasia, e.razao_social, e.cnpj, e.setor_atuacao
-            HAVING COUNT(m.id) > 0
-            ORDER BY COUNT(m.id) DESC, AVG(m.score_similaridade) DESC
+                empresa_id, empresa_nome, razao_social, cnpj, setor_atuacao,
+                total_matches, score_medio, melhor_score, pior_score
+            FROM mv_matches_por_empresa
+            ORDER BY total_matches DESC, score_medio DESC
         """
         return self.execute_custom_query(query)
     
@@ -239,35 +288,20 @@ class MatchRepository(BaseRepository):
         return self.update(match_id, {'score_similaridade': new_score})
     
     def bulk_create_matches(self, matches_data: List[Dict[str, Any]]) -> List[str]:
-        """Criar múltiplos matches em uma transação"""
-        created_ids = []
-        
-        with self.db_manager.get_transaction() as conn:
-            with conn.cursor() as cursor:
-                for match_data in matches_data:
-                    # Adicionar timestamps
-                    from datetime import datetime
-                    if 'created_at' not in match_data:
-                        match_data['created_at'] = datetime.now()
-                    if 'updated_at' not in match_data:
-                        match_data['updated_at'] = datetime.now()
-                    
-                    # Construir INSERT
-                    columns = list(match_data.keys())
-                    placeholders = ['%s'] * len(columns)
-                    values = list(match_data.values())
-                    
-                    query = f"""
-                        INSERT INTO matches ({', '.join(columns)})
-                        VALUES ({', '.join(placeholders)})
-                        RETURNING id
-                    """
-                    
-                    cursor.execute(query, values)
-                    created_ids.append(cursor.fetchone()[0])
+        """
+        Criar ou atualizar múltiplos matches em uma transação (upsert em lote)
+        Pares (licitacao_id, empresa_id) já existentes são atualizados, como em MATCH_UPSERT_SQL.
+        Retorna os ids dos matches gravados (ordem não garantida).
+        """
+        # Deduplicar o par dentro do lote (ON CONFLICT não aceita o mesmo par duas vezes)
+        unique_matches = {
+            (str(match['licitacao_id']), str(match['empresa_id'])): match
+            for match in matches_data
+        }
+        saved_ids = self.bulk_insert(list(unique_matches.values()), on_conflict=MATCH_BULK_ON_CONFLICT)
         
-        logger.info(f"Criados {len(created_ids)} matches em lote")
-        return created_ids
+        logger.info(f"Gravados {len(saved_ids)} matches em lote (upsert)")
+        return saved_ids
     
     def find_potential_matches(self, empresa_id: str, licitacao_id: str) -> List[Dict[str, Any]]:
         """Verificar se já existe match entre empresa e licitação"""
@@ -282,34 +316,8 @@ class MatchRepository(BaseRepository):
 
     def find_recent_matches(self, limit: int = 5) -> List[Dict[str, Any]]:
         """Buscar matches mais recentes com dados completos de empresa e licitação"""
-        query = """
-            SELECT 
-                m.id as match_id,
-                m.score_similaridade,
-                m.match_type as tipo_match,
-                m.data_match as match_timestamp,
-                -- Dados da empresa
-                e.id as empresa_id,
-                e.nome_fantasia as empresa_nome,
-                e.razao_social as empresa_razao_social,
-                e.cnpj as empresa_cnpj,
-                -- Dados da licitação
-                l.id as licitacao_id,
-                l.pncp_id as licitacao_pncp_id,
-                l.objeto_compra as licitacao_objeto,
-                l.valor_total_estimado as licitacao_valor,
-                l.uf as licitacao_uf,
-                l.data_publicacao as licitacao_data_publicacao,
-                l.data_encerramento_proposta as licitacao_data_encerramento
-            FROM matches m
-            JOIN empresas e ON m.empresa_id = e.id
-            JOIN licitacoes l ON m.licitacao_id = l.id
-            ORDER BY m.data_match DESC
-            LIMIT %s
-        """
-        
         try:
-            results = self.execute_custom_query(query, (limit,))
+            results = self.execute_prepared_query('matches_recentes', (limit,))
             
             # Formatar resultados para o frontend
             formatted_matches = []
@@ -0,0 +1,137 @@
+"""
+Cache de metadados do schema (colunas, tipos, chave primária, timestamps)
+Os repositórios consultavam o catálogo a cada escrita. Os metadados de cada tabela
+são carregados uma vez por processo, com uma única consulta ao pg_catalog, e ficam
+em memória até serem invalidados (após uma migração, por exemplo).
+"""
+
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TableMetadata:
+    """Metadados de uma tabela"""
+    table_name: str
+    columns: Tuple[str, ...]  # Ordem de criação
+    column_types: Dict[str, str] = field(default_factory=dict)
+    primary_key: Tuple[str, ...] = ()
+    generated_columns: Tuple[str, ...] = ()  # GENERATED ... STORED: não aceitam INSERT/UPDATE
+
+    @property
+    def writable_columns(self) -> Tuple[str, ...]:
+        return tuple(c for c in self.columns if c not in self.generated_columns)
+
+    def has_column(self, column: str) -> bool:
+        return column in self.column_types
+
+    @property
+    def has_created_at(self) -> bool:
+        return self.has_column('created_at')
+
+    @property
+    def has_updated_at(self) -> bool:
+        return self.has_column('updated_at')
+
+    @property
+    def has_timestamps(self) -> bool:
+        return self.has_created_at and self.has_updated_at
+
+
+class SchemaCache:
+    """Metadados por tabela, carregados sob demanda e compartilhados no processo"""
+
+    METADATA_QUERY = """
+        SELECT a.attname AS column_name,
+               format_type(a.atttypid, a.atttypmod) AS data_type,
+               COALESCE(a.attnum = ANY(i.indkey), false) AS is_primary_key,
+               a.attgenerated <> '' AS is_generated
+        FROM pg_attribute a
+        LEFT JOIN pg_index i ON i.indrelid = a.attrelid AND i.indisprimary
+        WHERE a.attrelid = to_regclass(%s)
+          AND a.attnum > 0
+          AND NOT a.attisdropped
+        ORDER BY a.attnum
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, TableMetadata] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'loads': 0, 'invalidations': 0}
+
+    def get(self, db_manager, table_name: str) -> Optional[TableMetadata]:
+        """Metadados da tabela (consulta o catálogo só na primeira vez); None se a tabela não existir"""
+        with self._lock:
+            metadata = self._tables.get(table_name)
+            if metadata is not None:
+                self.metrics['hits'] += 1
+                return metadata
+
+        metadata = self._load(db_manager, table_name)
+        if metadata is None:
+            return None
+        with self._lock:
+            # Outra thread pode ter carregado antes: mantém a primeira
+            metadata = self._tables.setdefault(table_name, metadata)
+            self._loaded_at.setdefault(table_name, time.time())
+        return metadata
+
+    def _load(self, db_manager, table_name: str) -> Optional[TableMetadata]:
+        with db_manager.get_read_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(self.METADATA_QUERY, (table_name,))
+                rows = cursor.fetchall()
+
+        if not rows:
+            logger.warning(f"⚠️ Tabela '{table_name}' não encontrada no catálogo")
+            return None
+
+        with self._lock:
+            self.metrics['loads'] += 1
+        logger.info(f"📚 Metadados de '{table_name}' carregados ({len(rows)} colunas)")
+        return TableMetadata(
+            table_name=table_name,
+            columns=tuple(row[0] for row in rows),
+            column_types={row[0]: row[1] for row in rows},
+            primary_key=tuple(row[0] for row in rows if row[2]),
+            generated_columns=tuple(row[0] for row in rows if row[3])
+        )
+
+    def invalidate(self, table_name: Optional[str] = None):
+        """Descarta os metadados de uma tabela (ou de todas) para recarregar na próxima leitura"""
+        with self._lock:
+            if table_name is None:
+                self._tables.clear()
+                self._loaded_at.clear()
+            else:
+                self._tables.pop(table_name, None)
+                self._loaded_at.pop(table_name, None)
+            self.metrics['invalidations'] += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'tables': {name: {'columns': len(meta.columns), 'loaded_at': self._loaded_at.get(name)}
+                           for name, meta in self._tables.items()},
+                **self.metrics
+            }
+
+
+# Cache do processo
+_schema_cache = SchemaCache()
+
+
+def get_schema_cache() -> SchemaCache:
+    """Cache de schema compartilhado pelos repositórios"""
+    return _schema_cache
+
+
+def invalidate_schema_cache(table_name: Optional[str] = None):
+    """Invalidar metadados em cache (chamar após migrações que alteram tabelas)"""
+    _schema_cache.invalidate(table_name)
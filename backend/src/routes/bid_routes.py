@@ -3,6 +3,7 @@ Rotas para operações com licitações
 """
 from flask import Blueprint
 from controllers.bid_controller import BidController
+from middleware.response_cache import cached_response
 
 # Criar blueprint para licitações
 bid_routes = Blueprint('bids', __name__, url_prefix='/api/bids')
@@ -49,6 +50,7 @@ def get_bid_detail():
     RETORNA:
     - Dados completos da licitação
     - Informações do órgão e modalidade
+    - Itens (itens, possui_itens) e matches com empresas, lidos em uma única consulta
     """
     return controller.get_bid_detail_by_query()
 
@@ -108,6 +110,7 @@ def test_supabase_connection():
     return controller.test_supabase_connection()
 
 @bid_routes.route('/recent', methods=['GET'])
+@cached_response(tags=('bids',), ttl=120)
 def get_recent_bids():
     """
     GET /api/bids/recent - Buscar licitações mais recentes
@@ -308,6 +311,7 @@ def get_bids_by_disputa_mode(mode_id):
     return controller.get_bids_by_disputa_mode(mode_id)
 
 @bid_routes.route('/enhanced-statistics', methods=['GET'])
+@cached_response(tags=('bids',), ttl=600)
 def get_enhanced_statistics():
     """
     GET /api/bids/enhanced-statistics - Estatísticas com insights de negócio
@@ -375,12 +379,16 @@ def get_detailed_bids():
     - Usado para relatórios e análises administrativas
     
     PARÂMETROS (Query):
-    - page: Número da página (opcional)
-    - limit: Itens por página (opcional)
+    - limit: Itens por página (opcional, padrão 50)
+    - cursor: Valor next_cursor da página anterior (opcional; ausente = primeira página)
+    - exact_count: true para total exato via COUNT(*) (opcional; padrão = estimativa)
+    - page: Número da página (opcional; usa OFFSET com total exato, legado)
+    - uf, modalidade_id, status: Filtros (opcionais)
     
     RETORNA:
     - Array de licitações com dados expandidos
-    - Informações agregadas dos itens
+    - pagination: next_cursor, has_next, total_count, total_is_estimate
+    - 400 se o cursor for inválido
     """
     return controller.get_detailed_bids()
 
@@ -404,6 +412,7 @@ def get_bids_by_uf(uf):
     return controller.get_bids_by_uf(uf)
 
 @bid_routes.route('/statistics', methods=['GET'])
+@cached_response(tags=('bids',), ttl=600)
 def get_bid_statistics():
     """
     GET /api/bids/statistics - Obter estatísticas das licitações
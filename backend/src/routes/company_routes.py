@@ -3,6 +3,7 @@ Routes para empresas - endpoints HTTP
 """
 from flask import Blueprint
 from controllers.company_controller import CompanyController
+from middleware.response_cache import cached_response
 
 # Criar blueprint com url_prefix correto
 company_routes = Blueprint('companies', __name__, url_prefix='/api/companies')
@@ -121,6 +122,7 @@ def get_companies_profile():
     return company_controller.get_companies_profile()
 
 @company_routes.route('/statistics', methods=['GET'], strict_slashes=False)
+@cached_response(tags=('companies',), ttl=600)
 def get_companies_statistics():
     """
     GET /api/companies/statistics - Estatísticas das empresas
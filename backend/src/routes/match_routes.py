@@ -3,6 +3,7 @@ Routes para matches - endpoints HTTP
 """
 from flask import Blueprint
 from controllers.match_controller import MatchController
+from middleware.response_cache import cached_response
 
 # Criar blueprint com url_prefix correto
 match_routes = Blueprint('matches', __name__, url_prefix='/api/matches')
@@ -23,15 +24,18 @@ def get_matches():
     - Inclui score de similaridade, empresa, licitação e timestamp
     
     PARÂMETROS (Query):
-    - page: Número da página (opcional)
-    - limit: Itens por página (opcional)
+    - limit: Itens por página (opcional, padrão 50)
+    - cursor: Valor next_cursor da página anterior (opcional; ausente = primeira página)
+    - exact_count: true para total exato via COUNT(*) (opcional; padrão = estimativa)
     - min_score: Score mínimo de similaridade (opcional)
     - company_id: Filtro por empresa específica (opcional)
+    - bid_id: Filtro por licitação específica (opcional)
     
     RETORNA:
     - Array de matches com informações básicas
     - Score de compatibilidade (0.0 a 1.0)
     - Dados resumidos da empresa e licitação
+    - pagination: next_cursor, has_next, total_count, total_is_estimate
     """
     return match_controller.get_all_matches()
 
@@ -83,6 +87,7 @@ def get_recent_matches():
 # ====== ROTAS ADMINISTRATIVAS (PARA MANUTENÇÃO) ======
 
 @match_routes.route('/grouped', methods=['GET'])
+@cached_response(tags=('matches', 'companies', 'bids'), ttl=300)
 def get_matches_grouped():
     """
     GET /api/matches/grouped - Correspondências agrupadas
@@ -104,6 +109,7 @@ def get_matches_grouped():
     return match_controller.get_matches_grouped()
 
 @match_routes.route('/statistics', methods=['GET'])
+@cached_response(tags=('matches',), ttl=600)
 def get_matches_statistics():
     """
     GET /api/matches/statistics - Estatísticas gerais de matches
@@ -125,4 +131,41 @@ def get_matches_statistics():
     """
     return match_controller.get_matches_statistics()
 
- 
\ No newline at end of file
+ 
+
+@match_routes.route('/what-if', methods=['POST'])
+def simulate_thresholds():
+    """
+    POST /api/matches/what-if - Recalcular matches para novos thresholds
+    
+    DESCRIÇÃO:
+    - Usa a matriz esparsa de scores persistida pela última execução do matching
+    - Recalcula o conjunto de matches em milissegundos, sem novas chamadas de embedding
+    - Opcionalmente confirma o resultado, substituindo os matches das licitações da execução
+    
+    PARÂMETROS (Body JSON):
+    - threshold_phase1: Novo threshold da Fase 1 (obrigatório)
+    - threshold_phase2: Novo threshold da Fase 2 (obrigatório)
+    - run_id: Execução a usar (opcional, padrão: mais recente)
+    - top_k_per_bid / top_k_per_company: Limites de matches (opcional, padrão: MATCH_TOP_K_PER_BID /
+      MATCH_TOP_K_PER_COMPANY; 0 = sem limite)
+    - commit: Gravar o novo conjunto de matches (opcional, padrão: false)
+    
+    RETORNA:
+    - Resumo do novo conjunto: total de matches, licitações/empresas com matches,
+      distribuição por fase, score médio e tempos de execução
+    """
+    return match_controller.simulate_thresholds()
+
+@match_routes.route('/score-runs', methods=['GET'])
+def get_score_runs():
+    """
+    GET /api/matches/score-runs - Execuções com matriz de scores persistida
+    
+    PARÂMETROS (Query):
+    - limit: Quantidade máxima de execuções (opcional, padrão: 10)
+    
+    RETORNA:
+    - Lista de execuções com thresholds usados, tamanho da matriz e data
+    """
+    return match_controller.get_score_runs()
@@ -69,7 +69,8 @@ def create_rag_routes(rag_service):
         Body JSON:
         {
             "licitacao_id": "uuid",
-            "forcar_reprocessamento": true (opcional, padrão: true)
+            "forcar_reprocessamento": true (opcional, padrão: true),
+            "em_background": true (opcional, padrão: true - enfileira job e retorna 202 com job_id)
         }
         """
         if request.method == 'OPTIONS':
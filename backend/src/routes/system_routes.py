@@ -146,6 +146,128 @@ def reevaluate_bids():
     """
     return controller.reevaluate_bids()
 
+@system_routes.route('/api/backfill', methods=['POST'], strict_slashes=False)
+def start_backfill():
+    """
+    POST /api/backfill - Ingestão retroativa do PNCP
+    
+    DESCRIÇÃO:
+    - Recupera licitações de dias perdidos (ex: após indisponibilidade)
+    - Divide o intervalo em unidades dia × UF × modalidade × página processadas em paralelo
+    - Respeita o orçamento de requisições do PNCP (PNCP_RATE_LIMIT_PER_SECOND)
+    - Unidades já concluídas são puladas ao repetir o mesmo intervalo
+    
+    PARÂMETROS (Body JSON):
+    - data_inicio: Data inicial (YYYY-MM-DD)
+    - data_fim: Data final (YYYY-MM-DD, inclusiva)
+    - ufs: Lista de UFs (opcional, padrão: todas)
+    - modalidades: Códigos de modalidade do PNCP (opcional, padrão: PNCP_MODALIDADES)
+    - concorrencia: Threads de ingestão (opcional, padrão: INGESTION_CONCURRENCY)
+    
+    RETORNA:
+    - 202 com job_id do backfill enfileirado
+    - 409 se o mesmo intervalo já estiver em execução
+    """
+    return controller.start_backfill()
+
+@system_routes.route('/api/backfill/status', methods=['GET'])
+def get_backfill_status():
+    """
+    GET /api/backfill/status - Progresso do backfill
+    
+    DESCRIÇÃO:
+    - Mostra as unidades de ingestão do intervalo por status
+    - Usado para acompanhar o backfill e identificar unidades com falha
+    
+    PARÂMETROS (Query):
+    - data_inicio: Data inicial (YYYY-MM-DD)
+    - data_fim: Data final (YYYY-MM-DD)
+    
+    RETORNA:
+    - Unidades por status (licitações encontradas/novas, matches, duração média)
+    - Progresso e vazão (licitações/s) por modalidade
+    - Unidades com falha e último erro
+    - Status do job de backfill mais recente
+    """
+    return controller.get_backfill_status()
+
+@system_routes.route('/api/sync-updates', methods=['POST'], strict_slashes=False)
+def start_sync_updates():
+    """
+    POST /api/sync-updates - Sincronização incremental com o PNCP
+    
+    DESCRIÇÃO:
+    - Consulta as contratações por data de atualização desde a última marca d'água
+    - Grava apenas as licitações que mudaram (situação, valores, datas)
+    - Licitações ainda não conhecidas passam por itens + matching
+    - A marca d'água avança para a maior dataAtualizacao recebida
+    
+    PARÂMETROS (Body JSON):
+    - matching: Executar matching das licitações novas (opcional, padrão: true)
+    
+    RETORNA:
+    - 202 com job_id da sincronização enfileirada
+    - 409 se já houver sincronização em execução
+    """
+    return controller.start_sync_updates()
+
+@system_routes.route('/api/sync-updates/status', methods=['GET'])
+def get_sync_updates_status():
+    """
+    GET /api/sync-updates/status - Estado da sincronização incremental
+    
+    DESCRIÇÃO:
+    - Mostra até onde as alterações do PNCP já foram sincronizadas
+    
+    RETORNA:
+    - watermark: Maior dataAtualizacao já sincronizada
+    - last_run_at / last_stats: Última execução (páginas, requisições, inseridas, atualizadas)
+    - Status do job de sincronização mais recente
+    """
+    return controller.get_sync_updates_status()
+
+# ====== FILA DE JOBS ======
+
+@system_routes.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """
+    GET /api/jobs - Jobs em background (fila durável)
+    
+    DESCRIÇÃO:
+    - Lista os jobs recentes da tabela background_jobs
+    - Busca diária, reavaliação e processamento de documentos passam pela fila
+    - Usado para acompanhar execução, retentativas e tempos por job
+    
+    PARÂMETROS (Query):
+    - job_type: Filtrar por tipo (daily_search, reevaluate, process_documents)
+    - status: Filtrar por status (queued, running, done, failed, cancelled)
+    - limit: Máximo de jobs retornados (padrão: 50, máximo: 200)
+    
+    RETORNA:
+    - Lista de jobs (prioridade, tentativas, duração, erro)
+    - Estatísticas por tipo/status dos últimos 7 dias (espera e execução média)
+    - Métricas do pool de workers deste processo (se ativo)
+    """
+    return controller.list_jobs()
+
+@system_routes.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    GET /api/jobs/<job_id> - Detalhes de um job
+    
+    DESCRIÇÃO:
+    - Consulta o estado de um job enfileirado
+    - Usado para acompanhar jobs retornados com 202 (ex: reprocessamento RAG)
+    
+    PARÂMETROS:
+    - job_id: UUID do job
+    
+    RETORNA:
+    - Status, tentativas, worker, início/fim, duração em ms
+    - Resultado (JSON) ou último erro
+    """
+    return controller.get_job(job_id)
+
 # Blueprint para exposição
 def register_system_routes(app):
     """
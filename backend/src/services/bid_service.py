@@ -3,17 +3,30 @@ Bid Service (Licitação Service)
 Lógica de negócio para operações com licitações
 """
 import logging
+from datetime import datetime
 from typing import List, Dict, Any, Tuple, Optional
 from repositories.licitacao_repository import LicitacaoRepository
+from repositories.bid_repository import BidRepository
 from config.database import db_manager
+from middleware.response_cache import invalidate_cache_tags
 
 logger = logging.getLogger(__name__)
 
+
+def _schedule_summary_refresh(*groups: str):
+    """Agenda o refresh das views de resumo do dashboard após escritas da API"""
+    try:
+        from matching.summaries import schedule_refresh
+        schedule_refresh(*groups)
+    except Exception as e:
+        logger.error(f"Erro ao agendar refresh das views de resumo {groups}: {e}")
+
 class BidService:
     """Service para regras de negócio de licitações"""
     
     def __init__(self):
         self.licitacao_repo = LicitacaoRepository(db_manager)
+        self.bid_repo = BidRepository(db_manager)
     
     def get_all_bids(self, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], str]:
         """
@@ -50,13 +63,36 @@ class BidService:
             logger.error(f"Erro ao buscar licitação por PNCP {pncp_id}: {e}")
             return None
     
+    def get_bid_detail(self, pncp_id: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Buscar licitação por PNCP ID com itens e matches (uma consulta ao banco)
+        """
+        try:
+            row = self.licitacao_repo.find_detail_by_pncp_id(pncp_id)
+            if not row:
+                return None, "Licitação não encontrada"
+            
+            bid = self._format_bid_for_frontend(row)
+            bid['itens'] = self._format_items_for_frontend(row.get('itens') or [])
+            bid['possui_itens'] = len(bid['itens']) > 0
+            bid['matches'] = row.get('matches') or []
+            
+            message = f"Licitação {pncp_id} encontrada com {len(bid['itens'])} itens"
+            return bid, message
+        except Exception as e:
+            logger.error(f"Erro ao buscar detalhes da licitação {pncp_id}: {e}")
+            return None, f"Erro ao buscar detalhes da licitação: {str(e)}"
+    
     def search_bids_by_object(self, search_term: str, limit: int = 50) -> List[Dict[str, Any]]:
         """
-        Buscar licitações por objeto/descrição
+        Buscar licitações por objeto/descrição (ordenadas por relevância)
         """
         try:
             bids = self.licitacao_repo.search_by_object(search_term, limit)
-            return self._format_bids_for_frontend(bids)
+            formatted = self._format_bids_for_frontend(bids)
+            for item, bid in zip(formatted, bids):
+                item['relevancia'] = float(bid.get('relevancia') or 0)
+            return formatted
         except Exception as e:
             logger.error(f"Erro ao buscar licitações por objeto '{search_term}': {e}")
             return []
@@ -162,6 +198,8 @@ class BidService:
             
             # Criar licitação
             created_bid = self.licitacao_repo.create(bid_data)
+            invalidate_cache_tags('bids')
+            _schedule_summary_refresh('licitacoes')
             
             logger.info(f"Licitação criada: {created_bid['id']}")
             
@@ -211,6 +249,8 @@ class BidService:
             
             # Atualizar licitação
             updated_bid = self.licitacao_repo.update(bid_id, bid_data)
+            invalidate_cache_tags('bids')
+            _schedule_summary_refresh('licitacoes')
             
             if updated_bid:
                 logger.info(f"Licitação atualizada: {bid_id}")
@@ -250,6 +290,8 @@ class BidService:
             
             # Deletar licitação
             success = self.licitacao_repo.delete(bid_id)
+            invalidate_cache_tags('bids')
+            _schedule_summary_refresh('licitacoes')
             
             if success:
                 logger.info(f"Licitação deletada: {bid_id}")
@@ -295,75 +337,42 @@ class BidService:
     def get_statistics(self) -> Tuple[Dict[str, Any], str]:
         """
         Obter estatísticas das licitações - método para BidController
+        Agregado no banco (uma consulta, memória constante)
         """
         try:
-            # Buscar todas as licitações para calcular estatísticas
-            all_bids = self.licitacao_repo.find_all(limit=None)
+            rows = self.licitacao_repo.get_statistics_aggregates()
+            total = next((row for row in rows if row['dimensao'] == 'total'), None)
+            total_licitacoes = int(total['quantidade']) if total else 0
             
-            if not all_bids:
+            if total_licitacoes == 0:
                 stats = {
                     'total_licitacoes': 0,
                     'message': 'Nenhuma licitação encontrada'
                 }
                 return stats, 'Nenhuma licitação para calcular estatísticas'
             
-            total_licitacoes = len(all_bids)
+            def top_10(dimensao: str) -> Dict[str, int]:
+                counts = [(row['chave'], int(row['quantidade'])) for row in rows if row['dimensao'] == dimensao]
+                return dict(sorted(counts, key=lambda x: x[1], reverse=True)[:10])
+            
+            com_valor = int(total['licitacoes_com_valor'])
+            valor_total = float(total['valor_total_estimado'])
+            last_updated = total['last_updated']
             
-            # Calcular estatísticas básicas
             stats = {
                 'total_licitacoes': total_licitacoes,
-                'valor_total_estimado': 0,
-                'modalidades': {},
-                'estados': {},
-                'status_distribution': {},
-                'recentes_30_dias': 0,
-                'valor_medio': 0,
-                'valor_maximo': 0,
-                'valor_minimo': 0,
-                'licitacoes_com_valor': 0,
-                'last_updated': '2025-06-08T21:46:00Z'
+                'valor_total_estimado': valor_total,
+                'modalidades': top_10('modalidade'),
+                'estados': top_10('uf'),
+                'status_distribution': top_10('status'),
+                'recentes_30_dias': int(total['recentes_30_dias']),
+                'valor_medio': valor_total / com_valor if com_valor else 0,
+                'valor_maximo': float(total['valor_maximo']),
+                'valor_minimo': float(total['valor_minimo']),
+                'licitacoes_com_valor': com_valor,
+                'last_updated': last_updated.isoformat() if hasattr(last_updated, 'isoformat') else last_updated
             }
             
-            # Análise detalhada
-            valores = []
-            for bid in all_bids:
-                # Modalidades
-                modalidade = bid.get('modalidade', 'Não especificada')
-                stats['modalidades'][modalidade] = stats['modalidades'].get(modalidade, 0) + 1
-                
-                # Estados
-                uf = bid.get('uf', 'Não especificado')
-                stats['estados'][uf] = stats['estados'].get(uf, 0) + 1
-                
-                # Valores - garantir que não seja None
-                valor_raw = bid.get('valor_total_estimado')
-                if valor_raw is not None:
-                    try:
-                        valor = float(valor_raw)
-                        if valor > 0:
-                            valores.append(valor)
-                            stats['valor_total_estimado'] += valor
-                            stats['valor_maximo'] = max(stats['valor_maximo'], valor)
-                            if stats['valor_minimo'] == 0:  # Primeira vez
-                                stats['valor_minimo'] = valor
-                            else:
-                                stats['valor_minimo'] = min(stats['valor_minimo'], valor)
-                    except (ValueError, TypeError):
-                        # Ignorar valores inválidos
-                        pass
-            
-            # Estatísticas de valores
-            if valores:
-                stats['valor_medio'] = stats['valor_total_estimado'] / len(valores)
-                stats['licitacoes_com_valor'] = len(valores)
-            else:
-                stats['valor_minimo'] = 0
-                stats['licitacoes_com_valor'] = 0
-            
-            # Ordenar por quantidade (top 10)
-            stats['modalidades'] = dict(sorted(stats['modalidades'].items(), key=lambda x: x[1], reverse=True)[:10])
-            stats['estados'] = dict(sorted(stats['estados'].items(), key=lambda x: x[1], reverse=True)[:10])
-            
             message = f'Estatísticas de {total_licitacoes} licitações calculadas'
             return stats, message
             
@@ -412,6 +421,8 @@ class BidService:
             
             # Inserir licitações em lote
             created_ids = self.licitacao_repo.bulk_create_bids(validated_bids)
+            invalidate_cache_tags('bids')
+            _schedule_summary_refresh('licitacoes')
             
             logger.info(f"Importação em lote: {len(created_ids)} licitações criadas")
             
@@ -432,6 +443,27 @@ class BidService:
                 'data': None
             }
     
+    def get_detailed_bids_page(self, filters: Dict[str, Any], per_page: int = 50,
+                               cursor: Optional[str] = None, page: Optional[int] = None,
+                               exact_count: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Página da listagem detalhada de licitações
+        Sem page: paginação por cursor (next_cursor), total estimado salvo exact_count.
+        Com page: paginação por OFFSET com total exato (compatibilidade).
+        Cursor inválido levanta ValueError.
+        """
+        per_page = max(1, per_page)
+        if page is not None and not cursor:
+            bids, pagination = self.bid_repo.find_detailed_with_pagination(
+                page=max(1, page), per_page=per_page, filters=filters
+            )
+        else:
+            bids, pagination = self.bid_repo.find_detailed_with_pagination(
+                per_page=per_page, filters=filters, cursor=cursor, keyset=True,
+                count='exact' if exact_count else 'estimate'
+            )
+        return self._format_bids_for_frontend(bids), pagination
+    
     def search_bids(self, search_filters: Dict[str, Any], limit: int = 50) -> List[Dict[str, Any]]:
         """
         Buscar licitações com filtros avançados
@@ -590,6 +622,8 @@ class BidService:
             'valor_total_homologado': format_currency(bid.get('valor_total_homologado')),
             'data_abertura_proposta': format_date(bid.get('data_abertura_proposta')),
             'data_encerramento_proposta': format_date(bid.get('data_encerramento_proposta')),
+            'modalidade_id': bid.get('modalidade_id'),
+            'modalidade_nome': bid.get('modalidade_nome'),
             'modo_disputa_id': bid.get('modo_disputa_id'),
             'modo_disputa_nome': bid.get('modo_disputa_nome'),
             'srp': bid.get('srp'),  # Sistema de Registro de Preços
@@ -825,7 +859,7 @@ class BidService:
                     insights.append(f"📊 {tipo['quantidade']} itens de {tipo_name} disponíveis")
             
             stats['business_insights'] = insights
-            stats['last_analysis'] = '2025-06-08T21:46:00Z'
+            stats['last_analysis'] = datetime.now().isoformat()
             
             message = "Estatísticas aprimoradas calculadas com sucesso"
             return stats, message
@@ -845,15 +879,12 @@ class BidService:
             Tupla com lista de itens e mensagem de status
         """
         try:
-            # Primeiro, buscar a licitação pelo pncp_id
-            bid = self.licitacao_repo.find_by_pncp_id(pncp_id)
+            # Licitação e itens em uma consulta (None = licitação inexistente)
+            items = self.licitacao_repo.find_items_by_pncp_id(pncp_id)
             
-            if not bid:
+            if items is None:
                 return [], "Licitação não encontrada"
             
-            # Buscar itens da licitação usando o ID interno
-            items = self.licitacao_repo.find_items_by_licitacao_id(bid['id'])
-            
             # Formatar itens para o frontend
             formatted_items = self._format_items_for_frontend(items)
             
@@ -8,9 +8,19 @@ import logging
 from typing import List, Dict, Any, Optional
 from repositories.company_repository import CompanyRepository
 from config.database import db_manager
+from middleware.response_cache import invalidate_cache_tags
 
 logger = logging.getLogger(__name__)
 
+
+def _schedule_summary_refresh(*groups: str):
+    """Agenda o refresh das views de resumo do dashboard após escritas da API"""
+    try:
+        from matching.summaries import schedule_refresh
+        schedule_refresh(*groups)
+    except Exception as e:
+        logger.error(f"Erro ao agendar refresh das views de resumo {groups}: {e}")
+
 class CompanyService:
     """
     Service para lógica de negócio de empresas
@@ -91,6 +101,7 @@ class CompanyService:
             
             # Criar empresa
             created_company = self.company_repo.create(company_data)
+            invalidate_cache_tags('companies')
             
             logger.info(f"Empresa criada: {created_company['id']} - {created_company['nome_fantasia']}")
             
@@ -143,6 +154,8 @@ class CompanyService:
             
             # Atualizar empresa
             updated_company = self.company_repo.update(company_id, company_data)
+            invalidate_cache_tags('companies', 'matches')
+            _schedule_summary_refresh('matches')
             
             if updated_company:
                 logger.info(f"Empresa atualizada: {company_id}")
@@ -192,6 +205,8 @@ class CompanyService:
             
             # Deletar empresa
             success = self.company_repo.delete(company_id)
+            invalidate_cache_tags('companies', 'matches')
+            _schedule_summary_refresh('matches')
             
             if success:
                 logger.info(f"Empresa deletada: {company_id} ({deleted_matches} matches removidos)")
@@ -256,6 +271,7 @@ class CompanyService:
             
             # Inserir empresas em lote
             created_ids = self.company_repo.bulk_create(validated_companies)
+            invalidate_cache_tags('companies')
             
             logger.info(f"Importação em lote: {len(created_ids)} empresas criadas")
             
@@ -4,12 +4,22 @@ Lógica de negócio para operações com matches
 Usa repository padronizado para acesso a dados
 """
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from repositories.match_repository import MatchRepository
 from config.database import db_manager
+from middleware.response_cache import invalidate_cache_tags
 
 logger = logging.getLogger(__name__)
 
+
+def _schedule_summary_refresh(*groups: str):
+    """Agenda o refresh das views de resumo do dashboard após escritas da API"""
+    try:
+        from matching.summaries import schedule_refresh
+        schedule_refresh(*groups)
+    except Exception as e:
+        logger.error(f"Erro ao agendar refresh das views de resumo {groups}: {e}")
+
 class MatchService:
     """
     Service para lógica de negócio de matches
@@ -30,6 +40,20 @@ class MatchService:
             logger.error(f"Erro ao buscar matches: {e}")
             return []
     
+    def get_matches_page(self, per_page: int = 50, cursor: Optional[str] = None,
+                         company_id: Optional[str] = None, licitacao_id: Optional[str] = None,
+                         min_score: Optional[float] = None,
+                         exact_count: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Página de matches com detalhes (paginação por cursor)
+        Cursor inválido levanta ValueError
+        """
+        return self.match_repo.find_matches_page(
+            per_page=max(1, per_page), cursor=cursor,
+            empresa_id=company_id, licitacao_id=licitacao_id, min_score=min_score,
+            count='exact' if exact_count else 'estimate'
+        )
+    
     def get_match_by_id(self, match_id: str) -> Optional[Dict[str, Any]]:
         """Buscar match por ID com formatação"""
         try:
@@ -97,6 +121,8 @@ class MatchService:
             
             # Criar match
             created_match = self.match_repo.create(match_data)
+            invalidate_cache_tags('matches')
+            _schedule_summary_refresh('matches')
             
             logger.info(f"Match criado: {created_match['id']}")
             
@@ -146,6 +172,8 @@ class MatchService:
             
             # Atualizar match
             updated_match = self.match_repo.update(match_id, match_data)
+            invalidate_cache_tags('matches')
+            _schedule_summary_refresh('matches')
             
             if updated_match:
                 logger.info(f"Match atualizado: {match_id}")
@@ -185,6 +213,8 @@ class MatchService:
             
             # Deletar match
             success = self.match_repo.delete(match_id)
+            invalidate_cache_tags('matches')
+            _schedule_summary_refresh('matches')
             
             if success:
                 logger.info(f"Match deletado: {match_id}")
@@ -255,14 +285,16 @@ class MatchService:
                     'data': {'errors': errors}
                 }
             
-            # Inserir matches em lote
+            # Gravar matches em lote (pares existentes são atualizados)
             created_ids = self.match_repo.bulk_create_matches(validated_matches)
+            invalidate_cache_tags('matches')
+            _schedule_summary_refresh('matches')
             
-            logger.info(f"Importação em lote: {len(created_ids)} matches criados")
+            logger.info(f"Importação em lote: {len(created_ids)} matches gravados")
             
             return {
                 'success': True,
-                'message': f'{len(created_ids)} matches criados com sucesso',
+                'message': f'{len(created_ids)} matches gravados com sucesso',
                 'data': {
                     'total_created': len(created_ids),
                     'match_ids': created_ids
@@ -277,6 +309,89 @@ class MatchService:
                 'data': None
             }
     
+    def simulate_thresholds(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Recalcular o conjunto de matches para novos thresholds a partir da
+        matriz de scores persistida (sem novas chamadas de embedding)
+        """
+        try:
+            from matching.score_matrix import simulate_thresholds
+            
+            threshold_phase1 = float(params.get('threshold_phase1', params.get('similarity_threshold_phase1')))
+            threshold_phase2 = float(params.get('threshold_phase2', params.get('similarity_threshold_phase2')))
+            for threshold in (threshold_phase1, threshold_phase2):
+                if not 0 <= threshold <= 1:
+                    raise ValueError('Thresholds devem estar entre 0 e 1')
+            
+            # Limites omitidos seguem a configuração; 0 explícito desativa o limite
+            top_k = {
+                key: int(params[key])
+                for key in ('top_k_per_bid', 'top_k_per_company')
+                if params.get(key) is not None
+            }
+            
+            result = simulate_thresholds(
+                threshold_phase1,
+                threshold_phase2,
+                run_id=params.get('run_id'),
+                **top_k,
+                commit=params.get('commit') is True
+            )
+            
+            if result is None:
+                return {
+                    'success': False,
+                    'message': 'Nenhuma matriz de scores encontrada. Execute uma busca ou reavaliação primeiro.',
+                    'error_type': 'not_found',
+                    'data': None
+                }
+            
+            if result.get('commit_blocked'):
+                return {
+                    'success': False,
+                    'message': f"Simulação não confirmada: {result['commit_blocked']}",
+                    'error_type': 'validation',
+                    'data': result
+                }
+            if result['committed']:
+                invalidate_cache_tags('matches')
+            
+            logger.info(
+                f"🧮 Simulação de thresholds ({threshold_phase1}/{threshold_phase2}): "
+                f"{result['summary']['total_matches']} matches em {result['timing_ms']['rethreshold']}ms"
+                f"{' - confirmado' if result['committed'] else ''}"
+            )
+            return {
+                'success': True,
+                'message': 'Matches confirmados com os novos thresholds' if result['committed'] else 'Simulação concluída',
+                'data': result
+            }
+            
+        except (TypeError, ValueError) as e:
+            return {
+                'success': False,
+                'message': f'Parâmetros inválidos: {e}',
+                'error_type': 'validation',
+                'data': None
+            }
+        except Exception as e:
+            logger.error(f"Erro ao simular thresholds: {e}")
+            return {
+                'success': False,
+                'message': 'Erro interno do servidor',
+                'error_type': 'internal',
+                'data': None
+            }
+    
+    def get_score_runs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Listar execuções com matriz de scores persistida"""
+        try:
+            from matching.score_matrix import list_score_runs
+            return list_score_runs(limit)
+        except Exception as e:
+            logger.error(f"Erro ao listar matrizes de scores: {e}")
+            return []
+    
     def search_matches(self, search_filters: Dict[str, Any], limit: int = 50) -> List[Dict[str, Any]]:
         """
         Buscar matches com filtros avançados
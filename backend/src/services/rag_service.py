@@ -65,6 +65,10 @@ class RAGService:
                             'licitacao_info': vectorization_result.get('licitacao_info')
                         }
                     }
+                    if vectorization_result.get('action') == 'documents_queued':
+                        error_response['job_id'] = vectorization_result['job_id']
+                        error_response['job_status'] = vectorization_result['job_status']
+                        error_response['status_url'] = vectorization_result['status_url']
                     return error_response
             
             # 4. Responder query
@@ -332,7 +336,7 @@ class RAGService:
     def _ensure_documents_processed(self, licitacao_id: str) -> Dict[str, Any]:
         """
         🚀 NOVA FUNÇÃO: Garante que documentos estão processados usando UnifiedDocumentProcessor recursivo
-        Integração completa do processamento recursivo de ZIPs no fluxo RAG
+        Sem documentos válidos, enfileira o job 'process_documents' e retorna o job_id
         """
         try:
             logger.info(f"🔍 Verificando documentos para licitação: {licitacao_id}")
@@ -377,45 +381,23 @@ class RAGService:
                     'action': 'licitacao_not_found'
                 }
             
-            # Tentar processar documentos (método assíncrono)
-            import asyncio
-            result = asyncio.run(self.unified_processor.processar_documentos_licitacao(licitacao_id))
+            # O download/extração roda no worker de jobs, fora da requisição HTTP
+            from jobs import JobQueue
+            job = JobQueue().enqueue(
+                'process_documents',
+                {'licitacao_id': licitacao_id, 'forcar_reprocessamento': False},
+                dedupe_key=f"process_documents:{licitacao_id}"
+            )
+            logger.info(f"📬 Processamento de documentos enfileirado: job {job['id']} ({job['status']})")
             
-            if result['success']:
-                logger.info(f"🎉 Processamento recursivo concluído: {result.get('documentos_processados', 0)} documentos")
-                return {
-                    'success': True,
-                    'message': 'Documentos processados com sucesso usando extração recursiva',
-                    'documentos_processados': result.get('documentos_processados', 0),
-                    'storage_provider': result.get('storage_provider', 'supabase'),
-                    'pasta_nuvem': result.get('pasta_nuvem'),
-                    'action': 'documents_processed_recursive'
-                }
-            else:
-                # Se falhou, tentar diagnosticar o problema
-                error_detail = result.get('error', 'Erro desconhecido')
-                logger.error(f"❌ Falha no processamento: {error_detail}")
-                
-                # Verificar se é problema da API PNCP
-                if 'API PNCP' in error_detail or 'HTTP' in error_detail:
-                    return {
-                        'success': False,
-                        'error': f'Erro na API PNCP: {error_detail}',
-                        'suggestion': 'Verifique se a licitação possui documentos disponíveis na API',
-                        'action': 'api_error'
-                    }
-                
-                # Outros erros
-                return {
-                    'success': False,
-                    'error': f'Erro no processamento de documentos: {error_detail}',
-                    'licitacao_info': {
-                        'objeto': licitacao_info.get('objeto_compra', 'N/A')[:100] + '...',
-                        'orgao': licitacao_info.get('orgao_entidade', 'N/A'),
-                        'uf': licitacao_info.get('uf', 'N/A')
-                    },
-                    'action': 'processing_error'
-                }
+            return {
+                'success': False,
+                'error': 'Documentos da licitação em processamento. Tente novamente quando o job concluir.',
+                'job_id': job['id'],
+                'job_status': job['status'],
+                'status_url': f"/api/jobs/{job['id']}",
+                'action': 'documents_queued'
+            }
                 
         except Exception as e:
             logger.error(f"❌ Erro crítico ao garantir documentos processados: {e}")
@@ -7,23 +7,13 @@ import logging
 import json
 import os
 import time
-import threading
+import uuid
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from config.database import db_manager
 
 logger = logging.getLogger(__name__)
 
-# Estado global para controlar execução (migrado do api.py)
-process_status = {
-    'daily_bids': {'running': False, 'last_result': None},
-    'reevaluate': {'running': False, 'last_result': None},
-    'is_running': False,
-    'last_run': None,
-    'status': 'idle',
-    'results': None
-}
-
 class SystemService:
     """
     Service para operações de sistema e background jobs
@@ -31,11 +21,9 @@ class SystemService:
     """
     
     def __init__(self):
-        """Inicializar service com estado do processo"""
+        """Inicializar service (estado dos processos vem da fila durável de jobs)"""
         self.db_manager = db_manager
         self.process_status = {
-            'daily_bids': {'running': False, 'last_run': None, 'message': ''},
-            'reevaluate': {'running': False, 'last_run': None, 'message': ''},
             'last_health_check': datetime.now()
         }
         
@@ -72,11 +60,10 @@ class SystemService:
             # Status do banco de dados usando o novo padrão
             db_health = self.db_manager.get_health_status()
             
-            # Status dos processos background
-            processes_healthy = not (
-                self.process_status['daily_bids']['running'] or 
-                self.process_status['reevaluate']['running']
-            )
+            # Status dos processos background (derivado da fila de jobs)
+            daily_status = self._get_job_status('daily_search')
+            reevaluate_status = self._get_job_status('reevaluate')
+            processes_healthy = not (daily_status['running'] or reevaluate_status['running'])
             
             # Determinar status geral
             if db_health['overall'] == 'healthy' and processes_healthy:
@@ -93,10 +80,12 @@ class SystemService:
                     'database': db_health,
                     'background_processes': {
                         'status': 'idle' if processes_healthy else 'busy',
-                        'daily_bids': self.process_status['daily_bids'],
-                        'reevaluate': self.process_status['reevaluate']
+                        'daily_bids': daily_status,
+                        'reevaluate': reevaluate_status
                     },
-                    'vectorizers': self.vectorizer_configs
+                    'vectorizers': self.vectorizer_configs,
+                    'pncp': self._get_pncp_resilience_status(),
+                    'response_cache': self._get_response_cache_status()
                 },
                 'uptime': 'running',
                 'version': '2.0.0-padronizado'
@@ -111,6 +100,19 @@ class SystemService:
                 'message': 'Erro ao verificar saúde do sistema'
             }
     
+    def _get_pncp_resilience_status(self) -> Dict[str, Any]:
+        """Estado dos circuit breakers e caches negativos do PNCP neste processo"""
+        try:
+            from matching.circuit_breaker import get_resilience_status
+            return get_resilience_status()
+        except ImportError as e:
+            return {'error': str(e)}
+    
+    def _get_response_cache_status(self) -> Dict[str, Any]:
+        """Métricas do cache de respostas da API neste processo"""
+        from middleware.response_cache import get_response_cache
+        return get_response_cache().status()
+    
     def get_system_status(self) -> Dict[str, Any]:
         """GET /api/status - Status geral do sistema"""
         try:
@@ -153,27 +155,84 @@ class SystemService:
     
     def get_daily_bids_status(self) -> Dict[str, Any]:
         """GET /api/status/daily-bids - Status da busca diária"""
-        daily_status = self.process_status['daily_bids']
+        daily_status = self._get_job_status('daily_search')
         
         return {
-            'running': daily_status['running'],
-            'last_run': daily_status['last_run'].isoformat() if daily_status['last_run'] else None,
-            'message': daily_status['message'],
+            **daily_status,
             'next_scheduled': None,  # Implementar lógica de agendamento se necessário
-            'status': 'running' if daily_status['running'] else 'idle'
+            'checkpoint': self._get_checkpoint(f"daily:{datetime.now().strftime('%Y%m%d')}")
         }
     
     def get_reevaluate_status(self) -> Dict[str, Any]:
         """GET /api/status/reevaluate - Status da reavaliação"""
-        reevaluate_status = self.process_status['reevaluate']
+        reevaluate_status = self._get_job_status('reevaluate')
+        sharded_run = self._get_sharded_run()
+        
+        # Em modo shards o job coordenador termina logo; o progresso vem dos shards
+        if sharded_run and sharded_run['status'] in ('running', 'finalizing'):
+            done = sharded_run['shards'].get('done', {}).get('total', 0)
+            reevaluate_status.update({
+                'running': True,
+                'status': 'running',
+                'message': f"Reavaliação em shards: {done}/{sharded_run['shard_count']} shards concluídos"
+            })
+        
+        return {
+            **reevaluate_status,
+            'checkpoint': self._get_checkpoint('reevaluate'),
+            'sharded_run': sharded_run
+        }
+    
+    def _get_sharded_run(self) -> Optional[Dict[str, Any]]:
+        """Progresso da execução mais recente da reavaliação em shards"""
+        try:
+            from matching.sharding import get_run_progress
+            return get_run_progress()
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível ler a reavaliação em shards: {e}")
+            return None
+    
+    def _get_job_status(self, job_type: str) -> Dict[str, Any]:
+        """Status de um processo derivado do job mais recente na fila (compartilhado entre processos)"""
+        messages = {
+            'queued': 'Aguardando worker disponível...',
+            'running': 'Em execução...',
+            'done': 'Concluído com sucesso!',
+            'failed': 'Erro na execução',
+            'cancelled': 'Cancelado'
+        }
+        try:
+            from jobs import JobQueue
+            job = JobQueue().get_latest(job_type)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível ler a fila de jobs ({job_type}): {e}")
+            job = None
+        
+        if not job:
+            return {'running': False, 'last_run': None, 'message': '', 'status': 'idle', 'job': None}
+        
+        running = job['status'] in ('queued', 'running')
+        message = messages.get(job['status'], job['status'])
+        if job['status'] == 'failed' and job.get('last_error'):
+            message = f"Erro: {job['last_error'].splitlines()[0]}"
         
         return {
-            'running': reevaluate_status['running'],
-            'last_run': reevaluate_status['last_run'].isoformat() if reevaluate_status['last_run'] else None,
-            'message': reevaluate_status['message'],
-            'status': 'running' if reevaluate_status['running'] else 'idle'
+            'running': running,
+            'last_run': job.get('started_at') or job.get('created_at'),
+            'message': message,
+            'status': job['status'] if running else ('error' if job['status'] == 'failed' else 'idle'),
+            'job': job
         }
     
+    def _get_checkpoint(self, job_name: str) -> Optional[Dict[str, Any]]:
+        """Último checkpoint durável de um job de matching (progresso e estatísticas parciais)"""
+        try:
+            from matching.checkpoints import get_checkpoint
+            return get_checkpoint(job_name)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível ler checkpoint de {job_name}: {e}")
+            return None
+    
     def get_config_options(self) -> Dict[str, Any]:
         """GET /api/config/options - Opções de configuração disponíveis"""
         db_health = self.db_manager.get_health_status()
@@ -202,7 +261,7 @@ class SystemService:
     def get_database_statistics(self) -> Dict[str, Any]:
         """Obter estatísticas do banco de dados"""
         try:
-            with self.db_manager.get_connection() as conn:
+            with self.db_manager.get_read_connection() as conn:
                 with conn.cursor() as cursor:
                     # Estatísticas das tabelas principais
                     stats_query = """
@@ -253,163 +312,213 @@ class SystemService:
     def start_daily_search(self) -> Dict[str, Any]:
         """
         POST /api/search-new-bids - Iniciar busca de novas licitações REAL
-        Integra com o matching engine real
+        Enfileira o job 'daily_search' na fila durável (executado pelo pool de workers)
         """
-        if self.process_status['daily_bids']['running']:
+        return self._enqueue_job(
+            'daily_search',
+            payload={},
+            running_message='Busca diária já está em execução',
+            success_message='Busca de novas licitações enfileirada em background (ENGINE REAL)',
+            extra={
+                'estimated_duration': '5-15 minutos (dependendo do número de licitações)',
+                'note': '🚀 Usando matching engine real do PNCP'
+            }
+        )
+    
+    def start_reevaluation(self) -> Dict[str, Any]:
+        """
+        POST /api/reevaluate-bids - Iniciar reavaliação de licitações REAL
+        Enfileira o job 'reevaluate' na fila durável (executado pelo pool de workers)
+        """
+        clear_matches = os.getenv('CLEAR_MATCHES_BEFORE_REEVALUATE', 'true').lower() == 'true'
+        return self._enqueue_job(
+            'reevaluate',
+            payload={'clear_matches': clear_matches},
+            running_message='Reavaliação já está em execução',
+            success_message='Reavaliação de licitações enfileirada em background (ENGINE REAL)',
+            extra={
+                'estimated_duration': '10-30 minutos (dependendo do número de licitações)',
+                'note': '🔄 Usando matching engine real com análise semântica avançada'
+            }
+        )
+    
+    def start_backfill(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST /api/backfill - Enfileirar ingestão retroativa de um intervalo de datas
+        Unidades já concluídas do intervalo são puladas
+        """
+        from matching.pncp_api import ESTADOS_BRASIL, MODALIDADES_PNCP
+        
+        try:
+            start_date = datetime.strptime(data.get('data_inicio', ''), '%Y-%m-%d').date()
+            end_date = datetime.strptime(data.get('data_fim', ''), '%Y-%m-%d').date()
+        except ValueError:
             return {
                 'success': False,
-                'message': 'Busca diária já está em execução'
+                'message': 'data_inicio e data_fim são obrigatórios no formato YYYY-MM-DD',
+                'error_type': 'validation'
             }
         
+        if end_date < start_date:
+            return {'success': False, 'message': 'data_fim deve ser maior ou igual a data_inicio', 'error_type': 'validation'}
+        if end_date > datetime.now().date():
+            return {'success': False, 'message': 'data_fim não pode estar no futuro', 'error_type': 'validation'}
+        
+        ufs = [uf.upper() for uf in (data.get('ufs') or [])]
+        invalid = [uf for uf in ufs if uf not in ESTADOS_BRASIL]
+        if invalid:
+            return {'success': False, 'message': f"UFs inválidas: {', '.join(invalid)}", 'error_type': 'validation'}
+        
         try:
-            # Marcar como executando
-            self.process_status['daily_bids']['running'] = True
-            self.process_status['daily_bids']['last_run'] = datetime.now()
-            self.process_status['daily_bids']['message'] = 'Iniciando busca de novas licitações...'
-            
-            def run_real_search():
-                """Executa busca real usando o matching engine"""
-                try:
-                    logger.info("🔍 Iniciando busca REAL de licitações do PNCP...")
-                    
-                    # Importar engine real
-                    from matching import process_daily_bids
-                    from matching.vectorizers import HybridTextVectorizer
-                    
-                    # Criar vetorizador baseado na configuração
-                    vectorizer_type = os.getenv('VECTORIZER_TYPE', 'hybrid')
-                    
-                    if vectorizer_type == 'hybrid':
-                        from matching.vectorizers import HybridTextVectorizer
-                        vectorizer = HybridTextVectorizer()
-                    elif vectorizer_type == 'openai':
-                        from matching.vectorizers import OpenAITextVectorizer
-                        vectorizer = OpenAITextVectorizer()
-                    elif vectorizer_type == 'voyage':
-                        from matching.vectorizers import VoyageAITextVectorizer
-                        vectorizer = VoyageAITextVectorizer()
-                    else:
-                        from matching.vectorizers import MockTextVectorizer
-                        vectorizer = MockTextVectorizer()
-                    
-                    # Executar busca real
-                    process_daily_bids(vectorizer)
-                    
-                    # Atualizar status
-                    self.process_status['daily_bids']['message'] = 'Busca de novas licitações concluída com sucesso!'
-                    logger.info("✅ Busca diária REAL concluída")
-                    
-                except Exception as e:
-                    logger.error(f"❌ Erro na busca diária REAL: {e}")
-                    self.process_status['daily_bids']['message'] = f'Erro: {str(e)}'
-                
-                finally:
-                    self.process_status['daily_bids']['running'] = False
-            
-            # Executar em thread separada
-            thread = threading.Thread(target=run_real_search)
-            thread.daemon = True
-            thread.start()
-            
+            modalidades = [int(m) for m in (data.get('modalidades') or [])]
+        except (TypeError, ValueError):
+            modalidades = [None]
+        invalid = [str(m) for m in modalidades if m not in MODALIDADES_PNCP]
+        if invalid:
+            return {'success': False, 'message': f"Modalidades inválidas: {', '.join(invalid)}", 'error_type': 'validation'}
+        
+        payload = {
+            'data_inicio': start_date.isoformat(),
+            'data_fim': end_date.isoformat(),
+            'ufs': ufs,
+            'modalidades': modalidades,
+            'concorrencia': data.get('concorrencia')
+        }
+        dias = (end_date - start_date).days + 1
+        return self._enqueue_job(
+            'backfill',
+            payload=payload,
+            running_message='Backfill deste intervalo já está em execução',
+            success_message=f'Backfill de {dias} dia(s) enfileirado em background',
+            extra={'data_inicio': payload['data_inicio'], 'data_fim': payload['data_fim']},
+            dedupe_key=f"backfill:{payload['data_inicio']}:{payload['data_fim']}"
+        )
+    
+    def get_backfill_status(self, data_inicio: Optional[str], data_fim: Optional[str]) -> Dict[str, Any]:
+        """GET /api/backfill/status - Unidades do intervalo por status e último job de backfill"""
+        try:
+            start_date = datetime.strptime(data_inicio or '', '%Y-%m-%d').date()
+            end_date = datetime.strptime(data_fim or '', '%Y-%m-%d').date()
+        except ValueError:
             return {
-                'success': True,
-                'message': 'Busca de novas licitações iniciada em background (ENGINE REAL)',
-                'estimated_duration': '5-15 minutos (dependendo do número de licitações)',
-                'note': '🚀 Usando matching engine real do PNCP'
+                'success': False,
+                'message': 'data_inicio e data_fim são obrigatórios no formato YYYY-MM-DD',
+                'error_type': 'validation'
             }
-            
-        except Exception as e:
-            self.process_status['daily_bids']['running'] = False
-            logger.error(f"Erro ao iniciar busca diária: {e}")
+        
+        try:
+            from matching.ingestion import get_backfill_progress
             return {
-                'success': False,
-                'message': f'Erro ao iniciar busca: {str(e)}'
+                'success': True,
+                'data': {
+                    **get_backfill_progress(start_date, end_date),
+                    'ultimo_job': self._get_job_status('backfill')
+                }
             }
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter status do backfill: {e}")
+            return {'success': False, 'message': f'Erro ao obter status do backfill: {str(e)}', 'error_type': 'internal'}
     
-    def start_reevaluation(self) -> Dict[str, Any]:
+    def start_sync_updates(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        POST /api/reevaluate-bids - Iniciar reavaliação de licitações REAL
-        Integra com o matching engine real
+        POST /api/sync-updates - Enfileirar sincronização incremental com o PNCP
+        Busca apenas contratações alteradas desde a última marca d'água
         """
-        if self.process_status['reevaluate']['running']:
+        return self._enqueue_job(
+            'sync_updates',
+            payload={'matching': bool(data.get('matching', True))},
+            running_message='Sincronização incremental já está em execução',
+            success_message='Sincronização incremental enfileirada em background',
+            extra={}
+        )
+    
+    def get_sync_updates_status(self) -> Dict[str, Any]:
+        """GET /api/sync-updates/status - Marca d'água, última execução e último job"""
+        try:
+            from matching.ingestion import get_sync_state
+            from matching.matching_engine import PNCP_SYNC_NAME
+            state = get_sync_state(PNCP_SYNC_NAME) or {}
             return {
-                'success': False,
-                'message': 'Reavaliação já está em execução'
+                'success': True,
+                'data': {
+                    'watermark': state['watermark'].isoformat() if state.get('watermark') else None,
+                    'last_run_at': state['last_run_at'].isoformat() if state.get('last_run_at') else None,
+                    'last_stats': state.get('last_stats') or {},
+                    'ultimo_job': self._get_job_status('sync_updates')
+                }
             }
-        
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter status da sincronização: {e}")
+            return {'success': False, 'message': f'Erro ao obter status da sincronização: {str(e)}', 'error_type': 'internal'}
+    
+    def _enqueue_job(self, job_type: str, payload: Dict[str, Any], running_message: str,
+                     success_message: str, extra: Dict[str, Any],
+                     dedupe_key: Optional[str] = None) -> Dict[str, Any]:
+        """Enfileira um job de matching com dedupe (por padrão, um job ativo por tipo)"""
         try:
-            # Marcar como executando
-            self.process_status['reevaluate']['running'] = True
-            self.process_status['reevaluate']['last_run'] = datetime.now()
-            self.process_status['reevaluate']['message'] = 'Iniciando reavaliação de licitações...'
-            
-            def run_real_reevaluation():
-                """Executa reavaliação real usando o matching engine"""
-                try:
-                    logger.info("🔄 Iniciando reavaliação REAL de licitações...")
-                    
-                    # Importar engine real
-                    from matching import reevaluate_existing_bids
-                    from matching.vectorizers import HybridTextVectorizer
-                    
-                    # Criar vetorizador baseado na configuração
-                    vectorizer_type = os.getenv('VECTORIZER_TYPE', 'hybrid')
-                    
-                    if vectorizer_type == 'hybrid':
-                        from matching.vectorizers import HybridTextVectorizer
-                        vectorizer = HybridTextVectorizer()
-                    elif vectorizer_type == 'openai':
-                        from matching.vectorizers import OpenAITextVectorizer
-                        vectorizer = OpenAITextVectorizer()
-                    elif vectorizer_type == 'voyage':
-                        from matching.vectorizers import VoyageAITextVectorizer
-                        vectorizer = VoyageAITextVectorizer()
-                    else:
-                        from matching.vectorizers import MockTextVectorizer
-                        vectorizer = MockTextVectorizer()
-                    
-                    # Configurar limpeza de matches (padrão: sim)
-                    clear_matches = os.getenv('CLEAR_MATCHES_BEFORE_REEVALUATE', 'true').lower() == 'true'
-                    
-                    # Executar reavaliação real
-                    result = reevaluate_existing_bids(vectorizer, clear_matches=clear_matches)
-                    
-                    # Atualizar status com resultado
-                    if result and result.get('success', False):
-                        matches_count = result.get('matches_encontrados', 0)
-                        self.process_status['reevaluate']['message'] = f'Reavaliação concluída! {matches_count} matches encontrados'
-                    else:
-                        self.process_status['reevaluate']['message'] = 'Reavaliação concluída com sucesso'
-                    
-                    logger.info("✅ Reavaliação REAL concluída")
-                    
-                except Exception as e:
-                    logger.error(f"❌ Erro na reavaliação REAL: {e}")
-                    self.process_status['reevaluate']['message'] = f'Erro: {str(e)}'
-                
-                finally:
-                    self.process_status['reevaluate']['running'] = False
+            from jobs import JobQueue, PRIORITY_HIGH
+            job = JobQueue().enqueue(job_type, payload, priority=PRIORITY_HIGH, dedupe_key=dedupe_key or job_type)
             
-            # Executar em thread separada
-            thread = threading.Thread(target=run_real_reevaluation)
-            thread.daemon = True
-            thread.start()
+            if not job['created']:
+                return {
+                    'success': False,
+                    'message': running_message,
+                    'job_id': job['id'],
+                    'job_status': job['status']
+                }
             
+            logger.info(f"📥 Job {job_type} enfileirado: {job['id']}")
             return {
                 'success': True,
-                'message': 'Reavaliação de licitações iniciada em background (ENGINE REAL)',
-                'estimated_duration': '10-30 minutos (dependendo do número de licitações)',
-                'note': '🔄 Usando matching engine real com análise semântica avançada'
+                'message': success_message,
+                'job_id': job['id'],
+                **extra
             }
             
         except Exception as e:
-            self.process_status['reevaluate']['running'] = False
-            logger.error(f"Erro ao iniciar reavaliação: {e}")
+            logger.error(f"Erro ao enfileirar job {job_type}: {e}")
             return {
                 'success': False,
-                'message': f'Erro ao iniciar reavaliação: {str(e)}'
+                'message': f'Erro ao iniciar processo: {str(e)}',
+                'error_type': 'internal'
             }
     
+    def list_jobs(self, job_type: Optional[str] = None, status: Optional[str] = None,
+                  limit: int = 50) -> Dict[str, Any]:
+        """GET /api/jobs - Jobs recentes da fila e estatísticas por tipo/status"""
+        try:
+            from jobs import JobQueue, get_worker_pool
+            queue = JobQueue()
+            pool = get_worker_pool()
+            return {
+                'success': True,
+                'data': {
+                    'jobs': queue.list_jobs(job_type=job_type, status=status, limit=limit),
+                    'queue_stats': queue.get_queue_stats(),
+                    'worker_pool': pool.get_metrics() if pool else None
+                }
+            }
+        except Exception as e:
+            logger.error(f"❌ Erro ao listar jobs: {e}")
+            return {'success': False, 'message': f'Erro ao listar jobs: {str(e)}'}
+    
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """GET /api/jobs/<job_id> - Detalhes de um job"""
+        try:
+            uuid.UUID(str(job_id))
+        except ValueError:
+            return {'success': False, 'message': 'Job não encontrado', 'error_type': 'not_found'}
+        
+        try:
+            from jobs import JobQueue
+            job = JobQueue().get_job(job_id)
+            if not job:
+                return {'success': False, 'message': 'Job não encontrado', 'error_type': 'not_found'}
+            return {'success': True, 'data': job}
+        except Exception as e:
+            logger.error(f"❌ Erro ao buscar job {job_id}: {e}")
+            return {'success': False, 'message': f'Erro ao buscar job: {str(e)}', 'error_type': 'internal'}
+    
     def cleanup_system(self) -> Dict[str, Any]:
         """Limpar dados antigos e otimizar sistema"""
         try:
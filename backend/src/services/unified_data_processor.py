@@ -33,7 +33,7 @@ class UnifiedDataProcessor:
             AND status_processamento != 'concluido';
         """
         try:
-            with self.db_manager.get_connection() as conn:
+            with self.db_manager.get_read_connection() as conn:
                 with conn.cursor() as cur:
                     cur.execute(sql, (licitacao_id,))
                     documentos = cur.fetchall()
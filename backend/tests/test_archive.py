@@ -0,0 +1,54 @@
+"""Testes da retenção do arquivo de payloads do PNCP (diretórios por data de publicação)"""
+
+import datetime
+
+from matching import archive
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_prune_removes_days_before_retention(monkeypatch, tmp_path):
+    today = datetime.date.today()
+    old_day = (today - datetime.timedelta(days=10)).isoformat()
+    recent_day = (today - datetime.timedelta(days=2)).isoformat()
+    for name in (old_day, recent_day, 'sem-data'):
+        (tmp_path / name / 'SP').mkdir(parents=True)
+
+    conn = RecordingConnection()
+    monkeypatch.setattr(archive, '_get_db_connection', lambda: conn)
+    writer = archive.PNCPArchive(base_dir=str(tmp_path), enabled=False)
+    writer.enabled = True  # zstandard é opcional; a retenção não comprime nada
+
+    assert writer.prune(retention_days=7) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([recent_day, 'sem-data'])
+    assert conn.executed[-1][1] == (today - datetime.timedelta(days=7),)
+
+
+def test_prune_disabled_by_zero_retention(tmp_path):
+    (tmp_path / '2000-01-01').mkdir()
+    writer = archive.PNCPArchive(base_dir=str(tmp_path), enabled=False)
+    writer.enabled = True
+
+    assert writer.prune(retention_days=0) == 0
+    assert (tmp_path / '2000-01-01').exists()
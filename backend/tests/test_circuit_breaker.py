@@ -0,0 +1,95 @@
+"""Testes das transições de estado do CircuitBreaker e do cache negativo"""
+
+import pytest
+
+from matching.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, NegativeCache,
+    STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+)
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker('teste', failure_threshold=3, recovery_seconds=60)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.status()['state'] == STATE_CLOSED
+
+    assert breaker.allow()
+    breaker.record_failure()
+
+    status = breaker.status()
+    assert status['state'] == STATE_OPEN
+    assert status['opened'] == 1
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.status()['rejected'] == 2
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker('teste', failure_threshold=2, recovery_seconds=60)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.status()['state'] == STATE_CLOSED
+    assert breaker.status()['consecutive_failures'] == 1
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker('teste', failure_threshold=1, recovery_seconds=0)
+    breaker.record_failure()
+    assert breaker.status()['state'] == STATE_OPEN
+
+    # Tempo de recuperação esgotado: uma requisição de teste por vez
+    assert breaker.allow()
+    assert breaker.status()['state'] == STATE_HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_probe_success_closes():
+    breaker = CircuitBreaker('teste', failure_threshold=1, recovery_seconds=0)
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_success()
+
+    assert breaker.status()['state'] == STATE_CLOSED
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = CircuitBreaker('teste', failure_threshold=5, recovery_seconds=60)
+    for _ in range(5):
+        breaker.record_failure()
+    breaker.recovery_seconds = 0
+    assert breaker.allow()
+    assert breaker.status()['state'] == STATE_HALF_OPEN
+
+    # Falha da requisição de teste reabre sem esperar o limite de falhas
+    breaker.recovery_seconds = 60
+    breaker.record_failure()
+
+    assert breaker.status()['state'] == STATE_OPEN
+    assert breaker.status()['retry_in_seconds'] > 0
+    assert not breaker.allow()
+
+
+def test_negative_cache_ttl_and_size():
+    cache = NegativeCache(ttl_seconds=60, max_size=2)
+    cache.add('a')
+    cache.add('b')
+    cache.add('c')
+
+    assert not cache.contains('a')  # Mais antigo descartado (LRU)
+    assert cache.contains('b') and cache.contains('c')
+    cache.discard('b')
+    assert not cache.contains('b')
+
+    disabled = NegativeCache(ttl_seconds=0)
+    disabled.add('a')
+    assert not disabled.contains('a')
@@ -0,0 +1,55 @@
+"""Testes da reserva de unidades da ingestão (sem banco: conexão de teste registra o SQL)"""
+
+import datetime
+
+from matching import ingestion
+
+
+class RecordingCursor:
+    def __init__(self, executed):
+        self.executed = executed
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append((' '.join(sql.split()), params))
+
+    def fetchone(self):
+        return None
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self.executed)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_claim_unit_fails_stale_units_without_attempts_left(monkeypatch):
+    conn = RecordingConnection()
+    monkeypatch.setattr(ingestion, 'get_db_connection', lambda: conn)
+    monkeypatch.setattr(ingestion, 'INGESTION_UNIT_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(ingestion, 'INGESTION_UNIT_STALE_SECONDS', 900)
+    day = datetime.date(2025, 6, 20)
+
+    assert ingestion.claim_unit(day, day, 'worker-1', ufs=['SP']) is None
+
+    (sweep_sql, sweep_params), (claim_sql, claim_params) = conn.executed
+    assert "SET status = 'failed'" in sweep_sql
+    assert "status = 'running' AND attempts >= %s" in sweep_sql
+    assert sweep_params == [day, day, ['SP'], 3, 900]
+    # A reserva continua restrita a unidades com tentativas restantes
+    assert "attempts < %s" in claim_sql
+    assert claim_params == ['worker-1', day, day, ['SP'], 3, 900]
@@ -0,0 +1,97 @@
+"""
+Testes da paginação por keyset do BaseRepository (condição e cursor opaco)
+A condição gerada é executada em SQLite em memória com ORDER BY ... DESC NULLS FIRST,
+a mesma ordem do DESC no PostgreSQL.
+"""
+
+import sqlite3
+import itertools
+
+import pytest
+
+from repositories.base_repository import BaseRepository
+
+ROWS = [
+    (a, b, i)
+    for i, (a, b) in enumerate(itertools.product([None, 1, 2, 3], [None, 10, 20]))
+]
+COLUMNS = ['a', 'b', 'id']
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (a INTEGER, b INTEGER, id INTEGER PRIMARY KEY)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?)", ROWS)
+    yield conn
+    conn.close()
+
+
+def _order_by(columns):
+    return ', '.join(f"{column} DESC NULLS FIRST" for column in columns)
+
+
+def _page(db, columns, cursor, limit):
+    where, params = "", []
+    if cursor is not None:
+        values = BaseRepository._decode_cursor(cursor, len(columns))
+        condition, params = BaseRepository._keyset_condition(columns, values)
+        where = f"WHERE {condition.replace('%s', '?')}"
+    rows = db.execute(f"SELECT {', '.join(columns)} FROM t {where} ORDER BY {_order_by(columns)} LIMIT ?",
+                      params + [limit]).fetchall()
+    next_cursor = BaseRepository._encode_cursor(list(rows[-1])) if len(rows) == limit else None
+    return rows, next_cursor
+
+
+@pytest.mark.parametrize('columns', [['a', 'id'], ['b', 'a', 'id'], ['a', 'b', 'id'], ['id']])
+@pytest.mark.parametrize('limit', [1, 2, 5])
+def test_pages_cover_every_row_once_in_order(db, columns, limit):
+    expected = db.execute(f"SELECT {', '.join(columns)} FROM t ORDER BY {_order_by(columns)}").fetchall()
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = _page(db, columns, cursor, limit)
+        seen.extend(rows)
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+
+def test_non_null_cursor_uses_row_comparison():
+    sql, params = BaseRepository._keyset_condition(['created_at', 'id'], ['2025-06-01', 'x'])
+
+    assert sql == "(created_at, id) < (%s, %s)"
+    assert params == ['2025-06-01', 'x']
+
+
+def test_null_cursor_branches():
+    assert BaseRepository._keyset_condition(['a'], [None]) == ("a IS NOT NULL", [])
+    assert BaseRepository._keyset_condition(['a'], [5]) == ("(a) < (%s)", [5])
+
+    sql, params = BaseRepository._keyset_condition(['a', 'id'], [None, 7])
+    assert sql == "((a IS NULL AND (id) < (%s)) OR a IS NOT NULL)"
+    assert params == [7]
+
+    sql, params = BaseRepository._keyset_condition(['a', 'b', 'id'], [3, None, 7])
+    assert sql == "(a < %s OR (a = %s AND ((b IS NULL AND (id) < (%s)) OR b IS NOT NULL)))"
+    assert params == [3, 3, 7]
+
+
+def test_cursor_round_trip():
+    values = ['2025-06-01T10:00:00', None, 42, 'c0ffee']
+    cursor = BaseRepository._encode_cursor(values)
+
+    assert '=' not in cursor
+    assert BaseRepository._decode_cursor(cursor, len(values)) == values
+
+
+@pytest.mark.parametrize('cursor', ['%%%', 'bm90LWpzb24', BaseRepository._encode_cursor({'a': 1})])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        BaseRepository._decode_cursor(cursor, 1)
+
+
+def test_cursor_with_wrong_size_is_invalid():
+    with pytest.raises(ValueError):
+        BaseRepository._decode_cursor(BaseRepository._encode_cursor([1, 2]), 3)
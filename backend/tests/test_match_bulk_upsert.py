@@ -0,0 +1,65 @@
+"""Testes do upsert em lote de matches (BaseRepository.bulk_insert com on_conflict)"""
+
+from contextlib import contextmanager
+
+from repositories import base_repository
+from repositories.match_repository import MatchRepository
+
+
+class FakeConnection:
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeDBManager:
+    @contextmanager
+    def get_transaction(self):
+        yield FakeConnection()
+
+
+def _bulk_create(monkeypatch, matches):
+    calls = []
+
+    def fake_execute_values(cursor, query, values, page_size=None, fetch=False):
+        calls.append((query, values))
+        return [(f"id-{i}",) for i, _ in enumerate(values)]
+
+    monkeypatch.setattr(base_repository, 'execute_values', fake_execute_values)
+    monkeypatch.setattr(MatchRepository, 'metadata', property(lambda self: None))
+    ids = MatchRepository(FakeDBManager()).bulk_create_matches(matches)
+    return ids, calls
+
+
+def test_bulk_create_matches_upserts_by_pair(monkeypatch):
+    matches = [
+        {'id': 'novo-1', 'licitacao_id': 'l1', 'empresa_id': 'e1', 'score_similaridade': 0.7},
+        {'id': 'novo-2', 'licitacao_id': 'l1', 'empresa_id': 'e2', 'score_similaridade': 0.8},
+    ]
+
+    ids, calls = _bulk_create(monkeypatch, matches)
+
+    query, values = calls[0]
+    assert 'ON CONFLICT (licitacao_id, empresa_id) DO UPDATE' in query
+    assert query.index('ON CONFLICT') < query.index('RETURNING')
+    # Pares existentes mantêm o id original: os ids vêm do RETURNING
+    assert ids == ['id-0', 'id-1']
+
+
+def test_bulk_create_matches_deduplicates_pairs_in_batch(monkeypatch):
+    matches = [
+        {'licitacao_id': 'l1', 'empresa_id': 'e1', 'score_similaridade': 0.6},
+        {'licitacao_id': 'l1', 'empresa_id': 'e1', 'score_similaridade': 0.9},
+    ]
+
+    ids, calls = _bulk_create(monkeypatch, matches)
+
+    _, values = calls[0]
+    assert len(values) == 1
+    assert 0.9 in values[0]
+    assert len(ids) == 1
@@ -0,0 +1,147 @@
+"""Testes do registro de prepared statements (sem banco: cursor de teste registra o SQL)"""
+
+import psycopg2
+import pytest
+
+from config.prepared_statements import PreparedStatement, PreparedStatementRegistry
+
+
+class RecordingConnection:
+    def __init__(self, autocommit=True):
+        self.autocommit = autocommit
+
+
+class RecordingCursor:
+    """Registra os comandos executados; fail_next simula um erro do servidor"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.executed = []
+        self.fail_next = None
+
+    def execute(self, sql, params=None):
+        if self.fail_next is not None and sql.startswith('EXECUTE'):
+            error, self.fail_next = self.fail_next, None
+            raise error
+        self.executed.append((sql, params))
+
+
+class ServerError(psycopg2.Error):
+    """Erro do servidor com pgcode definido (em psycopg2.Error o atributo é somente leitura)"""
+
+    def __init__(self, code):
+        super().__init__(f"erro {code}")
+        self._code = code
+
+    @property
+    def pgcode(self):
+        return self._code
+
+
+def test_prepare_sql_numbers_placeholders_and_unescapes_percent():
+    statement = PreparedStatement(
+        'busca', "SELECT * FROM t WHERE a = %s AND b ILIKE '%%x%%' AND c = %s", ['text', 'int']
+    )
+
+    assert statement.prepare_sql == (
+        "PREPARE busca (text, int) AS SELECT * FROM t WHERE a = $1 AND b ILIKE '%x%' AND c = $2"
+    )
+    assert statement.execute_sql == "EXECUTE busca (%s::text, %s::int)"
+
+
+def test_prepare_sql_without_parameters():
+    statement = PreparedStatement('contagem', "SELECT COUNT(*) FROM t", [])
+
+    assert statement.prepare_sql == "PREPARE contagem AS SELECT COUNT(*) FROM t"
+    assert statement.execute_sql == "EXECUTE contagem"
+
+
+def test_placeholder_after_escaped_percent():
+    statement = PreparedStatement('mod', "SELECT 10 %% %s", ['int'])
+
+    assert statement.prepare_sql == "PREPARE mod (int) AS SELECT 10 % $1"
+
+
+@pytest.mark.parametrize('name', ['Maiuscula', '1nome', 'nome-com-hifen', 'nome; DROP'])
+def test_invalid_name_is_rejected(name):
+    with pytest.raises(ValueError):
+        PreparedStatement(name, "SELECT 1", [])
+
+
+def test_parameter_count_must_match_types():
+    with pytest.raises(ValueError):
+        PreparedStatement('errado', "SELECT %s, %s", ['int'])
+
+
+def test_prepares_once_per_connection():
+    registry = PreparedStatementRegistry(enabled=True)
+    registry.register('por_id', "SELECT * FROM t WHERE id = %s", ['uuid'])
+    cursor = RecordingCursor(RecordingConnection())
+
+    registry.execute(cursor, 'por_id', ['a'])
+    registry.execute(cursor, 'por_id', ['b'])
+
+    assert [sql for sql, _ in cursor.executed] == [
+        "PREPARE por_id (uuid) AS SELECT * FROM t WHERE id = $1",
+        "EXECUTE por_id (%s::uuid)",
+        "EXECUTE por_id (%s::uuid)",
+    ]
+    assert cursor.executed[-1][1] == ('b',)
+
+    other = RecordingCursor(RecordingConnection())
+    registry.execute(other, 'por_id', ['c'])
+    assert other.executed[0][0].startswith('PREPARE')
+
+
+def test_disabled_registry_runs_plain_sql():
+    registry = PreparedStatementRegistry(enabled=False)
+    registry.register('por_id', "SELECT * FROM t WHERE id = %s", ['uuid'])
+    cursor = RecordingCursor(RecordingConnection())
+
+    registry.execute(cursor, 'por_id', ['a'])
+
+    assert cursor.executed == [("SELECT * FROM t WHERE id = %s", ('a',))]
+    assert registry.status()['fallbacks'] == 1
+
+
+def test_changed_sql_is_prepared_again():
+    registry = PreparedStatementRegistry(enabled=True)
+    registry.register('q', "SELECT 1", [])
+    cursor = RecordingCursor(RecordingConnection())
+    registry.execute(cursor, 'q')
+
+    registry.register('q', "SELECT 2", [])
+    registry.execute(cursor, 'q')
+
+    assert [sql for sql, _ in cursor.executed if sql.startswith('PREPARE')] == [
+        "PREPARE q AS SELECT 1", "PREPARE q AS SELECT 2"
+    ]
+
+
+def test_lost_statement_is_reprepared_in_autocommit():
+    registry = PreparedStatementRegistry(enabled=True)
+    registry.register('q', "SELECT 1", [])
+    cursor = RecordingCursor(RecordingConnection(autocommit=True))
+    registry.execute(cursor, 'q')
+
+    cursor.fail_next = ServerError('26000')
+    registry.execute(cursor, 'q')
+
+    assert [sql for sql, _ in cursor.executed] == [
+        "PREPARE q AS SELECT 1", "EXECUTE q", "PREPARE q AS SELECT 1", "EXECUTE q"
+    ]
+    assert registry.status()['reprepares'] == 1
+
+
+def test_error_inside_transaction_is_raised_and_statement_forgotten():
+    registry = PreparedStatementRegistry(enabled=True)
+    registry.register('q', "SELECT 1", [])
+    cursor = RecordingCursor(RecordingConnection(autocommit=False))
+    registry.execute(cursor, 'q')
+
+    cursor.fail_next = ServerError('0A000')
+    with pytest.raises(psycopg2.Error):
+        registry.execute(cursor, 'q')
+
+    registry.execute(cursor, 'q')
+    assert cursor.executed[-2][0] == "PREPARE q AS SELECT 1"
@@ -0,0 +1,23 @@
+"""Testes da lista de colunas do SELECT (colunas ocultas, como o tsvector da busca)"""
+
+from repositories.licitacao_repository import LicitacaoRepository
+from repositories.match_repository import MatchRepository
+from repositories.schema_cache import TableMetadata
+
+LICITACOES = TableMetadata(
+    'licitacoes', ('id', 'pncp_id', 'objeto_compra', 'objeto_busca', 'uf'),
+    generated_columns=('objeto_busca',)
+)
+
+
+def test_select_columns_excludes_hidden_columns(monkeypatch):
+    monkeypatch.setattr(LicitacaoRepository, 'metadata', property(lambda self: LICITACOES))
+
+    assert LicitacaoRepository(None).select_columns == 'id, pncp_id, objeto_compra, uf'
+
+
+def test_select_columns_falls_back_to_star(monkeypatch):
+    monkeypatch.setattr(LicitacaoRepository, 'metadata', property(lambda self: None))
+
+    assert LicitacaoRepository(None).select_columns == '*'
+    assert MatchRepository(None).select_columns == '*'
@@ -0,0 +1,137 @@
+"""Testes do cache de respostas: versões por tag, TTL herdado do Redis e decorator de rota"""
+
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from middleware import response_cache
+from middleware.response_cache import ResponseCache, cached_response
+
+
+class SharedRedis:
+    """Redis em memória com a interface usada do CacheManager (compartilhado entre 'processos')"""
+
+    def __init__(self):
+        self.values = {}
+        self.counters = {}
+
+    def get_value(self, key):
+        return self.values.get(key)
+
+    def set_value(self, key, value, ttl=None):
+        self.values[key] = value
+        return True
+
+    def get_counters(self, keys):
+        return [self.counters.get(key, 0) for key in keys]
+
+    def increment_counter(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+
+def _cache(redis=None, max_entries=16) -> ResponseCache:
+    cache = ResponseCache(max_entries=max_entries)
+    cache._redis_checked = True
+    cache._cache_manager = redis
+    return cache
+
+
+def test_invalidate_bumps_only_the_given_tags_without_redis():
+    cache = _cache()
+    assert cache.tag_versions(['bids', 'matches']) == (0, 0)
+
+    cache.invalidate('matches')
+
+    assert cache.tag_versions(['bids', 'matches']) == (0, 1)
+    assert cache.status()['invalidations'] == 1
+
+
+def test_other_process_invalidation_is_seen_after_version_check(monkeypatch):
+    redis = SharedRedis()
+    api, worker = _cache(redis), _cache(redis)
+    monkeypatch.setattr(response_cache, 'RESPONSE_CACHE_VERSION_CHECK', 3600)
+    assert api.tag_versions(['matches']) == (0,)
+
+    worker.invalidate('matches')
+
+    # Dentro do intervalo a versão local ainda é usada
+    assert api.tag_versions(['matches']) == (0,)
+    monkeypatch.setattr(response_cache, 'RESPONSE_CACHE_VERSION_CHECK', 0)
+    assert api.tag_versions(['matches']) == (1,)
+
+
+def test_local_entries_expire_and_respect_max_entries():
+    cache = _cache(max_entries=2)
+    cache.set('a', b'1', 'application/json', ttl=60)
+    cache.set('b', b'2', 'application/json', ttl=60)
+    cache.set('c', b'3', 'application/json', ttl=60)
+
+    assert cache.get('a') is None
+    assert cache.get('c') == (b'3', 'application/json')
+
+    cache.set('d', b'4', 'application/json', ttl=0)
+    assert cache.get('d') is None
+
+
+def test_redis_hit_keeps_remaining_ttl():
+    redis = SharedRedis()
+    writer, reader = _cache(redis), _cache(redis)
+    writer.set('k', b'corpo', 'application/json', ttl=300)
+    body, mimetype, _ = redis.values['k']
+    redis.values['k'] = (body, mimetype, time.time() + 2)
+
+    assert reader.get('k') == (b'corpo', 'application/json')
+
+    local_expiry = reader._entries['k'][0] - time.monotonic()
+    assert 0 < local_expiry <= 2
+    assert reader.status()['redis_hits'] == 1
+
+
+def test_expired_redis_payload_is_a_miss():
+    redis = SharedRedis()
+    redis.values['k'] = (b'corpo', 'application/json', time.time() - 1)
+    cache = _cache(redis)
+
+    assert cache.get('k') is None
+    assert 'k' not in cache._entries
+    assert cache.status()['misses'] == 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    cache = _cache()
+    monkeypatch.setattr(response_cache, '_response_cache', cache)
+    monkeypatch.setattr(response_cache, 'RESPONSE_CACHE_ENABLED', True)
+    calls = {'count': 0}
+
+    app = Flask(__name__)
+
+    @app.route('/stats')
+    @cached_response(tags=['matches'], ttl=60)
+    def stats():
+        calls['count'] += 1
+        return jsonify({'success': True, 'data': calls['count']})
+
+    client = app.test_client()
+    client.calls = calls
+    return client
+
+
+def test_cached_response_hit_miss_and_invalidation(client):
+    first = client.get('/stats')
+    second = client.get('/stats')
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    assert client.calls['count'] == 1
+
+    # Parâmetros diferentes são outra entrada
+    assert client.get('/stats?empresa=1').headers['X-Cache'] == 'MISS'
+
+    response_cache.invalidate_cache_tags('matches')
+    third = client.get('/stats')
+    assert third.headers['X-Cache'] == 'MISS'
+    assert third.get_json()['data'] == 3
@@ -0,0 +1,187 @@
+"""Testes da matriz de scores: top-K vetorizado e recálculo de thresholds"""
+
+import numpy as np
+import pytest
+
+from matching import matching_engine
+from matching.score_matrix import (
+    ScoreMatrix, ScoreMatrixRecorder, _commit_blocked_reason, ITEMS_NOT_EVALUATED
+)
+
+THRESHOLD_PHASE1 = 0.65
+THRESHOLD_PHASE2 = 0.70
+
+COMPANIES = {cid: {'id': cid, 'nome': cid, 'descricao_servicos_produtos': ''} for cid in ('e1', 'e2', 'e3')}
+
+# Fase 1 por licitação e scores de itens por empresa ({descrição: score})
+BIDS = {
+    'b1': {
+        'phase1': {'e1': 0.80, 'e2': 0.70, 'e3': 0.60},
+        'items': {
+            'e1': {'cadeira': 0.75, 'mesa': 0.90, 'papel': 0.50},
+            'e2': {'cadeira': 0.60},
+            'e3': {'mesa': 0.95},
+        },
+    },
+    'b2': {'phase1': {'e1': 0.68, 'e2': 0.50}, 'items': None},
+    'b3': {'phase1': {'e1': 0.55}, 'items': {'e1': {'cadeira': 0.90}}},
+}
+
+
+class ScriptedCompanyMatrix:
+    """Fases 1 e 2 com scores fixos de uma licitação (mesmo contrato de CompanyMatrix)"""
+
+    def __init__(self, bid):
+        self.bid = bid
+
+    def phase1(self, bid_embedding, objeto_compra, threshold):
+        candidates = [(COMPANIES[cid], score, f"cosseno {score}") for cid, score in self.bid['phase1'].items()
+                      if score >= threshold]
+        return sorted(candidates, key=lambda m: m[1], reverse=True)
+
+    def phase2(self, item_embeddings, item_descriptions, potential_matches, threshold):
+        items = self.bid['items'] or {}
+        return {
+            company['id']: [(desc, score) for desc, score in items.get(company['id'], {}).items()
+                            if desc in item_descriptions and score >= threshold]
+            for company, _, _ in potential_matches
+        }
+
+
+class FakeVectorizer:
+    def batch_vectorize(self, texts):
+        return [[1.0] for _ in texts]
+
+
+def _items(bid):
+    descriptions = sorted({desc for scores in (bid['items'] or {}).values() for desc in scores})
+    return [{'descricao': desc} for desc in descriptions]
+
+
+def _run_match_bid(monkeypatch, threshold_phase1, threshold_phase2, recorder=None):
+    """Matches de _match_bid (Fases 1 e 2) para todas as licitações: {(licitação, empresa): match}"""
+    monkeypatch.setattr(matching_engine, 'SIMILARITY_THRESHOLD_PHASE1', threshold_phase1)
+    monkeypatch.setattr(matching_engine, 'SIMILARITY_THRESHOLD_PHASE2', threshold_phase2)
+    result = {}
+    for bid_id, bid in BIDS.items():
+        matches = matching_engine._match_bid(
+            FakeVectorizer(), ScriptedCompanyMatrix(bid), [1.0], bid_id,
+            lambda bid=bid: _items(bid), matching_engine._new_statistics(),
+            licitacao_id=bid_id, recorder=recorder
+        )
+        for match in matches:
+            result[(bid_id, match['empresa_id'])] = match
+    return result
+
+
+def _recorded_matrix(monkeypatch) -> ScoreMatrix:
+    recorder = ScoreMatrixRecorder('teste', 'FakeVectorizer', THRESHOLD_PHASE1, THRESHOLD_PHASE2,
+                                   top_n=50, min_score=0.45)
+    _run_match_bid(monkeypatch, THRESHOLD_PHASE1, THRESHOLD_PHASE2, recorder=recorder)
+    return ScoreMatrix.from_payload({'min_score': recorder.min_score}, recorder.to_payload())
+
+
+def _rethreshold_matches(matrix, threshold_phase1, threshold_phase2):
+    pairs, scores, used_phase2, summary = matrix.rethreshold(threshold_phase1, threshold_phase2)
+    matches = matrix.build_matches(pairs, scores, used_phase2, threshold_phase1, threshold_phase2)
+    return {(bid_id, m['empresa_id']): m for bid_id, bid_matches in matches.items() for m in bid_matches}, summary
+
+
+@pytest.mark.parametrize('threshold_phase1, threshold_phase2', [
+    (THRESHOLD_PHASE1, THRESHOLD_PHASE2),
+    (0.60, 0.55),
+    (0.75, 0.80),
+    (0.69, 0.74),
+])
+def test_rethreshold_agrees_with_match_bid(monkeypatch, threshold_phase1, threshold_phase2):
+    matrix = _recorded_matrix(monkeypatch)
+
+    expected = _run_match_bid(monkeypatch, threshold_phase1, threshold_phase2)
+    actual, summary = _rethreshold_matches(matrix, threshold_phase1, threshold_phase2)
+
+    assert set(actual) == set(expected)
+    for key, match in expected.items():
+        assert actual[key]['match_type'] == match['match_type']
+        assert actual[key]['score'] == pytest.approx(match['score'], abs=1e-6)
+    assert summary['total_matches'] == len(expected)
+    assert summary['matches_aproximados'] == 0
+    assert _commit_blocked_reason(summary) is None
+
+
+def test_bid_without_phase2_evaluation_is_approximate(monkeypatch):
+    matrix = _recorded_matrix(monkeypatch)
+    assert matrix.bid_items[list(matrix.bid_ids).index('b3')] == ITEMS_NOT_EVALUATED
+
+    actual, summary = _rethreshold_matches(matrix, 0.50, THRESHOLD_PHASE2)
+
+    # b3 não teve itens vetorizados: o par entra só pela Fase 1 e é marcado como aproximado
+    assert actual[('b3', 'e1')]['match_type'] == 'objeto_completo'
+    assert summary['matches_aproximados'] == 1
+    assert 'aproximados' in _commit_blocked_reason(summary)
+
+
+def test_threshold_below_recorded_floor_blocks_commit(monkeypatch):
+    matrix = _recorded_matrix(monkeypatch)
+
+    summary = matrix.rethreshold(0.40, 0.40)[3]
+
+    assert summary['abaixo_do_piso_registrado'] is True
+    assert _commit_blocked_reason(summary) is not None
+
+
+def _brute_force_top_k(pairs, scores, groups, k):
+    kept = []
+    for group in set(groups[pairs].tolist()):
+        members = [p for p in pairs if groups[p] == group]
+        kept.extend(sorted(members, key=lambda p: -scores[p])[:k])
+    return np.sort(np.asarray(kept, dtype=pairs.dtype))
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 10])
+def test_apply_top_k_matches_brute_force(k):
+    rng = np.random.default_rng(42)
+    scores = rng.permutation(200).astype(np.float32) / 200  # Scores distintos
+    groups = rng.integers(0, 15, size=200)
+    pairs = np.sort(rng.choice(200, size=120, replace=False))
+
+    result = ScoreMatrix._apply_top_k(pairs, scores, groups, k)
+
+    np.testing.assert_array_equal(result, _brute_force_top_k(pairs, scores, groups, k))
+
+
+def test_apply_top_k_without_limit_or_pairs():
+    scores = np.asarray([0.9, 0.8, 0.7], dtype=np.float32)
+    groups = np.asarray([0, 0, 0])
+    pairs = np.asarray([0, 1, 2])
+
+    np.testing.assert_array_equal(ScoreMatrix._apply_top_k(pairs, scores, groups, 0), pairs)
+    empty = np.asarray([], dtype=np.int64)
+    assert len(ScoreMatrix._apply_top_k(empty, scores, groups, 1)) == 0
+
+
+def test_rethreshold_top_k_per_bid_and_company(monkeypatch):
+    matrix = _recorded_matrix(monkeypatch)
+
+    pairs, scores, _, summary = matrix.rethreshold(0.45, 0.45, top_k_per_bid=1, top_k_per_company=1)
+
+    companies = matrix.pair_company[pairs]
+    bids = matrix.pair_bid[pairs]
+    assert len(set(companies.tolist())) == len(companies)
+    assert len(set(bids.tolist())) == len(bids)
+    assert summary['total_matches'] == len(pairs)
+
+
+def test_simulate_thresholds_top_k_defaults_to_config(monkeypatch):
+    from matching import score_matrix
+
+    matrix = _recorded_matrix(monkeypatch)
+    monkeypatch.setattr(score_matrix, 'load_score_matrix', lambda run_id: matrix)
+    monkeypatch.setattr(score_matrix, 'MATCH_TOP_K_PER_BID', 1)
+    monkeypatch.setattr(score_matrix, 'MATCH_TOP_K_PER_COMPANY', 2)
+
+    result = score_matrix.simulate_thresholds(0.45, 0.45)
+    assert result['top_k'] == {'per_bid': 1, 'per_company': 2}
+    assert result['summary']['licitacoes_com_matches'] == result['summary']['total_matches']
+
+    result = score_matrix.simulate_thresholds(0.45, 0.45, top_k_per_bid=0, top_k_per_company=0)
+    assert result['top_k'] == {'per_bid': 0, 'per_company': 0}
@@ -0,0 +1,81 @@
+"""Testes do MatchSelector (top-K por licitação e por empresa)"""
+
+from matching.scoring import MatchSelector
+
+
+def _match(empresa_id, score):
+    return {'empresa_id': empresa_id, 'score': score, 'match_type': 'objeto_completo', 'justificativa': ''}
+
+
+def test_top_k_per_bid_keeps_highest_scores():
+    selector = MatchSelector(top_k_per_bid=2, top_k_per_company=0)
+
+    selected = selector.add('b1', [_match('e1', 0.7), _match('e2', 0.9), _match('e3', 0.8)])
+
+    assert [m['empresa_id'] for m in selected] == ['e2', 'e3']
+    assert selector.discarded == 1
+    assert selector.drain() == {'b1': selected}
+    assert selector.drain() == {}
+
+
+def test_without_company_limit_matches_are_not_buffered():
+    selector = MatchSelector(top_k_per_bid=0, top_k_per_company=0)
+    assert not selector.buffers_matches
+
+    selector.add('b1', [_match('e1', 0.7)])
+    selector.add('b2', [])
+
+    assert selector.drain() == {'b1': [_match('e1', 0.7)]}
+
+
+def test_top_k_per_company_across_bids():
+    selector = MatchSelector(top_k_per_bid=0, top_k_per_company=2)
+    assert selector.buffers_matches
+
+    selector.add('b1', [_match('e1', 0.70), _match('e2', 0.95)])
+    selector.add('b2', [_match('e1', 0.90)])
+    selector.add('b3', [_match('e1', 0.80)])
+
+    drained = selector.drain()
+    pairs = {(bid, m['empresa_id']) for bid, matches in drained.items() for m in matches}
+    assert pairs == {('b1', 'e2'), ('b2', 'e1'), ('b3', 'e1')}
+    assert selector.discarded == 1
+
+
+def test_written_match_evicted_after_flush_is_reported():
+    selector = MatchSelector(top_k_per_bid=0, top_k_per_company=1)
+
+    selector.add('b1', [_match('e1', 0.70)])
+    assert selector.drain() == {'b1': [_match('e1', 0.70)]}
+
+    # Licitação posterior supera o match já gravado: o par gravado deve ser removido
+    selector.add('b2', [_match('e1', 0.90)])
+    assert selector.pop_evicted() == [('b1', 'e1')]
+    assert selector.pop_evicted() == []
+    assert selector.drain() == {'b2': [_match('e1', 0.90)]}
+
+
+def test_lower_score_than_company_heap_is_discarded():
+    selector = MatchSelector(top_k_per_bid=0, top_k_per_company=1)
+
+    selector.add('b1', [_match('e1', 0.90)])
+    selector.add('b2', [_match('e1', 0.60)])
+
+    assert selector.drain() == {'b1': [_match('e1', 0.90)]}
+    assert selector.pop_evicted() == []
+    assert selector.discarded == 1
+
+
+def test_seed_restores_company_limit_on_resume():
+    selector = MatchSelector(top_k_per_bid=0, top_k_per_company=1)
+    selector.seed([('b1', 'e1', 0.85)])
+
+    # Match gravado na execução interrompida não é regravado
+    assert selector.drain() == {}
+
+    selector.add('b2', [_match('e1', 0.80)])
+    assert selector.drain() == {}
+
+    selector.add('b3', [_match('e1', 0.95)])
+    assert selector.pop_evicted() == [('b1', 'e1')]
+    assert selector.drain() == {'b3': [_match('e1', 0.95)]}
@@ -0,0 +1,75 @@
+"""Testes da finalização da reavaliação em shards (sem banco: conexão de teste registra o SQL)"""
+
+import datetime
+
+from matching import matching_engine, pncp_api
+
+
+class RecordingCursor:
+    def __init__(self, executed):
+        self.executed = executed
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append((' '.join(sql.split()), params))
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self.executed)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_finalize_trims_only_matches_written_by_the_run(monkeypatch):
+    run_started_at = datetime.datetime(2025, 6, 20, 12, 0, tzinfo=datetime.timezone.utc)
+    conn = RecordingConnection()
+    monkeypatch.setattr(pncp_api, 'get_db_connection', lambda: conn)
+    monkeypatch.setattr(matching_engine, 'MATCH_TOP_K_PER_COMPANY', 3)
+    monkeypatch.setattr(matching_engine, 'get_run_started_at', lambda run_id: run_started_at)
+    monkeypatch.setattr(matching_engine, 'get_shard_results', lambda run_id: [
+        {'shard_index': 0, 'stats': {'estatisticas': {}, 'matches_encontrados': 4, 'progresso': 2},
+         'score_payload': None}
+    ])
+    monkeypatch.setattr(matching_engine, '_new_recorder', lambda run_type, vectorizer: None)
+    monkeypatch.setattr(matching_engine, 'complete_run', lambda run_id, stats: None)
+    monkeypatch.setattr(matching_engine, 'refresh_summaries', lambda *groups, **kwargs: [])
+    monkeypatch.setattr(matching_engine, '_print_detailed_final_report', lambda matches, stats: {})
+
+    result = matching_engine.finalize_sharded_reevaluation('run-1', vectorizer=None)
+
+    assert result['run_id'] == 'run-1'
+    [(sql, params)] = conn.executed
+    assert sql.startswith('DELETE FROM matches m')
+    # Matches anteriores à execução (clear_matches=False) ficam fora do ranking e do DELETE
+    assert 'FROM matches WHERE data_match >= %s' in sql
+    assert params == [run_started_at, 3]
+
+
+def test_finalize_skips_trim_without_run_start(monkeypatch):
+    conn = RecordingConnection()
+    monkeypatch.setattr(pncp_api, 'get_db_connection', lambda: conn)
+    monkeypatch.setattr(matching_engine, 'MATCH_TOP_K_PER_COMPANY', 3)
+    monkeypatch.setattr(matching_engine, 'get_run_started_at', lambda run_id: None)
+    monkeypatch.setattr(matching_engine, 'get_shard_results', lambda run_id: [])
+    monkeypatch.setattr(matching_engine, '_new_recorder', lambda run_type, vectorizer: None)
+    monkeypatch.setattr(matching_engine, 'complete_run', lambda run_id, stats: None)
+    monkeypatch.setattr(matching_engine, 'refresh_summaries', lambda *groups, **kwargs: [])
+    monkeypatch.setattr(matching_engine, '_print_detailed_final_report', lambda matches, stats: {})
+
+    matching_engine.finalize_sharded_reevaluation('run-1', vectorizer=None)
+
+    assert conn.executed == []